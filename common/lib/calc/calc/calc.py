@@ -7,6 +7,8 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
 import numpy
 import scipy.constants
 import functions
@@ -228,9 +230,8 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    # Parse the tree, or reuse the parse of an earlier call.
+    math_interpreter = parse_expression(math_expr, case_sensitive)
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -238,24 +239,355 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     # ...and check them
     math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+    return math_interpreter.evaluate(all_variables, all_functions)
+
+
+# The number of parsed expressions that are kept by `parse_expression`. The
+# samples of a FormulaResponse evaluate the same few expressions many times.
+PARSE_CACHE_SIZE = 1024
+
+_PARSE_CACHE = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Return a parsed ParseAugmenter for the given math expression string.
+
+    The parsed expressions of recent calls are kept, keyed by the expression
+    and `case_sensitive`, so that evaluating an expression again doesn't parse
+    or compile it again. Parse errors are raised, and not cached.
+    """
+    key = (math_expr, case_sensitive)
+    with _PARSE_CACHE_LOCK:
+        math_interpreter = _PARSE_CACHE.pop(key, None)
+        if math_interpreter is not None:
+            _PARSE_CACHE[key] = math_interpreter
+            return math_interpreter
+
+    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+    math_interpreter.parse_algebra()
+    math_interpreter.compile()
+
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = math_interpreter
+        while len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    return math_interpreter
+
+
+def clear_parse_cache():
+    """
+    Forget the expressions parsed by `parse_expression`.
+    """
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE.clear()
+
+
+# The default functions which give the same results for arrays of samples as
+# for each of the samples.
+SAMPLE_FUNCTIONS = frozenset(
+    function for function in DEFAULT_FUNCTIONS.values() if function is not math.factorial
+)
+
+
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each of the dictionaries of variables in
+    `variables_list`, and return a NumPy array of the results.
+
+    This gives the same results, and raises the same errors, as calling
+    `evaluator` for each dictionary in turn. When all the dictionaries have the
+    same variables, each of which is either real in all the dictionaries or
+    complex in all of them, and the expression only uses functions
+    which accept arrays, the expression is evaluated once, for arrays of the
+    values of all the samples. It is evaluated again sample by sample if NumPy
+    reports a floating point error (e.g. a division by zero), since python
+    numbers raise errors where NumPy arrays give infinities or NaN.
+    """
+    num_samples = len(variables_list)
+    if math_expr.strip() == "":
+        return numpy.repeat(float('nan'), num_samples)
+
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+    variables = _variable_samples(variables_list)
+    if variables is not None:
+        all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+        math_interpreter.check_variables(all_variables, all_functions)
+        if all(all_functions[math_interpreter.casify(function)] in SAMPLE_FUNCTIONS
+               for function in math_interpreter.functions_used):
+            try:
+                with numpy.errstate(all='raise', under='ignore'):
+                    results = numpy.asarray(math_interpreter.evaluate(all_variables, all_functions))
+            except Exception:  # pylint: disable=broad-except
+                results = None
+            if results is not None and results.dtype.kind in 'fc':
+                if results.shape == ():
+                    return numpy.repeat(results, num_samples)
+                if results.shape == (num_samples,):
+                    return results
+
+    return numpy.array([
+        evaluator(variables, functions, math_expr, case_sensitive)
+        for variables in variables_list
+    ])
+
+
+def _variable_samples(variables_list):
+    """
+    Return a dictionary mapping each variable of the dictionaries in
+    `variables_list` to the array of its values, or None if the dictionaries
+    don't all have the same variables, or if the values of a variable aren't
+    all real or all complex numbers.
+
+    A variable's values must all have the same type: an array would make
+    complex numbers of real values, and then sqrt(-1) would no longer be
+    nan, or (-1)^0.5 raise an error.
+    """
+    if not variables_list:
+        return None
+    names = set(variables_list[0])
+    if any(set(variables) != names for variables in variables_list):
+        return None
+
+    samples = {}
+    for name in names:
+        values = [variables[name] for variables in variables_list]
+        if len(set(type(value) for value in values)) > 1:
+            return None
+        values = numpy.array(values)
+        if values.dtype.kind not in 'fc':
+            return None
+        samples[name] = values
+    return samples
+
+
+_GRAMMAR = None
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+def get_grammar():
+    """
+    Return the pyparsing grammar of algebraic expressions.
+
+    The grammar is built the first time it is needed, and then shared by all
+    the parses of the process. Its elements hold no state of a particular
+    parse, so it is safe to share between threads.
+    """
+    global _GRAMMAR  # pylint: disable=global-statement
+    if _GRAMMAR is None:
+        _GRAMMAR = _build_grammar()
+    return _GRAMMAR
+
+
+def _build_grammar():
+    """
+    Build the grammar of algebraic expressions.
+
+    Adding the groups and result names makes the `repr()` of the parse
+    results really gross. For debugging, use something like
+      print OBJ.tree.asXML()
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    return expr + stringEnd
+
+
+# The following few functions compile the nodes of a parse tree into closures,
+# which take the dictionaries of all variables and functions and return the
+# value of the node. They do the same as the evaluation actions above, but do
+# the work that doesn't depend on the values (converting numbers, finding the
+# operators) only once.
+
+def compile_number(node, casify):  # pylint: disable=unused-argument
+    """
+    Compile a number into a constant.
+    """
+    value = eval_number(node)
+    return lambda all_variables, all_functions: value
+
+
+def compile_variable(node, casify):
+    """
+    Compile a variable into a lookup of its value.
+    """
+    name = casify(node[0])
+    return lambda all_variables, all_functions: all_variables[name]
+
+
+def compile_function(node, casify):
+    """
+    Compile a function call.
+    """
+    name = casify(node[0])
+    argument = compile_node(node[1], casify)
+    return lambda all_variables, all_functions: all_functions[name](argument(all_variables, all_functions))
+
+
+def compile_atom(node, casify):
+    """
+    Compile an atom into its value, ignoring parentheses.
+    """
+    return compile_node(next(k for k in node if isinstance(k, ParseResults)), casify)
+
+
+def compile_power(node, casify):
+    """
+    Compile exponentiations, right to left, as `eval_power` does.
+    """
+    operands = [compile_node(k, casify) for k in node if isinstance(k, ParseResults)]
+    if len(operands) == 1:
+        return operands[0]
+    operands.reverse()
+
+    def power(all_variables, all_functions):
+        """
+        Raise each operand to the power of the operands on its right.
+        """
+        result = operands[0](all_variables, all_functions)
+        for operand in operands[1:]:
+            result = operand(all_variables, all_functions) ** result
+        return result
+    return power
+
+
+def compile_parallel(node, casify):
+    """
+    Compile the parallel resistors operator, as `eval_parallel` does.
+    """
+    operands = [compile_node(k, casify) for k in node if isinstance(k, ParseResults)]
+    if len(operands) == 1:
+        return operands[0]
+
+    def parallel(all_variables, all_functions):
+        """
+        Combine the operands, which are arrays when evaluating samples.
+        """
+        values = [operand(all_variables, all_functions) for operand in operands]
+        if any(isinstance(value, numpy.ndarray) for value in values):
+            return parallel_samples(values)
+        return eval_parallel(values)
+    return parallel
+
+
+def parallel_samples(values):
+    """
+    Compute the parallel resistors operator sample by sample, for arrays of
+    samples of its inputs, as `eval_parallel` does.
+    """
+    zeros = reduce(numpy.logical_or, [value == 0 for value in values])
+    reciprocals = [1. / numpy.where(value == 0, 1, value) for value in values]
+    return numpy.where(zeros, float('nan'), 1. / sum(reciprocals))
+
+
+def _compile_operations(node, casify, operators, start):
+    """
+    Compile a chain of binary operations, applied from left to right to the
+    initial value `start`, as `eval_sum` and `eval_product` do.
+
+    `operators` maps the operator tokens of the chain to functions. Each
+    operand must be preceded by an operator.
+    """
+    operations = []
+    current_op = None
+    for token in node:
+        if isinstance(token, ParseResults):
+            operations.append((current_op, compile_node(token, casify)))
+        else:
+            current_op = operators[token]
+
+    def operate(all_variables, all_functions):
+        """
+        Apply the operations in turn.
+        """
+        result = start
+        for current_op, operand in operations:
+            result = current_op(result, operand(all_variables, all_functions))
+        return result
+    return operate
+
+
+def compile_sum(node, casify):
+    """
+    Compile a sum, keeping in mind the signs of its terms.
+    """
+    if isinstance(node[0], ParseResults):
+        node = ['+'] + list(node)
+    return _compile_operations(node, casify, {'+': operator.add, '-': operator.sub}, 0.0)
+
+
+def compile_product(node, casify):
+    """
+    Compile a product.
+    """
+    return _compile_operations(['*'] + list(node), casify, {'*': operator.mul, '/': operator.truediv}, 1.0)
+
+
+COMPILE_ACTIONS = {
+    'number': compile_number,
+    'variable': compile_variable,
+    'function': compile_function,
+    'atom': compile_atom,
+    'power': compile_power,
+    'parallel': compile_parallel,
+    'product': compile_product,
+    'sum': compile_sum,
+}
+
+
+def compile_node(node, casify):
+    """
+    Compile a node of a parse tree into a closure returning its value.
+    """
+    node_name = node.getName()
+    if node_name not in COMPILE_ACTIONS:  # pragma: no cover
+        raise Exception(u"Unknown branch name '{}'".format(node_name))
+    return COMPILE_ACTIONS[node_name](node, casify)
 
 
 class ParseAugmenter(object):
@@ -277,23 +609,14 @@ class ParseAugmenter(object):
         self.tree = None
         self.variables_used = set()
         self.functions_used = set()
+        self.compiled = None
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
+    def casify(self, name):
+        """
+        Return the form of `name` which is looked up in the dictionaries of
+        variables and functions.
+        """
+        return name if self.case_sensitive else name.lower()
 
     def parse_algebra(self):
         """
@@ -303,61 +626,36 @@ class ParseAugmenter(object):
         reflect parenthesis and order of operations. Leave all operators in the
         tree and do not parse any strings of numbers into their float versions.
 
-        Adding the groups and result names makes the `repr()` of the result
-        really gross. For debugging, use something like
-          print OBJ.tree.asXML()
+        Also store the names of the variables and functions used in the tree.
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        self.tree = get_grammar().parseString(self.math_expr)[0]
+
+        stack = [self.tree]
+        while stack:
+            node = stack.pop()
+            node_name = node.getName()
+            if node_name == 'variable':
+                self.variables_used.add(node[0])
+            elif node_name == 'function':
+                self.functions_used.add(node[0])
+            stack.extend(k for k in node if isinstance(k, ParseResults))
+
+    def compile(self):
+        """
+        Compile the parse tree into `self.compiled`, a function which takes
+        the dictionaries of all variables and functions and returns the value
+        of the expression.
+        """
+        self.compiled = compile_node(self.tree, self.casify)
+
+    def evaluate(self, all_variables, all_functions):
+        """
+        Return the value of the expression for the given dictionaries of all
+        variables and functions, e.g. as returned by `add_defaults`.
+        """
+        if self.compiled is None:
+            self.compile()
+        return self.compiled(all_variables, all_functions)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
@@ -403,10 +701,7 @@ class ParseAugmenter(object):
 
         Otherwise, raise an UndefinedVariable containing all bad variables.
         """
-        if self.case_sensitive:
-            casify = lambda x: x
-        else:
-            casify = lambda x: x.lower()  # Lowercase for case insens.
+        casify = self.casify
 
         # Test if casify(X) is valid, but return the actual bad input (i.e. X)
         bad_vars = set(var for var in self.variables_used
@@ -3,6 +3,7 @@ Unit tests for calc.py
 """
 
 import unittest
+from mock import patch
 import numpy
 import calc
 from pyparsing import ParseException
@@ -559,3 +560,133 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class ParseCacheTest(unittest.TestCase):
+    """
+    Run tests for the grammar and the parsed expressions shared between
+    calls to calc.evaluator
+    """
+
+    def setUp(self):
+        super(ParseCacheTest, self).setUp()
+        calc.clear_parse_cache()
+        self.addCleanup(calc.clear_parse_cache)
+
+    def test_grammar_built_once(self):
+        calc.get_grammar()
+        with patch('calc.calc._build_grammar') as mock_build_grammar:
+            calc.evaluator({'x': 1}, {}, 'x+1')
+            calc.evaluator({'x': 1}, {}, 'x+2')
+        self.assertFalse(mock_build_grammar.called)
+
+    def test_expression_cached(self):
+        parsed = calc.parse_expression('x*sin(y)')
+        self.assertIs(calc.parse_expression('x*sin(y)'), parsed)
+        self.assertIsNot(calc.parse_expression('x*sin(y)', case_sensitive=True), parsed)
+        self.assertEqual(parsed.variables_used, {'x', 'y'})
+        self.assertEqual(parsed.functions_used, {'sin'})
+
+        self.assertEqual(calc.evaluator({'x': 2, 'y': 0}, {}, 'x*sin(y)'), 0)
+        self.assertEqual(calc.evaluator({'x': 2}, {'sin': lambda y: y}, 'x*sin(3)'), 6)
+
+    def test_cache_bounded(self):
+        with patch('calc.calc.PARSE_CACHE_SIZE', 2):
+            first = calc.parse_expression('1')
+            calc.parse_expression('2')
+            calc.parse_expression('3')
+        self.assertIsNot(calc.parse_expression('1'), first)
+
+    def test_parse_errors_not_cached(self):
+        with self.assertRaises(ParseException):
+            calc.evaluator({}, {}, '1+')
+        self.assertEqual(len(calc.calc._PARSE_CACHE), 0)  # pylint: disable=protected-access
+
+    def test_compiled_matches_tree(self):
+        # The compiled expressions give the same results as reducing the tree
+        # with the evaluation actions.
+        variables = {'x': 1.5, 'y': 2, 'R_1': 3}
+        all_variables, all_functions = calc.add_defaults(variables, {}, False)
+        evaluate_actions = {
+            'number': calc.eval_number,
+            'variable': lambda x: all_variables[x[0].lower()],
+            'function': lambda x: all_functions[x[0].lower()](x[1]),
+            'atom': calc.eval_atom,
+            'power': calc.eval_power,
+            'parallel': calc.eval_parallel,
+            'product': calc.eval_product,
+            'sum': calc.eval_sum
+        }
+        for math_expr in ('-3', '2^3^2', '1||2||3', '1-2+3', '-x*2/4', '4/2*3', 'sin(x)+X^2',
+                          '(1+2)*(3-4)/5', '2^-1', '-1^2', '1.5e3-7', 'x||y', '5%', 'R_1*2'):
+            parsed = calc.parse_expression(math_expr)
+            expected = parsed.reduce_tree(evaluate_actions)
+            result = calc.evaluator(variables, {}, math_expr)
+            self.assertEqual(result, expected, math_expr)
+            self.assertEqual(type(result), type(expected), math_expr)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Run tests for calc.evaluate_samples, which should give the same results
+    as calc.evaluator for each sample
+    """
+
+    def assert_samples(self, math_expr, variables_list, functions=None, case_sensitive=False):
+        """
+        Assert that `evaluate_samples` gives the results of `evaluator`.
+        """
+        functions = functions or {}
+        expected = [calc.evaluator(variables, functions, math_expr, case_sensitive) for variables in variables_list]
+        results = calc.evaluate_samples(variables_list, functions, math_expr, case_sensitive)
+        self.assertIsInstance(results, numpy.ndarray)
+        self.assertEqual(len(results), len(expected))
+        for result, expected_result in zip(results, expected):
+            if numpy.isnan(expected_result):
+                self.assertTrue(numpy.isnan(result), math_expr)
+            else:
+                self.assertAlmostEqual(result, expected_result, msg=math_expr)
+
+    def test_expressions(self):
+        variables_list = [{'x': 0.5 + index, 'y': -2.5 + index, 'R': 1.0 * index} for index in range(5)]
+        for math_expr in ('x+y', '-x*2k/y^2', '2^x^0.5', 'x||R', 'x||2', '3', 'sin(x)*cos(y)+i*x', 'sqrt(y)',
+                          'arccot(y)+sec(x)+arccoth(x)', 'abs(y)-e^x', 'X*Y', '(x+1)/(y-4)', '5%*x'):
+            self.assert_samples(math_expr, variables_list)
+
+    def test_case_sensitive(self):
+        variables_list = [{'x': 1.0, 'X': 2.0}, {'x': 3.0, 'X': 4.0}]
+        self.assert_samples('x-X', variables_list, case_sensitive=True)
+
+    def test_floating_point_errors(self):
+        # The samples raise the same errors as python numbers do.
+        variables_list = [{'x': 1.0}, {'x': 0.0}]
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(variables_list, {}, '1/x')
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples([{'x': -8.0}], {}, 'x^0.5')
+        self.assert_samples('x*1e308*10', [{'x': 1.0}, {'x': 2.0}])
+
+    def test_not_vectorized(self):
+        # Factorials, custom functions and differing variables are evaluated sample by sample.
+        self.assert_samples('fact(x)', [{'x': 3.0}, {'x': 4.0}])
+        self.assert_samples('f(x)', [{'x': 3.0}, {'x': 4.0}], functions={'f': lambda x: x + 1})
+        self.assert_samples('x', [{'x': 3.0}, {'x': 4.0, 'y': 1.0}])
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples([{'x': 3.5}], {}, 'factorial(x)')
+
+    def test_mixed_real_complex(self):
+        # Real samples stay real when other samples of the variable are complex.
+        variables_list = [{'x': -2.0}, {'x': 1j}]
+        for math_expr in ('sqrt(x)', 'arcsin(x)', 'x^2'):
+            self.assert_samples(math_expr, variables_list)
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples(variables_list, {}, 'x^0.5')
+
+    def test_undefined_variable(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}], {}, 'x+y')
+
+    def test_empty(self):
+        results = calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}], {}, ' ')
+        self.assertTrue(numpy.isnan(results).all())
+        self.assertEqual(len(calc.evaluate_samples([], {}, 'x')), 0)
@@ -16,6 +16,7 @@ This is used by capa_module.
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
@@ -27,6 +28,7 @@ from xml.sax.saxutils import unescape
 from capa.correctmap import CorrectMap
 import capa.inputtypes as inputtypes
 import capa.customrender as customrender
+from capa.parsed_problem_cache import ParsedProblem
 import capa.responsetypes as responsetypes
 from capa.util import contextualize_text, convert_files_to_filenames
 import capa.xqueue_interface as xqueue_interface
@@ -87,6 +89,10 @@ class LoncapaSystem(object):
     Attributes:
         i18n: an object implementing the `gettext.Translations` interface so
             that we can use `.ugettext` to localize strings.
+        parsed_problem_cache: a :class:`ParsedProblemCache` of the parsed
+            problems, or None to parse each problem when it is created.
+        sandbox_worker_pool: a :class:`SandboxWorkerPool` running the code of
+            the problems, or None to start a sandbox for each execution.
 
     See :class:`ModuleSystem` for documentation of other attributes.
 
@@ -106,7 +112,9 @@ class LoncapaSystem(object):
         seed,      # Why do we do this if we have self.seed?
         STATIC_URL,                                     # pylint: disable=invalid-name
         xqueue,
-        matlab_api_key=None
+        matlab_api_key=None,
+        parsed_problem_cache=None,
+        sandbox_worker_pool=None
     ):
         self.ajax_url = ajax_url
         self.anonymous_student_id = anonymous_student_id
@@ -122,6 +130,8 @@ class LoncapaSystem(object):
         self.STATIC_URL = STATIC_URL                    # pylint: disable=invalid-name
         self.xqueue = xqueue
         self.matlab_api_key = matlab_api_key
+        self.parsed_problem_cache = parsed_problem_cache
+        self.sandbox_worker_pool = sandbox_worker_pool
 
 
 class LoncapaProblem(object):
@@ -170,21 +180,10 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+        self.problem_text = self._clean_problem_text(problem_text)
 
-        self.make_xml_compatible(self.tree)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
-
-        # construct script processor context (eg for customresponse problems)
-        self.context = self._extract_context(self.tree)
+        # parse the problem and run its scripts, or reuse an earlier parse of it
+        self._parse_problem()
 
         # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
         # transformations.  This also creates the dict (self.responders) of Response
@@ -209,6 +208,110 @@ class LoncapaProblem(object):
 
         self.extracted_tree = self._extract_html(self.tree)
 
+    @classmethod
+    def extract_script_context(cls, problem_text, id, capa_system, seed):  # pylint: disable=redefined-builtin
+        """
+        Returns the context extracted from the scripts of a problem for the
+        given seed, without creating its responders or rendering it.
+
+        This runs the scripts just as creating the LoncapaProblem would, so it
+        can be used to fill the caches of the script results ahead of time.
+        """
+        problem = cls.__new__(cls)
+        problem.problem_id = id
+        problem.capa_system = capa_system
+        problem.seed = seed
+        problem.problem_text = cls._clean_problem_text(problem_text)
+        problem._parse_problem()  # pylint: disable=protected-access
+        return problem.context
+
+    @staticmethod
+    def _clean_problem_text(problem_text):
+        """
+        Convert startouttext and endouttext to proper <text></text>
+        """
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        return re.sub(r"endouttext\s*/", "/text", problem_text)
+
+    def _parse_problem(self):
+        """
+        Set `self.tree` to the parsed problem XML, with its included files, and
+        `self.context` to the context extracted from its scripts.
+
+        The results are kept in the parsed problem cache of the LoncapaSystem,
+        if it has one, and copied from there by the later LoncapaProblems with
+        the same problem text and seed.
+        """
+        cache = getattr(self.capa_system, 'parsed_problem_cache', None)
+        if cache is not None:
+            key = self._parsed_problem_key()
+            student_key = key + (self.capa_system.anonymous_student_id,)
+            parsed_problem = cache.get(key)
+            if parsed_problem is not None and parsed_problem.uses_anonymous_student_id:
+                parsed_problem = cache.get(student_key)
+            if parsed_problem is not None:
+                self.tree = parsed_problem.copy_tree()
+                self.context = parsed_problem.copy_context()
+                if 'python_lib.zip' in self.context['python_path']:
+                    # The cached parse doesn't keep the python_lib.zip of the course
+                    self.context['extra_files'] = self._python_lib_files() or None
+                # The problem may have been parsed for another student
+                self.context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+                return
+
+        # parse problem XML file into an element tree
+        self.tree = etree.XML(self.problem_text)
+
+        self.make_xml_compatible(self.tree)
+
+        # handle any <include file="foo"> tags
+        self._process_includes()
+
+        # construct script processor context (eg for customresponse problems)
+        self.context = self._extract_context(self.tree)
+
+        if cache is not None:
+            # Leave out the python_lib.zip, which can be large and is the same
+            # for all the problems of the course.
+            parsed_problem = ParsedProblem(self.tree, dict(self.context, extra_files=None))
+            # The scripts, including the ones of the included files, are given
+            # the anonymous id of the student if they mention it.
+            if 'anonymous_student_id' in self.context['script_code']:
+                cache.set(key, ParsedProblem(None, {}, uses_anonymous_student_id=True))
+                cache.set(student_key, parsed_problem)
+            else:
+                cache.set(key, parsed_problem)
+
+    def _python_lib_files(self):
+        """
+        Returns the extra files of the scripts of the problem: the python_lib.zip
+        of the course, if it has one, which can be imported by Python code.
+        """
+        zip_lib = self.capa_system.get_python_lib_zip()
+        if zip_lib is None:
+            return []
+        return [("python_lib.zip", zip_lib)]
+
+    def _parsed_problem_key(self):
+        """
+        Returns the key of this problem in the parsed problem cache.
+
+        The parses of a problem whose scripts use the anonymous id of the
+        student are cached with the id appended to this key, see ParsedProblem.
+        """
+        problem_text = self.problem_text
+        if isinstance(problem_text, unicode):
+            problem_text = problem_text.encode('utf-8')
+
+        return (
+            hashlib.sha1(problem_text).hexdigest(),
+            self.problem_id,
+            self.seed,
+            bool(self.capa_system.can_execute_unsafe_code()),
+            bool(self.capa_system.DEBUG),
+            getattr(self.capa_system.filestore, 'root_path', None),
+        )
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
@@ -697,7 +800,6 @@ class LoncapaProblem(object):
         """
         context = {}
         context['seed'] = self.seed
-        context['anonymous_student_id'] = self.capa_system.anonymous_student_id
         all_code = ''
 
         python_path = []
@@ -720,12 +822,18 @@ class LoncapaProblem(object):
             code = unescape(script.text, XMLESC)
             all_code += code
 
+        # Only give the anonymous id of the student to the scripts which use it,
+        # so that the cached results of the other scripts are shared by all
+        # the students with the same seed.
+        uses_anonymous_student_id = 'anonymous_student_id' in all_code
+        if uses_anonymous_student_id:
+            context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+
         extra_files = []
         if all_code:
             # An asset named python_lib.zip can be imported by Python code.
-            zip_lib = self.capa_system.get_python_lib_zip()
-            if zip_lib is not None:
-                extra_files.append(("python_lib.zip", zip_lib))
+            extra_files = self._python_lib_files()
+            if extra_files:
                 python_path.append("python_lib.zip")
 
             try:
@@ -738,12 +846,16 @@ class LoncapaProblem(object):
                     cache=self.capa_system.cache,
                     slug=self.problem_id,
                     unsafely=self.capa_system.can_execute_unsafe_code(),
+                    worker_pool=self.capa_system.sandbox_worker_pool,
                 )
             except Exception as err:
                 log.exception("Error while execing script code: " + all_code)
                 msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
                 raise responsetypes.LoncapaProblemError(msg)
 
+        if not uses_anonymous_student_id:
+            context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+
         # Store code source in context, along with the Python path needed to run it correctly.
         context['script_code'] = all_code
         context['python_path'] = python_path
@@ -0,0 +1,114 @@
+"""
+A process-local cache of the seed-specific parse of capa problems.
+
+Building a LoncapaProblem parses the problem XML, reads its included files and
+runs its scripts, on every page render, submission and rescore. None of that
+depends on the answers of the student, only on the problem text, the seed and
+a few settings of the runtime, so problems keep the result of those steps in
+this cache, and each LoncapaProblem works on its own copy of it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+
+class ParsedProblem(object):
+    """
+    The XML tree of a problem, after its included files were inserted, and
+    the context extracted from its scripts for a seed.
+
+    The parsed problem is never modified: it keeps copies of the tree and
+    context that it is created with, and returns new copies of them.
+
+    The parse of a problem whose scripts use the anonymous id of the student
+    is only valid for that student: the parsed problem cached for all of the
+    students is then only a marker, with `uses_anonymous_student_id` set,
+    and the parses are cached for each student.
+    """
+    def __init__(self, tree, context, uses_anonymous_student_id=False):
+        self._tree = deepcopy(tree)
+        self._context = deepcopy(context)
+        self.uses_anonymous_student_id = uses_anonymous_student_id
+
+    def copy_tree(self):
+        """
+        Returns a copy of the XML tree of the problem.
+        """
+        return deepcopy(self._tree)
+
+    def copy_context(self):
+        """
+        Returns a copy of the context of the problem.
+        """
+        return deepcopy(self._context)
+
+
+class ParsedProblemCache(object):
+    """
+    A cache of ParsedProblems, which evicts the least recently used problems
+    once it holds `max_size` of them, and which drops problems that were
+    parsed more than `timeout` seconds ago.
+
+    The files included by a problem and the python_lib.zip of its course can
+    change without the problem text changing; the timeout bounds how long the
+    problems parsed with the old files are used.
+    """
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def limits(self):
+        """
+        The (max_size, timeout) limits of this cache.
+        """
+        return self.max_size, self.timeout
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return the ParsedProblem cached for `key`, or None, marking it as the
+        most recently used problem.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            parsed_problem, cached_at = entry
+            if time.time() - cached_at > self.timeout:
+                return None
+            self._entries[key] = entry
+            return parsed_problem
+
+    def set(self, key, parsed_problem):
+        """
+        Cache `parsed_problem` for `key`, evicting the least recently used
+        problems as needed.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (parsed_problem, time.time())
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_PARSED_PROBLEM_CACHE = {}
+
+
+def get_parsed_problem_cache(max_size, timeout):
+    """
+    Return the process-local :class:`ParsedProblemCache` with the given
+    limits, or None if `max_size` is 0.
+    """
+    if not max_size:
+        return None
+
+    cache = _PARSED_PROBLEM_CACHE.get('cache')
+    if cache is None or cache.limits != (max_size, timeout):
+        cache = _PARSED_PROBLEM_CACHE['cache'] = ParsedProblemCache(max_size, timeout)
+    return cache
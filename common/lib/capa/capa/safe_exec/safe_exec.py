@@ -80,6 +80,7 @@ def safe_exec(
     cache=None,
     slug=None,
     unsafely=False,
+    worker_pool=None,
 ):
     """
     Execute python code safely.
@@ -106,6 +107,9 @@ def safe_exec(
 
     If `unsafely` is true, then the code will actually be executed without sandboxing.
 
+    `worker_pool` is an optional :class:`SandboxWorkerPool`, whose workers
+    execute the code when they can, instead of a new sandboxed process.
+
     """
     # Check the cache for a previous result.
     if cache:
@@ -130,6 +134,8 @@ def safe_exec(
     # Decide which code executor to use.
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif worker_pool is not None and worker_pool.can_run(python_path, extra_files):
+        exec_fn = worker_pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -0,0 +1,290 @@
+"""
+The sandboxed side of the pool of sandbox workers, see worker_pool.py.
+
+This file is not imported in the sandbox: worker_pool.py reads its source and
+runs it with the sandboxed Python, as the sandbox user, so it must only use the
+standard library.  It is also imported by worker_pool.py, for the functions
+that read and write the messages exchanged with the workers.
+
+A worker imports the modules that Capa code assumes once, then answers the jobs
+written to its stdin, one at a time.  The worker never reads a job itself: it
+forks a job child before each job, which reads the job from stdin, runs its code
+in a grandchild, in a new codejail- temporary directory and with the resource
+limits of codejail, and writes its result to stdout.  So the jobs start from the
+state of the worker after its imports, and no job data is ever held by the
+worker, to be inherited by the children of the next jobs.
+
+The jobs are otherwise only as isolated from each other as the executions of
+codejail are: they run as the same sandbox user, and so may see the files left
+outside of their temporary directories and the processes of other jobs.
+"""
+
+import base64
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+# Messages are JSON documents, prefixed by their length.
+HEADER = struct.Struct("!I")
+
+# The types of the globals that are sent back, like codejail does.
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+
+class Timeout(Exception):
+    """A message wasn't read before its deadline."""
+    pass
+
+
+def read_exactly(fd, size, deadline=None):
+    """
+    Read `size` bytes from the file descriptor `fd`.
+
+    Raises EOFError if the file ends first, and Timeout if `deadline`, a
+    time.time() value, passes first.
+    """
+    chunks = []
+    while size:
+        if deadline is not None:
+            if not select.select([fd], [], [], max(deadline - time.time(), 0))[0]:
+                raise Timeout()
+        chunk = os.read(fd, size)
+        if not chunk:
+            raise EOFError()
+        chunks.append(chunk)
+        size -= len(chunk)
+    return "".join(chunks)
+
+
+def write_all(fd, data):
+    """
+    Write all of `data` to the file descriptor `fd`.
+    """
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def read_message(fd, deadline=None):
+    """
+    Read a message from the file descriptor `fd`.
+    """
+    size, = HEADER.unpack(read_exactly(fd, HEADER.size, deadline))
+    return json.loads(read_exactly(fd, size, deadline))
+
+
+def write_message(fd, message):
+    """
+    Write `message`, a JSON-serializable object, to the file descriptor `fd`.
+    """
+    data = json.dumps(message)
+    write_all(fd, HEADER.pack(len(data)) + data)
+
+
+def jsonable(value):
+    """
+    Can `value` be sent back as a global?
+    """
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def set_process_limits(limits):
+    """
+    Set the resource limits of a job, as codejail.jail_code does.
+    """
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    # CPU seconds, not wall clock time.
+    cpu = limits.get("CPU")
+    if cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    # Total process virtual memory.
+    vmem = limits.get("VMEM")
+    if vmem:
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+    # Size of written files.  Can be zero (nothing can be written).
+    fsize = limits.get("FSIZE", 0)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+
+
+def run_code(job, tmpdir, result_fd):
+    """
+    Run the code of `job` in the forked grandchild, and write its result to
+    `result_fd`.
+    """
+    # The code can't read the next jobs or answer in place of the worker.
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.closerange(3, result_fd)
+    os.closerange(result_fd + 1, os.sysconf("SC_OPEN_MAX"))
+
+    os.chdir(tmpdir)
+    os.mkdir("tmp")
+    os.environ["TMPDIR"] = os.path.join(tmpdir, "tmp")
+    tempfile.tempdir = None
+    sys.path.extend(job["python_path"])
+    set_process_limits(job["limits"])
+
+    g_dict = job["globals"]
+    try:
+        exec job["code"] in g_dict  # pylint: disable=exec-used
+    except BaseException:  # pylint: disable=broad-except
+        result = {"error": traceback.format_exc()}
+    else:
+        result = {
+            "globals": dict(
+                (key, value) for key, value in g_dict.iteritems()
+                if key not in BAD_KEYS and jsonable(value)
+            ),
+        }
+    write_all(result_fd, json.dumps(result))
+
+
+def wait_for_child(pid, result_fd, realtime):
+    """
+    Return the output and the exit status of the child `pid`, killing it if
+    it runs longer than `realtime` seconds.
+    """
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    while True:
+        timeout = None if deadline is None else max(deadline - time.time(), 0)
+        if not select.select([result_fd], [], [], timeout)[0]:
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(result_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    while deadline is not None:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return "".join(chunks), status
+        if time.time() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            break
+        time.sleep(0.001)
+    return "".join(chunks), os.waitpid(pid, 0)[1]
+
+
+def run_job(job):
+    """
+    Run `job` in a forked grandchild, and return its result.
+    """
+    tmpdir = tempfile.mkdtemp(prefix="codejail-")
+    try:
+        for name, content in job["extra_files"]:
+            with open(os.path.join(tmpdir, name), "wb") as extra_file:
+                extra_file.write(base64.b64decode(content))
+
+        result_fd, child_result_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(result_fd)
+                run_code(job, tmpdir, child_result_fd)
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+        os.close(child_result_fd)
+        try:
+            output, status = wait_for_child(pid, result_fd, job["limits"].get("REALTIME"))
+        finally:
+            os.close(result_fd)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    try:
+        return json.loads(output)
+    except ValueError:
+        if os.WIFSIGNALED(status):
+            return {"error": "Killed by signal %d" % os.WTERMSIG(status)}
+        return {"error": "Exited with status %d" % os.WEXITSTATUS(status)}
+
+
+# The exit statuses of a job child: after answering a job, and when stdin is
+# closed.  Any other status means that the answer may not have been written
+# entirely, so that the worker can't answer the next jobs.
+JOB_DONE = 0
+NO_MORE_JOBS = 3
+
+
+def run_job_child():
+    """
+    Read a job from stdin, run it and write its result to stdout, in the
+    forked job child.  Returns the exit status of the job child.
+    """
+    # The job child and the grandchild running the code are killed together
+    # if the worker is terminated.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        job = read_message(0)
+    except EOFError:
+        return NO_MORE_JOBS
+    write_message(1, run_job(job))
+    return JOB_DONE
+
+
+# The job child of the current job, killed if the worker is terminated.
+CHILD = {}
+
+
+def terminate(signum, frame):  # pylint: disable=unused-argument
+    """
+    Kill the job child of the current job, and the code that it runs, and exit.
+    """
+    pid = CHILD.get("pid")
+    if pid:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            os.kill(pid, signal.SIGKILL)
+    os._exit(1)  # pylint: disable=protected-access
+
+
+def serve(imports):
+    """
+    Import the modules named in `imports`, then fork a job child for each job
+    written to stdin, until it's closed or a job child fails.
+    """
+    for modname in imports:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            # The jobs will get the error when they use the module.
+            pass
+
+    signal.signal(signal.SIGTERM, terminate)
+    while True:
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                status = run_job_child()
+            finally:
+                os._exit(status)  # pylint: disable=protected-access
+        CHILD["pid"] = pid
+        status = os.waitpid(pid, 0)[1]
+        CHILD.pop("pid", None)
+        if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != JOB_DONE:
+            return
+
+
+if __name__ == "__main__":
+    serve(json.loads(sys.argv[1]))
@@ -0,0 +1,165 @@
+"""Test worker_pool.py"""
+
+import io
+import os
+import sys
+import time
+import unittest
+import zipfile
+
+from mock import patch
+
+from capa.safe_exec import safe_exec
+from capa.safe_exec.worker_pool import SandboxWorkerPool, get_sandbox_worker_pool
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+
+# Sets `worker` to the pid of the worker running the code, which is the parent
+# of the job child that forked the process running the code.
+WORKER_PID = "import os; worker = int(open('/proc/%d/stat' % os.getppid()).read().rsplit(')', 1)[1].split()[1])"
+
+
+class TestSandboxWorkerPool(unittest.TestCase):
+    """
+    Tests of SandboxWorkerPool, whose workers run with the Python running the
+    tests rather than a sandboxed one.
+    """
+    def setUp(self):
+        super(TestSandboxWorkerPool, self).setUp()
+        self.pool = SandboxWorkerPool(1, 3, 600, command=[sys.executable, "-E", "-B"], imports=["math"])
+        self.addCleanup(self.pool.close)
+        self.addCleanup(self.wait_for_replacement)
+        patcher = patch.dict(jail_code.LIMITS, {"CPU": 1, "REALTIME": 1, "VMEM": 0, "FSIZE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def safe_exec(self, code, globals_dict, **kwargs):
+        """
+        Run `code` with capa's safe_exec and the pool.
+        """
+        safe_exec(code, globals_dict, worker_pool=self.pool, **kwargs)
+
+    def wait_for_replacement(self):
+        """
+        Wait until the workers being replaced in the background are started.
+        """
+        deadline = time.time() + 10
+        while self.pool._busy and time.time() < deadline:  # pylint: disable=protected-access
+            time.sleep(0.01)
+
+    def test_set_values(self):
+        g = {"b": 3}
+        self.safe_exec("a = 1/2 + b", g, random_seed=17)
+        self.assertEqual(g, {"a": 3.5, "b": 3})
+
+    def test_assumed_imports(self):
+        g = {}
+        self.safe_exec("a = int(math.pi)", g)
+        self.assertEqual(g["a"], 3)
+
+    def test_python_lib(self):
+        zip_lib = io.BytesIO()
+        with zipfile.ZipFile(zip_lib, "w") as zip_file:
+            zip_file.writestr("constant.py", "THE_CONST = 23\n")
+        g = {}
+        self.safe_exec(
+            "import constant; a = constant.THE_CONST", g,
+            python_path=["python_lib.zip"], extra_files=[("python_lib.zip", zip_lib.getvalue())],
+        )
+        self.assertEqual(g["a"], 23)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_environment(self):
+        g = {}
+        self.safe_exec("import os; env = sorted(os.environ); tmp = os.environ['TMPDIR']", g)
+        self.assertEqual(g["env"], ["TMPDIR"])
+        worker = self.pool._idle[0]  # pylint: disable=protected-access
+        self.assertTrue(os.path.basename(worker.homedir).startswith("codejail-"))
+        self.assertTrue(g["tmp"].startswith(os.path.join(worker.homedir, "tmp", "codejail-")))
+
+        self.pool.close()
+        self.assertFalse(os.path.exists(worker.homedir))
+
+    def test_jobs_isolated(self):
+        g = {}
+        self.safe_exec(WORKER_PID + "; math.changed = True", g)
+        worker = g["worker"]
+        self.safe_exec(WORKER_PID + "; changed = hasattr(math, 'changed')", g)
+        self.assertEqual(g["worker"], worker)
+        self.assertFalse(g["changed"])
+
+    def test_recycled(self):
+        workers = set()
+        for _ in range(4):
+            g = {}
+            self.safe_exec(WORKER_PID, g)
+            workers.add(g["worker"])
+            self.wait_for_replacement()
+        self.assertEqual(len(workers), 2)
+
+    def test_realtime_limit(self):
+        start = time.time()
+        with self.assertRaises(SafeExecException) as cm:
+            self.safe_exec("import time; time.sleep(10)", {})
+        self.assertIn("Killed by signal 9", cm.exception.message)
+        self.assertLess(time.time() - start, 5)
+
+    @patch("capa.safe_exec.worker_pool.WORKER_TIMEOUT_MARGIN", -0.5)
+    @patch("capa.safe_exec.worker_pool.codejail_safe_exec")
+    def test_worker_timeout(self, mock_codejail_safe_exec):
+        with self.assertRaises(SafeExecException) as cm:
+            self.safe_exec("import time; time.sleep(10)", {})
+        self.assertIn("didn't answer", cm.exception.message)
+        self.assertEqual(mock_codejail_safe_exec.call_count, 0)
+        self.assertEqual(self.pool.fallbacks, 0)
+
+    @patch("capa.safe_exec.worker_pool.codejail_safe_exec")
+    def test_broken_worker(self, mock_codejail_safe_exec):
+        # Kills the job child, which the worker can't recover from.
+        code = "import os, signal; os.kill(os.getppid(), signal.SIGKILL)"
+        self.safe_exec(code, {})
+        self.assertEqual(mock_codejail_safe_exec.call_count, 1)
+        self.wait_for_replacement()
+        g = {}
+        self.safe_exec("a = 17", g)
+        self.assertEqual(g["a"], 17)
+        self.assertEqual(self.pool.fallbacks, 1)
+
+    def test_forked(self):
+        self.safe_exec("a = 17", {})
+        inherited_worker = self.pool._idle[0]  # pylint: disable=protected-access
+        # As if this process was forked from the one that started the worker.
+        self.pool._pid = None  # pylint: disable=protected-access
+        worker = self.pool._acquire()  # pylint: disable=protected-access
+        self.assertIsNot(worker, inherited_worker)
+        self.assertTrue(inherited_worker.process.stdin.closed)
+        self.assertTrue(inherited_worker.process.stdout.closed)
+        # The directory of the worker is left to the parent process.
+        self.assertTrue(os.path.exists(inherited_worker.homedir))
+        self.addCleanup(inherited_worker.close)
+        self.pool._release(worker)  # pylint: disable=protected-access
+
+    def test_other_python_path(self):
+        self.assertFalse(self.pool.can_run(["/some/dir"], []))
+        # capa.safe_exec.safe_exec is the function, not its module.
+        with patch.object(sys.modules["capa.safe_exec.safe_exec"], "codejail_safe_exec") as mock_codejail_safe_exec:
+            self.safe_exec("a = 17", {}, python_path=["/some/dir"])
+        self.assertEqual(mock_codejail_safe_exec.call_count, 1)
+
+    @patch("capa.safe_exec.worker_pool.codejail_safe_exec")
+    def test_all_workers_busy(self, mock_codejail_safe_exec):
+        worker = self.pool._acquire()  # pylint: disable=protected-access
+        self.safe_exec("a = 17", {})
+        self.assertEqual(mock_codejail_safe_exec.call_count, 1)
+        self.assertEqual(self.pool.fallbacks, 1)
+        self.pool._release(worker)  # pylint: disable=protected-access
+
+    def test_get_sandbox_worker_pool(self):
+        self.assertIsNone(get_sandbox_worker_pool(0, 100, 600))
+        pool = get_sandbox_worker_pool(2, 100, 600)
+        self.assertIs(get_sandbox_worker_pool(2, 100, 600), pool)
+        self.assertEqual(get_sandbox_worker_pool(2, 10, 600).limits, (2, 10, 600))
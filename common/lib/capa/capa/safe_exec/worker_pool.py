@@ -0,0 +1,365 @@
+"""
+A pool of long-lived sandbox workers, to run Capa code without starting a new
+sandboxed Python for each execution.
+
+codejail starts a sandboxed Python for every execution, which then imports
+numpy and the other modules that Capa code assumes before running a few lines
+of code.  The workers of this pool are sandboxed Pythons started the same way,
+with the same executable, user and so AppArmor profile, which import those
+modules once, then fork a child for each job they're sent over their stdin,
+which runs it with the resource limits of codejail (see sandbox_worker.py).
+
+Workers are replaced after running `max_jobs` jobs or after `max_age` seconds,
+in the background.  The code that the pool can't run, because codejail isn't
+configured, because its python_path has other directories than its extra files,
+or because all the workers are busy or broken, is run by codejail as usual.
+Code that a worker doesn't answer in time fails as it would with codejail,
+rather than being run again by codejail.
+"""
+
+import base64
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+from codejail.safe_exec import json_safe, SafeExecException
+
+from . import sandbox_worker
+from .safe_exec import ASSUMED_IMPORTS
+
+log = logging.getLogger(__name__)
+
+# We'll need the code of sandbox_worker.py to start the workers, so read it now.
+sandbox_worker_py_file = sandbox_worker.__file__
+if sandbox_worker_py_file.endswith("c"):
+    sandbox_worker_py_file = sandbox_worker_py_file[:-1]
+
+SANDBOX_WORKER_PY = open(sandbox_worker_py_file).read()
+
+# How many seconds longer than the REALTIME limit of a job a worker can take
+# to answer before it's considered stuck.
+WORKER_TIMEOUT_MARGIN = 5
+
+
+class WorkerError(Exception):
+    """A sandbox worker failed, rather than the code that it ran."""
+    pass
+
+
+class WorkerTimeout(WorkerError):
+    """A sandbox worker didn't answer in time."""
+    pass
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running sandbox_worker.py.
+
+    As codejail does for each execution, the worker is started with an empty
+    environment, in a new codejail- directory whose "tmp" directory the
+    sandbox user can write to, and which is its TMPDIR.  The worker makes the
+    temporary directories of its jobs there.
+    """
+    def __init__(self, command, imports):
+        self.homedir = tempfile.mkdtemp(prefix="codejail-")
+        try:
+            os.chmod(self.homedir, 0775)
+            tmptmp = os.path.join(self.homedir, "tmp")
+            os.mkdir(tmptmp)
+            os.chmod(tmptmp, 0777)
+            self.process = subprocess.Popen(
+                command + ["-c", SANDBOX_WORKER_PY, json.dumps(imports)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                close_fds=True,
+                cwd=self.homedir,
+                env={"TMPDIR": "tmp"},
+            )
+        except:
+            shutil.rmtree(self.homedir, ignore_errors=True)
+            raise
+        self.started = time.time()
+        self.jobs = 0
+
+    def is_alive(self):
+        """
+        Is the worker process still running?
+        """
+        return self.process.poll() is None
+
+    def is_expired(self, max_jobs, max_age):
+        """
+        Has the worker run `max_jobs` jobs, or lived `max_age` seconds?
+        """
+        return self.jobs >= max_jobs or time.time() - self.started >= max_age
+
+    def run(self, job, timeout=None):
+        """
+        Send `job` to the worker, and return its result.
+
+        Raises WorkerTimeout if the worker doesn't answer within `timeout`
+        seconds, and WorkerError if it fails to answer at all.
+        """
+        self.jobs += 1
+        deadline = time.time() + timeout if timeout else None
+        try:
+            sandbox_worker.write_message(self.process.stdin.fileno(), job)
+            return sandbox_worker.read_message(self.process.stdout.fileno(), deadline)
+        except sandbox_worker.Timeout:
+            raise WorkerTimeout("The sandbox worker didn't answer within {} seconds".format(timeout))
+        except (EnvironmentError, EOFError, ValueError) as err:
+            raise WorkerError("The sandbox worker failed: {!r}".format(err))
+
+    def close_pipes(self):
+        """
+        Close the pipes to the worker.
+        """
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except EnvironmentError:
+                pass
+
+    def close(self, terminate=False):
+        """
+        Stop the worker, which exits once its stdin is closed, and remove its
+        directory.  If `terminate` is true, the worker is also killed with its
+        current job.
+
+        The process is reaped by the subprocess module when other processes
+        are started.
+        """
+        self.close_pipes()
+        if terminate and self.is_alive():
+            try:
+                # sudo relays the signal to the worker.
+                self.process.terminate()
+            except OSError:
+                pass
+        shutil.rmtree(self.homedir, ignore_errors=True)
+
+
+class SandboxWorkerPool(object):
+    """
+    A pool of up to `size` SandboxWorkers, each replaced after `max_jobs` jobs
+    or `max_age` seconds.
+
+    Workers are started when they're first needed.  `command` is the command
+    line starting the sandboxed Python, by default the one that codejail uses.
+    `fallbacks` counts the executions that the pool left to codejail.
+    """
+    def __init__(self, size, max_jobs, max_age, command=None, imports=None):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_age = max_age
+        self.command = command
+        if imports is None:
+            imports = [modname for _, modname in ASSUMED_IMPORTS]
+        self.imports = imports
+        self._idle = []
+        # The idle workers, the busy ones, and the ones being started.
+        self._workers = set()
+        self._busy = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.fallbacks = 0
+
+    @property
+    def limits(self):
+        """
+        The (size, max_jobs, max_age) limits of this pool.
+        """
+        return self.size, self.max_jobs, self.max_age
+
+    def python_command(self):
+        """
+        Return the command line that starts a sandboxed Python, or None if
+        codejail isn't configured.
+        """
+        if self.command is not None:
+            return self.command
+        if not jail_code.is_configured("python"):
+            return None
+        python = jail_code.COMMANDS["python"]
+        command = []
+        if python["user"]:
+            command.extend(["sudo", "-u", python["user"]])
+        return command + python["cmdline_start"]
+
+    def can_run(self, python_path=None, extra_files=None):
+        """
+        Can the pool run code with this `python_path` and these `extra_files`?
+
+        The workers only add extra files to the path of the code: the other
+        files and directories are copied in the sandbox by codejail.
+        """
+        names = set(name for name, _ in extra_files or ())
+        return (
+            self.python_command() is not None and
+            all(os.path.basename(name) == name for name in names) and
+            all(path in names for path in python_path or ())
+        )
+
+    def _start_worker(self):
+        """
+        Start a new worker, or return None if it can't be started.
+        """
+        try:
+            worker = SandboxWorker(self.python_command(), self.imports)
+        except (EnvironmentError, TypeError):
+            log.exception("Couldn't start a sandbox worker")
+            return None
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _close_worker(self, worker, terminate=False):
+        """
+        Stop `worker`, and forget it.
+        """
+        worker.close(terminate=terminate)
+        with self._lock:
+            self._workers.discard(worker)
+
+    def _acquire(self):
+        """
+        Return an idle worker, or a new one if there are less than `size`
+        workers, or None.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # The pool was created before this process was forked: its
+                # workers belong to the parent process, so only close our
+                # copies of their pipes.
+                for worker in self._workers:
+                    worker.close_pipes()
+                self._idle = []
+                self._workers = set()
+                self._busy = 0
+                self._pid = os.getpid()
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive() and not worker.is_expired(self.max_jobs, self.max_age):
+                    self._busy += 1
+                    return worker
+                worker.close()
+                self._workers.discard(worker)
+            if self._busy >= self.size:
+                return None
+            self._busy += 1
+
+        worker = self._start_worker()
+        if worker is None:
+            with self._lock:
+                self._busy -= 1
+        return worker
+
+    def _release(self, worker, broken=False):
+        """
+        Return `worker` to the pool, replacing it if it's broken or expired.
+        """
+        if broken or worker.is_expired(self.max_jobs, self.max_age):
+            self._close_worker(worker, terminate=broken)
+            # Start the replacement in the background, so it has imported its
+            # modules when the next job comes, without delaying this one.
+            # Until then, its slot is kept busy.
+            replacement = threading.Thread(target=self._replace_worker, name="sandbox-worker-start")
+            replacement.daemon = True
+            replacement.start()
+            return
+        with self._lock:
+            self._busy -= 1
+            if self._pid == os.getpid():
+                self._idle.append(worker)
+
+    def _replace_worker(self):
+        """
+        Start a worker in place of a worker that was released, and add it to
+        the idle workers.
+        """
+        worker = self._start_worker()
+        with self._lock:
+            self._busy -= 1
+            if worker is not None and self._pid == os.getpid():
+                self._idle.append(worker)
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._workers.difference_update(idle)
+        for worker in idle:
+            worker.close()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute code as codejail.safe_exec.safe_exec does, in a sandbox worker.
+        """
+        worker = self._acquire()
+        if worker is None:
+            self._fallback(code, globals_dict, python_path, extra_files, slug)
+            return
+
+        limits = dict(jail_code.LIMITS)
+        job = {
+            "code": code,
+            "globals": json_safe(globals_dict),
+            "python_path": list(python_path or ()),
+            "extra_files": [(name, base64.b64encode(content)) for name, content in extra_files or ()],
+            "limits": limits,
+        }
+        timeout = limits["REALTIME"] + WORKER_TIMEOUT_MARGIN if limits.get("REALTIME") else None
+        try:
+            result = worker.run(job, timeout)
+        except WorkerTimeout as err:
+            # The code itself is most likely too slow: running it again with
+            # codejail would only make the request wait as long again.
+            log.warning("Sandbox worker timed out running %s", slug)
+            self._release(worker, broken=True)
+            raise SafeExecException("Couldn't execute jailed code: %s" % err)
+        except WorkerError:
+            log.exception("Sandbox worker failed running %s, running it with codejail", slug)
+            self._release(worker, broken=True)
+            self._fallback(code, globals_dict, python_path, extra_files, slug)
+            return
+        self._release(worker)
+
+        if "error" in result:
+            raise SafeExecException("Couldn't execute jailed code: %s" % result["error"])
+        globals_dict.update(result["globals"])
+
+    def _fallback(self, code, globals_dict, python_path, extra_files, slug):
+        """
+        Execute code with codejail, rather than in a sandbox worker.
+        """
+        with self._lock:
+            self.fallbacks += 1
+        codejail_safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+
+
+_SANDBOX_WORKER_POOL = {}
+
+
+def get_sandbox_worker_pool(size, max_jobs, max_age):
+    """
+    Return the process-local :class:`SandboxWorkerPool` with the given limits,
+    or None if `size` is 0.
+    """
+    if not size:
+        return None
+
+    pool = _SANDBOX_WORKER_POOL.get("pool")
+    if pool is None or pool.limits != (size, max_jobs, max_age):
+        if pool is not None:
+            pool.close()
+        pool = _SANDBOX_WORKER_POOL["pool"] = SandboxWorkerPool(size, max_jobs, max_age)
+    return pool
@@ -69,6 +69,7 @@ def test_capa_system(render_template=None):
         seed=0,
         STATIC_URL='/dummy-static/',
         STATUS_CLASS=Status,
+        sandbox_worker_pool=None,
         xqueue={
             'interface': xqueue_interface,
             'construct_callback': calledback_url,
@@ -6,7 +6,8 @@ import textwrap
 from lxml import etree
 import unittest
 
-from capa.tests.helpers import new_loncapa_problem
+from capa.safe_exec.tests.test_safe_exec import DictCache
+from capa.tests.helpers import new_loncapa_problem, test_capa_system
 
 
 @ddt.ddt
@@ -590,3 +591,39 @@ class CAPAMultiInputProblemTest(unittest.TestCase):
             description_element = multi_inputs_group.xpath('//p[@id="{}"]'.format(description_id))
             self.assertEqual(len(description_element), 1)
             self.assertEqual(description_element[0].text, descriptions[index])
+
+
+class CAPAProblemScriptCacheTest(unittest.TestCase):
+    """
+    Tests of the caching of the results of the problem scripts.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+        answer = {answer}
+            </script>
+            <p>$answer</p>
+        </problem>
+    """)
+
+    def run_scripts(self, answer, anonymous_student_id, cache):
+        """
+        Returns the context of a problem created for the given student.
+        """
+        capa_system = test_capa_system()
+        capa_system.anonymous_student_id = anonymous_student_id
+        capa_system.cache = cache
+        return new_loncapa_problem(self.xml.format(answer=answer), capa_system=capa_system).context
+
+    def test_shared_by_students(self):
+        cache = DictCache({})
+        self.run_scripts('random.randint(1, 100)', 'student', cache)
+        context = self.run_scripts('random.randint(1, 100)', 'other_student', cache)
+        self.assertEqual(len(cache.cache), 1)
+        self.assertEqual(context['anonymous_student_id'], 'other_student')
+
+    def test_anonymous_student_id(self):
+        cache = DictCache({})
+        self.assertEqual(self.run_scripts('anonymous_student_id', 'student', cache)['answer'], 'student')
+        self.assertEqual(self.run_scripts('anonymous_student_id', 'other_student', cache)['answer'], 'other_student')
+        self.assertEqual(len(cache.cache), 2)
@@ -0,0 +1,143 @@
+"""
+Tests of the cache of parsed capa problems.
+"""
+import os
+import textwrap
+import unittest
+
+from mock import patch
+
+from capa.parsed_problem_cache import ParsedProblem, ParsedProblemCache, get_parsed_problem_cache
+from capa.safe_exec import safe_exec
+from capa.tests.helpers import new_loncapa_problem, test_capa_system
+
+
+class ParsedProblemCacheTest(unittest.TestCase):
+    """
+    Tests of ParsedProblemCache.
+    """
+    def test_lru(self):
+        cache = ParsedProblemCache(2, 60)
+        parsed_problems = [ParsedProblem(None, {'index': index}) for index in range(3)]
+        cache.set('a', parsed_problems[0])
+        cache.set('b', parsed_problems[1])
+        self.assertIs(cache.get('a'), parsed_problems[0])
+        cache.set('c', parsed_problems[2])
+        self.assertIsNone(cache.get('b'))
+        self.assertIs(cache.get('a'), parsed_problems[0])
+        self.assertEqual(len(cache), 2)
+
+    def test_timeout(self):
+        cache = ParsedProblemCache(2, 60)
+        with patch('capa.parsed_problem_cache.time.time', return_value=1000):
+            cache.set('a', ParsedProblem(None, {}))
+        with patch('capa.parsed_problem_cache.time.time', return_value=1061):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_copies(self):
+        context = {'values': [1]}
+        parsed_problem = ParsedProblem(None, context)
+        context['values'].append(2)
+        copied_context = parsed_problem.copy_context()
+        copied_context['values'].append(3)
+        self.assertEqual(parsed_problem.copy_context(), {'values': [1]})
+
+    def test_get_parsed_problem_cache(self):
+        self.assertIsNone(get_parsed_problem_cache(0, 60))
+        cache = get_parsed_problem_cache(10, 60)
+        self.assertIs(get_parsed_problem_cache(10, 60), cache)
+        self.assertEqual(get_parsed_problem_cache(20, 60).limits, (20, 60))
+
+
+class ParsedProblemTest(unittest.TestCase):
+    """
+    Tests of the LoncapaProblems created with a parsed problem cache.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+        answer = str(random.randint(1, 1000000))
+            </script>
+            <stringresponse answer="$answer">
+                <label>What is the answer?</label>
+                <textline size="20"/>
+            </stringresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ParsedProblemTest, self).setUp()
+        self.cache = ParsedProblemCache(10, 60)
+        patcher = patch('capa.capa_problem.safe_exec', wraps=safe_exec)
+        self.mock_safe_exec = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_problem(self, xml=None, seed=723, anonymous_student_id='student'):
+        """
+        Returns a LoncapaProblem created with the parsed problem cache.
+        """
+        capa_system = test_capa_system()
+        capa_system.anonymous_student_id = anonymous_student_id
+        capa_system.parsed_problem_cache = self.cache
+        return new_loncapa_problem(xml or self.xml, capa_system=capa_system, seed=seed)
+
+    def test_reused(self):
+        problem = self.new_problem()
+        problem.context['answer'] = 'changed'
+        other_problem = self.new_problem(anonymous_student_id='other_student')
+
+        self.assertEqual(self.mock_safe_exec.call_count, 1)
+        self.assertEqual(len(self.cache), 1)
+        self.assertNotEqual(other_problem.context['answer'], 'changed')
+        self.assertEqual(other_problem.context['anonymous_student_id'], 'other_student')
+        self.assertIsNot(other_problem.tree, problem.tree)
+        self.assertEqual(other_problem.get_question_answers(), new_loncapa_problem(self.xml).get_question_answers())
+        self.assertEqual(other_problem.get_html(), new_loncapa_problem(self.xml).get_html())
+
+    def test_seed(self):
+        self.new_problem(seed=1)
+        self.new_problem(seed=2)
+        self.assertEqual(self.mock_safe_exec.call_count, 2)
+
+    def test_anonymous_student_id(self):
+        xml = self.xml.replace('answer = ', 'answer = anonymous_student_id + ')
+        self.assertEqual(self.new_problem(xml).context['answer'][:7], 'student')
+        self.assertEqual(self.new_problem(xml, anonymous_student_id='other').context['answer'][:5], 'other')
+        self.new_problem(xml)
+        self.assertEqual(self.mock_safe_exec.call_count, 2)
+
+    def test_anonymous_student_id_in_include(self):
+        include_file = test_capa_system().filestore.open('student_script.xml', 'w')
+        include_file.write(textwrap.dedent(u"""
+            <script type="loncapa/python">
+        answer = anonymous_student_id + str(random.randint(1, 1000000))
+            </script>
+        """))
+        include_file.close()
+        self.addCleanup(os.remove, include_file.name)
+        xml = self.xml.replace(
+            '<script type="loncapa/python">',
+            '<include file="student_script.xml"/><script type="loncapa/python">',
+        ).replace('answer = ', 'unused = ')
+
+        self.assertEqual(self.new_problem(xml).context['answer'][:7], 'student')
+        self.assertEqual(self.new_problem(xml, anonymous_student_id='other').context['answer'][:5], 'other')
+        self.assertEqual(self.new_problem(xml).context['answer'][:7], 'student')
+        self.assertEqual(self.mock_safe_exec.call_count, 2)
+
+    def test_python_lib_zip_not_cached(self):
+        zip_libs = ['zip one', 'zip two']
+        capa_systems = []
+        for zip_lib in zip_libs:
+            capa_system = test_capa_system()
+            capa_system.parsed_problem_cache = self.cache
+            capa_system.get_python_lib_zip = lambda zip_lib=zip_lib: zip_lib
+            capa_systems.append(capa_system)
+        problem = new_loncapa_problem(self.xml, capa_system=capa_systems[0], seed=723)
+        other_problem = new_loncapa_problem(self.xml, capa_system=capa_systems[1], seed=723)
+
+        self.assertEqual(self.mock_safe_exec.call_count, 1)
+        self.assertIsNone(self.cache.get(other_problem._parsed_problem_key()).copy_context()['extra_files'])  # pylint: disable=protected-access
+        self.assertEqual(problem.context['extra_files'], [('python_lib.zip', 'zip one')])
+        self.assertEqual(other_problem.context['extra_files'], [('python_lib.zip', 'zip two')])
@@ -2,10 +2,13 @@
 Tests capa util
 """
 import unittest
+import numpy
 from lxml import etree
 
 from capa.tests.helpers import test_capa_system
-from capa.util import compare_with_tolerance, sanitize_html, get_inner_html_from_xpath, remove_markup
+from capa.util import (
+    compare_samples_with_tolerance, compare_with_tolerance, sanitize_html, get_inner_html_from_xpath, remove_markup
+)
 
 
 class UtilTest(unittest.TestCase):
@@ -106,6 +109,31 @@ class UtilTest(unittest.TestCase):
         result = compare_with_tolerance(111.0, complex(100.0, 0), '10%', True)
         self.assertTrue(result)
 
+    def test_compare_samples_with_tolerance(self):
+        # The samples compare as they do with compare_with_tolerance
+        infinity = float('Inf')
+        student = [100.0, 100.001, 101.0, 109.9, 110.1, 100.01, 100.002, 0.4, 1.1, infinity, infinity, float('nan'),
+                   complex(100.0, 1.0), 100.0]
+        instructor = [100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 0.44, 1.0, 100.0, infinity, 100.0,
+                      complex(100.0, 1.0), complex(100.0, 1.0)]
+        for tolerance, relative_tolerance in [
+                ('0.001%', False), ('10%', False), ('10%', True), ('10.0', False), ('0.1', True),
+                (10.0, False), (0.1, True), (0.01, False), (0.001, False), (0.1, False),
+        ]:
+            expected = [
+                compare_with_tolerance(student_sample, instructor_sample, tolerance, relative_tolerance)
+                for student_sample, instructor_sample in zip(student, instructor)
+            ]
+            result = compare_samples_with_tolerance(
+                numpy.array(student), numpy.array(instructor), tolerance, relative_tolerance
+            )
+            self.assertEqual(result.tolist(), expected, (tolerance, relative_tolerance))
+
+    def test_compare_samples_with_tolerance_objects(self):
+        # Long integers, e.g. from factorial(), are compared one by one
+        result = compare_samples_with_tolerance(numpy.array([10 ** 30, 2]), numpy.array([10 ** 30, 3.0]), 0.5)
+        self.assertEqual(result.tolist(), [True, False])
+
     def test_sanitize_html(self):
         """
         Test for html sanitization with bleach.
@@ -3,6 +3,7 @@ Utility functions for capa.
 """
 import bleach
 from decimal import Decimal
+import numpy
 
 from calc import evaluator
 from cmath import isinf, isnan
@@ -91,6 +92,70 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_samples_with_tolerance(student_samples, instructor_samples, tolerance=default_tolerance,
+                                   relative_tolerance=False):
+    """
+    Compare arrays of student and instructor results sample by sample, as
+    `compare_with_tolerance` does, and return an array of booleans.
+
+    The finite samples are compared with array operations. Real samples are
+    compared as floats rather than as Decimals, so the samples whose difference
+    is too close to the tolerance for that to be safe are compared again with
+    `compare_with_tolerance`, as are infinite and NaN samples.
+    """
+    student = numpy.asarray(student_samples)
+    instructor = numpy.asarray(instructor_samples)
+
+    def compare_sample(index):
+        """
+        Compare the samples at `index` with `compare_with_tolerance`.
+        """
+        return compare_with_tolerance(
+            _python_number(student[index]), _python_number(instructor[index]), tolerance, relative_tolerance
+        )
+
+    sample_tolerance = tolerance
+    relative = relative_tolerance
+    if isinstance(sample_tolerance, str):
+        if sample_tolerance == default_tolerance:
+            relative = True
+        if sample_tolerance.endswith('%'):
+            sample_tolerance = evaluator(dict(), dict(), sample_tolerance[:-1]) * 0.01
+            if not relative:
+                sample_tolerance = sample_tolerance * numpy.abs(instructor)
+        else:
+            sample_tolerance = evaluator(dict(), dict(), sample_tolerance)
+
+    if (student.dtype.kind not in 'fc' or instructor.dtype.kind not in 'fc' or
+            student.shape != instructor.shape or numpy.iscomplexobj(sample_tolerance)):
+        return numpy.array([compare_sample(index) for index in range(min(len(student), len(instructor)))], dtype=bool)
+
+    with numpy.errstate(all='ignore'):
+        magnitude = numpy.maximum(numpy.abs(student), numpy.abs(instructor))
+        if relative:
+            sample_tolerance = sample_tolerance * magnitude
+        difference = numpy.abs(student - instructor)
+        result = difference <= sample_tolerance
+
+        # Decimals are made from the 12 significant digits which str() keeps.
+        margin = 1e-11 * (magnitude + numpy.abs(sample_tolerance))
+        real = (numpy.imag(student) == 0) & (numpy.imag(instructor) == 0)
+        exact = (
+            numpy.isfinite(difference) & numpy.isfinite(sample_tolerance) &
+            (~real | (numpy.abs(difference - sample_tolerance) > margin))
+        )
+    for index in numpy.flatnonzero(~exact):
+        result[index] = compare_sample(index)
+    return result
+
+
+def _python_number(value):
+    """
+    Return the python number of a NumPy scalar.
+    """
+    return value.item() if isinstance(value, numpy.generic) else value
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
@@ -18,6 +18,8 @@ except ImportError:
     dog_stats_api = None
 
 from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from capa.parsed_problem_cache import get_parsed_problem_cache
+from capa.safe_exec.worker_pool import get_sandbox_worker_pool
 from capa.responsetypes import StudentInputError, \
     ResponseError, LoncapaProblemError
 from capa.util import convert_files_to_filenames, get_inner_html_from_xpath
@@ -292,6 +294,7 @@ class CapaMixin(CapaFields):
         if text is None:
             text = self.data
 
+        worker_pool_settings = getattr(settings, 'CODE_JAIL', {}).get('worker_pool', {})
         capa_system = LoncapaSystem(
             ajax_url=self.runtime.ajax_url,
             anonymous_student_id=self.runtime.anonymous_student_id,
@@ -306,7 +309,16 @@ class CapaMixin(CapaFields):
             seed=self.runtime.seed,      # Why do we do this if we have self.seed?
             STATIC_URL=self.runtime.STATIC_URL,
             xqueue=self.runtime.xqueue,
-            matlab_api_key=self.matlab_api_key
+            matlab_api_key=self.matlab_api_key,
+            parsed_problem_cache=get_parsed_problem_cache(
+                getattr(settings, 'CAPA_PARSED_PROBLEM_CACHE_SIZE', 0),
+                getattr(settings, 'CAPA_PARSED_PROBLEM_CACHE_TIMEOUT', 300),
+            ),
+            sandbox_worker_pool=get_sandbox_worker_pool(
+                worker_pool_settings.get('size', 0),
+                worker_pool_settings.get('max_jobs', 100),
+                worker_pool_settings.get('max_age', 600),
+            ),
         )
 
         return LoncapaProblem(
@@ -399,33 +399,46 @@ class AssignmentFormatGrader(CourseGrader):
                     possible = scores[i].possible
                     section_name = scores[i].display_name
 
-                percentage = earned / possible
-                summary_format = u"{section_type} {index} - {name} - {percent:.0%} ({earned:.3n}/{possible:.3n})"
-                summary = summary_format.format(
-                    index=i + self.starting_index,
-                    section_type=self.section_type,
-                    name=section_name,
-                    percent=percentage,
-                    earned=float(earned),
-                    possible=float(possible)
-                )
+                breakdown.append(self.section_breakdown_item(i, earned / possible, section_name, earned, possible))
             else:
-                percentage = 0.0
-                summary = u"{section_type} {index} Unreleased - 0% (?/?)".format(
-                    index=i + self.starting_index,
-                    section_type=self.section_type
-                )
+                breakdown.append(self.section_breakdown_item(i, 0.0))
 
-            short_label = u"{short_label} {index:02d}".format(
-                index=i + self.starting_index,
-                short_label=self.short_label
+        total_percent, dropped_indices = total_with_drops(breakdown, self.drop_count)
+        return self.grade_result(breakdown, total_percent, dropped_indices)
+
+    def section_breakdown_item(self, index, percentage, section_name=None, earned=None, possible=None):
+        """
+        Returns the section_breakdown entry of the section at `index` among the
+        sections of this format, or of its placeholder if `earned` is None.
+        """
+        if earned is not None:
+            summary_format = u"{section_type} {index} - {name} - {percent:.0%} ({earned:.3n}/{possible:.3n})"
+            summary = summary_format.format(
+                index=index + self.starting_index,
+                section_type=self.section_type,
+                name=section_name,
+                percent=percentage,
+                earned=float(earned),
+                possible=float(possible)
+            )
+        else:
+            summary = u"{section_type} {index} Unreleased - 0% (?/?)".format(
+                index=index + self.starting_index,
+                section_type=self.section_type
             )
 
-            breakdown.append({'percent': percentage, 'label': short_label,
-                              'detail': summary, 'category': self.category})
+        short_label = u"{short_label} {index:02d}".format(
+            index=index + self.starting_index,
+            short_label=self.short_label
+        )
 
-        total_percent, dropped_indices = total_with_drops(breakdown, self.drop_count)
+        return {'percent': percentage, 'label': short_label, 'detail': summary, 'category': self.category}
 
+    def grade_result(self, breakdown, total_percent, dropped_indices):
+        """
+        Returns the result of grade(), given the section_breakdown entries of
+        the sections, their total percent and the indices of the dropped ones.
+        """
         for dropped_index in dropped_indices:
             breakdown[dropped_index]['mark'] = {
                 'detail': u"The lowest {drop_count} {section_type} scores are dropped.".format(
@@ -416,7 +416,12 @@ class BlockData(object):
     Wrap the block data in an object instead of using a straight Python dictionary.
     Allows the storing of meta-information about a structure that doesn't persist along with
     the structure itself.
+
+    Courses have many blocks, so the attributes are kept in slots rather than in
+    an instance dict.
     """
+    __slots__ = ('fields', 'block_type', 'definition', 'defaults', 'asides', 'edit_info', 'definition_loaded')
+
     def __init__(self, **kwargs):
         # Has the definition been loaded?
         self.definition_loaded = False
@@ -468,6 +473,20 @@ class BlockData(object):
             self.asides = {}   # pylint: disable=attribute-defined-outside-init
         return self.asides
 
+    def __getstate__(self):
+        """
+        Return the attributes to pickle, as the slots can't be pickled by default.
+        """
+        return {attr: getattr(self, attr) for attr in self.__slots__ if hasattr(self, attr)}
+
+    def __setstate__(self, state):
+        """
+        Restore the pickled attributes, which are those of the instance dict
+        for BlockData pickled before they had slots.
+        """
+        for attr, value in state.iteritems():
+            setattr(self, attr, value)
+
     def __repr__(self):
         # pylint: disable=bad-continuation, redundant-keyword-arg
         return ("{classname}(fields={self.fields}, "
@@ -812,6 +831,23 @@ class ModuleStoreRead(ModuleStoreAssetBase):
         """
         pass
 
+    def get_items_by_keys(self, usage_keys, depth=0, **kwargs):
+        """
+        Returns a list of the XModuleDescriptor instances for the items at
+        the given usage keys, in the same order as the keys.
+
+        Modulestores that can read many items at once override this to do so;
+        by default, each item is read with get_item.
+
+        If no object is found for any of the keys, raises
+            xmodule.modulestore.exceptions.ItemNotFoundError
+
+        usage_keys: A list of :class:`.UsageKey` subclass instances
+
+        depth (int): see get_item
+        """
+        return [self.get_item(usage_key, depth, **kwargs) for usage_key in usage_keys]
+
     @abstractmethod
     def get_course_errors(self, course_key):
         """
@@ -860,7 +896,7 @@ class ModuleStoreRead(ModuleStoreAssetBase):
             xblock, fields = (block, block.fields)
         elif isinstance(block, BlockData):
             # BlockData is an object - compare its attributes in dict form.
-            xblock, fields = (None, block.__dict__)
+            xblock, fields = (None, block.__getstate__())
         else:
             xblock, fields = (None, block)
 
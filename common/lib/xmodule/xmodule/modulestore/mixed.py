@@ -258,6 +258,29 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         store = self._get_modulestore_for_courselike(usage_key.course_key)
         return store.get_item(usage_key, depth, **kwargs)
 
+    @strip_key
+    def get_items_by_keys(self, usage_keys, depth=0, **kwargs):
+        """
+        Returns a list of the XModuleDescriptor instances for the items at the
+        given usage keys, in the same order as the keys. The keys are grouped
+        by modulestore, and each modulestore reads the items of its keys at once.
+
+        see parent doc
+        """
+        usage_keys = list(usage_keys)
+        stores = {}
+        keys_by_store = {}
+        for usage_key in usage_keys:
+            course_key = usage_key.course_key
+            if course_key not in stores:
+                stores[course_key] = self._get_modulestore_for_courselike(course_key)
+            keys_by_store.setdefault(stores[course_key], []).append(usage_key)
+
+        items = {}
+        for store, store_usage_keys in keys_by_store.iteritems():
+            items.update(zip(store_usage_keys, store.get_items_by_keys(store_usage_keys, depth, **kwargs)))
+        return [items[usage_key] for usage_key in usage_keys]
+
     @strip_key
     def get_items(self, course_key, **kwargs):
         """
@@ -593,6 +616,25 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         except NotImplementedError:
             return None, None
 
+    def get_blocks_changed_since(self, course_key, version_guid):
+        """
+        Returns a tuple of the current version of the given course and the
+        set of usage keys of its blocks that were added or modified since
+        the given version.  The set is None if the changes cannot be
+        determined, as is the case for stores that do not version courses.
+        """
+        try:
+            store = self._verify_modulestore_support(course_key, 'get_blocks_changed_since')
+        except NotImplementedError:
+            return None, None
+        current_version, changed_usage_keys = store.get_blocks_changed_since(course_key, version_guid)
+        if changed_usage_keys is not None:
+            changed_usage_keys = {
+                usage_key.for_branch(None).version_agnostic()
+                for usage_key in changed_usage_keys
+            }
+        return current_version, changed_usage_keys
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
@@ -12,7 +12,6 @@ structure:
 }
 """
 
-import copy
 from datetime import datetime
 from importlib import import_module
 import logging
@@ -47,6 +46,7 @@ from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
 from xmodule.modulestore.inheritance import InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
+from xmodule.modulestore.mongo.inheritance_table import InheritanceTable
 from xmodule.modulestore.xml import CourseLocationManager
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.services import SettingsService
@@ -729,44 +729,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 additional_children = result.get('definition', {}).get('children', [])
                 total_children = existing_children + additional_children
                 # use set to get rid of duplicates. We don't care about order; so, it shouldn't matter.
-                results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
+                results_by_url[location_url].setdefault('definition', {})['children'] = list(set(total_children))
             else:
                 results_by_url[location_url] = result
             if location.category == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
-
-        if root is not None:
-            _compute_inherited_metadata(root)
-
-        return metadata_to_inherit
+        # now compute down the inherited metadata
+        return InheritanceTable.compute(
+            self.get_branch_setting(),
+            root,
+            {
+                url: (result.get('metadata', {}), result.get('definition', {}).get('children', []))
+                for url, result in results_by_url.iteritems()
+            }
+        )
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
@@ -782,7 +759,16 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                version_key = self._metadata_inheritance_version_key(course_id)
+                cached = self.metadata_inheritance_cache_subsystem.get_many([unicode(course_id), version_key])
+                tree = cached.get(unicode(course_id), {})
+                # ignore the trees cached in older formats, and the trees overwritten by the late write
+                # of an older version
+                if (
+                        not isinstance(tree, InheritanceTable) or not tree.is_current() or
+                        tree.cache_version is None or tree.cache_version != cached.get(version_key)
+                ):
+                    tree = {}
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
@@ -792,38 +778,125 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
-
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            self._cache_metadata_inheritance_tree(course_id, tree, in_request_cache=False)
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
         # put into the request_cache
-        if self.request_cache is not None:
+        self._cache_metadata_inheritance_tree(course_id, tree, in_subsystem=False)
+
+        return tree
+
+    def _cache_metadata_inheritance_tree(self, course_id, tree, in_subsystem=True, in_request_cache=True):
+        """
+        Write out the metadata inheritance tree of the course to the caching subsystem (e.g. memcached)
+        and to the request cache, if they are available.
+
+        Trees written to the caching subsystem are stamped with a new version of the cached tree of the
+        course, see _next_metadata_inheritance_version.
+        """
+        if in_subsystem and self.metadata_inheritance_cache_subsystem is not None:
+            if isinstance(tree, InheritanceTable):
+                tree.cache_version = self._next_metadata_inheritance_version(course_id)
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+
+        if in_request_cache and self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
             if 'metadata_inheritance' not in self.request_cache.data:
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
 
-        return tree
+    @staticmethod
+    def _metadata_inheritance_version_key(course_id):
+        """
+        Returns the key of the version of the cached metadata inheritance tree of the course.
+        """
+        return u'{}.version'.format(course_id)
+
+    def _next_metadata_inheritance_version(self, course_id):
+        """
+        Increments the version of the cached metadata inheritance tree of the course in the caching
+        subsystem, and returns it; or returns None if the caching subsystem can't keep it.
+
+        The version is incremented atomically, so that of several processes writing the tree at the
+        same time, exactly one gets the version following the one it read.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        key = self._metadata_inheritance_version_key(course_id)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The version isn't cached yet, or was evicted: start it at a random value, so that trees
+            # stamped with an evicted version aren't taken for the current one.
+            cache.add(key, uuid4().int >> 80)
+            try:
+                return cache.incr(key)
+            except ValueError:
+                return None
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, xblock=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        If given the xblock which was updated, the cached tree is updated for the changes to its
+        inheritable metadata, instead of being recomputed for the whole course, unless its
+        children changed.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if xblock is not None:
+                cached_metadata = self._update_cached_metadata_inheritance_tree(course_id, xblock)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def _update_cached_metadata_inheritance_tree(self, course_id, xblock):
+        """
+        Update the cached metadata inheritance tree of the course in place for the current
+        inheritable metadata of xblock, and return it; or return None if there is no cached
+        tree or if it must be recomputed.
+
+        Other processes may update the tree of the course at the same time, so the updated tree is
+        only written back to the caching subsystem if it was the current version of the tree and
+        no other process wrote a new version since it was read. Otherwise the tree is recomputed,
+        so that none of the updates are lost.
+        """
+        tree = self._get_cached_metadata_inheritance_tree(course_id)
+        if not isinstance(tree, InheritanceTable) or tree.branch != self.get_branch_setting():
+            return None
+
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is not None:
+            version = tree.cache_version
+            if version is None or version != cache.get(self._metadata_inheritance_version_key(course_id)):
+                return None
+
+        metadata = {
+            field_name: value
+            for field_name, value in self._serialize_scope(xblock, Scope.settings).iteritems()
+            if field_name in InheritanceMixin.fields
+        }
+        children = [unicode(as_published(child)) for child in xblock.children] if xblock.has_children else []
+        if not tree.update_block(unicode(as_published(xblock.location)), metadata, children):
+            return None
+
+        if cache is not None:
+            tree.cache_version = self._next_metadata_inheritance_version(course_id)
+            if tree.cache_version is None or tree.cache_version != version + 1:
+                # Another process wrote the tree since it was read.
+                return None
+            cache.set(unicode(course_id), tree)
+        self._cache_metadata_inheritance_tree(course_id, tree, in_subsystem=False)
+        return tree
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -951,7 +1024,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             system = using_descriptor_system
             system.module_data.update(data_cache)
-            system.cached_metadata.update(cached_metadata)
+            if cached_metadata:
+                # the inheritance table of the course supersedes any the system was created with
+                system.cached_metadata = cached_metadata
 
         item = system.load_item(location, for_parent=for_parent)
 
@@ -1178,6 +1253,77 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         )[0]
         return module
 
+    def get_items_by_keys(self, usage_keys, depth=0, using_descriptor_system=None, for_parent=None, **kwargs):
+        """
+        Returns a list of the XModuleDescriptor instances for the items at the
+        given usage keys, in the same order as the keys, reading all of their
+        documents with a single query.
+
+        If no object is found for any of the keys, raises
+            xmodule.modulestore.exceptions.ItemNotFoundError
+
+        Arguments:
+            usage_keys: a list of :class:`.UsageKey` instances
+            depth (int): see get_item
+            using_descriptor_system (CachingDescriptorSystem): see get_item
+        """
+        usage_keys = list(usage_keys)
+        items = self._find_many(usage_keys)
+        return self._load_items_by_keys(
+            usage_keys,
+            items,
+            depth,
+            using_descriptor_system=using_descriptor_system,
+            for_parent=for_parent,
+        )
+
+    @autoretry_read()
+    def _find_many(self, usage_keys):
+        """
+        Look for the given locations in the collection in a single query.
+        Returns a dict mapping each location found to its document.
+        """
+        usage_keys_by_id = {
+            tuple(usage_key.to_deprecated_son().itervalues()): usage_key
+            for usage_key in usage_keys
+        }
+        if not usage_keys_by_id:
+            return {}
+        query = {'_id': {'$in': [usage_key.to_deprecated_son() for usage_key in usage_keys_by_id.itervalues()]}}
+        return {
+            usage_keys_by_id[tuple(self._id_dict_to_son(item['_id']).itervalues())]: item
+            for item in self.collection.find(query)
+        }
+
+    def _load_items_by_keys(self, usage_keys, items, depth=0, using_descriptor_system=None, for_parent=None):
+        """
+        Load the xmodules for the given usage keys from their documents in
+        `items`, a dict mapping usage keys to documents, grouping the keys by
+        course so that the children of each course's items are cached together.
+        Returns the xmodules in the same order as the keys.
+
+        Each document is loaded once, even if its key is repeated, since
+        loading a document modifies it.
+        """
+        keys_by_course = {}
+        for usage_key in usage_keys:
+            if usage_key not in items:
+                raise ItemNotFoundError(usage_key)
+            course_usage_keys = keys_by_course.setdefault(usage_key.course_key, [])
+            if usage_key not in course_usage_keys:
+                course_usage_keys.append(usage_key)
+
+        modules = {}
+        for course_key, course_usage_keys in keys_by_course.iteritems():
+            modules.update(zip(course_usage_keys, self._load_items(
+                course_key,
+                [items[usage_key] for usage_key in course_usage_keys],
+                depth,
+                using_descriptor_system=using_descriptor_system,
+                for_parent=for_parent,
+            )))
+        return [modules[usage_key] for usage_key in usage_keys]
+
     @staticmethod
     def _course_key_to_son(course_id, tag='i4x'):
         """
@@ -1545,7 +1691,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, xblock=xblock
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
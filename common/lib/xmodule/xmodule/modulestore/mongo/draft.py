@@ -120,6 +120,64 @@ class DraftModuleStore(MongoModuleStore):
         else:
             raise UnsupportedRevisionError()
 
+    def get_items_by_keys(self, usage_keys, depth=0, revision=None, using_descriptor_system=None, **kwargs):
+        """
+        Returns a list of the XModuleDescriptor instances for the items at the
+        given usage keys, in the same order as the keys, choosing between the
+        draft and published version of each item as get_item does, and reading
+        the documents of all of the candidate versions with a single query.
+
+        Args:
+            usage_keys: A list of :class:`.UsageKey` instances
+            depth (int): see get_item
+            revision: see get_item
+            using_descriptor_system (CachingDescriptorSystem): see get_item
+
+        Raises:
+            xmodule.modulestore.exceptions.ItemNotFoundError if no object
+            is found for any of the keys
+        """
+        if revision not in (
+                None, ModuleStoreEnum.RevisionOption.published_only, ModuleStoreEnum.RevisionOption.draft_only
+        ):
+            raise UnsupportedRevisionError()
+        usage_keys = list(usage_keys)
+        published_only = (
+            revision == ModuleStoreEnum.RevisionOption.published_only or
+            (revision is None and self.get_branch_setting() == ModuleStoreEnum.Branch.published_only)
+        )
+
+        # The versions to look for of each item, in order of preference
+        candidates = {}
+        for usage_key in usage_keys:
+            if published_only or usage_key.category in DIRECT_ONLY_CATEGORIES:
+                candidates[usage_key] = (usage_key,)
+            elif revision == ModuleStoreEnum.RevisionOption.draft_only:
+                candidates[usage_key] = (as_draft(usage_key),)
+            else:
+                candidates[usage_key] = (as_draft(usage_key), usage_key)
+
+        found = self._find_many([
+            candidate for usage_key_candidates in candidates.itervalues() for candidate in usage_key_candidates
+        ])
+        items = {}
+        for usage_key, usage_key_candidates in candidates.iteritems():
+            for candidate in usage_key_candidates:
+                if candidate in found:
+                    items[usage_key] = found[candidate]
+                    break
+
+        return [
+            wrap_draft(item)
+            for item in self._load_items_by_keys(
+                usage_keys,
+                items,
+                depth,
+                using_descriptor_system=using_descriptor_system,
+                for_parent=kwargs.get('for_parent'),
+            )
+        ]
+
     def has_item(self, usage_key, revision=None):
         """
         Returns True if location exists in this ModuleStore.
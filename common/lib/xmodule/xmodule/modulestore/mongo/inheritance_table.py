@@ -0,0 +1,217 @@
+"""
+A flat table of the metadata inherited by the blocks of an old Mongo course.
+
+The table replaces the nested dicts of inherited metadata that used to be
+cached per course. Blocks are numbered, and each block refers to its parent
+and to its inherited metadata by index; since most blocks of a course inherit
+exactly the same values from their ancestors, each distinct set of inherited
+values is stored only once. The dict of inherited metadata of a block is only
+built when that block is loaded.
+
+The table also keeps the own inheritable metadata and the children of each
+container, so that it can be updated in place when a single block is updated,
+instead of being recomputed for the whole course.  Since a table updated in
+place is written back to the cache, the modulestore stamps each cached table
+with a version and only writes back updates to the current version.
+"""
+import json
+
+
+class InheritanceTable(object):
+    """
+    The metadata inherited by the blocks of a course, keyed by the urls of
+    their published locations.
+
+    It quacks enough like the dict of dicts which it replaces for the users
+    of `CachingDescriptorSystem.cached_metadata`: `get(url)` returns the
+    inheritable metadata of the block, along with a 'parent' entry mapping the
+    branch that the table was computed for to the url of the block's parent.
+    """
+    # Bump this when the pickled format of the table changes, so that the
+    # tables cached in the old format are recomputed instead of being used.
+    VERSION = 2
+
+    def __init__(self, branch):
+        self.version = self.VERSION
+        self.branch = branch
+        # The version of the cached table of the course that this table was
+        # cached as, which is stamped by the modulestore.
+        self.cache_version = None
+        self._urls = []
+        self._parents = []
+        self._inherited = []
+        self._value_sets = []
+        # maps the index of each container to (own value set id, child indexes)
+        self._containers = {}
+        self._root = None
+        self._init_derived()
+
+    def _init_derived(self):
+        """
+        Build the lookups which are derived from the pickled state.
+        """
+        self._indexes = {url: index for index, url in enumerate(self._urls)}
+        self._value_set_ids = {self._value_set_key(values): value_set_id
+                               for value_set_id, values in enumerate(self._value_sets)}
+        self._blocks = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for derived in ('_indexes', '_value_set_ids', '_blocks'):
+            del state[derived]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_derived()
+
+    @classmethod
+    def compute(cls, branch, root, containers):
+        """
+        Compute the table of a course.
+
+        Arguments:
+            branch: the branch setting that the containers were read with.
+            root (unicode): the url of the course block, or None.
+            containers (dict): maps the url of each container of the course
+                to a tuple of its own inheritable metadata and the urls of its
+                children.
+        """
+        table = cls(branch)
+        if root is None or root not in containers:
+            return table
+
+        for url, (metadata, children) in containers.iteritems():
+            table._containers[table._index(url)] = (
+                table._value_set_id(metadata),
+                tuple(table._index(child) for child in children),
+            )
+        table._root = table._indexes[root]
+        table._inherited[table._root] = table._containers[table._root][0]
+        table._propagate(table._root)
+        return table
+
+    def is_current(self):
+        """
+        Returns whether the table has the format of this version of the code.
+        """
+        return getattr(self, 'version', None) == self.VERSION
+
+    def __len__(self):
+        return len(self._urls)
+
+    def keys(self):
+        """
+        The urls of the blocks of the table.
+        """
+        return list(self._urls)
+
+    def get(self, url, default=None):
+        """
+        Returns the dict of the metadata inherited by the block at `url`,
+        which also maps 'parent' to {branch: parent url}, or `default` if the
+        block doesn't inherit anything from the table.
+        """
+        block = self._blocks.get(url)
+        if block is None:
+            index = self._indexes.get(url)
+            if index is None or index == self._root or self._parents[index] is None:
+                return default
+            block = dict(self._value_sets[self._inherited[index]])
+            block['parent'] = {self.branch: self._urls[self._parents[index]]}
+            self._blocks[url] = block
+        return block
+
+    def update_block(self, url, metadata, children):
+        """
+        Updates the table for the new inheritable `metadata` of the block at
+        `url`, whose children are at the urls `children`.
+
+        Returns False if the table can't be updated in place, i.e. if the
+        block is a container which isn't in the table yet or whose children
+        changed, in which case the table must be recomputed.
+        """
+        index = self._indexes.get(url)
+        container = self._containers.get(index)
+        if container is None:
+            # The metadata of leaves isn't inherited by any other block
+            return not children
+        if set(self._urls[child] for child in container[1]) != set(children):
+            return False
+
+        value_set_id = self._value_set_id(metadata)
+        if value_set_id == container[0]:
+            return True
+        self._containers[index] = (value_set_id, container[1])
+        if index == self._root:
+            self._inherited[index] = value_set_id
+        elif self._parents[index] is not None:
+            self._inherited[index] = self._merged_value_set_id(self._inherited[self._parents[index]], value_set_id)
+        else:
+            # Nothing is inherited from orphans
+            return True
+        self._propagate(index)
+        self._blocks.clear()
+        return True
+
+    def _index(self, url):
+        """
+        Returns the index of the block at `url`, adding it if needed.
+        """
+        index = self._indexes.get(url)
+        if index is None:
+            index = self._indexes[url] = len(self._urls)
+            self._urls.append(url)
+            self._parents.append(None)
+            self._inherited.append(None)
+        return index
+
+    @staticmethod
+    def _value_set_key(values):
+        """
+        Returns a hashable key of the dict or items `values`.
+        """
+        return json.dumps(sorted(dict(values).items()), sort_keys=True, default=unicode)
+
+    def _value_set_id(self, values):
+        """
+        Returns the id of the set of inherited `values`, adding it if needed.
+        """
+        key = self._value_set_key(values)
+        value_set_id = self._value_set_ids.get(key)
+        if value_set_id is None:
+            value_set_id = self._value_set_ids[key] = len(self._value_sets)
+            self._value_sets.append(tuple(sorted(dict(values).items())))
+        return value_set_id
+
+    def _merged_value_set_id(self, inherited_value_set_id, own_value_set_id):
+        """
+        Returns the id of the values inherited by a container, i.e. of its own
+        values over the values inherited by its parent.
+
+        Containers inherit their own metadata as well, as the nested dicts
+        which the table replaces did.
+        """
+        own_values = self._value_sets[own_value_set_id]
+        if not own_values:
+            return inherited_value_set_id
+        return self._value_set_id(self._value_sets[inherited_value_set_id] + own_values)
+
+    def _propagate(self, index):
+        """
+        Recomputes the metadata inherited by the descendants of the container
+        at `index`, from the metadata inherited by that container.
+        """
+        stack = [index]
+        visited = {index}
+        while stack:
+            parent = stack.pop()
+            for child in self._containers[parent][1]:
+                self._parents[child] = parent
+                child_container = self._containers.get(child)
+                if child_container is None:
+                    self._inherited[child] = self._inherited[parent]
+                elif child not in visited:
+                    visited.add(child)
+                    self._inherited[child] = self._merged_value_set_id(self._inherited[parent], child_container[0])
+                    stack.append(child)
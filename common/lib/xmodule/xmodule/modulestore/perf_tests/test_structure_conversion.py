@@ -0,0 +1,92 @@
+"""
+Performance test for the conversion of split modulestore structures
+to and from their mongo documents.
+"""
+import unittest
+import ddt
+#from nose.plugins.attrib import attr
+
+from bson.objectid import ObjectId
+from nose.plugins.skip import SkipTest
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo, structure_to_mongo
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# Number of blocks in the structures converted per test run.
+BLOCK_AMOUNT_PER_TEST = (100, 1000, 10000)
+
+# Number of children of each non-leaf block of the generated structures.
+CHILDREN_PER_BLOCK = 10
+
+
+def make_structure_doc(num_blocks):
+    """
+    Return the mongo document of a structure with a course and `num_blocks`
+    other blocks, with CHILDREN_PER_BLOCK children per block.
+    """
+    version = ObjectId()
+    edit_info = {
+        'edited_by': 'test_user',
+        'update_version': version,
+        'previous_version': None,
+        'source_version': None,
+        'edited_on': None,
+        'original_usage': None,
+        'original_usage_version': None,
+    }
+    block_keys = [['course', 'course']] + [['vertical', 'block_{}'.format(index)] for index in xrange(num_blocks)]
+    blocks = []
+    for index, (block_type, block_id) in enumerate(block_keys):
+        first_child = index * CHILDREN_PER_BLOCK + 1
+        children = block_keys[first_child:first_child + CHILDREN_PER_BLOCK]
+        blocks.append({
+            'block_type': block_type,
+            'block_id': block_id,
+            'definition': ObjectId(),
+            'fields': {'display_name': block_id, 'children': children} if children else {'display_name': block_id},
+            'defaults': {},
+            'asides': {},
+            'edit_info': dict(edit_info),
+        })
+    return {
+        '_id': version,
+        'root': ['course', 'course'],
+        'blocks': blocks,
+    }
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class StructureConversion(unittest.TestCase):
+    """
+    This class exists to time the conversion of structures of different sizes
+    to and from their mongo documents.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*BLOCK_AMOUNT_PER_TEST)
+    def test_generate_conversion_timings(self, num_blocks):
+        """
+        Generate timings for the conversion of structures with different amounts of blocks.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        doc = make_structure_doc(num_blocks)
+
+        with CodeBlockTimer("StructureConversion:{}".format(num_blocks)):
+            with CodeBlockTimer("structure_from_mongo"):
+                structure = structure_from_mongo(doc)
+
+            with CodeBlockTimer("structure_to_mongo"):
+                structure_to_mongo(structure)
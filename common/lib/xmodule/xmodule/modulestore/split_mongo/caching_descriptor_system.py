@@ -87,8 +87,13 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
     @lazy
     @contract(returns="dict(BlockKey: BlockKey)")
     def _parent_map(self):
+        structure = self.course_entry.structure
+        structure_index = self.modulestore.get_structure_index(self.course_entry.course_key, structure)
+        if structure_index is not None:
+            return {child: parents[-1] for child, parents in structure_index.parents.iteritems()}
+
         parent_map = {}
-        for block_key, block in self.course_entry.structure['blocks'].iteritems():
+        for block_key, block in structure['blocks'].iteritems():
             for child in block.fields.get('children', []):
                 parent_map[child] = block_key
         return parent_map
@@ -4,17 +4,22 @@ Segregation of pymongo functions from the data modeling mechanisms for split mod
 import datetime
 import cPickle as pickle
 import math
+import os
 import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 from time import time
 
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -23,7 +28,7 @@ except ImportError:
 import dogstats_wrapper as dog_stats_api
 import logging
 
-from contracts import check, new_contract
+from contracts import all_disabled, check, new_contract
 from mongodb_proxy import autoretry_read
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
@@ -163,6 +168,17 @@ class QueryTimer(object):
 TIMER = QueryTimer(__name__, 0.01)
 
 
+def _block_key(pair):
+    """
+    Return the BlockKey for the (block_type, block_id) `pair`.
+
+    This skips the contract checks of BlockKey.__new__, which would dominate
+    the conversion of large structures; the pairs of stored structures are
+    checked by `structure_from_mongo` instead, whenever contracts are enabled.
+    """
+    return tuple.__new__(BlockKey, pair)
+
+
 def structure_from_mongo(structure, course_context=None):
     """
     Converts the 'blocks' key from a list [block_data] to a map
@@ -171,6 +187,9 @@ def structure_from_mongo(structure, course_context=None):
     Converts 'blocks.*.fields.children' from [[block_type, block_id]] to [BlockKey].
     N.B. Does not convert any other ReferenceFields (because we don't know which fields they are at this level).
 
+    The structure is only validated when contracts are enabled, i.e. not in
+    production, where contracts are disabled.
+
     Arguments:
         structure: The document structure to convert
         course_context (CourseKey): For metrics gathering, the CourseKey
@@ -179,18 +198,21 @@ def structure_from_mongo(structure, course_context=None):
     with TIMER.timer('structure_from_mongo', course_context) as tagger:
         tagger.measure('blocks', len(structure['blocks']))
 
-        check('seq[2]', structure['root'])
-        check('list(dict)', structure['blocks'])
-        for block in structure['blocks']:
-            if 'children' in block['fields']:
-                check('list(list[2])', block['fields']['children'])
+        if not all_disabled():
+            check('seq[2]', structure['root'])
+            check('list(dict)', structure['blocks'])
+            for block in structure['blocks']:
+                check('string[>0]', block['block_type'])
+                if 'children' in block['fields']:
+                    check('list(list[2])', block['fields']['children'])
 
-        structure['root'] = BlockKey(*structure['root'])
+        structure['root'] = _block_key(structure['root'])
         new_blocks = {}
         for block in structure['blocks']:
-            if 'children' in block['fields']:
-                block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
-            new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(**block)
+            fields = block['fields']
+            if 'children' in fields:
+                fields['children'] = [_block_key(child) for child in fields['children']]
+            new_blocks[_block_key((block['block_type'], block.pop('block_id')))] = BlockData(**block)
         structure['blocks'] = new_blocks
 
         return structure
@@ -207,39 +229,277 @@ def structure_to_mongo(structure, course_context=None):
     with TIMER.timer('structure_to_mongo', course_context) as tagger:
         tagger.measure('blocks', len(structure['blocks']))
 
-        check('BlockKey', structure['root'])
-        check('dict(BlockKey: BlockData)', structure['blocks'])
-        for block in structure['blocks'].itervalues():
-            if 'children' in block.fields:
-                check('list(BlockKey)', block.fields['children'])
+        if not all_disabled():
+            check('BlockKey', structure['root'])
+            check('dict(BlockKey: BlockData)', structure['blocks'])
+            for block in structure['blocks'].itervalues():
+                if 'children' in block.fields:
+                    check('list(BlockKey)', block.fields['children'])
 
         new_structure = dict(structure)
-        new_structure['blocks'] = []
+        new_blocks = new_structure['blocks'] = []
 
         for block_key, block in structure['blocks'].iteritems():
-            new_block = dict(block.to_storable())
+            # to_storable returns a new dict, so it's safe to add to it
+            new_block = block.to_storable()
             new_block.setdefault('block_type', block_key.type)
             new_block['block_id'] = block_key.id
-            new_structure['blocks'].append(new_block)
+            new_blocks.append(new_block)
 
         return new_structure
 
 
+class StructureLRU(object):
+    """
+    A process-local cache of pickled course structures, which evicts the
+    least recently used structures once the total size of the cached
+    structures exceeds `max_bytes`.
+
+    The structures are kept pickled, and callers unpickle a private copy of
+    them on each read: the structures and definitions that are read are
+    modified by their readers, e.g. when the definitions of blocks are loaded
+    into their fields, and they must not be shared between requests and
+    threads.  This also keeps the cached size equal to the memory used.
+    Structures larger than `max_item_bytes` are not cached at all, so that a
+    single huge course can't evict every other course.
+    """
+    def __init__(self, max_bytes, max_item_bytes):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def limits(self):
+        """
+        The (max_bytes, max_item_bytes) limits of this cache.
+        """
+        return self.max_bytes, self.max_item_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return the structure cached for `key`, or None, marking it as the most
+        recently used structure.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            return entry[0]
+
+    def set(self, key, structure, size):
+        """
+        Cache `structure` for `key`, given its size in bytes, evicting
+        the least recently used structures as needed.
+        """
+        if size > self.max_item_bytes or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous_entry = self._entries.pop(key, None)
+            if previous_entry is not None:
+                self.current_bytes -= previous_entry[1]
+            self._entries[key] = (structure, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _evicted_key, (_evicted_structure, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        """
+        Remove all structures from this cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+_LRUS = {}
+
+
+def _get_lru(max_bytes_setting, max_item_bytes_setting):
+    """
+    Return the process-local :class:`StructureLRU` sized according to the
+    given settings, or None if it is disabled or Django isn't available.
+    """
+    if not DJANGO_AVAILABLE:
+        return None
+
+    max_bytes = getattr(settings, max_bytes_setting, 0)
+    if not max_bytes:
+        return None
+
+    max_item_bytes = getattr(settings, max_item_bytes_setting, max_bytes)
+    lru = _LRUS.get(max_bytes_setting)
+    if lru is None or lru.limits != (max_bytes, max_item_bytes):
+        lru = _LRUS[max_bytes_setting] = StructureLRU(max_bytes, max_item_bytes)
+    return lru
+
+
+def get_structure_lru():
+    """
+    Return the process-local :class:`StructureLRU` of course structures, sized
+    according to the COURSE_STRUCTURE_LRU_MAX_BYTES and
+    COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES settings, or None if it is disabled.
+    """
+    return _get_lru('COURSE_STRUCTURE_LRU_MAX_BYTES', 'COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES')
+
+
+def get_definition_lru():
+    """
+    Return the process-local :class:`StructureLRU` of pickled definitions,
+    keyed by definition id and sized according to the
+    COURSE_DEFINITION_LRU_MAX_BYTES and COURSE_DEFINITION_LRU_MAX_ITEM_BYTES
+    settings, or None if it is disabled.
+
+    Like structures, definitions are never changed once they are written.
+    """
+    return _get_lru('COURSE_DEFINITION_LRU_MAX_BYTES', 'COURSE_DEFINITION_LRU_MAX_ITEM_BYTES')
+
+
+class StructureIndex(object):
+    """
+    The parents of each block of a structure, and the blocks that can be
+    reached from its roots, computed in a single pass over the blocks of the
+    structure.
+
+    Attributes:
+        parents (dict): maps the BlockKey of each block that is the child of
+            another block to the list of the BlockKeys of its parents.
+        rooted (frozenset): the BlockKeys of the blocks which have a path to a
+            root, i.e. the root of the structure or a course or library block
+            with no parents.
+    """
+    ROOT_BLOCK_TYPES = ('course', 'library')
+
+    def __init__(self, structure):
+        blocks = structure['blocks']
+        parents = {}
+        for block_key, block in blocks.iteritems():
+            for child in block.fields.get('children', []):
+                parents.setdefault(_block_key(child), []).append(block_key)
+        self.parents = parents
+
+        stack = [structure['root']] + [
+            block_key
+            for block_key in blocks
+            if block_key.type in self.ROOT_BLOCK_TYPES and block_key not in parents
+        ]
+        visited = set()
+        while stack:
+            block_key = stack.pop()
+            if block_key in visited or block_key not in blocks:
+                continue
+            visited.add(block_key)
+            stack.extend(_block_key(child) for child in blocks[block_key].fields.get('children', []))
+        self.rooted = frozenset(visited)
+
+    def get_parents(self, block_key):
+        """
+        Return the list of the BlockKeys of the parents of `block_key`.
+        """
+        return self.parents.get(block_key, [])
+
+
+# The number of structure indexes kept per process.
+STRUCTURE_INDEX_CACHE_SIZE = 64
+
+_STRUCTURE_INDEXES = OrderedDict()
+_STRUCTURE_INDEXES_LOCK = threading.Lock()
+
+
+def get_structure_index(structure, course_context=None):
+    """
+    Return the :class:`StructureIndex` of `structure`, which is only computed
+    the first time it is needed for each structure version in a process.
+
+    Structures are immutable once they are stored, so the index is cached by
+    structure id; this must not be called with structures that are still being
+    edited, i.e. the new versions of structures within bulk operations.
+    """
+    key = structure['_id']
+    with _STRUCTURE_INDEXES_LOCK:
+        index = _STRUCTURE_INDEXES.pop(key, None)
+        if index is not None:
+            _STRUCTURE_INDEXES[key] = index
+            return index
+
+    with TIMER.timer('get_structure_index', course_context) as tagger:
+        tagger.measure('blocks', len(structure['blocks']))
+        index = StructureIndex(structure)
+
+    with _STRUCTURE_INDEXES_LOCK:
+        _STRUCTURE_INDEXES[key] = index
+        while len(_STRUCTURE_INDEXES) > STRUCTURE_INDEX_CACHE_SIZE:
+            _STRUCTURE_INDEXES.popitem(last=False)
+    return index
+
+
+# The default number of definitions read per query, and the default number of
+# those queries run concurrently, when many definitions are read at once.
+DEFAULT_DEFINITION_FETCH_BATCH_SIZE = 1000
+DEFAULT_DEFINITION_FETCH_THREADS = 4
+
+_DEFINITION_FETCH_POOL = {}
+
+
+def get_definition_fetch_settings():
+    """
+    Return the (batch size, number of threads) to read definitions with,
+    from the SPLIT_DEFINITION_FETCH_BATCH_SIZE and SPLIT_DEFINITION_FETCH_THREADS
+    settings if they are set.
+    """
+    batch_size = DEFAULT_DEFINITION_FETCH_BATCH_SIZE
+    threads = DEFAULT_DEFINITION_FETCH_THREADS
+    if DJANGO_AVAILABLE:
+        batch_size = getattr(settings, 'SPLIT_DEFINITION_FETCH_BATCH_SIZE', batch_size)
+        threads = getattr(settings, 'SPLIT_DEFINITION_FETCH_THREADS', threads)
+    return batch_size, threads
+
+
+def _get_definition_fetch_pool(threads):
+    """
+    Return the process-local pool of `threads` threads used to read batches
+    of definitions concurrently. The pool is recreated in forked processes,
+    which don't inherit the threads of their parent.
+    """
+    pool_key = (os.getpid(), threads)
+    pool = _DEFINITION_FETCH_POOL.get(pool_key)
+    if pool is None:
+        _DEFINITION_FETCH_POOL.clear()
+        pool = _DEFINITION_FETCH_POOL[pool_key] = ThreadPool(threads)
+    return pool
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
     The course structures are pickled and compressed when cached.
 
+    Structures are immutable, so the uncompressed pickles of the structures are
+    also kept in a process-local :class:`StructureLRU`, if it is enabled, which
+    saves both the round-trip to the cache and the decompression of the
+    structures of frequently used courses.  Each read unpickles a new copy of
+    the structure, which the caller can modify.
+
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
     """
     def __init__(self):
         self.cache = None
+        self.lru = None
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+            else:
+                self.lru = get_structure_lru()
 
     def get(self, key, course_context=None):
         """Pull the compressed, pickled struct data from cache and deserialize."""
@@ -247,6 +507,13 @@ class CourseStructureCache(object):
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
+            if self.lru is not None:
+                pickled_data = self.lru.get(key)
+                tagger.tag(from_lru=str(pickled_data is not None).lower())
+                tagger.measure('lru_size', self.lru.current_bytes)
+                if pickled_data is not None:
+                    return pickle.loads(pickled_data)
+
             compressed_pickled_data = self.cache.get(key)
             tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
 
@@ -260,6 +527,8 @@ class CourseStructureCache(object):
             pickled_data = zlib.decompress(compressed_pickled_data)
             tagger.measure('uncompressed_size', len(pickled_data))
 
+            if self.lru is not None:
+                self.lru.set(key, pickled_data, len(pickled_data))
             return pickle.loads(pickled_data)
 
     def set(self, key, structure, course_context=None):
@@ -278,6 +547,19 @@ class CourseStructureCache(object):
             # Stuctures are immutable, so we set a timeout of "never"
             self.cache.set(key, compressed_pickled_data, None)
 
+            if self.lru is not None:
+                self.lru.set(key, pickled_data, len(pickled_data))
+
+
+def _cache_definition(lru, definition):
+    """
+    Keep a pickled copy of `definition` in the definition `lru`, and return
+    the size of the pickle.
+    """
+    pickled_definition = pickle.dumps(definition, pickle.HIGHEST_PROTOCOL)
+    lru.set(definition['_id'], pickled_definition, len(pickled_definition))
+    return len(pickled_definition)
+
 
 class MongoConnection(object):
     """
@@ -523,19 +805,68 @@ class MongoConnection(object):
         Get the definition from the persistence mechanism whose id is the given key
         """
         with TIMER.timer("get_definition", course_context) as tagger:
-            definition = self.definitions.find_one({'_id': key})
+            lru = get_definition_lru()
+            pickled_definition = lru.get(key) if lru is not None else None
+            tagger.tag(from_lru=str(pickled_definition is not None).lower())
+            if pickled_definition is not None:
+                definition = pickle.loads(pickled_definition)
+            else:
+                definition = self.definitions.find_one({'_id': key})
+                if definition is not None and lru is not None:
+                    tagger.measure('fetched_bytes', _cache_definition(lru, definition))
             tagger.measure("fields", len(definition['fields']))
             tagger.tag(block_type=definition['block_type'])
             return definition
 
     def get_definitions(self, definitions, course_context=None):
         """
-        Retrieve all definitions listed in `definitions`.
+        Retrieve all definitions listed in `definitions`, as a list.
+
+        Definitions found in the process-local definition cache aren't read
+        again. The rest are read in batches, several batches at a time, so
+        that reading the definitions of a large course isn't a single query
+        whose results are all sent over one connection.
         """
         with TIMER.timer("get_definitions", course_context) as tagger:
             tagger.measure('definitions', len(definitions))
-            definitions = self.definitions.find({'_id': {'$in': definitions}})
-            return definitions
+
+            lru = get_definition_lru()
+            found = []
+            missing = []
+            for definition_id in definitions:
+                pickled_definition = lru.get(definition_id) if lru is not None else None
+                if pickled_definition is None:
+                    missing.append(definition_id)
+                else:
+                    found.append(pickle.loads(pickled_definition))
+            tagger.measure('from_lru', len(found))
+            if not missing:
+                return found
+
+            batch_size, threads = get_definition_fetch_settings()
+            batches = [missing[start:start + batch_size] for start in xrange(0, len(missing), batch_size)]
+            tagger.measure('batches', len(batches))
+            if len(batches) > 1 and threads > 1:
+                fetched_batches = _get_definition_fetch_pool(threads).map(self._find_definitions, batches)
+            else:
+                fetched_batches = [self._find_definitions(batch) for batch in batches]
+
+            # The definitions are only sized when they're pickled for the LRU
+            fetched_bytes = 0
+            for fetched in fetched_batches:
+                for definition in fetched:
+                    if lru is not None:
+                        fetched_bytes += _cache_definition(lru, definition)
+                    found.append(definition)
+            if lru is not None:
+                tagger.measure('fetched_bytes', fetched_bytes)
+            return found
+
+    def _find_definitions(self, definition_ids):
+        """
+        Read the definitions with the given ids, in a single query.
+        """
+        return list(self.definitions.find({'_id': {'$in': definition_ids}}))
 
     def insert_definition(self, definition, course_context=None):
         """
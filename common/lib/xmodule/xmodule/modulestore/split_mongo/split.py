@@ -82,7 +82,7 @@ from xmodule.modulestore import (
 
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError, get_structure_index
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.error_module import ErrorDescriptor
@@ -336,6 +336,22 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
             version_guid = course_key.as_object_id(version_guid)
             return self.db_connection.get_structure(version_guid, course_key)
 
+    def get_structure_index(self, course_key, structure):
+        """
+        Return the :class:`StructureIndex` of the parents and the rooted blocks
+        of `structure`, or None if `structure` is a new version which is still
+        being edited in an active bulk operation.
+        """
+        structure_id = structure['_id']
+        for bulk_write_record in self._active_bulk_ops.records.itervalues():
+            if (  # pylint: disable=bad-continuation
+                bulk_write_record.active and
+                structure_id in bulk_write_record.structures and
+                structure_id not in bulk_write_record.structures_in_db
+            ):
+                return None
+        return get_structure_index(structure, course_key)
+
     def update_structure(self, course_key, structure):
         """
         Update a course structure, respecting the current bulk operation status
@@ -1147,6 +1163,37 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 log.debug("Found more than one item for '{}'".format(usage_key))
             return items[0]
 
+    def get_items_by_keys(self, usage_keys, depth=0, **kwargs):
+        """
+        Returns a list of the XBlocks for the given usage keys, in the same
+        order as the keys. The course of each key is looked up only once, and
+        the blocks of each course are loaded together, so that their
+        definitions are read in one query if they are loaded eagerly.
+
+        depth (int): see get_item
+        raises InsufficientSpecificationError or ItemNotFoundError
+        """
+        usage_keys = list(usage_keys)
+        keys_by_course = {}
+        for usage_key in usage_keys:
+            if not isinstance(usage_key, BlockUsageLocator) or usage_key.deprecated:
+                # The supplied UsageKey is of the wrong type, so it can't possibly be stored in this modulestore.
+                raise ItemNotFoundError(usage_key)
+            keys_by_course.setdefault(usage_key.course_key, []).append(usage_key)
+
+        blocks = {}
+        for course_key, course_usage_keys in keys_by_course.iteritems():
+            with self.bulk_operations(course_key):
+                course = self._lookup_course(course_key)
+                block_keys = []
+                for usage_key in course_usage_keys:
+                    block_key = BlockKey.from_usage_key(usage_key)
+                    if self._get_block_from_structure(course.structure, block_key) is None:
+                        raise ItemNotFoundError(usage_key)
+                    block_keys.append(block_key)
+                blocks.update(zip(course_usage_keys, self._load_items(course, block_keys, depth, **kwargs)))
+        return [blocks[usage_key] for usage_key in usage_keys]
+
     def get_items(self, course_locator, settings=None, content=None, qualifiers=None, include_orphans=True, **kwargs):
         """
         Returns:
@@ -1221,7 +1268,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         path_cache = None
         parents_cache = None
 
-        if not include_orphans:
+        # The structure index already knows which blocks have a path to the root
+        if not include_orphans and self.get_structure_index(course.course_key, course.structure) is None:
             path_cache = {}
             parents_cache = self.build_block_key_to_parents_mapping(course.structure)
 
@@ -1275,6 +1323,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return path_cache[block_key]
 
         if parents_cache is None:
+            structure_index = self.get_structure_index(course.course_key, course.structure)
+            if structure_index is not None:
+                return block_key in structure_index.rooted
             xblock_parents = self._get_parents_from_structure(block_key, course.structure)
         else:
             xblock_parents = parents_cache[block_key]
@@ -1309,7 +1360,11 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(locator)
 
         course = self._lookup_course(locator.course_key)
-        all_parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
+        structure_index = self.get_structure_index(course.course_key, course.structure)
+        if structure_index is not None:
+            all_parent_ids = structure_index.get_parents(BlockKey.from_usage_key(locator))
+        else:
+            all_parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
 
         # Check and verify the found parent_ids are not orphans; Remove parent which has no valid path
         # to the course root
@@ -1340,13 +1395,22 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         detached_categories = [name for name, __ in XBlock.load_tagged_classes("detached")]
         course = self._lookup_course(course_key)
-        items = set(course.structure['blocks'].keys())
-        items.remove(course.structure['root'])
         blocks = course.structure['blocks']
-        for block_id, block_data in blocks.iteritems():
-            items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
-            if block_data.block_type in detached_categories:
-                items.discard(block_id)
+        structure_index = self.get_structure_index(course.course_key, course.structure)
+        if structure_index is not None:
+            items = set(
+                block_id
+                for block_id, block_data in blocks.iteritems()
+                if block_id not in structure_index.parents and block_data.block_type not in detached_categories
+            )
+            items.discard(course.structure['root'])
+        else:
+            items = set(blocks.keys())
+            items.remove(course.structure['root'])
+            for block_id, block_data in blocks.iteritems():
+                items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
+                if block_data.block_type in detached_categories:
+                    items.discard(block_id)
         return [
             course_key.make_usage_key(block_type=block_id.type, block_id=block_id.id)
             for block_id in items
@@ -1528,6 +1592,40 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return usage_key, block.edit_info.original_usage_version
         return None, None
 
+    def get_blocks_changed_since(self, course_key, version_guid):
+        """
+        Compares the current structure of the given course with the given
+        earlier version of its structure.
+
+        Returns a tuple of the current version guid of the course and the
+        set of usage keys of the blocks that were added or whose fields,
+        definition, defaults or asides differ from the given version.
+        Blocks whose children were added, moved or removed are included,
+        since children are stored in their fields.  The set is None if the
+        given version is not available.
+        """
+        course_entry = self._lookup_course(course_key)
+        current_version = course_entry.structure['_id']
+        if version_guid is None:
+            return current_version, None
+        if current_version == course_key.as_object_id(version_guid):
+            return current_version, set()
+
+        old_structure = self.get_structure(course_key, version_guid)
+        if old_structure is None:
+            return current_version, None
+
+        old_blocks = old_structure['blocks']
+        changed_usage_keys = set()
+        for block_key, block_data in course_entry.structure['blocks'].iteritems():
+            old_block_data = old_blocks.get(block_key)
+            if old_block_data is None or block_data.get_asides() != old_block_data.get_asides() or any(
+                    getattr(block_data, attr) != getattr(old_block_data, attr)
+                    for attr in ('fields', 'definition', 'defaults')
+            ):
+                changed_usage_keys.add(course_key.make_usage_key(block_key.type, block_key.id))
+        return current_version, changed_usage_keys
+
     def create_definition_from_data(self, course_key, new_def_data, category, user_id):
         """
         Pull the definition fields out of descriptor and save to the db as a new definition
@@ -279,6 +279,14 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         usage_key = self._map_revision_to_branch(usage_key, revision=revision)
         return super(DraftVersioningModuleStore, self).get_item(usage_key, depth=depth, **kwargs)
 
+    def get_items_by_keys(self, usage_keys, depth=0, revision=None, **kwargs):
+        """
+        Returns the items identified by usage_keys and revision, in the same
+        order as the keys.
+        """
+        usage_keys = [self._map_revision_to_branch(usage_key, revision=revision) for usage_key in usage_keys]
+        return super(DraftVersioningModuleStore, self).get_items_by_keys(usage_keys, depth=depth, **kwargs)
+
     def get_items(self, course_locator, revision=None, **kwargs):
         """
         Returns a list of XModuleDescriptor instances for the matching items within the course with
@@ -313,6 +321,14 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         usage_key = self._map_revision_to_branch(usage_key)
         return super(DraftVersioningModuleStore, self).get_block_original_usage(usage_key)
 
+    def get_blocks_changed_since(self, course_key, version_guid):
+        """
+        Returns the current version guid of the given course and the set
+        of usage keys of its blocks that changed since the given version.
+        """
+        course_key = self._map_revision_to_branch(course_key)
+        return super(DraftVersioningModuleStore, self).get_blocks_changed_since(course_key, version_guid)
+
     def get_orphans(self, course_key, **kwargs):
         course_key = self._map_revision_to_branch(course_key)
         return super(DraftVersioningModuleStore, self).get_orphans(course_key, **kwargs)
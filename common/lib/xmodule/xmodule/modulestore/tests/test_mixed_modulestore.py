@@ -414,6 +414,62 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         with self.assertRaises(UnsupportedRevisionError):
             self.store.get_item(self.fake_location, revision=ModuleStoreEnum.RevisionOption.draft_preferred)
 
+    # Draft:
+    #   the draft and published candidates of all of the items, then for each of the 3 distinct items:
+    #   find all items pertinent to inheritance computation, find parent
+    # split:
+    #   active_versions, structure, for all of the items
+    @ddt.data((ModuleStoreEnum.Type.mongo, 7), (ModuleStoreEnum.Type.split, 2))
+    @ddt.unpack
+    def test_get_items_by_keys(self, default_ms, max_find):
+        self.initdb(default_ms)
+        self._create_block_hierarchy()
+
+        usage_keys = [self.problem_y1a_2, self.chapter_x, self.problem_x1a_1, self.problem_y1a_2]
+        with check_mongo_calls(max_find):
+            items = self.store.get_items_by_keys(usage_keys)
+        self.assertEqual([item.location for item in items], usage_keys)
+        self.assertEqual(
+            [item.display_name for item in items],
+            ['Problem_y1a_2', 'Chapter_x', 'Problem_x1a_1', 'Problem_y1a_2']
+        )
+        self.assertIs(items[0], items[3])
+        self.assertEqual(self.store.get_items_by_keys([]), [])
+
+        # try negative cases
+        with self.assertRaises(ItemNotFoundError):
+            self.store.get_items_by_keys([self.problem_x1a_1, self.fake_location])
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_get_items_by_keys_draft(self, default_ms):
+        self.initdb(default_ms)
+        self._create_block_hierarchy()
+        self.store.publish(self.vertical_x1a, self.user_id)
+        problem = self.store.get_item(self.problem_x1a_1)
+        problem.display_name = 'Problem_x1a_1 changed'
+        self.store.update_item(problem, self.user_id)
+
+        usage_keys = [self.problem_x1a_1, self.chapter_x, self.problem_x1a_2]
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred):
+            items = self.store.get_items_by_keys(usage_keys)
+            self.assertEqual([item.location for item in items], usage_keys)
+            self.assertEqual(
+                [item.display_name for item in items],
+                ['Problem_x1a_1 changed', 'Chapter_x', 'Problem_x1a_2']
+            )
+            # never published
+            self.assertEqual(self.store.get_items_by_keys([self.problem_y1a_1])[0].display_name, 'Problem_y1a_1')
+
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only):
+            items = self.store.get_items_by_keys(usage_keys)
+            self.assertEqual([item.location for item in items], usage_keys)
+            self.assertEqual(
+                [item.display_name for item in items],
+                ['Problem_x1a_1', 'Chapter_x', 'Problem_x1a_2']
+            )
+            with self.assertRaises(ItemNotFoundError):
+                self.store.get_items_by_keys([self.problem_x1a_1, self.problem_y1a_1])
+
     # Draft:
     #    wildcard query, 6! load pertinent items for inheritance calls, load parents, course root fetch (why)
     # Split:
@@ -42,7 +42,7 @@ from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
 from xmodule.modulestore.mongo.base import as_draft
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
-from xmodule.modulestore.tests.utils import LocationMixin, mock_tab_from_json
+from xmodule.modulestore.tests.utils import LocationMixin, MemoryCache, mock_tab_from_json
 from xmodule.modulestore.edit_info import EditInfoMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.inheritance import InheritanceMixin
@@ -707,6 +707,39 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_update_cached_inheritance_conflict(self):
+        """
+        Test that the cached metadata inheritance tree of a course is updated in place, unless
+        another process wrote it since it was read, in which case it's recomputed.
+        """
+        cache = MemoryCache()
+        course = self.draft_store.create_course("TestX", "InheritanceConflict", "2016", self.dummy_user)
+        chapter = self.draft_store.create_child(self.dummy_user, course.location, "chapter")
+        with patch.object(self.draft_store, 'metadata_inheritance_cache_subsystem', cache):
+            with patch.object(
+                self.draft_store,
+                '_compute_metadata_inheritance_tree',
+                wraps=self.draft_store._compute_metadata_inheritance_tree,
+            ) as mock_compute:
+                self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+                self.assertEqual(mock_compute.call_count, 1)
+
+                chapter.graded = True
+                self.draft_store.update_item(chapter, self.dummy_user)
+                self.assertEqual(mock_compute.call_count, 1)
+
+                # Another process writes the tree of the course.
+                cache.incr(self.draft_store._metadata_inheritance_version_key(course.id))
+                chapter.graded = False
+                self.draft_store.update_item(chapter, self.dummy_user)
+                self.assertEqual(mock_compute.call_count, 2)
+
+                tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+                self.assertEqual(mock_compute.call_count, 2)
+                self.assertFalse(tree.get(unicode(chapter.location))['graded'])
+
+        self.draft_store.delete_course(course.id, self.dummy_user)
+
     def test_make_course_usage_key(self):
         """Test that we get back the appropriate usage key for the root of a course key."""
         course_key = CourseLocator(org="edX", course="101", run="2015")
@@ -0,0 +1,67 @@
+"""
+Tests of the flat metadata inheritance table of the old Mongo modulestore.
+"""
+import cPickle as pickle
+import unittest
+
+from xmodule.modulestore.mongo.inheritance_table import InheritanceTable
+
+
+class TestInheritanceTable(unittest.TestCase):
+    """
+    Tests of InheritanceTable.
+    """
+    def setUp(self):
+        super(TestInheritanceTable, self).setUp()
+        self.table = InheritanceTable.compute('draft', 'course', {
+            'course': ({'due': 'course_due'}, ['chapter1', 'chapter2']),
+            'chapter1': ({'graded': True}, ['sequential1']),
+            'chapter2': ({}, ['sequential2']),
+            'sequential1': ({}, ['html1']),
+            'sequential2': ({}, ['html2']),
+            'orphan': ({'due': 'orphan_due'}, ['html3']),
+        })
+
+    def test_inherited_metadata(self):
+        self.assertIsNone(self.table.get('course'))
+        self.assertEqual(
+            self.table.get('chapter1'),
+            {'due': 'course_due', 'graded': True, 'parent': {'draft': 'course'}}
+        )
+        self.assertEqual(
+            self.table.get('html1'),
+            {'due': 'course_due', 'graded': True, 'parent': {'draft': 'sequential1'}}
+        )
+        self.assertEqual(self.table.get('html2'), {'due': 'course_due', 'parent': {'draft': 'sequential2'}})
+        self.assertEqual(self.table.get('html3', {}), {})
+        self.assertIsNone(self.table.get('orphan'))
+
+    def test_values_deduplicated(self):
+        # the own values of the course, chapter1, the other containers and the orphan, and the
+        # values inherited under chapter1
+        self.assertEqual(len(self.table._value_sets), 5)  # pylint: disable=protected-access
+
+    def test_pickle(self):
+        table = pickle.loads(pickle.dumps(self.table, pickle.HIGHEST_PROTOCOL))
+        self.assertTrue(table.is_current())
+        self.assertEqual(table.get('html1'), self.table.get('html1'))
+        self.assertNotIn('_blocks', self.table.__getstate__())
+
+    def test_update_metadata(self):
+        self.assertEqual(self.table.get('html1')['due'], 'course_due')
+        self.assertTrue(self.table.update_block('chapter1', {'due': 'chapter_due'}, ['sequential1']))
+        self.assertEqual(self.table.get('html1'), {'due': 'chapter_due', 'parent': {'draft': 'sequential1'}})
+        self.assertEqual(self.table.get('html2'), {'due': 'course_due', 'parent': {'draft': 'sequential2'}})
+
+        self.assertTrue(self.table.update_block('course', {}, ['chapter2', 'chapter1']))
+        self.assertEqual(self.table.get('html2'), {'parent': {'draft': 'sequential2'}})
+        self.assertEqual(self.table.get('html1')['due'], 'chapter_due')
+
+    def test_update_leaf(self):
+        self.assertTrue(self.table.update_block('html1', {'due': 'html_due'}, []))
+        self.assertEqual(self.table.get('html1')['due'], 'course_due')
+
+    def test_update_requires_recompute(self):
+        self.assertFalse(self.table.update_block('chapter1', {}, ['sequential1', 'sequential3']))
+        self.assertFalse(self.table.update_block('html1', {}, ['problem1']))
+        self.assertFalse(self.table.update_block('chapter3', {}, ['sequential3']))
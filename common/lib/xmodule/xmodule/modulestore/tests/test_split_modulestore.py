@@ -14,6 +14,7 @@ import ddt
 from contracts import contract
 from nose.plugins.attrib import attr
 from django.core.cache import caches, InvalidCacheBackendError
+from django.test.utils import override_settings
 
 from openedx.core.lib import tempdir
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
@@ -32,6 +33,7 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import StructureLRU
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -990,6 +992,52 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @override_settings(COURSE_STRUCTURE_LRU_MAX_BYTES=10 ** 8)
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_lru(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the structure is kept in the process, so it can be read neither
+        # from mongo nor from the cache
+        self.cache.clear()
+        with patch.object(self.cache, 'get') as mock_cache_get:
+            with check_mongo_calls(0):
+                cached_structure = self._get_structure(self.new_course)
+        self.assertFalse(mock_cache_get.called)
+        self.assertEqual(cached_structure, not_cached_structure)
+        self.assertIsNot(cached_structure, not_cached_structure)
+
+    @override_settings(COURSE_STRUCTURE_LRU_MAX_BYTES=10 ** 8)
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_lru_copies(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+        modulestore().create_child(
+            self.user, self.new_course.location, block_type='html', block_id='html1', fields={'data': 'text'}
+        )
+        course = modulestore().get_course(self.new_course.id)
+        structure = self._get_structure(course)
+
+        # loading the definitions of the blocks into their fields doesn't
+        # change the structures that are read after it
+        modulestore().get_course(self.new_course.id, depth=None, lazy=False)
+        self.assertEqual(self._get_structure(course), structure)
+        self.assertNotIn('data', structure['blocks'][BlockKey('html', 'html1')].fields)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_lru_disabled(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+
+        with check_mongo_calls(1):
+            self._get_structure(self.new_course)
+
+        self.cache.clear()
+        with override_settings(COURSE_STRUCTURE_LRU_MAX_BYTES=0):
+            with check_mongo_calls(1):
+                self._get_structure(self.new_course)
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
@@ -999,6 +1047,43 @@ class TestCourseStructureCache(SplitModuleTest):
         )
 
 
+class TestStructureLRU(unittest.TestCase):
+    """Tests for the StructureLRU"""
+
+    def test_eviction(self):
+        lru = StructureLRU(max_bytes=100, max_item_bytes=60)
+        lru.set('a', {'_id': 'a'}, 40)
+        lru.set('b', {'_id': 'b'}, 40)
+        self.assertEqual(lru.current_bytes, 80)
+
+        # reading 'a' makes 'b' the least recently used structure
+        self.assertEqual(lru.get('a'), {'_id': 'a'})
+        lru.set('c', {'_id': 'c'}, 40)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), {'_id': 'a'})
+        self.assertEqual(lru.get('c'), {'_id': 'c'})
+        self.assertEqual(lru.current_bytes, 80)
+
+    def test_item_too_large(self):
+        lru = StructureLRU(max_bytes=100, max_item_bytes=60)
+        lru.set('a', {'_id': 'a'}, 40)
+        lru.set('big', {'_id': 'big'}, 61)
+        self.assertIsNone(lru.get('big'))
+        self.assertEqual(lru.get('a'), {'_id': 'a'})
+        self.assertEqual(lru.current_bytes, 40)
+
+    def test_replace(self):
+        lru = StructureLRU(max_bytes=100, max_item_bytes=60)
+        lru.set('a', {'_id': 'a'}, 40)
+        lru.set('a', {'_id': 'a'}, 50)
+        self.assertEqual(len(lru), 1)
+        self.assertEqual(lru.current_bytes, 50)
+
+        lru.clear()
+        self.assertEqual(len(lru), 0)
+        self.assertEqual(lru.current_bytes, 0)
+
+
 class SplitModuleItemTests(SplitModuleTest):
     '''
     Item read tests including inheritance
@@ -1320,6 +1405,25 @@ class TestItemCrud(SplitModuleTest):
         with self.assertRaises(ItemNotFoundError):
             modulestore().get_item(locator)
 
+    def test_get_blocks_changed_since(self):
+        """
+        Test get_blocks_changed_since with an earlier structure whose blocks have no asides.
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        old_version = modulestore().get_course(course_key).location.version_guid
+        chapter_key = BlockUsageLocator(course_key, 'chapter', block_id='chapter2')
+        chapter = modulestore().get_item(chapter_key)
+        chapter.display_name = 'changed chapter'
+        modulestore().update_item(chapter, 'user123')
+
+        old_structure = modulestore().get_structure(course_key, old_version)
+        for block_data in old_structure['blocks'].itervalues():
+            del block_data.asides
+        with patch.object(modulestore(), 'get_structure', return_value=old_structure):
+            _current_version, changed_usage_keys = modulestore().get_blocks_changed_since(course_key, old_version)
+        self.assertIn(chapter_key, changed_usage_keys)
+        self.assertNotIn(BlockUsageLocator(course_key, 'chapter', block_id='chapter1'), changed_usage_keys)
+
     def test_create_parented_item(self):
         """
         Test create_item w/ specifying the parent of the new item
@@ -1,7 +1,19 @@
 """ Test the behavior of split_mongo/MongoConnection """
+import copy
+import cPickle as pickle
 import unittest
-from mock import patch
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from mock import Mock, patch
+from bson.objectid import ObjectId
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    MongoConnection,
+    StructureIndex,
+    StructureLRU,
+    get_structure_index,
+    structure_from_mongo,
+    structure_to_mongo,
+)
 from xmodule.exceptions import HeartbeatFailure
 
 
@@ -17,3 +29,195 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestStructureConversion(unittest.TestCase):
+    """ Test the conversion of structures to and from their mongo documents """
+    def _structure_doc(self):
+        """
+        Return the mongo document of a structure with a course and two chapters.
+        """
+        version = ObjectId()
+        edit_info = {
+            'previous_version': None,
+            'update_version': version,
+            'source_version': None,
+            'edited_on': None,
+            'edited_by': 'me',
+            'original_usage': None,
+            'original_usage_version': None,
+        }
+        return {
+            '_id': version,
+            'root': ['course', 'course'],
+            'blocks': [
+                {
+                    'block_type': 'course',
+                    'block_id': 'course',
+                    'definition': ObjectId(),
+                    'fields': {'children': [['chapter', 'one'], ['chapter', 'two']]},
+                    'defaults': {},
+                    'asides': {},
+                    'edit_info': edit_info,
+                },
+            ] + [
+                {
+                    'block_type': 'chapter',
+                    'block_id': block_id,
+                    'definition': ObjectId(),
+                    'fields': {'display_name': block_id},
+                    'defaults': {},
+                    'asides': {},
+                    'edit_info': edit_info,
+                }
+                for block_id in ('one', 'two')
+            ],
+        }
+
+    def test_round_trip(self):
+        doc = self._structure_doc()
+        structure = structure_from_mongo(copy.deepcopy(doc))
+
+        self.assertIsInstance(structure['root'], BlockKey)
+        self.assertEqual(structure['root'], BlockKey('course', 'course'))
+        course = structure['blocks'][BlockKey('course', 'course')]
+        self.assertIsInstance(course, BlockData)
+        self.assertEqual(course.fields['children'], [BlockKey('chapter', 'one'), BlockKey('chapter', 'two')])
+        self.assertTrue(all(isinstance(child, BlockKey) for child in course.fields['children']))
+        self.assertEqual(structure['blocks'][BlockKey('chapter', 'two')].fields, {'display_name': 'two'})
+
+        new_doc = structure_to_mongo(structure)
+        for block in new_doc['blocks']:
+            # BlockKeys are stored as lists by mongo
+            if 'children' in block['fields']:
+                block['fields']['children'] = [list(child) for child in block['fields']['children']]
+        self.assertEqual(
+            sorted(new_doc['blocks'], key=lambda block: block['block_id']),
+            sorted(doc['blocks'], key=lambda block: block['block_id']),
+        )
+
+    def test_pickle_block_data(self):
+        structure = structure_from_mongo(self._structure_doc())
+        block = structure['blocks'][BlockKey('course', 'course')]
+        block.definition_loaded = True
+
+        unpickled_block = pickle.loads(pickle.dumps(block, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(unpickled_block, block)
+        self.assertTrue(unpickled_block.definition_loaded)
+
+
+class TestGetDefinitions(unittest.TestCase):
+    """ Test the batched and cached reading of definitions """
+    @patch('pymongo.MongoClient')
+    @patch('pymongo.database.Database')
+    def setUp(self, *calls):  # pylint: disable=arguments-differ
+        # pylint: disable=W0613
+        super(TestGetDefinitions, self).setUp()
+        with patch('mongodb_proxy.MongoProxy'):
+            self.connection = MongoConnection('useless', 'useless', 'useless')
+        self.stored = {
+            definition_id: {'_id': definition_id, 'block_type': 'html', 'fields': {'data': 'text'}}
+            for definition_id in (ObjectId() for _ in range(5))
+        }
+        self.connection.definitions = Mock()
+        self.connection.definitions.find.side_effect = lambda query: [
+            self.stored[definition_id] for definition_id in query['_id']['$in']
+        ]
+
+        self.lru = None
+        for target, replacement in (
+                ('get_definition_lru', lambda: self.lru),
+                ('get_definition_fetch_settings', lambda: (2, 2)),
+        ):
+            patcher = patch('xmodule.modulestore.split_mongo.mongo_connection.' + target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_batches(self):
+        definition_ids = self.stored.keys()
+        definitions = self.connection.get_definitions(definition_ids)
+        self.assertItemsEqual(definitions, self.stored.values())
+        self.assertItemsEqual(
+            [call[0][0]['_id']['$in'] for call in self.connection.definitions.find.call_args_list],
+            [definition_ids[0:2], definition_ids[2:4], definition_ids[4:]]
+        )
+
+    def test_lru(self):
+        self.lru = StructureLRU(max_bytes=10 ** 6, max_item_bytes=10 ** 6)
+        definition_ids = self.stored.keys()
+        self.connection.get_definitions(definition_ids[:3])
+        self.assertEqual(len(self.lru), 3)
+
+        self.connection.definitions.find.reset_mock()
+        definitions = self.connection.get_definitions(definition_ids)
+        self.assertItemsEqual(definitions, self.stored.values())
+        self.assertEqual(
+            [call[0][0]['_id']['$in'] for call in self.connection.definitions.find.call_args_list],
+            [definition_ids[3:]]
+        )
+
+    def test_lru_copies(self):
+        self.lru = StructureLRU(max_bytes=10 ** 6, max_item_bytes=10 ** 6)
+        definition_id = self.stored.keys()[0]
+        self.connection.get_definitions([definition_id])[0]['fields']['data'] = 'changed'
+        definition = self.connection.get_definitions([definition_id])[0]
+        self.assertEqual(definition['fields']['data'], 'text')
+        definition['fields']['data'] = 'changed again'
+        self.assertEqual(self.connection.get_definition(definition_id)['fields']['data'], 'text')
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.dog_stats_api')
+    def test_fetched_bytes(self, mock_dog_stats_api):
+        def fetched_bytes():
+            """ The fetched_bytes measures of get_definitions """
+            return [
+                call[0][1] for call in mock_dog_stats_api.histogram.call_args_list
+                if call[0][0].endswith('.get_definitions.fetched_bytes')
+            ]
+
+        definition_ids = self.stored.keys()
+        self.connection.get_definitions(definition_ids[:3])
+        self.assertEqual(fetched_bytes(), [])
+
+        self.lru = StructureLRU(max_bytes=10 ** 6, max_item_bytes=10 ** 6)
+        self.connection.get_definitions(definition_ids[:3])
+        self.connection.get_definitions(definition_ids)
+        sizes = [
+            len(pickle.dumps(self.stored[definition_id], pickle.HIGHEST_PROTOCOL))
+            for definition_id in definition_ids
+        ]
+        self.assertEqual(fetched_bytes(), [sum(sizes[:3]), sum(sizes[3:])])
+
+
+class TestStructureIndex(unittest.TestCase):
+    """ Test the index of the parents and the rooted blocks of a structure """
+    def setUp(self):
+        super(TestStructureIndex, self).setUp()
+        self.course = BlockKey('course', 'course')
+        self.chapters = [BlockKey('chapter', 'one'), BlockKey('chapter', 'two')]
+        self.html = BlockKey('html', 'shared')
+        self.orphan = BlockKey('vertical', 'orphan')
+        self.structure = {
+            '_id': ObjectId(),
+            'root': self.course,
+            'blocks': {
+                self.course: BlockData(fields={'children': self.chapters}),
+                self.chapters[0]: BlockData(fields={'children': [self.html]}),
+                self.chapters[1]: BlockData(fields={'children': [self.html]}),
+                self.html: BlockData(fields={}),
+                self.orphan: BlockData(fields={'children': [self.html]}),
+            },
+        }
+
+    def test_index(self):
+        index = StructureIndex(self.structure)
+        self.assertEqual(index.get_parents(self.course), [])
+        self.assertEqual(index.get_parents(self.chapters[1]), [self.course])
+        self.assertItemsEqual(index.get_parents(self.html), self.chapters + [self.orphan])
+        self.assertEqual(index.rooted, frozenset(self.chapters + [self.course, self.html]))
+
+    def test_cached_by_version(self):
+        index = get_structure_index(self.structure)
+        self.assertIs(get_structure_index(self.structure), index)
+
+        new_version = dict(self.structure, _id=ObjectId())
+        self.assertIsNot(get_structure_index(new_version), index)
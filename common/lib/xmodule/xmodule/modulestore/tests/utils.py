@@ -206,6 +206,15 @@ class MemoryCache(object):
         """
         return self._data.get(key, default)
 
+    def get_many(self, keys):
+        """
+        Get the keys that are in the cache, as a dict.
+
+        Args:
+            keys: The keys to get.
+        """
+        return {key: self._data[key] for key in keys if key in self._data}
+
     def set(self, key, value):
         """
         Set a key in the cache.
@@ -216,6 +225,31 @@ class MemoryCache(object):
         """
         self._data[key] = value
 
+    def add(self, key, value):
+        """
+        Set a key in the cache if it isn't set yet, and return whether it was set.
+
+        Args:
+            key: The key to add.
+            value: The value of the key.
+        """
+        if key in self._data:
+            return False
+        self._data[key] = value
+        return True
+
+    def incr(self, key):
+        """
+        Increment the integer value of a key in the cache, and return the new value.
+
+        Args:
+            key: The key to increment. Raises ValueError if it isn't set.
+        """
+        if key not in self._data:
+            raise ValueError("Key '{}' not found".format(key))
+        self._data[key] += 1
+        return self._data[key]
+
 
 class MongoContentstoreBuilder(object):
     """
@@ -86,6 +86,19 @@ class FakeGridFsItem(object):
         return chunk
 
 
+class FakeChunkedGridFsItem(FakeGridFsItem):
+    """
+    A FakeGridFsItem which can also be read a GridFS chunk at a time
+    """
+    chunk_size = 500
+
+    def readchunk(self):
+        """
+        Read the rest of the chunk at position cursor and move the cursor
+        """
+        return self.read(self.chunk_size - self.cursor % self.chunk_size)
+
+
 class MockImage(Mock):
     """
     This class pretends to be PIL.Image for purposes of thumbnails testing.
@@ -208,6 +221,28 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_stream_data_by_chunk(self):
+        """
+        Test that StaticContentStream streams GridFS files a GridFS chunk at a time
+        """
+        item = FakeChunkedGridFsItem(SAMPLE_STRING)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        chunks = list(static_content_stream.stream_data())
+        self.assertEqual(''.join(chunks), SAMPLE_STRING)
+        self.assertEqual(len(chunks[0]), FakeChunkedGridFsItem.chunk_size)
+
+        chunks = list(static_content_stream.stream_data_in_range(100, 1500))
+        self.assertEqual(''.join(chunks), SAMPLE_STRING[100:1501])
+        self.assertEqual([len(chunk) for chunk in chunks], [400, 500, 500, 1])
+
+    def test_static_content_stream_data_in_range(self):
+        """
+        Test StaticContent stream_data_in_range function on content which is in memory
+        """
+        static_content = StaticContent('loc', 'name', 'type', SAMPLE_STRING, length=len(SAMPLE_STRING))
+        self.assertEqual(''.join(static_content.stream_data_in_range(100, 1500)), SAMPLE_STRING[100:1501])
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
@@ -6,10 +6,12 @@ import json
 import logging
 
 from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 import request_cache
 
-from courseware.field_overrides import FieldOverrideProvider
+from courseware.field_overrides import FieldOverrideProvider, clear_override_tables
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from ccx_keys.locator import CCXLocator, CCXBlockUsageLocator
 
@@ -220,3 +222,12 @@ def bulk_delete_ccx_override_fields(ccx, ids):
     ids = list(set(ids))
     if ids:
         CcxFieldOverride.objects.filter(ccx=ccx, id__in=ids).delete()
+
+
+@receiver(post_save, sender=CcxFieldOverride, dispatch_uid='ccx.overrides.saved')
+@receiver(post_delete, sender=CcxFieldOverride, dispatch_uid='ccx.overrides.deleted')
+def _clear_override_tables(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Makes the rest of the request see the changed override.
+    """
+    clear_override_tables()
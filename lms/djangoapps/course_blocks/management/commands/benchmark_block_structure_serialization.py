@@ -0,0 +1,122 @@
+"""
+Command to compare the serialization formats of cached course blocks.
+"""
+import logging
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
+from openedx.core.lib.block_structure.factory import BlockStructureFactory
+from openedx.core.lib.block_structure.serialization import BlockStructureSerializer
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_block_structure_serialization 'edX/DemoX/Demo_Course' --settings=devstack
+        $ ./manage.py lms benchmark_block_structure_serialization 'edX/DemoX/Demo_Course' \
+            --iterations=20 --transformer=grades --settings=devstack
+    """
+    args = '<course_id course_id ...>'
+    help = (
+        'Compares the size and the (de)serialization times of the zpickle and binary formats '
+        'of the block structures for one or more courses.'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            '--iterations',
+            help='Number of times each operation is timed.',
+            type=int,
+            default=10,
+        )
+        parser.add_argument(
+            '--transformer',
+            help='Name of a transformer whose block data is read after a partial (lazy) deserialization.',
+            default=None,
+        )
+
+    def handle(self, *args, **options):
+        if len(args) < 1:
+            raise CommandError('At least one course must be specified.')
+        try:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+        except InvalidKeyError:
+            raise CommandError('Invalid key specified.')
+
+        for course_key in course_keys:
+            self._benchmark(course_key, options['iterations'], options['transformer'])
+
+    def _benchmark(self, course_key, iterations, transformer_name):
+        """
+        Logs the size and the timings of each serialization format for
+        the block structure of the given course.
+        """
+        block_structure = get_course_in_cache(course_key)
+        compact_block_structure = BlockStructureFactory.create_compact(block_structure)
+        root_key = block_structure.root_block_usage_key
+
+        # pylint: disable=protected-access
+        zpickle_data = zpickle((
+            block_structure._block_relations,
+            block_structure.transformer_data,
+            block_structure._block_data_map,
+        ))
+        binary_data = BlockStructureSerializer.serialize(compact_block_structure)
+
+        def _read_transformer_data(deserialized_block_structure):
+            """
+            Reads the block data of the requested transformer for all
+            blocks, as a transformer would.
+            """
+            if transformer_name:
+                for block_key in deserialized_block_structure:
+                    deserialized_block_structure.get_transformer_block_field(block_key, transformer_name, 'unused')
+
+        timings = [
+            ('zpickle serialize', lambda: zpickle((
+                block_structure._block_relations,
+                block_structure.transformer_data,
+                block_structure._block_data_map,
+            ))),
+            ('zpickle deserialize', lambda: zunpickle(zpickle_data)),
+            ('binary serialize', lambda: BlockStructureSerializer.serialize(compact_block_structure)),
+            ('binary deserialize', lambda: _read_transformer_data(
+                BlockStructureSerializer.deserialize(root_key, binary_data)
+            )),
+        ]
+
+        log.info(
+            'Block structure for %s: %d blocks, zpickle size: %d, binary size: %d.',
+            unicode(course_key),
+            len(block_structure),
+            len(zpickle_data),
+            len(binary_data),
+        )
+        for name, operation in timings:
+            log.info(
+                '%s for %s: %.2f ms per iteration.',
+                name,
+                unicode(course_key),
+                self._time(operation, iterations) * 1000,
+            )
+
+    @staticmethod
+    def _time(operation, iterations):
+        """
+        Returns the average duration in seconds of the given operation.
+        """
+        start = default_timer()
+        for __ in xrange(iterations):
+            operation()
+        return (default_timer() - start) / iterations
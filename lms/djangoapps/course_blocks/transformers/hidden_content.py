@@ -26,6 +26,7 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
     Staff users are exempted from hidden content rules.
     """
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
     MERGED_DUE_DATE = 'merged_due_date'
     MERGED_HIDE_AFTER_DUE = 'merged_hide_after_due'
 
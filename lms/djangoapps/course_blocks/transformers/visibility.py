@@ -19,6 +19,7 @@ class VisibilityTransformer(FilteringTransformerMixin, BlockStructureTransformer
     Staff users are exempted from visibility rules.
     """
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
 
     MERGED_VISIBLE_TO_STAFF_ONLY = 'merged_visible_to_staff_only'
 
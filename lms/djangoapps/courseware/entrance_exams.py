@@ -10,6 +10,7 @@ from student.models import EntranceExamConfiguration
 from util.milestones_helpers import get_required_content, is_entrance_exams_enabled
 from util.module_utils import yield_dynamic_descriptor_descendants
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
 
 
 def course_has_entrance_exam(course):
@@ -164,10 +165,26 @@ def get_entrance_exam_content(user, course):
     required_content = get_required_content(course, user)
 
     exam_module = None
-    for content in required_content:
-        usage_key = course.id.make_usage_key_from_deprecated_string(content)
-        module_item = modulestore().get_item(usage_key)
+    usage_keys = [course.id.make_usage_key_from_deprecated_string(content) for content in required_content]
+    for module_item in _get_required_items(usage_keys):
         if not module_item.hide_from_toc and module_item.is_entrance_exam:
             exam_module = module_item
             break
     return exam_module
+
+
+def _get_required_items(usage_keys):
+    """
+    Yields the items of the required content at `usage_keys`, in order.
+
+    The items are read together, unless some are missing: they are then read
+    one by one, so that ItemNotFoundError is raised only when the missing item
+    is reached, as when they were always read one by one.
+    """
+    store = modulestore()
+    try:
+        items = store.get_items_by_keys(usage_keys)
+    except ItemNotFoundError:
+        items = (store.get_item(usage_key) for usage_key in usage_keys)
+    for item in items:
+        yield item
@@ -18,9 +18,11 @@ from abc import ABCMeta, abstractmethod
 from contextlib import contextmanager
 import threading
 
+import crum
 from django.conf import settings
 from xblock.field_data import FieldData
 
+import request_cache
 from request_cache.middleware import RequestCache
 from xmodule.modulestore.inheritance import InheritanceMixin
 
@@ -28,6 +30,7 @@ from xmodule.modulestore.inheritance import InheritanceMixin
 NOTSET = object()
 ENABLED_OVERRIDE_PROVIDERS_KEY = u'courseware.field_overrides.enabled_providers.{course_id}'
 ENABLED_MODULESTORE_OVERRIDE_PROVIDERS_KEY = u'courseware.modulestore_field_overrides.enabled_providers.{course_id}'
+OVERRIDE_TABLES_CACHE_NAME = u'courseware.field_overrides.override_tables'
 
 
 def resolve_dotted(name):
@@ -90,6 +93,34 @@ def overrides_disabled():
     return bool(_OVERRIDES_DISABLED.disabled)
 
 
+def _override_table(user, providers):
+    """
+    Returns the table of the overrides found so far in this request by the
+    given providers for the given user, keyed by (block location, field name).
+    Fields found not to be overridden map to `NOTSET`.
+
+    Returns None if there is no current request, since the request cache is
+    only cleared at the end of each request and each celery task.
+    """
+    if crum.get_current_request() is None:
+        return None
+
+    user_id = getattr(user, 'id', None)
+    tables = request_cache.get_cache(OVERRIDE_TABLES_CACHE_NAME)
+    return tables.setdefault((user_id, providers), {})
+
+
+def clear_override_tables():
+    """
+    Empties the override tables of the current request.
+
+    Override providers must call this whenever the overrides they provide
+    change, so that the change is seen by the rest of the request.
+    """
+    for table in request_cache.get_cache(OVERRIDE_TABLES_CACHE_NAME).itervalues():
+        table.clear()
+
+
 class FieldOverrideProvider(object):
     """
     Abstract class which defines the interface that a `FieldOverrideProvider`
@@ -198,18 +229,32 @@ class OverrideFieldData(FieldData):
     def __init__(self, user, fallback, providers):
         self.fallback = fallback
         self.providers = tuple(provider(user) for provider in providers)
+        # The overrides of the providers are shared by all of the blocks
+        # wrapped for the same user in a request, since the blocks of a
+        # page often look up the same fields of each other's ancestors.
+        # Outside of a request, they aren't kept.
+        self._overrides = _override_table(user, tuple(providers))
 
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
         Returns the overridden value or `NOTSET` if no override is found.
         """
-        if not overrides_disabled():
-            for provider in self.providers:
-                value = provider.get(block, name, NOTSET)
-                if value is not NOTSET:
-                    return value
-        return NOTSET
+        if overrides_disabled():
+            return NOTSET
+
+        key = (getattr(block, 'location', block), name)
+        if self._overrides is not None and key in self._overrides:
+            return self._overrides[key]
+
+        value = NOTSET
+        for provider in self.providers:
+            value = provider.get(block, name, NOTSET)
+            if value is not NOTSET:
+                break
+        if self._overrides is not None:
+            self._overrides[key] = value
+        return value
 
     def get(self, block, name):
         value = self.get_override(block, name)
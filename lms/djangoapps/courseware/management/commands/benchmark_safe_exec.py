@@ -0,0 +1,95 @@
+"""
+Command to compare the latency of capa's safe_exec with a new sandboxed process
+for each execution and with the pool of sandbox workers.
+"""
+from timeit import default_timer
+
+from codejail.django_integration import ConfigureCodeJailMiddleware
+from codejail.jail_code import is_configured
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import BaseCommand, CommandError
+
+from capa.safe_exec import safe_exec
+from capa.safe_exec.worker_pool import SandboxWorkerPool
+
+# Typical problem scripts: plain Python, seeded randomization, and the
+# modules that are imported on first use.
+SNIPPETS = [
+    ('plain', 'answer = sum(range(100))'),
+    ('random', 'answer = random.randint(1, 100)'),
+    ('numpy', 'answer = float(numpy.linalg.det(numpy.eye(3) * 2))'),
+    ('calc', 'answer = calc.evaluator({"x": 2}, {}, "x^2 + sin(x)")'),
+]
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_safe_exec --settings=aws
+        $ ./manage.py lms benchmark_safe_exec --iterations=50 --settings=aws
+    """
+    help = (
+        'Compares the latency of the execution of typical problem scripts by codejail, which starts '
+        'a sandboxed Python for each execution, and by the pool of sandbox workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            help='Number of times each snippet is run with each backend.',
+            type=int,
+            default=20,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            ConfigureCodeJailMiddleware()
+        except MiddlewareNotUsed:
+            pass
+        if not is_configured('python'):
+            raise CommandError('codejail is not configured: set CODE_JAIL["python_bin"].')
+
+        iterations = options['iterations']
+        pool = SandboxWorkerPool(1, iterations * len(SNIPPETS) + 1, 3600)
+        try:
+            start = default_timer()
+            safe_exec('', {}, worker_pool=pool)
+            self.stdout.write('worker start and first execution: {:.1f} ms\n'.format(
+                (default_timer() - start) * 1000
+            ))
+            for name, code in SNIPPETS:
+                per_call = self._time(code, iterations, None)
+                fallbacks = pool.fallbacks
+                pooled = self._time(code, iterations, pool)
+                self.stdout.write(
+                    '{}: per-call process median {:.1f} ms (p95 {:.1f} ms), '
+                    'worker pool median {:.1f} ms (p95 {:.1f} ms), {:.1f}x faster, '
+                    '{} of {} pool executions run by codejail\n'.format(
+                        name, per_call[0], per_call[1], pooled[0], pooled[1], per_call[0] / pooled[0],
+                        pool.fallbacks - fallbacks, iterations,
+                    )
+                )
+        finally:
+            pool.close()
+
+        # The timings of the pool are meaningless if it ran the code with
+        # codejail, e.g. because its workers couldn't be started.
+        if pool.fallbacks:
+            raise CommandError(
+                '{} executions were run by codejail rather than by a sandbox worker, '
+                'see the capa.safe_exec.worker_pool log.'.format(pool.fallbacks)
+            )
+
+    @staticmethod
+    def _time(code, iterations, worker_pool):
+        """
+        Returns the median and 95th percentile durations in milliseconds of
+        the execution of `code` with a new seed each time.
+        """
+        durations = []
+        for seed in xrange(iterations):
+            start = default_timer()
+            safe_exec(code, {}, random_seed=seed, worker_pool=worker_pool)
+            durations.append((default_timer() - start) * 1000)
+        durations.sort()
+        return durations[len(durations) // 2], durations[int(len(durations) * 0.95)]
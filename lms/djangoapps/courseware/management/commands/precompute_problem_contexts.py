@@ -0,0 +1,218 @@
+"""
+A Django command that runs the scripts of the capa problems of a course for
+all of their random seeds, ahead of time.
+
+The results of the problem scripts are cached by safe_exec, by code and seed,
+but when many learners open a problem at the same time on a cold cache, each
+of them runs the scripts in the sandbox. Running this command before an exam
+opens fills the cache for every seed that learners can be given:
+
+  - the single seed of the problems that are never randomized,
+  - the NUM_RANDOMIZATION_BINS seeds of the problems randomized per student,
+  - the MAX_RANDOMIZATION_BINS seeds of the other randomized problems.
+
+The results are cached for --timeout seconds, one day by default, rather than
+for the default timeout of the cache, which would let them expire within
+minutes: run the command with a timeout that lasts until the exam is over.
+The cache may still evict them earlier when it's full. The results of the
+scripts that fail are not cached, so that they are run again by learners.
+
+The problems whose scripts use the anonymous id of the student can't be run
+ahead of time, and are skipped.
+
+The scripts are run by --processes processes, by default half the CPUs of the
+machine, so that the machine can still serve requests meanwhile.
+"""
+import logging
+from multiprocessing import Pool, cpu_count
+from textwrap import dedent
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand, CommandError
+from django import db
+import fs.osfs
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from util.sandboxing import can_execute_unsafe_code, get_python_lib_zip
+from xmodule.capa_base import MAX_RANDOMIZATION_BINS, NUM_RANDOMIZATION_BINS
+from xmodule.capa_base_constants import RANDOMIZATION
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+# How long the results of the problem scripts are cached by default, in seconds.
+DEFAULT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def problem_seeds(problem):
+    """
+    Returns the seeds that learners can be given for the capa `problem`, as
+    chosen by `CapaMixin.choose_new_seed`.
+    """
+    if problem.rerandomize == RANDOMIZATION.NEVER:
+        return [1]
+    elif problem.rerandomize == RANDOMIZATION.PER_STUDENT:
+        return range(NUM_RANDOMIZATION_BINS)
+    return range(MAX_RANDOMIZATION_BINS)
+
+
+class PrecomputedResultsCache(object):
+    """
+    The cache of the results of the problem scripts, which keeps them for
+    `timeout` seconds, and doesn't keep the results of the scripts that
+    failed.
+    """
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def get(self, key):
+        """
+        Returns the cached result of a script.
+        """
+        return cache.get(key)
+
+    def set(self, key, value):
+        """
+        Caches the result of a script, an (error message, globals) pair,
+        unless the script failed.
+        """
+        if value[0] is not None:
+            return
+        cache.set(key, value, self.timeout)
+
+
+# The settings of the course whose problems are run, set in each process.
+_COURSE_SETTINGS = {}
+
+
+def _init_course_settings(unsafe_code, python_lib_zip, cache_timeout):
+    """
+    Set the settings of the course whose problems are run by this process.
+    """
+    _COURSE_SETTINGS.update(
+        unsafe_code=unsafe_code,
+        python_lib_zip=python_lib_zip,
+        cache=PrecomputedResultsCache(cache_timeout),
+    )
+
+
+def _init_worker(unsafe_code, python_lib_zip, cache_timeout):
+    """
+    Initialize a worker process of the pool.
+
+    The connections to the caches are dropped, since they were inherited from
+    the parent process; new ones are opened as needed.
+    """
+    for worker_cache in caches.all():
+        worker_cache.close()
+    _init_course_settings(unsafe_code, python_lib_zip, cache_timeout)
+
+
+def run_problem_scripts(job):
+    """
+    Run the scripts of a problem for a seed, caching their results.
+
+    `job` is a (problem text, problem id, seed, filestore root path) tuple.
+    Returns a (problem id, seed, error message or None) tuple.
+    """
+    problem_text, problem_id, seed, filestore_root = job
+    capa_system = LoncapaSystem(
+        ajax_url=None,
+        anonymous_student_id=None,
+        cache=_COURSE_SETTINGS['cache'],
+        can_execute_unsafe_code=lambda: _COURSE_SETTINGS['unsafe_code'],
+        get_python_lib_zip=lambda: _COURSE_SETTINGS['python_lib_zip'],
+        DEBUG=settings.DEBUG,
+        filestore=fs.osfs.OSFS(filestore_root) if filestore_root else None,
+        i18n=None,
+        node_path=None,
+        render_template=None,
+        seed=seed,
+        STATIC_URL=None,
+        xqueue=None,
+    )
+    try:
+        LoncapaProblem.extract_script_context(problem_text, problem_id, capa_system, seed)
+    except Exception as err:  # pylint: disable=broad-except
+        return problem_id, seed, unicode(err)
+    return problem_id, seed, None
+
+
+class Command(BaseCommand):
+    """
+    Run the scripts of the capa problems of a course for all of their seeds.
+    """
+    help = dedent(__doc__).strip()
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id')
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=max(1, cpu_count() // 2),
+            help='Number of processes running the problem scripts, by default half the number of CPUs',
+        )
+        parser.add_argument(
+            '--max-seeds',
+            type=int,
+            default=None,
+            help='Maximum number of seeds to run the scripts of each problem for',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=DEFAULT_CACHE_TIMEOUT,
+            help='Number of seconds the results of the problem scripts are cached for, by default one day',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+        except InvalidKeyError:
+            raise CommandError("Invalid course_id")
+
+        store = modulestore()
+        if store.get_course(course_key) is None:
+            raise CommandError("Invalid course_id")
+
+        jobs = []
+        for problem in store.get_items(course_key, qualifiers={'category': 'problem'}):
+            if 'anonymous_student_id' in problem.data:
+                log.info(u'Skipping %s, which uses the anonymous student id', problem.location)
+                continue
+            filestore = problem.runtime.resources_fs
+            filestore_root = getattr(filestore, 'root_path', None)
+            seeds = problem_seeds(problem)[:options['max_seeds']]
+            jobs.extend(
+                (problem.data, problem.location.html_id(), seed, filestore_root)
+                for seed in seeds
+            )
+
+        course_settings = (
+            can_execute_unsafe_code(course_key),
+            get_python_lib_zip(contentstore, course_key),
+            options['timeout'],
+        )
+        if options['processes'] > 1:
+            # Don't share the database connections of this process with the pool.
+            db.connections.close_all()
+            pool = Pool(options['processes'], _init_worker, course_settings)
+            try:
+                results = list(pool.imap_unordered(run_problem_scripts, jobs, chunksize=10))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            _init_course_settings(*course_settings)
+            results = [run_problem_scripts(job) for job in jobs]
+
+        errors = 0
+        for problem_id, seed, error in results:
+            if error is not None:
+                errors += 1
+                log.warning(u'Error running the scripts of %s for seed %s: %s', problem_id, seed, error)
+        self.stdout.write(u'Ran the scripts of {} problem seeds, with {} errors\n'.format(len(results), errors))
@@ -0,0 +1,87 @@
+"""
+Tests of the precompute_problem_contexts command.
+"""
+from StringIO import StringIO
+
+from django.core.management import call_command
+from mock import patch
+
+from courseware.management.commands.precompute_problem_contexts import PrecomputedResultsCache
+from xmodule.capa_base import NUM_RANDOMIZATION_BINS
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+PROBLEM_XML = """
+<problem>
+    <script type="loncapa/python">
+answer = {answer}
+    </script>
+    <stringresponse answer="$answer">
+        <textline size="20"/>
+    </stringresponse>
+</problem>
+"""
+
+
+class PrecomputeProblemContextsTest(ModuleStoreTestCase):
+    """
+    Tests of the precompute_problem_contexts command.
+    """
+    def setUp(self):
+        super(PrecomputeProblemContextsTest, self).setUp()
+        self.course = CourseFactory.create()
+        self.per_student = ItemFactory.create(
+            parent=self.course,
+            category='problem',
+            data=PROBLEM_XML.format(answer='random.randint(1, 10)'),
+            metadata={'rerandomize': 'per_student'},
+        )
+        self.never = ItemFactory.create(
+            parent=self.course,
+            category='problem',
+            data=PROBLEM_XML.format(answer='42'),
+            metadata={'rerandomize': 'never'},
+        )
+        ItemFactory.create(
+            parent=self.course,
+            category='problem',
+            data=PROBLEM_XML.format(answer='anonymous_student_id'),
+        )
+
+    def call_command(self, *args, **kwargs):
+        """
+        Call the command with the safe_exec of capa problems mocked, and
+        return the (slug, seed) of the calls to safe_exec and the output.
+        """
+        out = StringIO()
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            call_command('precompute_problem_contexts', unicode(self.course.id), *args, stdout=out, **kwargs)
+        calls = sorted(
+            (call[1]['slug'], call[1]['random_seed']) for call in mock_safe_exec.call_args_list
+        )
+        return calls, out.getvalue()
+
+    def test_seeds(self):
+        calls, output = self.call_command(processes=1)
+        expected_calls = sorted(
+            [(self.per_student.location.html_id(), seed) for seed in range(NUM_RANDOMIZATION_BINS)] +
+            [(self.never.location.html_id(), 1)]
+        )
+        self.assertEqual(calls, expected_calls)
+        self.assertIn('Ran the scripts of {} problem seeds, with 0 errors'.format(len(expected_calls)), output)
+
+    def test_max_seeds(self):
+        calls, _output = self.call_command(processes=1, max_seeds=2)
+        self.assertEqual(len(calls), 3)
+
+    def test_errors(self):
+        with patch('capa.capa_problem.LoncapaProblem._extract_context', side_effect=Exception('error')):
+            _calls, output = self.call_command(processes=1, max_seeds=1)
+        self.assertIn('with 2 errors', output)
+
+    @patch('courseware.management.commands.precompute_problem_contexts.cache')
+    def test_cache(self, mock_cache):
+        results_cache = PrecomputedResultsCache(3600)
+        results_cache.set('safe_exec.1.failed', ('error', {}))
+        results_cache.set('safe_exec.1.succeeded', (None, {'answer': 42}))
+        mock_cache.set.assert_called_once_with('safe_exec.1.succeeded', (None, {'answer': 42}), 3600)
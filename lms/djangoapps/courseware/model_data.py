@@ -22,8 +22,10 @@ DjangoOrmFieldCache: A base-class for single-row-per-field caches.
 """
 
 import json
+import sys
 from abc import abstractmethod, ABCMeta
 from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
@@ -43,6 +45,7 @@ from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
 from xblock.fields import Scope, UserScope
 from xmodule.modulestore.django import modulestore
 from xblock.core import XBlockAside
+from courseware.student_module_snapshot import StudentModuleSnapshot
 from courseware.user_state_client import DjangoXBlockUserStateClient
 
 
@@ -348,12 +351,77 @@ class DjangoOrmFieldCache(object):
 class UserStateCache(object):
     """
     Cache for Scope.user_state xblock field data.
+
+    Within :meth:`deferred_writes`, the fields that are set are only written
+    to the database when the outermost deferred_writes context exits, so that
+    each block whose state changed within it is written once.
     """
     def __init__(self, user, course_id):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
         self._client = DjangoXBlockUserStateClient(self.user)
+        self._deferred_writes_depth = 0
+        self._pending_updates = defaultdict(dict)
+
+    @contextmanager
+    def deferred_writes(self, log_errors=False):
+        """
+        Defer the writes of the fields set within this context until it exits.
+
+        If `log_errors` is true, or if an exception is raised within the
+        context, failures to write the fields are only logged.
+        """
+        self._deferred_writes_depth += 1
+        try:
+            yield
+        except Exception:  # pylint: disable=broad-except
+            exc_info = sys.exc_info()
+            self._end_deferred_writes(log_errors=True)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        self._end_deferred_writes(log_errors)
+
+    def _end_deferred_writes(self, log_errors):
+        """
+        Leave a deferred_writes context, writing the deferred fields when
+        leaving the outermost one.
+        """
+        self._deferred_writes_depth -= 1
+        if self._deferred_writes_depth:
+            return
+        try:
+            self.flush()
+        except KeyValueMultiSaveError:
+            if not log_errors:
+                raise
+            log.warning("Dropped the deferred user state writes of %s", self.user.username)
+
+    def flush(self):
+        """
+        Write all of the fields whose writes were deferred, with a single
+        write per block.
+
+        Raises: KeyValueMultiSaveError if the writes fail
+        """
+        if not self._pending_updates:
+            return
+
+        pending_updates, self._pending_updates = self._pending_updates, defaultdict(dict)
+        self._write(pending_updates)
+
+    def _write(self, pending_updates):
+        """
+        Write the given fields, as a map of cache keys to the fields to write
+        to the state of each block.
+        """
+        try:
+            self._client.set_many(
+                self.user.username,
+                pending_updates
+            )
+        except DatabaseError:
+            log.exception("Saving user state failed for %s", self.user.username)
+            raise KeyValueMultiSaveError([])
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -371,6 +439,8 @@ class UserStateCache(object):
         )
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
+            # Fields whose writes are deferred are newer than the stored ones
+            self._cache[user_state.block_key].update(self._pending_updates.get(user_state.block_key, {}))
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
@@ -393,6 +463,9 @@ class UserStateCache(object):
 
         Returns: datetime if there was a modified date, or None otherwise
         """
+        if self._cache_key_for_kvs_key(kvs_key) in self._pending_updates:
+            self.flush()
+
         try:
             return self._client.get(
                 self.user.username,
@@ -417,14 +490,14 @@ class UserStateCache(object):
 
             pending_updates[cache_key][kvs_key.field_name] = value
 
+        if self._deferred_writes_depth:
+            for cache_key, field_state in pending_updates.iteritems():
+                self._pending_updates[cache_key].update(field_state)
+                self._cache[cache_key].update(field_state)
+            return
+
         try:
-            self._client.set_many(
-                self.user.username,
-                pending_updates
-            )
-        except DatabaseError:
-            log.exception("Saving user state failed for %s", self.user.username)
-            raise KeyValueMultiSaveError([])
+            self._write(pending_updates)
         finally:
             self._cache.update(pending_updates)
 
@@ -464,6 +537,12 @@ class UserStateCache(object):
         if kvs_key.field_name not in field_state:
             raise KeyError(kvs_key.field_name)
 
+        if cache_key in self._pending_updates:
+            # Don't write the deleted field back when the pending writes are flushed
+            self._pending_updates[cache_key].pop(kvs_key.field_name, None)
+            if not self._pending_updates[cache_key]:
+                del self._pending_updates[cache_key]
+
         self._client.delete(self.user.username, cache_key, fields=[kvs_key.field_name])
         del field_state[kvs_key.field_name]
 
@@ -797,6 +876,20 @@ class FieldDataCache(object):
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
         return cache
 
+    @contextmanager
+    def deferred_user_state_writes(self, log_errors=False):
+        """
+        Defer the writes of the Scope.user_state fields that are set within
+        this context until it exits, when all of them are written together,
+        with a single write per block.  This saves repeated writes of the
+        state of the same blocks, e.g. while rendering a page.
+
+        Raises: KeyValueMultiSaveError on exit if the writes fail, unless
+        `log_errors` is true, in which case the failure is only logged
+        """
+        with self.cache[Scope.user_state].deferred_writes(log_errors):
+            yield
+
     def _fields_to_cache(self, descriptors):
         """
         Returns a map of scopes to fields in that scope that should be cached
@@ -950,7 +1043,19 @@ class ScoresClient(object):
         return location in self._locations_to_scores
 
     def fetch_scores(self, locations):
-        """Grab score information."""
+        """
+        Grab score information, from the StudentModule snapshot of the
+        current request if there is one.
+        """
+        snapshot = StudentModuleSnapshot.for_user(self.user_id, self.course_key)
+        if snapshot is not None:
+            self._locations_to_scores.update({
+                location: self.Score(student_module.grade, student_module.max_grade)
+                for location, student_module in snapshot.get_many(locations)
+            })
+            self._has_fetched = True
+            return
+
         scores_qset = StudentModule.objects.filter(
             student_id=self.user_id,
             course_id=self.course_key,
@@ -988,6 +1093,32 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_id, user_ids, scorable_locations):
+        """
+        Create ScoresClients, keyed by user id, with pre-fetched data for the
+        given users and locations, reading the scores of all the users in a
+        single query.
+        """
+        clients = {user_id: cls(course_id, user_id) for user_id in user_ids}
+        if not clients:
+            return clients
+
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade'
+        ):
+            usage_key = UsageKey.from_string(location).map_into_course(course_id)
+            clients[user_id]._locations_to_scores[usage_key] = cls.Score(correct, total)  # pylint: disable=protected-access
+
+        for client in clients.itervalues():
+            client._has_fetched = True  # pylint: disable=protected-access
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
@@ -957,6 +957,21 @@ def get_module_by_usage_id(request, course_id, usage_id, disable_staff_debug_inf
 
     Returns (instance, tracking_context)
     """
+    instance, tracking_context, _ = _get_module_and_field_data_cache_by_usage_id(
+        request, course_id, usage_id, disable_staff_debug_info=disable_staff_debug_info, course=course
+    )
+    return (instance, tracking_context)
+
+
+def _get_module_and_field_data_cache_by_usage_id(
+        request, course_id, usage_id, disable_staff_debug_info=False, course=None
+):
+    """
+    Gets a module instance based on its `usage_id` in a course, for a given request/user,
+    along with the FieldDataCache that holds its fields.
+
+    Returns (instance, tracking_context, field_data_cache)
+    """
     user = request.user
 
     try:
@@ -1009,7 +1024,7 @@ def get_module_by_usage_id(request, course_id, usage_id, disable_staff_debug_inf
         log.debug("No module %s for user %s -- access denied?", usage_key, user)
         raise Http404
 
-    return (instance, tracking_context)
+    return (instance, tracking_context, field_data_cache)
 
 
 def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course=None):
@@ -1041,7 +1056,9 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
     newrelic.agent.add_custom_parameter('org', unicode(course_key.org))
 
     with modulestore().bulk_operations(course_key):
-        instance, tracking_context = get_module_by_usage_id(request, course_id, usage_id, course=course)
+        instance, tracking_context, field_data_cache = _get_module_and_field_data_cache_by_usage_id(
+            request, course_id, usage_id, course=course
+        )
 
         # Name the transaction so that we can view XBlock handlers separately in
         # New Relic. The suffix is necessary for XModule handlers because the
@@ -1054,7 +1071,9 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
         req = django_to_webob_request(request)
         try:
             with tracker.get_tracker().context(tracking_context_name, tracking_context):
-                resp = instance.handle(handler, req, suffix)
+                # The state that the handler changes is written once, when it returns.
+                with field_data_cache.deferred_user_state_writes():
+                    resp = instance.handle(handler, req, suffix)
                 if suffix == 'problem_check' \
                         and course \
                         and getattr(course, 'entrance_exam_enabled', False) \
@@ -4,10 +4,19 @@ by the individual due dates feature.
 """
 import json
 
-from .field_overrides import FieldOverrideProvider
+import crum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+import request_cache
+
+from .field_overrides import FieldOverrideProvider, clear_override_tables
 from .models import StudentFieldOverride
 
 
+STUDENT_OVERRIDES_CACHE_NAME = 'courseware.student_field_overrides'
+
+
 class IndividualStudentOverrideProvider(FieldOverrideProvider):
     """
     A concrete implementation of
@@ -29,31 +38,65 @@ def get_override_for_user(user, block, name, default=None):
     specify the block and the name of the field.  If the field is not
     overridden for the given user, returns `default`.
     """
-    if not hasattr(block, '_student_overrides'):
-        block._student_overrides = {}  # pylint: disable=protected-access
-    overrides = block._student_overrides.get(user.id)  # pylint: disable=protected-access
-    if overrides is None:
-        overrides = _get_overrides_for_user(user, block)
-        block._student_overrides[user.id] = overrides  # pylint: disable=protected-access
-    return overrides.get(name, default)
+    if crum.get_current_request() is None:
+        # Outside of a request, nothing would clear the overrides of the user
+        # until the end of the celery task, so the block keeps its own.
+        if not hasattr(block, '_student_overrides'):
+            block._student_overrides = {}  # pylint: disable=protected-access
+        overrides = block._student_overrides.get(user.id)  # pylint: disable=protected-access
+        if overrides is None:
+            overrides = _get_overrides_for_block(user, block)
+            block._student_overrides[user.id] = overrides  # pylint: disable=protected-access
+    else:
+        overrides = _get_overrides_for_user(user, block.runtime.course_id).get(block.location, {})
+    if name not in overrides:
+        return default
+    return block.fields[name].from_json(overrides[name])
+
+
+def _get_overrides_for_user(user, course_id):
+    """
+    Gets all of the individual student overrides for the given user in the
+    given course, reading them with a single query per request.
+    Returns a dictionary of dictionaries of JSON field override values, keyed
+    by block location and then by field name.
+    """
+    overrides_cache = request_cache.get_cache(STUDENT_OVERRIDES_CACHE_NAME)
+    cache_key = (user.id, course_id)
+
+    if cache_key not in overrides_cache:
+        overrides = {}
+        query = StudentFieldOverride.objects.filter(
+            course_id=course_id,
+            student_id=user.id,
+        )
+        for override in query:
+            _cache_override(overrides, override)
+        overrides_cache[cache_key] = overrides
+
+    return overrides_cache[cache_key]
 
 
-def _get_overrides_for_user(user, block):
+def _get_overrides_for_block(user, block):
     """
-    Gets all of the individual student overrides for given user and block.
-    Returns a dictionary of field override values keyed by field name.
+    Gets the individual student overrides for the given user and block.
+    Returns a dictionary of JSON field override values keyed by field name.
     """
     query = StudentFieldOverride.objects.filter(
         course_id=block.runtime.course_id,
         location=block.location,
         student_id=user.id,
     )
-    overrides = {}
-    for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
-    return overrides
+    return {override.field: json.loads(override.value) for override in query}
+
+
+def _cache_override(overrides, override):
+    """
+    Adds the JSON value of the given StudentFieldOverride to the given
+    overrides of its user.
+    """
+    location = override.location.map_into_course(override.course_id)
+    overrides.setdefault(location, {})[override.field] = json.loads(override.value)
 
 
 def override_field_for_user(user, block, name, value):
@@ -87,3 +130,28 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+
+
+@receiver(post_save, sender=StudentFieldOverride, dispatch_uid='courseware.student_field_overrides.saved')
+def _update_cache_on_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keeps the overrides read in this request consistent with the saved
+    override.
+    """
+    overrides = request_cache.get_cache(STUDENT_OVERRIDES_CACHE_NAME).get((instance.student_id, instance.course_id))
+    if overrides is not None:
+        _cache_override(overrides, instance)
+    clear_override_tables()
+
+
+@receiver(post_delete, sender=StudentFieldOverride, dispatch_uid='courseware.student_field_overrides.deleted')
+def _update_cache_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keeps the overrides read in this request consistent with the deleted
+    override.
+    """
+    overrides = request_cache.get_cache(STUDENT_OVERRIDES_CACHE_NAME).get((instance.student_id, instance.course_id))
+    if overrides is not None:
+        location = instance.location.map_into_course(instance.course_id)
+        overrides.get(location, {}).pop(instance.field, None)
+    clear_override_tables()
@@ -0,0 +1,137 @@
+"""
+A per-request snapshot of the StudentModules of a user in a course.
+
+Rendering courseware, computing scores and updating grades in response to
+score changes all read the StudentModules of the same user and course, often
+within the same request. The snapshot reads the StudentModules of the blocks
+that are asked for the first time they are needed in a request, and then serves
+the later reads of those blocks by all of those consumers from memory.
+
+The snapshot only serves reads: writes always start from a fresh query, so
+that they never overwrite changes made outside of the request. StudentModules
+saved or deleted during the request are updated in the snapshot, so that later
+reads in the request see them. Changes made with ``QuerySet.update`` or
+``QuerySet.delete`` bypass the model signals, and so are not seen by blocks
+that are already in the snapshot.
+
+Snapshots are only used within a request, since the request cache that holds
+them is only cleared at the end of each request and each celery task.
+"""
+import crum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+import request_cache
+
+from .models import StudentModule
+
+
+class StudentModuleSnapshot(object):
+    """
+    The StudentModules of a user in a course that were read in the current
+    request, keyed by the usage keys of their blocks, mapped into the course.
+    """
+    REQUEST_CACHE_NAME = 'courseware.student_module_snapshot'
+
+    def __init__(self, user_id, course_key):
+        self.user_id = user_id
+        self.course_key = course_key
+        self._modules = {}
+        # The usage keys of the blocks that were read, whether or not the
+        # user has a StudentModule for them.
+        self._read_keys = set()
+
+    @classmethod
+    def for_user(cls, user_id, course_key):
+        """
+        Returns the snapshot of the StudentModules of the given user in the
+        given course for the current request, or None if there is no current
+        request or the user is not saved.
+        """
+        if user_id is None or crum.get_current_request() is None:
+            return None
+
+        snapshots = request_cache.get_cache(cls.REQUEST_CACHE_NAME)
+        snapshot = snapshots.get((user_id, course_key))
+        if snapshot is None:
+            snapshot = snapshots[(user_id, course_key)] = cls(user_id, course_key)
+        return snapshot
+
+    @classmethod
+    def _existing_for_module(cls, student_module):
+        """
+        Returns the snapshot that the given StudentModule belongs to, if there
+        is one in the current request.
+        """
+        return request_cache.get_cache(cls.REQUEST_CACHE_NAME).get(
+            (student_module.student_id, student_module.course_id)
+        )
+
+    def get(self, usage_key):
+        """
+        Returns the StudentModule of the given block, or None if the user has
+        none.
+        """
+        for _, student_module in self.get_many([usage_key]):
+            return student_module
+        return None
+
+    def get_many(self, usage_keys):
+        """
+        Yields (usage key, StudentModule) tuples for each of the given blocks
+        for which the user has a StudentModule.  The blocks that were not read
+        yet in the request are read with a single query.
+        """
+        usage_keys = set(usage_keys)
+        unread_keys = usage_keys - self._read_keys
+        if unread_keys:
+            for student_module in StudentModule.objects.chunked_filter(
+                    'module_state_key__in',
+                    list(unread_keys),
+                    student_id=self.user_id,
+                    course_id=self.course_key,
+            ):
+                self._add(student_module)
+            self._read_keys |= unread_keys
+
+        for usage_key in usage_keys:
+            student_module = self._modules.get(usage_key)
+            if student_module is not None:
+                yield usage_key, student_module
+
+    def _add(self, student_module):
+        """
+        Adds (or replaces) the given StudentModule in the snapshot.
+        """
+        usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+        self._modules[usage_key] = student_module
+        self._read_keys.add(usage_key)
+
+    def _discard(self, student_module):
+        """
+        Removes the given StudentModule from the snapshot.
+        """
+        usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+        self._modules.pop(usage_key, None)
+
+
+@receiver(post_save, sender=StudentModule, dispatch_uid='courseware.student_module_snapshot.saved')
+def update_snapshot_on_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keeps the snapshot consistent with the StudentModules saved during the
+    request.
+    """
+    snapshot = StudentModuleSnapshot._existing_for_module(instance)  # pylint: disable=protected-access
+    if snapshot is not None:
+        snapshot._add(instance)  # pylint: disable=protected-access
+
+
+@receiver(post_delete, sender=StudentModule, dispatch_uid='courseware.student_module_snapshot.deleted')
+def update_snapshot_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keeps the snapshot consistent with the StudentModules deleted during the
+    request.
+    """
+    snapshot = StudentModuleSnapshot._existing_for_module(instance)  # pylint: disable=protected-access
+    if snapshot is not None:
+        snapshot._discard(instance)  # pylint: disable=protected-access
@@ -34,6 +34,7 @@ from util.milestones_helpers import (
 )
 from milestones.tests.utils import MilestonesTestCaseMixin
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
@@ -289,6 +290,19 @@ class EntranceExamTestCases(LoginEnrollmentTestCase, ModuleStoreTestCase, Milest
         self.assertEqual(exam_chapter, None)
         self.assertTrue(user_has_passed_entrance_exam(self.request, self.course))
 
+    def test_get_entrance_exam_content_missing_item(self):
+        """
+        test get entrance exam content method when some required content is missing
+        """
+        missing = unicode(self.course.id.make_usage_key('chapter', 'missing'))
+        exam = unicode(self.entrance_exam.location)
+        with patch('courseware.entrance_exams.get_required_content', return_value=[exam, missing]):
+            exam_chapter = get_entrance_exam_content(self.request.user, self.course)
+        self.assertEqual(exam_chapter.url_name, self.entrance_exam.url_name)
+        with patch('courseware.entrance_exams.get_required_content', return_value=[missing, exam]):
+            with self.assertRaises(ItemNotFoundError):
+                get_entrance_exam_content(self.request.user, self.course)
+
     def test_entrance_exam_score(self):
         """
         test entrance exam score. we will hit the method get_entrance_exam_score to verify exam score.
@@ -2,21 +2,28 @@
 Tests for `field_overrides` module.
 """
 # pylint: disable=missing-docstring
+import datetime
 import unittest
 from nose.plugins.attrib import attr
 
+import pytz
 from django.test.utils import override_settings
+from mock import Mock, patch
 from xblock.field_data import DictFieldData
-from xmodule.modulestore.tests.factories import CourseFactory
+from request_cache.middleware import RequestCache
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 
 from ..field_overrides import (
     resolve_dotted,
+    clear_override_tables,
     disable_overrides,
     FieldOverrideProvider,
     OverrideFieldData,
     OverrideModulestoreFieldData,
 )
+from ..student_field_overrides import clear_override_for_user, get_override_for_user, override_field_for_user
 from ..testutils import FieldOverrideTestMixin
 
 
@@ -45,6 +52,17 @@ class TestOverrideProvider(FieldOverrideProvider):
         return True
 
 
+class CountingOverrideProvider(TestOverrideProvider):
+    """
+    A `TestOverrideProvider` which records the lookups made of it.
+    """
+    lookups = []
+
+    def get(self, block, name, default):
+        self.lookups.append((block, name))
+        return super(CountingOverrideProvider, self).get(block, name, default)
+
+
 @attr(shard=1)
 @override_settings(FIELD_OVERRIDE_PROVIDERS=(
     'courseware.tests.test_field_overrides.TestOverrideProvider',))
@@ -142,6 +160,113 @@ class OverrideModulestoreFieldDataTests(FieldOverrideTestMixin, OverrideFieldDat
         self.assertIsInstance(data, DictFieldData)
 
 
+@attr(shard=1)
+@override_settings(FIELD_OVERRIDE_PROVIDERS=(
+    'courseware.tests.test_field_overrides.CountingOverrideProvider',))
+class OverrideTableTests(SharedModuleStoreTestCase):
+    """
+    Tests for the sharing of override lookups within a request.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(OverrideTableTests, cls).setUpClass()
+        cls.course = CourseFactory.create()
+
+    def setUp(self):
+        super(OverrideTableTests, self).setUp()
+        OverrideFieldData.provider_classes = None
+        CountingOverrideProvider.lookups = []
+        self.addCleanup(setattr, OverrideFieldData, 'provider_classes', None)
+        patcher = patch('courseware.field_overrides.crum.get_current_request', return_value=Mock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_one(self):
+        return OverrideFieldData.wrap(TESTUSER, self.course, DictFieldData({'foo': 'bar', 'bees': 'knees'}))
+
+    def test_lookups_shared(self):
+        first, second = self.make_one(), self.make_one()
+        for data in (first, second, first):
+            self.assertEqual(data.get('block', 'foo'), 'fu')
+            self.assertEqual(data.get('block', 'bees'), 'knees')
+        self.assertEqual(CountingOverrideProvider.lookups, [('block', 'foo'), ('block', 'bees')])
+
+    def test_clear_override_tables(self):
+        data = self.make_one()
+        data.get('block', 'foo')
+        clear_override_tables()
+        data.get('block', 'foo')
+        self.assertEqual(CountingOverrideProvider.lookups, [('block', 'foo'), ('block', 'foo')])
+
+    def test_new_request(self):
+        self.make_one().get('block', 'foo')
+        RequestCache.clear_request_cache()
+        self.make_one().get('block', 'foo')
+        self.assertEqual(CountingOverrideProvider.lookups, [('block', 'foo'), ('block', 'foo')])
+
+    def test_no_request(self):
+        with patch('courseware.field_overrides.crum.get_current_request', return_value=None):
+            data = self.make_one()
+            data.get('block', 'foo')
+            data.get('block', 'foo')
+        self.assertEqual(CountingOverrideProvider.lookups, [('block', 'foo'), ('block', 'foo')])
+
+
+@attr(shard=1)
+class StudentFieldOverridesTests(SharedModuleStoreTestCase):
+    """
+    Tests for the individual student overrides.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(StudentFieldOverridesTests, cls).setUpClass()
+        cls.course = CourseFactory.create()
+        cls.chapters = [ItemFactory.create(category='chapter', parent=cls.course) for _ in range(3)]
+
+    def setUp(self):
+        super(StudentFieldOverridesTests, self).setUp()
+        self.user = UserFactory.create()
+        self.due = datetime.datetime(2016, 10, 1, tzinfo=pytz.UTC)
+        patcher = patch('courseware.student_field_overrides.crum.get_current_request', return_value=Mock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_overrides_read_once(self):
+        for chapter in self.chapters[:2]:
+            override_field_for_user(self.user, chapter, 'due', self.due)
+        RequestCache.clear_request_cache()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [get_override_for_user(self.user, chapter, 'due') for chapter in self.chapters],
+                [self.due, self.due, None]
+            )
+
+    def test_overrides_changed_in_request(self):
+        override_field_for_user(self.user, self.chapters[0], 'due', self.due)
+        self.assertEqual(get_override_for_user(self.user, self.chapters[0], 'due'), self.due)
+        self.assertIsNone(get_override_for_user(self.user, self.chapters[1], 'due'))
+
+        override_field_for_user(self.user, self.chapters[1], 'due', self.due)
+        clear_override_for_user(self.user, self.chapters[0], 'due')
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_override_for_user(self.user, self.chapters[0], 'due'))
+            self.assertEqual(get_override_for_user(self.user, self.chapters[1], 'due'), self.due)
+
+    def test_no_request(self):
+        override_field_for_user(self.user, self.chapters[0], 'due', self.due)
+        RequestCache.clear_request_cache()
+
+        with patch('courseware.student_field_overrides.crum.get_current_request', return_value=None):
+            with self.assertNumQueries(2):
+                self.assertEqual(get_override_for_user(self.user, self.chapters[0], 'due'), self.due)
+                self.assertEqual(get_override_for_user(self.user, self.chapters[0], 'due'), self.due)
+                self.assertIsNone(get_override_for_user(self.user, self.chapters[1], 'due'))
+        self.assertFalse(RequestCache.get_request_cache('courseware.student_field_overrides'))
+
+
 @attr(shard=1)
 class ResolveDottedTests(unittest.TestCase):
     """
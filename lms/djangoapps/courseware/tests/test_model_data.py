@@ -158,6 +158,49 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         self.assertEquals(1, StudentModule.objects.all().count())
         self.assertEquals({'b_field': 'b_value', 'a_field': 'a_value', 'not_a_field': 'new_value'}, json.loads(StudentModule.objects.all()[0].state))
 
+    def test_deferred_writes(self):
+        "Test that the user_state fields set within deferred_user_state_writes are written once, on exit"
+        # The state of the block is written once, as by a single set
+        with self.assertNumQueries(4, using='default'):
+            with self.assertNumQueries(1, using='student_module_history'):
+                with self.field_data_cache.deferred_user_state_writes():
+                    with self.assertNumQueries(0):
+                        self.kvs.set(user_state_key('a_field'), 'new_value')
+                        self.kvs.set(user_state_key('not_a_field'), 'other_value')
+                        self.kvs.set(user_state_key('a_field'), 'newer_value')
+                        self.assertEquals('newer_value', self.kvs.get(user_state_key('a_field')))
+
+        self.assertEquals(
+            {'b_field': 'b_value', 'a_field': 'newer_value', 'not_a_field': 'other_value'},
+            json.loads(StudentModule.objects.get().state)
+        )
+
+    def test_deferred_writes_delete(self):
+        "Test that a field deleted within deferred_user_state_writes isn't written back on exit"
+        with self.field_data_cache.deferred_user_state_writes():
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.kvs.set(user_state_key('not_a_field'), 'other_value')
+            self.kvs.delete(user_state_key('not_a_field'))
+        self.assertEquals({'b_field': 'b_value', 'a_field': 'new_value'}, json.loads(StudentModule.objects.get().state))
+
+    def test_deferred_writes_failure(self):
+        "Test that failures to write deferred user_state fields are raised on exit"
+        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+            with self.assertRaises(KeyValueMultiSaveError):
+                with self.field_data_cache.deferred_user_state_writes():
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+
+    def test_deferred_writes_failure_logged(self):
+        "Test that failures to write deferred user_state fields are only logged if asked, or on errors"
+        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+            with self.field_data_cache.deferred_user_state_writes(log_errors=True):
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+
+            with self.assertRaises(ValueError):
+                with self.field_data_cache.deferred_user_state_writes():
+                    self.kvs.set(user_state_key('a_field'), 'newer_value')
+                    raise ValueError()
+
     def test_delete_existing_field(self):
         "Test that deleting an existing field removes it from the StudentModule"
         # We are updating a problem, so we write to courseware_studentmodulehistory
@@ -21,7 +21,7 @@ from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from pyquery import PyQuery
 from xblock.field_data import FieldData
 from xblock.runtime import Runtime
-from xblock.fields import ScopeIds
+from xblock.fields import Integer, Scope, ScopeIds
 from xblock.core import XBlock, XBlockAside
 from xblock.fragment import Fragment
 
@@ -36,6 +36,7 @@ from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory, UserFactory, GlobalStaffFactory
 from courseware.tests.tests import LoginEnrollmentTestCase
 from courseware.tests.test_submitting_problems import TestSubmittingProblems
+from courseware.user_state_client import DjangoXBlockUserStateClient
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
 from openedx.core.lib.courses import course_image_url
 from openedx.core.lib.gating import api as gating_api
@@ -122,6 +123,24 @@ class GradedStatelessXBlock(XBlock):
         )
 
 
+class StatefulXBlock(XBlock):
+    """
+    This XBlock exists to test the writes of the student state that its
+    handler changes.
+    """
+    count = Integer(scope=Scope.user_state, default=0)
+
+    @XBlock.json_handler
+    def increment(self, json_data, suffix):  # pylint: disable=unused-argument
+        """
+        Increment the count of this testing XBlock, saving it after each increment.
+        """
+        for _ in range(json_data['times']):
+            self.count += 1
+            self.save()
+        return {'count': self.count}
+
+
 @attr(shard=1)
 @ddt.ddt
 class ModuleRenderTestCase(SharedModuleStoreTestCase, LoginEnrollmentTestCase):
@@ -590,6 +609,36 @@ class TestHandleXBlockCallback(SharedModuleStoreTestCase, LoginEnrollmentTestCas
         self.assertEquals(student_module.grade, 0.75)
         self.assertEquals(student_module.max_grade, 1)
 
+    @XBlock.register_temp_plugin(StatefulXBlock, identifier='stateful')
+    def test_handler_state_written_once(self):
+        course = CourseFactory.create()
+        block = ItemFactory.create(category='stateful', parent=course)
+
+        request = self.request_factory.post(
+            'dummy_url',
+            data=json.dumps({"times": 3}),
+            content_type='application/json'
+        )
+        request.user = self.mock_user
+
+        with patch.object(
+            DjangoXBlockUserStateClient, 'set_many', autospec=True, side_effect=DjangoXBlockUserStateClient.set_many
+        ) as mock_set_many:
+            response = render.handle_xblock_callback(
+                request,
+                unicode(course.id),
+                quote_slashes(unicode(block.scope_ids.usage_id)),
+                'increment',
+                '',
+            )
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(mock_set_many.call_count, 1)
+        student_module = StudentModule.objects.get(
+            student=self.mock_user,
+            module_state_key=block.scope_ids.usage_id,
+        )
+        self.assertEquals(json.loads(student_module.state), {'count': 3})
+
     @patch.dict('django.conf.settings.FEATURES', {'ENABLE_XBLOCK_VIEW_ENDPOINT': True})
     def test_xblock_view_handler(self):
         args = [
@@ -0,0 +1,102 @@
+"""
+Tests for the per-request StudentModule snapshot.
+"""
+from django.test import TestCase
+from mock import Mock, patch
+from opaque_keys.edx.locator import CourseLocator
+
+from courseware.model_data import ScoresClient, set_score
+from courseware.models import StudentModule
+from courseware.student_module_snapshot import StudentModuleSnapshot
+from courseware.tests.factories import StudentModuleFactory, UserFactory
+from courseware.user_state_client import DjangoXBlockUserStateClient
+from request_cache.middleware import RequestCache
+
+
+class TestStudentModuleSnapshot(TestCase):
+    """
+    Tests of StudentModuleSnapshot and its use by the user state and
+    scores clients.
+    """
+    def setUp(self):
+        super(TestStudentModuleSnapshot, self).setUp()
+        RequestCache.clear_request_cache()
+        self.addCleanup(RequestCache.clear_request_cache)
+
+        patcher = patch('courseware.student_module_snapshot.crum.get_current_request', return_value=Mock())
+        self.mock_get_current_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = UserFactory.create()
+        self.course_key = CourseLocator('org', 'course', 'run')
+        self.usage_keys = [self.course_key.make_usage_key('problem', 'problem{}'.format(index)) for index in range(3)]
+        for index, usage_key in enumerate(self.usage_keys[:2]):
+            StudentModuleFactory.create(
+                student=self.user,
+                course_id=self.course_key,
+                module_state_key=usage_key,
+                state='{{"attempts": {}}}'.format(index + 1),
+                grade=index,
+                max_grade=2,
+            )
+
+    def test_shared_by_consumers(self):
+        client = DjangoXBlockUserStateClient(self.user)
+        with self.assertNumQueries(1):
+            states = {
+                state.block_key: state.state
+                for state in client.get_many(self.user.username, self.usage_keys)
+            }
+            scores_client = ScoresClient.create_for_locations(self.course_key, self.user.id, self.usage_keys)
+
+        self.assertEqual(states, {self.usage_keys[0]: {'attempts': 1}, self.usage_keys[1]: {'attempts': 2}})
+        self.assertEqual(scores_client.get(self.usage_keys[1]), ScoresClient.Score(1, 2))
+        self.assertIsNone(scores_client.get(self.usage_keys[2]))
+
+    def test_limited_to_requested_blocks(self):
+        snapshot = StudentModuleSnapshot.for_user(self.user.id, self.course_key)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(snapshot.get_many(self.usage_keys[:1]))), 1)
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(snapshot.get(self.usage_keys[0]))
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(snapshot.get_many(self.usage_keys))), 2)
+        with self.assertNumQueries(0):
+            self.assertIsNone(snapshot.get(self.usage_keys[2]))
+
+    def test_not_used_for_writes(self):
+        client = DjangoXBlockUserStateClient(self.user)
+        list(client.get_many(self.user.username, self.usage_keys))
+        # Changed outside of the request.
+        StudentModule.objects.filter(module_state_key=self.usage_keys[0]).update(
+            state='{"attempts": 5, "done": true}'
+        )
+
+        client.delete_many(self.user.username, self.usage_keys[:1], fields=['done'])
+        self.assertEqual(
+            StudentModule.objects.get(module_state_key=self.usage_keys[0]).state,
+            '{"attempts": 5}',
+        )
+
+    def test_updated_on_write(self):
+        snapshot = StudentModuleSnapshot.for_user(self.user.id, self.course_key)
+        self.assertEqual(len(list(snapshot.get_many(self.usage_keys))), 2)
+
+        set_score(self.user.id, self.usage_keys[2], 1, 1)
+        set_score(self.user.id, self.usage_keys[0], 2, 2)
+        snapshot.get(self.usage_keys[1]).delete()
+
+        with self.assertNumQueries(0):
+            scores_client = ScoresClient.create_for_locations(self.course_key, self.user.id, self.usage_keys)
+        self.assertEqual(scores_client.get(self.usage_keys[0]), ScoresClient.Score(2, 2))
+        self.assertIsNone(scores_client.get(self.usage_keys[1]))
+        self.assertEqual(scores_client.get(self.usage_keys[2]), ScoresClient.Score(1, 1))
+
+    def test_not_used_outside_requests(self):
+        self.mock_get_current_request.return_value = None
+        self.assertIsNone(StudentModuleSnapshot.for_user(self.user.id, self.course_key))
+
+        with self.assertNumQueries(1):
+            ScoresClient.create_for_locations(self.course_key, self.user.id, self.usage_keys)
+        with self.assertNumQueries(1):
+            ScoresClient.create_for_locations(self.course_key, self.user.id, self.usage_keys)
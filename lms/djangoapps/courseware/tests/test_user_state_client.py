@@ -4,11 +4,12 @@ defined in edx_user_state_client.
 """
 
 from collections import defaultdict
-from unittest import skip
 
+import numpy
 from django.test import TestCase
 
 from edx_user_state_client.tests import UserStateClientTestBase
+from courseware.models import StudentModule
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from courseware.tests.factories import UserFactory
 
@@ -34,36 +35,37 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
 
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
+    def test_iter_course_in_batches(self):
+        for user in range(5):
+            self.set(user=user, block=0, state={'a': user})
+        self.set(user=0, block=1, state={})
+
+        self.assertItemsEqual(
+            [
+                (item.username, item.block_key, item.state)
+                for item in self.client.iter_all_for_course(self._course(0), batch_size=2)
+            ],
+            [(self._user(user), self._block(0), {'a': user}) for user in range(5)]
+        )
+
+    def test_iter_column_batches(self):
+        for user in range(3):
+            self.set(user=user, block=0, state={'a': user})
+        self.set(user=0, block=1, state={'b': 0})
+        StudentModule.objects.filter(module_state_key=self._block(0)).update(grade=1, max_grade=2)
+
+        batches = list(self.client.iter_column_batches(
+            self._course(0), ['student_id', 'grade', 'max_grade'], batch_size=2
+        ))
+        self.assertEqual([len(batch['student_id']) for batch in batches], [2, 2])
+        grades = numpy.concatenate([batch['grade'] for batch in batches])
+        self.assertEqual(numpy.nansum(grades), 3)
+        self.assertEqual(numpy.isnan(grades).sum(), 1)
+
+        batches = list(self.client.iter_column_batches(self._course(0), ['max_grade'], block_key=self._block(1)))
+        self.assertEqual(len(batches), 1)
+        self.assertTrue(numpy.isnan(batches[0]['max_grade']).all())
+
+    def test_iter_column_batches_unknown_column(self):
+        with self.assertRaises(ValueError):
+            list(self.client.iter_column_batches(self._course(0), ['state']))
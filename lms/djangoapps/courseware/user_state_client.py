@@ -13,11 +13,14 @@ except ImportError:
     import json
 
 import dogstats_wrapper as dog_stats_api
+import numpy
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.db.utils import IntegrityError
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from xblock.fields import Scope
 from courseware.models import StudentModule, BaseStudentModuleHistory
+from courseware.student_module_snapshot import StudentModuleSnapshot
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
 
 log = logging.getLogger(__name__)
@@ -46,6 +49,19 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.1
 
+    # The default number of StudentModule rows read per query when iterating
+    # over all of the state of a block or a course.
+    ITER_BATCH_SIZE = 1000
+
+    # The numeric StudentModule columns that can be read by iter_column_batches,
+    # with the NumPy dtypes of their arrays.  Missing grades are read as NaN.
+    NUMERIC_COLUMNS = {
+        'id': numpy.int64,
+        'student_id': numpy.int64,
+        'grade': numpy.float64,
+        'max_grade': numpy.float64,
+    }
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -73,13 +89,16 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         self.user = user
 
-    def _get_student_modules(self, username, block_keys):
+    def _get_student_modules(self, username, block_keys, use_snapshot=False):
         """
         Retrieve the :class:`~StudentModule`s for the supplied ``username`` and ``block_keys``.
 
         Arguments:
             username (str): The name of the user to load `StudentModule`s for.
             block_keys (list of :class:`~UsageKey`): The set of XBlocks to load data for.
+            use_snapshot (bool): Whether the `StudentModule`s may be read from the snapshot of
+                the current request, if the user is the one this client was created for. Only
+                reads should use the snapshot.
         """
         course_key_func = attrgetter('course_key')
         by_course = itertools.groupby(
@@ -88,6 +107,14 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         )
 
         for course_key, usage_keys in by_course:
+            snapshot = None
+            if use_snapshot and self.user is not None and self.user.username == username:
+                snapshot = StudentModuleSnapshot.for_user(self.user.id, course_key)
+            if snapshot is not None:
+                for usage_key, student_module in snapshot.get_many(usage_keys):
+                    yield (student_module, usage_key)
+                continue
+
             query = StudentModule.objects.chunked_filter(
                 'module_state_key__in',
                 usage_keys,
@@ -142,7 +169,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         self._ddog_histogram(evt_time, 'get_many.blks_requested', len(block_keys))
 
-        modules = self._get_student_modules(username, block_keys)
+        modules = self._get_student_modules(username, block_keys, use_snapshot=True)
         for module, usage_key in modules:
             if module.state is None:
                 self._ddog_increment(evt_time, 'get_many.empty_state')
@@ -365,7 +392,11 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        return self._iter_user_states(
+            batch_size,
+            course_id=block_key.course_key,
+            module_state_key=block_key,
+        )
 
     def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
         """
@@ -375,4 +406,94 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        filters = {'course_id': course_key}
+        if block_type is not None:
+            filters['module_type'] = block_type
+        return self._iter_user_states(batch_size, **filters)
+
+    def iter_column_batches(self, course_key, columns, block_key=None, block_type=None, batch_size=None):
+        """
+        Yield the given numeric `columns` of the StudentModule rows of a
+        course, or of one of its blocks or block types, without reading or
+        parsing their state.
+
+        Each batch of rows is yielded as a dict that maps each column to a
+        NumPy array of its values in the rows of the batch.
+
+        Arguments:
+            course_key (CourseKey): The course to read the rows of.
+            columns (list of str): The columns to read, out of NUMERIC_COLUMNS.
+            block_key (UsageKey): If given, only the rows of this block are read.
+            block_type (str): If given, only the rows of blocks of this type are read.
+            batch_size (int): The number of rows read per query.
+        """
+        unknown_columns = set(columns) - set(self.NUMERIC_COLUMNS)
+        if unknown_columns:
+            raise ValueError("Only the columns {} can be read, not {}".format(
+                sorted(self.NUMERIC_COLUMNS), sorted(unknown_columns)
+            ))
+
+        filters = {'course_id': course_key}
+        if block_key is not None:
+            filters['module_state_key'] = block_key
+        if block_type is not None:
+            filters['module_type'] = block_type
+
+        for rows in self._iter_row_batches(columns, batch_size, **filters):
+            yield {
+                column: numpy.array(
+                    # The first value of each row is its id
+                    [row[index + 1] for row in rows],
+                    dtype=self.NUMERIC_COLUMNS[column],
+                )
+                for index, column in enumerate(columns)
+            }
+
+    def _iter_row_batches(self, columns, batch_size=None, **filters):
+        """
+        Yield the rows of StudentModule that match `filters`, in batches of
+        `batch_size` rows, as lists of tuples of the row id followed by the
+        values of `columns`.
+
+        The batches are read in order of id, each from the id the previous
+        batch ended at, so that reading late batches doesn't require the
+        database to skip over all of the rows of the earlier ones.
+        """
+        batch_size = batch_size or self.ITER_BATCH_SIZE
+        rows = StudentModule.objects.filter(**filters).order_by('id').values_list('id', *columns)
+
+        last_id = None
+        while True:
+            batch_rows = rows if last_id is None else rows.filter(id__gt=last_id)
+            batch = list(batch_rows[:batch_size])
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1][0]
+
+    def _iter_user_states(self, batch_size=None, **filters):
+        """
+        Yield an XBlockUserState for each StudentModule that matches
+        `filters` and has state, reading the rows in batches of `batch_size`
+        and parsing the state of each row only as it is yielded.
+        """
+        columns = ('student__username', 'module_state_key', 'course_id', 'state', 'modified')
+        for rows in self._iter_row_batches(columns, batch_size, **filters):
+            for _id, username, block_key, course_key, state, modified in rows:
+                # If the state is the empty dict, then it has been deleted, and
+                # so we treat it as if it doesn't exist, as get_many does.
+                if state is None or state == '{}':
+                    continue
+                state = json.loads(state)
+                if state == {}:
+                    continue
+
+                if not isinstance(course_key, CourseKey):
+                    course_key = CourseKey.from_string(course_key)
+                if not isinstance(block_key, UsageKey):
+                    block_key = UsageKey.from_string(block_key)
+                yield XBlockUserState(
+                    username, block_key.map_into_course(course_key), state, modified, Scope.user_state
+                )
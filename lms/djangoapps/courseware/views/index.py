@@ -135,17 +135,21 @@ class CoursewareIndex(View):
         self._redirect_if_needed_to_access_course()
         self._prefetch_and_bind_course()
 
-        if self.course.has_children_at_depth(CONTENT_DEPTH):
-            self._reset_section_to_exam_if_required()
-            self.chapter = self._find_chapter()
-            self.section = self._find_section()
-
-            if self.chapter and self.section:
-                self._redirect_if_not_requested_section()
-                self._save_positions()
-                self._prefetch_and_bind_section()
-
-        return render_to_response('courseware/courseware.html', self._create_courseware_context())
+        # The state of the blocks changed while rendering the page, such as
+        # the saved positions, is written once the page is rendered.  Failing
+        # to write it doesn't fail the page, which was already rendered.
+        with self.field_data_cache.deferred_user_state_writes(log_errors=True):
+            if self.course.has_children_at_depth(CONTENT_DEPTH):
+                self._reset_section_to_exam_if_required()
+                self.chapter = self._find_chapter()
+                self.section = self._find_section()
+
+                if self.chapter and self.section:
+                    self._redirect_if_not_requested_section()
+                    self._save_positions()
+                    self._prefetch_and_bind_section()
+
+            return render_to_response('courseware/courseware.html', self._create_courseware_context())
 
     def _redirect_if_not_requested_section(self):
         """
@@ -176,11 +176,8 @@ def get_cached_discussion_id_map(course, discussion_ids, user):
     """
     try:
         entries = []
-        for discussion_id in discussion_ids:
-            key = get_cached_discussion_key(course, discussion_id)
-            if not key:
-                continue
-            xblock = modulestore().get_item(key)
+        keys = filter(None, [get_cached_discussion_key(course, discussion_id) for discussion_id in discussion_ids])
+        for xblock in modulestore().get_items_by_keys(keys):
             if not (has_required_keys(xblock) and has_access(user, 'load', xblock, course.id)):
                 continue
             entries.append(get_discussion_id_map_entry(xblock))
@@ -2,13 +2,18 @@
 Functionality for course-level grades.
 """
 from collections import namedtuple
+from itertools import islice
 from logging import getLogger
 
 import dogstats_wrapper as dog_stats_api
+from django.conf import settings
 
 from opaque_keys.edx.keys import CourseKey
 from courseware.courses import get_course_by_id
+from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
+from .grade_matrix import grade_many
 from .new.course_grade import CourseGradeFactory
+from .new.subsection_grade import BulkSubsectionGradeData
 
 
 log = getLogger(__name__)
@@ -16,6 +21,10 @@ log = getLogger(__name__)
 
 GradeResult = namedtuple('GradeResult', ['student', 'gradeset', 'err_msg'])
 
+# Number of students whose scores are read from the database together
+# by iterate_grades_for.
+GRADES_BATCH_SIZE = 100
+
 
 def iterate_grades_for(course_or_id, students):
     """
@@ -36,34 +45,124 @@ def iterate_grades_for(course_or_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in batches of GRADES_BATCH_SIZE: the course's
+    collected block structure is read once for all students, and the
+    scores and saved subsection grades of each batch are read together.
+    With the ENABLE_GRADE_MATRIX feature, the course's grader is also run
+    once for each batch, see grade_matrix.py.
     """
     if isinstance(course_or_id, (basestring, CourseKey)):
         course = get_course_by_id(course_or_id)
     else:
         course = course_or_id
 
+    collected_block_structure = None
+    students = iter(students)
+    students_batch = list(islice(students, GRADES_BATCH_SIZE))
+    while students_batch:
+        if collected_block_structure is None:
+            collected_block_structure = get_course_in_cache(course.id)
+        bulk_data = BulkSubsectionGradeData(course, collected_block_structure, students_batch)
+        if settings.FEATURES.get('ENABLE_GRADE_MATRIX'):
+            for grade_result in _grade_results_with_matrix(
+                    students_batch, course, collected_block_structure, bulk_data
+            ):
+                yield grade_result
+        else:
+            for student in students_batch:
+                yield _grade_result(student, course, collected_block_structure, bulk_data)
+        students_batch = list(islice(students, GRADES_BATCH_SIZE))
+
+
+def _grade_result(student, course, collected_block_structure, bulk_data):
+    """
+    Returns the GradeResult of the given student for the given course.
+    """
+    with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+        try:
+            gradeset = summary(
+                student,
+                course,
+                collected_block_structure=collected_block_structure,
+                bulk_data=bulk_data,
+            )
+            return GradeResult(student, gradeset, "")
+        except Exception as exc:  # pylint: disable=broad-except
+            return _error_result(student, course, exc)
+
+
+def _grade_results_with_matrix(students, course, collected_block_structure, bulk_data):
+    """
+    Returns the GradeResults of the given students for the given course,
+    running the course's grader once for all of them.
+    """
+    course_grades = []
     for student in students:
         with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
             try:
-                gradeset = summary(student, course)
-                yield GradeResult(student, gradeset, "")
+                course_grades.append(CourseGradeFactory(student, bulk_data).create(
+                    course,
+                    collected_block_structure=collected_block_structure,
+                    send_signal=False,
+                ))
             except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
-                )
-                yield GradeResult(student, {}, exc.message)
-
-
-def summary(student, course):
+                course_grades.append(_error_result(student, course, exc))
+
+    computed_grades = [course_grade for course_grade in course_grades if not isinstance(course_grade, GradeResult)]
+    grade_values = None
+    if not settings.GENERATE_PROFILE_SCORES:
+        # Grading policy might be overriden by a CCX, need to reset it
+        course.set_grading_policy(course.grading_policy)
+        grade_values = grade_many(
+            course.grader,
+            [course_grade.subsection_grade_totals_by_format for course_grade in computed_grades],
+        )
+    if grade_values is not None:
+        for course_grade, grade_value in zip(computed_grades, grade_values):
+            # Replaces the grade value that the course grade would compute
+            course_grade.grade_value = grade_value
+
+    grade_results = []
+    for course_grade in course_grades:
+        if isinstance(course_grade, GradeResult):
+            grade_results.append(course_grade)
+            continue
+        try:
+            course_grade._signal_listeners_when_grade_computed()  # pylint: disable=protected-access
+            grade_results.append(GradeResult(course_grade.student, course_grade.summary, ""))
+        except Exception as exc:  # pylint: disable=broad-except
+            grade_results.append(_error_result(course_grade.student, course, exc))
+    return grade_results
+
+
+def _error_result(student, course, exc):
+    """
+    Returns the GradeResult of the given student, who couldn't be graded
+    because of the exception `exc`.
+    """
+    # Keep marching on even if this student couldn't be graded for
+    # some reason, but log it for future reference.
+    log.exception(
+        'Cannot grade student %s (%s) in course %s because of exception: %s',
+        student.username,
+        student.id,
+        course.id,
+        exc.message
+    )
+    return GradeResult(student, {}, exc.message)
+
+
+def summary(student, course, collected_block_structure=None, bulk_data=None):
     """
     Returns the grade summary of the student for the given course.
 
     Also sends a signal to update the minimum grade requirement status.
+
+    The collected block structure of the course and the student's
+    BulkSubsectionGradeData may be provided, for optimization.
     """
-    return CourseGradeFactory(student).create(course).summary
+    return CourseGradeFactory(student, bulk_data).create(
+        course,
+        collected_block_structure=collected_block_structure,
+    ).summary
@@ -0,0 +1,104 @@
+"""
+Computes the results of a course's grader for many students at once.
+
+The grading policies of grader_from_conf are computed on NumPy arrays with a
+row for each student: the percents of the sections of each assignment format,
+the lowest of which are dropped, and the weighted sum of the formats.  Only
+the breakdowns of the grades are still built for each student, with the
+methods of the policies themselves, and the percents are added in the same
+order as by the policies, so that the results are those of grader.grade().
+"""
+from __future__ import division
+
+import numpy
+
+from xmodule.graders import AssignmentFormatGrader, WeightedSubsectionsGrader
+
+
+def grade_many(grader, grade_sheets):
+    """
+    Returns the list of the results of `grader` for each of the grade sheets,
+    as grader.grade(grade_sheet) does, or None if the grader is not one that
+    grader_from_conf creates.
+    """
+    if not isinstance(grader, WeightedSubsectionsGrader):
+        return None
+
+    results = [
+        {'percent': 0.0, 'section_breakdown': [], 'grade_breakdown': []}
+        for _ in grade_sheets
+    ]
+    total_percents = numpy.zeros(len(grade_sheets))
+    for subgrader, category, weight in grader.sections:
+        if isinstance(subgrader, AssignmentFormatGrader):
+            subgrade_results = _grade_assignment_format(subgrader, grade_sheets)
+        else:
+            subgrade_results = [subgrader.grade(grade_sheet) for grade_sheet in grade_sheets]
+
+        weighted_percents = numpy.array([result['percent'] for result in subgrade_results], dtype=float) * weight
+        total_percents += weighted_percents
+        for result, subgrade_result, weighted_percent in zip(results, subgrade_results, weighted_percents):
+            weighted_percent = float(weighted_percent)
+            section_detail = u"{0} = {1:.2%} of a possible {2:.2%}".format(category, weighted_percent, weight)
+            result['section_breakdown'] += subgrade_result['section_breakdown']
+            result['grade_breakdown'].append(
+                {'percent': weighted_percent, 'detail': section_detail, 'category': category}
+            )
+
+    for result, total_percent in zip(results, total_percents):
+        result['percent'] = float(total_percent)
+    return results
+
+
+def _grade_assignment_format(subgrader, grade_sheets):
+    """
+    Returns the results of the AssignmentFormatGrader `subgrader` for each of
+    the grade sheets.
+    """
+    scores = [grade_sheet.get(subgrader.type, []) for grade_sheet in grade_sheets]
+    # The number of sections of each student, including the placeholders
+    counts = numpy.array([max(subgrader.min_count, len(student_scores)) for student_scores in scores], dtype=int)
+    columns = max(counts.max(), 1) if len(counts) else 1
+
+    # The percents of the sections, and -inf after the sections of each student
+    percents = numpy.zeros((len(scores), columns))
+    percents[numpy.arange(columns) >= counts[:, numpy.newaxis]] = -numpy.inf
+    for row, student_scores in enumerate(scores):
+        for column, score in enumerate(student_scores):
+            percents[row, column] = score.earned / score.possible
+
+    # The rank of each section when sorted by descending percent, the ties
+    # keeping their order, as the grader sorts them; its lowest sections are
+    # the last `drop_count` ones of the student.
+    order = numpy.argsort(-percents, axis=1, kind='mergesort')
+    ranks = numpy.empty_like(order)
+    ranks[numpy.arange(len(scores))[:, numpy.newaxis], order] = numpy.arange(columns)
+    dropped = (
+        (ranks >= (counts - subgrader.drop_count)[:, numpy.newaxis]) &
+        (ranks < counts[:, numpy.newaxis])
+    )
+
+    # Sum the kept percents column by column, so that they're added in the
+    # same order as by the grader.
+    kept_percents = numpy.where(dropped | numpy.isinf(percents), 0.0, percents)
+    total_percents = numpy.zeros(len(scores))
+    for column in range(columns):
+        total_percents += kept_percents[:, column]
+    kept_counts = counts - subgrader.drop_count
+    total_percents = numpy.where(kept_counts > 0, total_percents / numpy.maximum(kept_counts, 1), total_percents)
+
+    results = []
+    for row, student_scores in enumerate(scores):
+        breakdown = [
+            subgrader.section_breakdown_item(
+                index, float(percents[row, index]), score.display_name, score.earned, score.possible
+            )
+            for index, score in enumerate(student_scores)
+        ]
+        breakdown.extend(
+            subgrader.section_breakdown_item(index, 0.0)
+            for index in range(len(student_scores), int(counts[row]))
+        )
+        dropped_indices = [int(index) for index in order[row] if dropped[row, index]]
+        results.append(subgrader.grade_result(breakdown, float(total_percents[row]), dropped_indices))
+    return results
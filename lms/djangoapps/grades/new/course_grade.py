@@ -21,11 +21,12 @@ class CourseGrade(object):
     """
     Course Grade class
     """
-    def __init__(self, student, course, course_structure):
+    def __init__(self, student, course, course_structure, bulk_data=None):
         self.student = student
         self.course = course
         self.course_structure = course_structure
         self.chapter_grades = []
+        self._bulk_data = bulk_data
 
     @lazy
     def subsection_grade_totals_by_format(self):
@@ -117,13 +118,18 @@ class CourseGrade(object):
 
         return grade_summary
 
-    def compute_and_update(self, read_only=False):
+    def compute_and_update(self, read_only=False, send_signal=True):
         """
         Computes the grade for the given student and course.
 
         If read_only is True, doesn't save any updates to the grades.
+
+        If send_signal is False, the listeners aren't signaled that the grade
+        is computed, which is then up to the caller.
         """
-        subsection_grade_factory = SubsectionGradeFactory(self.student, self.course, self.course_structure)
+        subsection_grade_factory = SubsectionGradeFactory(
+            self.student, self.course, self.course_structure, self._bulk_data,
+        )
         for chapter_key in self.course_structure.get_children(self.course.location):
             chapter = self.course_structure[chapter_key]
             chapter_subsection_grades = []
@@ -145,7 +151,8 @@ class CourseGrade(object):
         if not read_only:
             subsection_grade_factory.bulk_create_unsaved()
 
-        self._signal_listeners_when_grade_computed()
+        if send_signal:
+            self._signal_listeners_when_grade_computed()
         self._log_event(
             log.warning,
             u"compute_and_update, read_only: {0}, subsections read/created: {1}/{2}, blocks accessed: {3}".format(
@@ -240,29 +247,44 @@ class CourseGradeFactory(object):
     """
     Factory class to create Course Grade objects
     """
-    def __init__(self, student):
+    def __init__(self, student, bulk_data=None):
+        """
+        If bulk_data (BulkSubsectionGradeData) is provided, the
+        student's scores and saved subsection grades are taken from it.
+        """
         self.student = student
+        self._bulk_data = bulk_data
 
-    def create(self, course, read_only=False):
+    def create(self, course, read_only=False, collected_block_structure=None, send_signal=True):
         """
         Returns the CourseGrade object for the given student and course.
 
         If read_only is True, doesn't save any updates to the grades.
+
+        If collected_block_structure is provided, it is used instead of
+        reading the course's collected block structure from the cache.
+
+        If send_signal is False, the listeners aren't signaled that a grade
+        is computed (see CourseGrade.compute_and_update).
         """
-        course_structure = get_course_blocks(self.student, course.location)
+        course_structure = get_course_blocks(
+            self.student,
+            course.location,
+            collected_block_structure=collected_block_structure,
+        )
         return (
             self._get_saved_grade(course, course_structure) or
-            self._compute_and_update_grade(course, course_structure, read_only)
+            self._compute_and_update_grade(course, course_structure, read_only, send_signal)
         )
 
-    def _compute_and_update_grade(self, course, course_structure, read_only):
+    def _compute_and_update_grade(self, course, course_structure, read_only, send_signal=True):
         """
         Freshly computes and updates the grade for the student and course.
 
         If read_only is True, doesn't save any updates to the grades.
         """
-        course_grade = CourseGrade(self.student, course, course_structure)
-        course_grade.compute_and_update(read_only)
+        course_grade = CourseGrade(self.student, course, course_structure, self._bulk_data)
+        course_grade.compute_and_update(read_only, send_signal)
         return course_grade
 
     def _get_saved_grade(self, course, course_structure):  # pylint: disable=unused-argument
@@ -196,16 +196,60 @@ class SubsectionGrade(object):
         )
 
 
+class BulkSubsectionGradeData(object):
+    """
+    Scores in the user state (in CSM) and saved subsection grades of a
+    batch of students in a course, read from the database with a
+    constant number of queries for the whole batch.
+    """
+    def __init__(self, course, course_structure, students):
+        """
+        Arguments:
+            course: The course for which the data is read.
+            course_structure (BlockStructureBlockData): A block structure
+                of the course containing all the blocks that may be scored
+                for any of the students, such as the collected structure.
+            students ([User]): The students whose data is read.
+        """
+        user_ids = [student.id for student in students]
+        scorable_locations = [block_key for block_key in course_structure if possibly_scored(block_key)]
+        self._csm_scores = ScoresClient.create_for_users(course.id, user_ids, scorable_locations)
+
+        self._saved_subsection_grades = {user_id: {} for user_id in user_ids}
+        if PersistentGradesEnabledFlag.feature_enabled(course.id):
+            for record in PersistentSubsectionGrade.bulk_read_grades_for_users(user_ids, course.id):
+                self._saved_subsection_grades[record.user_id][record.full_usage_key] = record
+
+    def csm_scores(self, student):
+        """
+        Returns the ScoresClient with the scores of the given student.
+        """
+        return self._csm_scores[student.id]
+
+    def saved_subsection_grades(self, student):
+        """
+        Returns the saved subsection grades of the given student,
+        keyed by subsection usage key.
+        """
+        return self._saved_subsection_grades[student.id]
+
+
 class SubsectionGradeFactory(object):
     """
     Factory for Subsection Grades.
     """
-    def __init__(self, student, course, course_structure):
+    def __init__(self, student, course, course_structure, bulk_data=None):
+        """
+        If bulk_data (BulkSubsectionGradeData) is provided, the scores and
+        saved subsection grades of the student are taken from it instead
+        of being queried for the student alone.
+        """
         self.student = student
         self.course = course
         self.course_structure = course_structure
+        self._bulk_data = bulk_data
 
-        self._cached_subsection_grades = None
+        self._cached_subsection_grades = dict(bulk_data.saved_subsection_grades(student)) if bulk_data else None
         self._unsaved_subsection_grades = []
 
     def create(self, subsection, block_structure=None, read_only=False):
@@ -274,6 +318,8 @@ class SubsectionGradeFactory(object):
         Lazily queries and returns all the scores stored in the user
         state (in CSM) for the course, while caching the result.
         """
+        if self._bulk_data:
+            return self._bulk_data.csm_scores(self.student)
         scorable_locations = [block_key for block_key in self.course_structure if possibly_scored(block_key)]
         return ScoresClient.create_for_locations(self.course.id, self.student.id, scorable_locations)
 
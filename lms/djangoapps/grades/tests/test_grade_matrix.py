@@ -0,0 +1,65 @@
+"""
+Tests of the grade matrix.
+"""
+from unittest import TestCase
+
+from xmodule.graders import AggregatedScore, SingleSectionGrader, grader_from_conf
+
+from ..grade_matrix import grade_many
+
+
+def _scores(section_type, *earned_possible):
+    """
+    Returns the graded subsection totals with the given earned and possible
+    scores.
+    """
+    return [
+        AggregatedScore(float(earned), float(possible), True, u'{} {}'.format(section_type, index), None)
+        for index, (earned, possible) in enumerate(earned_possible)
+    ]
+
+
+class GradeManyTest(TestCase):
+    """
+    Tests of grade_many.
+    """
+    grader = grader_from_conf([
+        {'type': 'Homework', 'min_count': 4, 'drop_count': 2, 'short_label': 'HW', 'weight': 0.4},
+        {'type': 'Lab', 'min_count': 2, 'drop_count': 0, 'weight': 0.2},
+        {'type': 'Midterm', 'name': 'Midterm 0', 'short_label': 'Midterm', 'weight': 0.1},
+        {'type': 'Final', 'min_count': 1, 'drop_count': 0, 'weight': 0.3},
+    ])
+
+    grade_sheets = [
+        {},
+        {'Homework': _scores('Homework', (1, 2))},
+        # ties between the dropped homeworks
+        {'Homework': _scores('Homework', (1, 3), (2, 3), (1, 3), (3, 3), (1, 3))},
+        {
+            'Homework': _scores('Homework', (0, 1), (1, 1), (7, 10), (3, 7), (2, 3), (1, 1)),
+            'Lab': _scores('Lab', (1, 3), (2, 3), (3, 3)),
+            'Midterm': _scores('Midterm', (4, 10)),
+            'Final': _scores('Final', (9, 10)),
+        },
+        {'Lab': _scores('Lab', (1, 10)), 'Final': _scores('Final', (0, 10))},
+    ]
+
+    def test_same_as_grader(self):
+        self.assertEqual(
+            grade_many(self.grader, self.grade_sheets),
+            [self.grader.grade(grade_sheet) for grade_sheet in self.grade_sheets],
+        )
+
+    def test_all_dropped(self):
+        grader = grader_from_conf([{'type': 'Quiz', 'min_count': 1, 'drop_count': 3, 'weight': 1.0}])
+        grade_sheets = [{}, {'Quiz': _scores('Quiz', (1, 2), (2, 2))}]
+        self.assertEqual(
+            grade_many(grader, grade_sheets),
+            [grader.grade(grade_sheet) for grade_sheet in grade_sheets],
+        )
+
+    def test_no_students(self):
+        self.assertEqual(grade_many(self.grader, []), [])
+
+    def test_other_grader(self):
+        self.assertIsNone(grade_many(SingleSectionGrader('Midterm', 'Midterm 0'), self.grade_sheets))
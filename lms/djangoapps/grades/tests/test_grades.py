@@ -32,7 +32,7 @@ from ..new.course_grade import CourseGradeFactory
 from ..new.subsection_grade import SubsectionGradeFactory
 
 
-def _grade_with_errors(student, course):
+def _grade_with_errors(student, course, **kwargs):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -43,7 +43,7 @@ def _grade_with_errors(student, course):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grades_summary(student, course)
+    return grades_summary(student, course, **kwargs)
 
 
 def _create_problem_xml():
@@ -109,6 +109,48 @@ class TestGradeIteration(SharedModuleStoreTestCase):
             self.assertIsNone(gradeset['grade'])
             self.assertEqual(gradeset['percent'], 0.0)
 
+    def test_batched_reads(self):
+        """
+        The collected course structure is read once, and scores are read
+        in bulk for each batch of students.
+        """
+        with patch.object(course_grades, 'GRADES_BATCH_SIZE', 2):
+            with patch(
+                'lms.djangoapps.grades.course_grades.get_course_in_cache',
+                wraps=course_grades.get_course_in_cache,
+            ) as mock_get_course_in_cache:
+                with patch(
+                    'lms.djangoapps.grades.course_grades.BulkSubsectionGradeData',
+                    wraps=course_grades.BulkSubsectionGradeData,
+                ) as mock_bulk_data:
+                    all_gradesets, all_errors = self._gradesets_and_errors_for(
+                        self.course.id, iter(self.students)
+                    )
+        self.assertEqual(len(all_gradesets), 5)
+        self.assertEqual(len(all_errors), 0)
+        self.assertEqual(mock_get_course_in_cache.call_count, 1)
+        self.assertEqual(
+            [call_args[0][2] for call_args in mock_bulk_data.call_args_list],
+            [self.students[0:2], self.students[2:4], self.students[4:5]],
+        )
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_GRADE_MATRIX': True})
+    def test_grade_matrix(self):
+        """
+        With the grade matrix, the course grader is run once for each batch
+        of students, with the same results.
+        """
+        with patch.object(course_grades, 'GRADES_BATCH_SIZE', 2):
+            with patch(
+                'lms.djangoapps.grades.course_grades.grade_many',
+                wraps=course_grades.grade_many,
+            ) as mock_grade_many:
+                all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students)
+        self.assertEqual(mock_grade_many.call_count, 3)
+        self.assertEqual(len(all_errors), 0)
+        for student in self.students:
+            self.assertEqual(all_gradesets[student], grades_summary(student, self.course))
+
     @patch('lms.djangoapps.grades.course_grades.summary', _grade_with_errors)
     def test_grading_exception(self):
         """Test that we correctly capture exception messages that bubble up from
@@ -24,7 +24,7 @@ from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ..models import PersistentSubsectionGrade
 from ..new.course_grade import CourseGradeFactory
-from ..new.subsection_grade import SubsectionGrade, SubsectionGradeFactory
+from ..new.subsection_grade import BulkSubsectionGradeData, SubsectionGrade, SubsectionGradeFactory
 from .utils import mock_get_score
 
 
@@ -140,6 +140,28 @@ class SubsectionGradeFactoryTest(GradeTestBase):
         self.assertEqual(grade_a.url_name, grade_b.url_name)
         self.assertEqual(grade_a.all_total, grade_b.all_total)
 
+    def test_create_with_bulk_data(self):
+        """
+        Tests that scores and saved subsection grades are taken from the
+        bulk data, without further queries.
+        """
+        saved_grade = self.subsection_grade_factory.create(self.sequence)
+        other_student = UserFactory()
+        bulk_data = BulkSubsectionGradeData(self.course, self.course_structure, [self.request.user, other_student])
+
+        grade_factory = SubsectionGradeFactory(self.request.user, self.course, self.course_structure, bulk_data)
+        with self.assertNumQueries(0):
+            grade = grade_factory.create(self.sequence)
+        self.assertEqual(grade.all_total, saved_grade.all_total)
+
+        other_grade_factory = SubsectionGradeFactory(other_student, self.course, self.course_structure, bulk_data)
+        with patch(
+            'lms.djangoapps.grades.new.subsection_grade.PersistentSubsectionGrade.bulk_read_grades'
+        ) as mock_read_saved_grades:
+            other_grade_factory.create(self.sequence, read_only=True)
+        self.assertFalse(mock_read_saved_grades.called)
+        self.assertIs(other_grade_factory._csm_scores, bulk_data.csm_scores(other_student))
+
     @ddt.data(
         (
             'lms.djangoapps.grades.new.subsection_grade.SubsectionGrade.create_model',
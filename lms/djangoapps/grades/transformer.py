@@ -37,6 +37,7 @@ class GradesTransformer(BlockStructureTransformer):
         max_score: (numeric)
     """
     VERSION = 4
+    SUPPORTS_INCREMENTAL_COLLECT = True
     FIELDS_TO_COLLECT = [u'due', u'format', u'graded', u'has_score', u'weight', u'course_version', u'subtree_edited_on']
 
     EXPLICIT_GRADED_FIELD_NAME = 'explicit_graded'
@@ -142,16 +143,19 @@ class GradesTransformer(BlockStructureTransformer):
         user = SystemUser()
         request.user = user
         request.session = {}
-        root_block = block_structure.get_xblock(block_structure.root_block_usage_key)
         course_key = block_structure.root_block_usage_key.course_key
-        cache = FieldDataCache.cache_for_descriptor_descendents(
-            course_id=course_key,
-            user=request.user,
-            descriptor=root_block,
-            descriptor_filter=lambda descriptor: descriptor.has_score,
-        )
-        for block_locator in block_structure.post_order_traversal():
-            block = block_structure.get_xblock(block_locator)
-            if getattr(block, 'has_score', False):
-                module = get_module_for_descriptor(user, request, block, cache, course_key)
-                yield module
+        scorable_blocks = [
+            block
+            for block in (
+                block_structure.get_xblock(block_locator)
+                for block_locator in block_structure.post_order_traversal()
+            )
+            if getattr(block, 'has_score', False)
+        ]
+        # Only cache field data for the scorable blocks in the block
+        # structure, rather than for all descendants of the root block,
+        # since the block structure may be partial.
+        cache = FieldDataCache(scorable_blocks, course_key, request.user)
+        for block in scorable_blocks:
+            module = get_module_for_descriptor(user, request, block, cache, course_key)
+            yield module
@@ -5,6 +5,7 @@ Serve miscellaneous course and student data
 """
 import json
 import datetime
+from collections import defaultdict
 from shoppingcart.models import (
     PaidCourseRegistration, CouponRedemption, CourseRegCodeItem,
     RegistrationCodeRedemption, CourseRegistrationCodeInvoiceItem
@@ -17,14 +18,21 @@ from django.core.serializers.json import DjangoJSONEncoder
 from django.core.urlresolvers import reverse
 from opaque_keys.edx.keys import UsageKey
 import xmodule.graders as xmgraders
-from student.models import CourseEnrollmentAllowed
+from student.models import CourseEnrollment, CourseEnrollmentAllowed, UserProfile
 from edx_proctoring.api import get_all_exam_attempts
+from course_modes.models import CourseMode
 from courseware.models import StudentModule
-from certificates.models import GeneratedCertificate
+from certificates.models import CertificateWhitelist, GeneratedCertificate
 from django.db.models import Count
 from certificates.models import CertificateStatuses
 from lms.djangoapps.grades.context import grading_context_for_course
+from lms.djangoapps.teams.models import CourseTeamMembership
+from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
+from openedx.core.djangoapps.course_groups.models import CohortMembership
 from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers
+from openedx.core.djangoapps.user_api.models import UserCourseTag
+from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
+from xmodule.partitions.partitions import NoSuchUserPartitionGroupError
 
 
 STUDENT_FEATURES = ('id', 'username', 'first_name', 'last_name', 'is_staff', 'email')
@@ -50,6 +58,184 @@ CERTIFICATE_FEATURES = ('course_id', 'mode', 'status', 'grade', 'created_date',
 UNAVAILABLE = "[unavailable]"
 
 
+class BulkStudentEnrichment(object):
+    """
+    The per-student data that course reports add to the rows of the students
+    of a course: their cohort, experiment groups, team, enrollment mode,
+    verification status and certificate.
+
+    `prefetch` reads the data of a batch of students with one query for each
+    kind of data, whatever the number of students, after which the data of
+    those students is looked up without any further queries.  Only the kinds
+    of data that are asked for are read.
+
+    Arguments:
+        course_key (CourseKey): the course the data is read for.
+        kinds (iterable): the kinds of data to read, out of COHORT, TEAM,
+            ENROLLMENT_MODE, VERIFICATION_STATUS and CERTIFICATE.
+        experiment_partitions (list): the random scheme user partitions for
+            which the experiment groups of the students are read.
+    """
+    COHORT = 'cohort'
+    TEAM = 'team'
+    ENROLLMENT_MODE = 'enrollment_mode'
+    VERIFICATION_STATUS = 'verification_status'
+    CERTIFICATE = 'certificate'
+
+    def __init__(self, course_key, kinds, experiment_partitions=()):
+        self.course_key = course_key
+        self.kinds = frozenset(kinds)
+        self.experiment_partitions = list(experiment_partitions)
+        self._cohort_names = {}
+        self._team_names = {}
+        self._course_tags = defaultdict(dict)
+        self._enrollment_modes = {}
+        self._verified_user_ids = set()
+        self._certificates = {}
+        self._allowed_certificate_user_ids = set()
+        self._whitelisted_user_ids = None
+        self._course_mode_slugs = None
+
+    def prefetch(self, students):
+        """
+        Reads the data of the given students, adding it to the data of the
+        students that were prefetched before.
+        """
+        user_ids = [student.id for student in students]
+        if not user_ids:
+            return
+
+        if self.COHORT in self.kinds:
+            self._cohort_names.update(
+                CohortMembership.objects.filter(
+                    course_id=self.course_key, user_id__in=user_ids
+                ).values_list('user_id', 'course_user_group__name')
+            )
+
+        if self.TEAM in self.kinds:
+            self._team_names.update(
+                CourseTeamMembership.objects.filter(
+                    team__course_id=self.course_key, user_id__in=user_ids
+                ).values_list('user_id', 'team__name')
+            )
+
+        if self.experiment_partitions:
+            partition_keys = [
+                RandomUserPartitionScheme.key_for_partition(partition) for partition in self.experiment_partitions
+            ]
+            course_tags = UserCourseTag.objects.filter(
+                course_id=self.course_key, user_id__in=user_ids, key__in=partition_keys
+            ).values_list('user_id', 'key', 'value')
+            for user_id, key, value in course_tags:
+                self._course_tags[user_id][key] = value
+
+        if self.kinds & {self.ENROLLMENT_MODE, self.VERIFICATION_STATUS}:
+            enrollment_modes = dict(
+                CourseEnrollment.objects.filter(
+                    course_id=self.course_key, user_id__in=user_ids
+                ).values_list('user_id', 'mode')
+            )
+            self._enrollment_modes.update(enrollment_modes)
+
+            if self.VERIFICATION_STATUS in self.kinds:
+                verified_mode_user_ids = [
+                    user_id for user_id, mode in enrollment_modes.iteritems() if mode in CourseMode.VERIFIED_MODES
+                ]
+                if verified_mode_user_ids:
+                    self._verified_user_ids.update(
+                        SoftwareSecurePhotoVerification.objects.filter(
+                            user_id__in=verified_mode_user_ids,
+                            status='approved',
+                            created_at__gte=SoftwareSecurePhotoVerification._earliest_allowed_date(),  # pylint: disable=protected-access
+                        ).values_list('user_id', flat=True)
+                    )
+
+        if self.CERTIFICATE in self.kinds:
+            if self._whitelisted_user_ids is None:
+                self._whitelisted_user_ids = set(
+                    CertificateWhitelist.objects.filter(
+                        course_id=self.course_key, whitelist=True
+                    ).values_list('user_id', flat=True)
+                )
+            self._allowed_certificate_user_ids.update(
+                UserProfile.objects.filter(
+                    user_id__in=user_ids, allow_certificate=True
+                ).values_list('user_id', flat=True)
+            )
+            certificates = GeneratedCertificate.objects.filter(
+                course_id=self.course_key, user_id__in=user_ids
+            ).values_list('user_id', 'status', 'mode')
+            for user_id, status, mode in certificates:
+                self._certificates[user_id] = (status, mode)
+
+    def cohort_name(self, student):
+        """
+        Returns the name of the cohort of the student, or None.
+        """
+        return self._cohort_names.get(student.id)
+
+    def team_name(self, student):
+        """
+        Returns the name of the team of the student, or None.
+        """
+        return self._team_names.get(student.id)
+
+    def experiment_group(self, student, partition):
+        """
+        Returns the group of the student in the given experiment partition,
+        or None if the student has not been assigned to an existing group.
+        """
+        group_id = self._course_tags.get(student.id, {}).get(RandomUserPartitionScheme.key_for_partition(partition))
+        if group_id is None:
+            return None
+        try:
+            return partition.get_group(int(group_id))
+        except NoSuchUserPartitionGroupError:
+            return None
+
+    def enrollment_mode(self, student):
+        """
+        Returns the enrollment mode of the student, or None if the student
+        has never enrolled.
+        """
+        return self._enrollment_modes.get(student.id)
+
+    def verification_status(self, student):
+        """
+        Returns the verification status of the student, as given by
+        `SoftwareSecurePhotoVerification.verification_status_for_user`.
+        """
+        if self.enrollment_mode(student) not in CourseMode.VERIFIED_MODES:
+            return 'N/A'
+        return 'ID Verified' if student.id in self._verified_user_ids else 'Not ID Verified'
+
+    def certificate_info(self, student, grade):
+        """
+        Returns the certificate info of the student with the given grade, as
+        given by `certificate_info_for_user`.
+        """
+        is_eligible = (
+            (student.id in self._whitelisted_user_ids or grade is not None) and
+            student.id in self._allowed_certificate_user_ids
+        )
+        status, mode = self._certificates.get(student.id, (None, None))
+        if mode == 'audit' and 'honor' not in self._get_course_mode_slugs():
+            # Like certificate_status_for_student, old audit certificates
+            # are only delivered if the course has an honor mode.
+            status = CertificateStatuses.auditing
+        if status == CertificateStatuses.downloadable:
+            return ['Y' if is_eligible else 'N', 'Y', mode]
+        return ['Y' if is_eligible else 'N', 'N', 'N/A']
+
+    def _get_course_mode_slugs(self):
+        """
+        Returns the slugs of the modes of the course.
+        """
+        if self._course_mode_slugs is None:
+            self._course_mode_slugs = [mode.slug for mode in CourseMode.modes_for_course(self.course_key)]
+        return self._course_mode_slugs
+
+
 def sale_order_record_features(course_id, features):
     """
     Return list of sale orders features as dictionaries.
@@ -214,16 +400,18 @@ def enrolled_students_features(course_key, features):
     include_cohort_column = 'cohort' in features
     include_team_column = 'team' in features
 
-    students = User.objects.filter(
+    students = list(User.objects.filter(
         courseenrollment__course_id=course_key,
         courseenrollment__is_active=1,
-    ).order_by('username').select_related('profile')
+    ).order_by('username').select_related('profile'))
 
+    enrichment_kinds = []
     if include_cohort_column:
-        students = students.prefetch_related('course_groups')
-
+        enrichment_kinds.append(BulkStudentEnrichment.COHORT)
     if include_team_column:
-        students = students.prefetch_related('teams')
+        enrichment_kinds.append(BulkStudentEnrichment.TEAM)
+    enrichment = BulkStudentEnrichment(course_key, enrichment_kinds)
+    enrichment.prefetch(students)
 
     def extract_attr(student, feature):
         """Evaluate a student attribute that is ready for JSON serialization"""
@@ -262,19 +450,12 @@ def enrolled_students_features(course_key, features):
                 student_dict[meta_feature] = meta_dict.get(meta_key)
 
         if include_cohort_column:
-            # Note that we use student.course_groups.all() here instead of
-            # student.course_groups.filter(). The latter creates a fresh query,
-            # therefore negating the performance gain from prefetch_related().
-            student_dict['cohort'] = next(
-                (cohort.name for cohort in student.course_groups.all() if cohort.course_id == course_key),
-                "[unassigned]"
-            )
+            cohort_name = enrichment.cohort_name(student)
+            student_dict['cohort'] = cohort_name if cohort_name is not None else "[unassigned]"
 
         if include_team_column:
-            student_dict['team'] = next(
-                (team.name for team in student.teams.all() if team.course_id == course_key),
-                UNAVAILABLE
-            )
+            team_name = enrichment.team_name(student)
+            student_dict['team'] = team_name if team_name is not None else UNAVAILABLE
         return student_dict
 
     return [extract_student(student, features) for student in students]
@@ -405,11 +586,11 @@ def list_problem_responses(course_key, problem_location):
         course_id=course_key,
         module_state_key=problem_key
     )
-    smdat = smdat.order_by('student')
+    smdat = smdat.order_by('student').values_list('student__username', 'state')
 
     return [
-        {'username': response.student.username, 'state': response.state}
-        for response in smdat
+        {'username': username, 'state': state}
+        for username, state in smdat
     ]
 
 
@@ -5,19 +5,20 @@ Tests for instructor.basic
 import datetime
 import json
 import pytz
-from mock import MagicMock, Mock, patch
+from mock import patch
 from nose.plugins.attrib import attr
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 
+from certificates.models import CertificateStatuses, certificate_info_for_user
+from certificates.tests.factories import CertificateWhitelistFactory, GeneratedCertificateFactory
 from course_modes.models import CourseMode
-from courseware.tests.factories import InstructorFactory
+from courseware.tests.factories import InstructorFactory, StudentModuleFactory
 from instructor_analytics.basic import (
-    StudentModule, sale_record_features, sale_order_record_features, enrolled_students_features,
+    BulkStudentEnrichment, sale_record_features, sale_order_record_features, enrolled_students_features,
     course_registration_features, coupon_codes_features, get_proctored_exam_results, list_may_enroll,
     list_problem_responses, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
 )
-from opaque_keys.edx.locator import UsageKey
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from student.models import CourseEnrollment, CourseEnrollmentAllowed
 from student.roles import CourseSalesAdminRole
@@ -30,6 +31,7 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 from edx_proctoring.api import create_exam
 from edx_proctoring.models import ProctoredExamStudentAttempt
+from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
 
 
 @attr(shard=3)
@@ -56,46 +58,32 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             )
 
     def test_list_problem_responses(self):
-        def result_factory(result_id):
-            """
-            Return a dummy StudentModule object that can be queried for
-            relevant info (student.username and state).
-            """
-            result = Mock(spec=['student', 'state'])
-            result.student.username.return_value = u'user{}'.format(result_id)
-            result.state.return_value = u'state{}'.format(result_id)
-            return result
-
-        # Ensure that UsageKey.from_string returns a problem key that list_problem_responses can work with
-        # (even when called with a dummy location):
-        mock_problem_key = Mock(return_value=u'')
-        mock_problem_key.course_key = self.course_key
-        with patch.object(UsageKey, 'from_string') as patched_from_string:
-            patched_from_string.return_value = mock_problem_key
-
-            # Ensure that StudentModule.objects.filter returns a result set that list_problem_responses can work with
-            # (this keeps us from having to create fixtures for this test):
-            mock_results = MagicMock(return_value=[result_factory(n) for n in range(5)])
-            with patch.object(StudentModule, 'objects') as patched_manager:
-                patched_manager.filter.return_value = mock_results
-
-                mock_problem_location = ''
-                problem_responses = list_problem_responses(self.course_key, problem_location=mock_problem_location)
-
-                # Check if list_problem_responses called UsageKey.from_string to look up problem key:
-                patched_from_string.assert_called_once_with(mock_problem_location)
-                # Check if list_problem_responses called StudentModule.objects.filter to obtain relevant records:
-                patched_manager.filter.assert_called_once_with(
-                    course_id=self.course_key, module_state_key=mock_problem_key
-                )
+        problem_key = self.course_key.make_usage_key('problem', 'test_problem')
+        other_problem_key = self.course_key.make_usage_key('problem', 'other_problem')
+        for index, user in enumerate(self.users[:5]):
+            StudentModuleFactory.create(
+                student=user,
+                course_id=self.course_key,
+                module_state_key=problem_key,
+                state=u'state{}'.format(index),
+            )
+        StudentModuleFactory.create(
+            student=self.users[5], course_id=self.course_key, module_state_key=other_problem_key
+        )
+
+        # The usernames are read along with the responses, rather than a query per response
+        with self.assertNumQueries(1):
+            problem_responses = list_problem_responses(self.course_key, unicode(problem_key))
+
+        self.assertEqual(problem_responses, [
+            {'username': user.username, 'state': u'state{}'.format(index)}
+            for index, user in enumerate(self.users[:5])
+        ])
 
-                # Check if list_problem_responses returned expected results:
-                self.assertEqual(len(problem_responses), len(mock_results))
-                for mock_result in mock_results:
-                    self.assertIn(
-                        {'username': mock_result.student.username, 'state': mock_result.state},
-                        problem_responses
-                    )
+    def test_list_problem_responses_other_course(self):
+        other_course_key = self.store.make_course_key('robot', 'other_course', 'id')
+        problem_key = other_course_key.make_usage_key('problem', 'test_problem')
+        self.assertEqual(list_problem_responses(self.course_key, unicode(problem_key)), [])
 
     def test_enrolled_students_features_username(self):
         self.assertIn('username', AVAILABLE_FEATURES)
@@ -168,7 +156,7 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
         # There should be a constant of 2 SQL queries when calling
         # enrolled_students_features.  The first query comes from the call to
         # User.objects.filter(...), and the second comes from
-        # prefetch_related('course_groups').
+        # prefetching the cohorts of the students.
         with self.assertNumQueries(2):
             userreports = enrolled_students_features(course.id, query_features)
         self.assertEqual(len([r for r in userreports if r['username'] in cohorted_usernames]), len(cohorted_students))
@@ -180,6 +168,64 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             else:
                 self.assertEqual(report['cohort'], '[unassigned]')
 
+    def test_bulk_student_enrichment(self):
+        CourseModeFactory.create(course_id=self.course_key, mode_slug=CourseMode.HONOR)
+        CourseModeFactory.create(course_id=self.course_key, mode_slug=CourseMode.VERIFIED)
+        verified_students = self.users[:4]
+        for student in verified_students:
+            CourseEnrollment.enroll(student, self.course_key, mode=CourseMode.VERIFIED)
+        for student in verified_students[:2]:
+            SoftwareSecurePhotoVerification.objects.create(user=student, status='approved')
+        for student in self.users[4:8]:
+            GeneratedCertificateFactory.create(
+                user=student,
+                course_id=self.course_key,
+                status=CertificateStatuses.downloadable,
+                mode='honor',
+            )
+        GeneratedCertificateFactory.create(
+            user=self.users[8],
+            course_id=self.course_key,
+            status=CertificateStatuses.notpassing,
+            mode='honor',
+        )
+        for student in self.users[6:10]:
+            CertificateWhitelistFactory.create(user=student, course_id=self.course_key, whitelist=True)
+        self.users[5].profile.allow_certificate = False
+        self.users[5].profile.save()
+
+        enrichment = BulkStudentEnrichment(self.course_key, [
+            BulkStudentEnrichment.ENROLLMENT_MODE,
+            BulkStudentEnrichment.VERIFICATION_STATUS,
+            BulkStudentEnrichment.CERTIFICATE,
+        ])
+        # The whitelist, enrollments, verifications, profiles and certificates
+        # are read in a query each, whatever the number of students.
+        with self.assertNumQueries(5):
+            enrichment.prefetch(self.users)
+
+        with self.assertNumQueries(0):
+            enrichment_data = [
+                (
+                    enrichment.enrollment_mode(student),
+                    enrichment.verification_status(student),
+                    enrichment.certificate_info(student, 'Pass' if index % 2 else None),
+                )
+                for index, student in enumerate(self.users)
+            ]
+        for index, student in enumerate(self.users):
+            enrollment_mode = CourseEnrollment.enrollment_mode_for_user(student, self.course_key)[0]
+            self.assertEqual(
+                enrichment_data[index],
+                (
+                    enrollment_mode,
+                    SoftwareSecurePhotoVerification.verification_status_for_user(
+                        student, self.course_key, enrollment_mode
+                    ),
+                    certificate_info_for_user(student, self.course_key, 'Pass' if index % 2 else None),
+                )
+            )
+
     def test_available_features(self):
         self.assertEqual(len(AVAILABLE_FEATURES), len(STUDENT_FEATURES + PROFILE_FEATURES))
         self.assertEqual(set(AVAILABLE_FEATURES), set(STUDENT_FEATURES + PROFILE_FEATURES))
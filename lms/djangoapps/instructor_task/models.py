@@ -17,10 +17,12 @@ import csv
 import json
 import hashlib
 import os.path
+import shutil
+import tempfile
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.db import models, transaction
 
 from openedx.core.storage import get_storage
@@ -178,9 +180,9 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. Large reports can be stored in parts, which are then joined
+    into the report with `store_parts`, so that the whole dataset never
+    needs to be held in memory.
     """
     @classmethod
     def from_config(cls, config_name):
@@ -264,12 +266,39 @@ class DjangoStorageReportStore(ReportStore):
         """
         Given a course_id, filename, and rows (each row is an iterable of
         strings), write the rows to the storage backend in csv format.
+
+        `rows` may be any iterable, such as a generator; the rows are
+        written to a temporary file, rather than to memory, before being
+        stored.
+        """
+        with tempfile.TemporaryFile() as output_file:
+            csvwriter = csv.writer(output_file)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            output_file.seek(0)
+            self.store(course_id, filename, File(output_file))
+
+    def store_parts(self, course_id, filename, part_filenames):
+        """
+        Store the concatenation of the previously stored files named in
+        `part_filenames`, in order, as `filename`, and delete the parts.
+        The parts are copied through a temporary file, one block at a time.
+        """
+        with tempfile.TemporaryFile() as output_file:
+            for part_filename in part_filenames:
+                with self.storage.open(self.path_to(course_id, part_filename)) as part_file:
+                    shutil.copyfileobj(part_file, output_file)
+            output_file.seek(0)
+            self.store(course_id, filename, File(output_file))
+        self.delete(course_id, part_filenames)
+
+    def delete(self, course_id, filenames):
+        """
+        Delete the given files for a given course, if they exist.
         """
-        output_buffer = ContentFile('')
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        output_buffer.seek(0)
-        self.store(course_id, filename, output_buffer)
+        for filename in filenames:
+            path = self.path_to(course_id, filename)
+            if self.storage.exists(path):
+                self.storage.delete(path)
 
     def links_for(self, course_id):
         """
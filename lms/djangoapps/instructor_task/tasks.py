@@ -29,6 +29,9 @@ from celery import task
 from bulk_email.tasks import perform_delegate_email_batches
 from lms.djangoapps.instructor_task.tasks_helper import (
     run_main_task,
+    run_report_subtask,
+    merge_report_shards,
+    delegate_report_subtasks,
     BaseInstructorTask,
     perform_module_state_update,
     rescore_problem_module_state,
@@ -172,7 +175,12 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(upload_grades_csv, xmodule_instance_args)
+    task_fn = partial(
+        delegate_report_subtasks,
+        'grade_report',
+        partial(upload_grades_csv, xmodule_instance_args),
+        partial(_create_report_subtask, entry_id, 'grade_report', action_name),
+    )
     return run_main_task(entry_id, task_fn, action_name)
 
 
@@ -189,10 +197,64 @@ def calculate_problem_grade_report(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(upload_problem_grade_report, xmodule_instance_args)
+    task_fn = partial(
+        delegate_report_subtasks,
+        'problem_grade_report',
+        partial(upload_problem_grade_report, xmodule_instance_args),
+        partial(_create_report_subtask, entry_id, 'problem_grade_report', action_name),
+    )
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_report_shard(entry_id, report_type, shard, student_id_range, action_name, subtask_status_dict):
+    """
+    Grade the students with ids within `student_id_range` and write their
+    rows as a shard of the report of the given type, as a subtask of the
+    InstructorTask entry.
+    """
+    queue_merge_fcn = partial(
+        merge_report.apply_async, (entry_id, report_type), routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY
+    )
+    return run_report_subtask(
+        entry_id, report_type, shard, student_id_range, action_name, subtask_status_dict, queue_merge_fcn
+    )
+
+
+@task(bind=True, default_retry_delay=60, max_retries=3, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def merge_report(self, entry_id, report_type):
+    """
+    Merge the shards written by the subtasks of the InstructorTask entry
+    into the report of the given type, and complete the entry.  The merge
+    is retried if it fails, and the entry fails after the last retry.
+    """
+    final_attempt = self.request.retries >= self.max_retries
+    try:
+        merge_report_shards(entry_id, report_type, final_attempt)
+    except Exception as exc:  # pylint: disable=broad-except
+        if final_attempt:
+            raise
+        raise self.retry(exc=exc)
+
+
+def _create_report_subtask(entry_id, report_type, action_name, shard, student_id_range, initial_subtask_status):
+    """
+    Creates a subtask to write a shard of a report.
+    """
+    return calculate_report_shard.subtask(
+        (
+            entry_id,
+            report_type,
+            shard,
+            student_id_range,
+            action_name,
+            initial_subtask_status.to_dict(),
+        ),
+        task_id=initial_subtask_status.task_id,
+        routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+    )
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
@@ -5,17 +5,22 @@ running state of a course.
 """
 import json
 import re
-from collections import OrderedDict
+import sys
+import traceback
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from eventtracking import tracker
-from itertools import chain
+from itertools import chain, count, islice
 from time import time
+from uuid import uuid4
 import unicodecsv
 import logging
 
 from celery import Task, current_task
-from celery.states import SUCCESS, FAILURE
+from celery.states import SUCCESS, FAILURE, READY_STATES
 from django.contrib.auth.models import User
 from django.core.files.storage import DefaultStorage
 from django.db import reset_queries
@@ -39,18 +44,17 @@ from xmodule.modulestore.django import modulestore
 from xmodule.split_test_module import get_split_user_partitions
 from django.utils.translation import ugettext as _
 from certificates.models import (
-    CertificateWhitelist,
-    certificate_info_for_user,
     CertificateStatuses,
     GeneratedCertificate
 )
 from certificates.api import generate_user_certificates
 from courseware.courses import get_course_by_id, get_problems_in_section
-from lms.djangoapps.grades.course_grades import iterate_grades_for
+from lms.djangoapps.grades.course_grades import GRADES_BATCH_SIZE, iterate_grades_for
 from courseware.models import StudentModule
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import (
+    BulkStudentEnrichment,
     enrolled_students_features,
     get_proctored_exam_results,
     list_may_enroll,
@@ -59,15 +63,17 @@ from instructor_analytics.basic import (
 from instructor_analytics.csvs import format_dictlist
 from openassessment.data import OraAggregateData
 from lms.djangoapps.instructor_task.models import ReportStore, InstructorTask, PROGRESS
-from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
-from openedx.core.djangoapps.course_groups.cohorts import get_cohort
+from lms.djangoapps.instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from opaque_keys.edx.keys import UsageKey
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort, is_course_cohorted
 from student.models import CourseEnrollment, CourseAccessRole
-from lms.djangoapps.teams.models import CourseTeamMembership
-from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
 
 # define different loggers for use within tasks and on client side
 TASK_LOG = logging.getLogger('edx.celery.task')
@@ -83,6 +89,12 @@ UPDATE_STATUS_SKIPPED = 'skipped'
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
 
+# Number of rows of a CSV report that are held in memory before they are
+# stored as a part of the report.
+REPORT_CHUNK_SIZE = 1000
+# Time (in seconds) for which the checkpoint of a partially written report is kept.
+REPORT_CHECKPOINT_TIMEOUT = 60 * 60 * 24
+
 
 class BaseInstructorTask(Task):
     """
@@ -179,6 +191,14 @@ class UpdateProblemModuleStateError(Exception):
     pass
 
 
+class ReportMergeError(Exception):
+    """
+    Error signaling that the shards written by the subtasks of a report
+    can't be merged into the report.
+    """
+    pass
+
+
 def _get_current_task():
     """
     Stub to make it easier to test without actually running Celery.
@@ -600,6 +620,17 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
     return UPDATE_STATUS_SUCCEEDED
 
 
+def _report_filename(csv_name, course_id, timestamp):
+    """
+    Returns the filename of the CSV report with the given name.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
+    )
+
+
 def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD'):
     """
     Upload data as a CSV using ReportStore.
@@ -615,16 +646,510 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
         course_id: ID of the course
     """
     report_store = ReportStore.from_config(config_name)
-    report_store.store_rows(
-        course_id,
-        u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-            course_prefix=course_filename_prefix_generator(course_id),
+    report_store.store_rows(course_id, _report_filename(csv_name, course_id, timestamp), rows)
+    tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
+
+
+class ChunkedReportWriter(object):
+    """
+    Writes the rows of the CSV reports generated by a task to a ReportStore
+    in chunks of at most `chunk_size` rows, each stored as a part of its
+    report, so that the rows of a report are never all held in memory.
+
+    Rows are added per student, and the writer is notified once all rows of
+    a student are added.  Each time a chunk is stored, a checkpoint of the
+    task's progress is saved in the cache for the InstructorTask entry, so
+    that if the task is run again for the same entry after a failure, it
+    resumes after the last student whose rows were stored.
+
+    A report may also be written by several subtasks, each writing a shard
+    of the report under its own `shard` name with `finish_shard`.  The shards
+    are then joined, in order, into the reports with `merge_shards`.
+
+    Usage:
+        report_writer = ChunkedReportWriter(entry_id, course_id, start_date, task_progress)
+        for student in report_writer.remaining_students(students):
+            report_writer.add_row('report_name', row, header=header)
+            report_writer.student_done(student)
+        report_writer.finish(always_upload=['report_name'])
+    """
+    def __init__(
+            self,
+            entry_id,
+            course_id,
+            timestamp,
+            task_progress,
+            config_name='GRADES_DOWNLOAD',
+            chunk_size=None,
+            shard=None,
+    ):
+        self.entry_id = entry_id
+        self.course_id = course_id
+        self.task_progress = task_progress
+        self.chunk_size = chunk_size or REPORT_CHUNK_SIZE
+        self.shard = shard
+        self.report_store = ReportStore.from_config(config_name)
+        # Parts of tasks that are not run for an entry are kept apart.
+        self._parts_dir = self._shard_dir(entry_id if entry_id is not None else uuid4().hex, shard)
+
+        checkpoint = self._load_checkpoint()
+        # The timestamp of the reports is kept when resuming, so that all
+        # of their parts end up in the same reports.
+        self.timestamp = checkpoint.get('timestamp', timestamp)
+        # Task specific data that is kept when resuming, such as the
+        # columns of a report.
+        self.state = checkpoint.get('state', {})
+        self._last_student_id = checkpoint.get('last_student_id')
+        # The id of the last student whose rows were added, stored or not.
+        self._done_student_id = self._last_student_id
+        self._headers = checkpoint.get('headers', {})
+        self._parts = checkpoint.get('parts', {})
+        self._row_counts = checkpoint.get('row_counts', {})
+        for counter, value in checkpoint.get('progress', {}).iteritems():
+            setattr(task_progress, counter, value)
+
+        self._pending_rows = defaultdict(list)
+        self._pending_row_count = 0
+
+    def remaining_students(self, students):
+        """
+        Returns the given queryset of students, ordered by id and limited to
+        the students whose rows were not stored before the last checkpoint.
+        """
+        if self._last_student_id is not None:
+            students = students.filter(id__gt=self._last_student_id)
+        return students.order_by('id')
+
+    def has_rows(self, csv_name):
+        """
+        Returns whether any rows were added to the report with the given name.
+        """
+        return bool(self._row_counts.get(csv_name))
+
+    def add_row(self, csv_name, row, header=None):
+        """
+        Adds a row to the report with the given name.  The first header
+        given for a report is written before all of its rows.
+        """
+        if header is not None and csv_name not in self._headers:
+            self._headers[csv_name] = header
+        self._pending_rows[csv_name].append(row)
+        self._pending_row_count += 1
+        self._row_counts[csv_name] = self._row_counts.get(csv_name, 0) + 1
+
+    def student_done(self, student):
+        """
+        Notifies the writer that all rows of the given student were added.
+        Stores the pending rows, and saves a checkpoint, once there are
+        `chunk_size` of them.
+        """
+        self._done_student_id = student.id
+        if self._pending_row_count >= self.chunk_size:
+            self._store_chunk(student.id)
+
+    def finish(self, always_upload=()):
+        """
+        Stores the pending rows and uploads the reports.  Reports without
+        any rows are only uploaded if their names are in `always_upload`.
+        """
+        self._store_last_chunk()
+        for csv_name in sorted(set(self._parts) | set(always_upload)):
+            self._upload_report(
+                self.report_store,
+                self.course_id,
+                csv_name,
+                self.timestamp,
+                self._headers.get(csv_name),
+                self._part_filename(self._parts_dir, csv_name, 'header'),
+                self._part_filenames(self._parts_dir, csv_name, self._parts.get(csv_name, 0)),
+            )
+        self._delete_checkpoint()
+
+    def finish_shard(self):
+        """
+        Stores the pending rows and a manifest of the stored parts of this
+        writer's shard, for use by `merge_shards`.
+        """
+        self._store_last_chunk()
+        manifest_filename = self._manifest_filename(self._parts_dir)
+        self.report_store.delete(self.course_id, [manifest_filename])
+        self.report_store.store(
+            self.course_id,
+            manifest_filename,
+            ContentFile(json.dumps({'headers': self._headers, 'parts': self._parts})),
+        )
+        self._delete_checkpoint()
+
+    @classmethod
+    def merge_shards(cls, entry_id, course_id, timestamp, shards, always_upload=(), config_name='GRADES_DOWNLOAD'):
+        """
+        Uploads the reports written in the given shards of the InstructorTask
+        entry, joining the shards in the given order.  Reports without any
+        rows are only uploaded if their names are in `always_upload`.
+
+        Raises a ReportMergeError, without uploading any report, if any of
+        the shards was not finished.
+        """
+        report_store = ReportStore.from_config(config_name)
+        manifests = []
+        for shard in shards:
+            shard_dir = cls._shard_dir(entry_id, shard)
+            manifest_path = report_store.path_to(course_id, cls._manifest_filename(shard_dir))
+            if not report_store.storage.exists(manifest_path):
+                raise ReportMergeError(u'Report shard {} is missing'.format(shard))
+            with report_store.storage.open(manifest_path) as manifest_file:
+                manifests.append((shard_dir, json.load(manifest_file)))
+
+        csv_names = set(always_upload)
+        for _, manifest in manifests:
+            csv_names.update(manifest['parts'])
+        for csv_name in sorted(csv_names):
+            headers = [manifest['headers'][csv_name] for _, manifest in manifests if csv_name in manifest['headers']]
+            part_filenames = []
+            for shard_dir, manifest in manifests:
+                part_filenames.extend(cls._part_filenames(shard_dir, csv_name, manifest['parts'].get(csv_name, 0)))
+            cls._upload_report(
+                report_store,
+                course_id,
+                csv_name,
+                timestamp,
+                headers[0] if headers else None,
+                cls._part_filename(cls._shard_dir(entry_id, None), csv_name, 'header'),
+                part_filenames,
+            )
+        report_store.delete(course_id, [cls._manifest_filename(shard_dir) for shard_dir, _ in manifests])
+
+    @classmethod
+    def _upload_report(cls, report_store, course_id, csv_name, timestamp, header, header_filename, part_filenames):
+        """
+        Uploads the report with the given name, made of the given header,
+        if any, followed by the given stored parts.  The header is first
+        stored as a part named `header_filename`.
+        """
+        filename = _report_filename(csv_name, course_id, timestamp)
+        if header is not None and part_filenames:
+            report_store.delete(course_id, [header_filename])
+            report_store.store_rows(course_id, header_filename, [header])
+            part_filenames = [header_filename] + part_filenames
+        if part_filenames:
+            report_store.store_parts(course_id, filename, part_filenames)
+        else:
+            report_store.store_rows(course_id, filename, [])
+        tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
+
+    def _store_last_chunk(self):
+        """
+        Stores the pending rows, if any, and saves a checkpoint after the
+        last student whose rows were added.
+        """
+        if self._pending_row_count:
+            self._store_chunk(self._done_student_id)
+
+    def _store_chunk(self, last_student_id):
+        """
+        Stores the pending rows of each report as a new part of the report,
+        and saves a checkpoint after the student with the given id.
+        """
+        for csv_name, rows in self._pending_rows.iteritems():
+            part_index = self._parts.get(csv_name, 0)
+            part_filename = self._part_filename(self._parts_dir, csv_name, part_index)
+            # A part may have been stored by a failed run after its last checkpoint.
+            self.report_store.delete(self.course_id, [part_filename])
+            self.report_store.store_rows(self.course_id, part_filename, rows)
+            self._parts[csv_name] = part_index + 1
+        self._pending_rows = defaultdict(list)
+        self._pending_row_count = 0
+        self._last_student_id = last_student_id
+        self._save_checkpoint()
+
+    @staticmethod
+    def _shard_dir(entry_id, shard):
+        """
+        Returns the directory of the parts of the given shard of the
+        InstructorTask entry.  Parts are stored in a sub-directory, so they
+        are not listed as reports.
+        """
+        parts_dir = u"parts/{}".format(entry_id)
+        if shard is not None:
+            parts_dir = u"{}/{}".format(parts_dir, shard)
+        return parts_dir
+
+    @staticmethod
+    def _part_filename(parts_dir, csv_name, part_index):
+        """
+        Returns the filename of a part of a report.
+        """
+        return u"{parts_dir}/{csv_name}_{part_index}.csv".format(
+            parts_dir=parts_dir,
             csv_name=csv_name,
-            timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-        ),
-        rows
+            part_index=part_index,
+        )
+
+    @classmethod
+    def _part_filenames(cls, parts_dir, csv_name, num_parts):
+        """
+        Returns the filenames of the given number of parts of a report, in order.
+        """
+        return [cls._part_filename(parts_dir, csv_name, part_index) for part_index in range(num_parts)]
+
+    @staticmethod
+    def _manifest_filename(parts_dir):
+        """
+        Returns the filename of the manifest of a shard.
+        """
+        return u"{}/manifest.json".format(parts_dir)
+
+    @property
+    def _checkpoint_cache_key(self):
+        """
+        Returns the cache key of the checkpoint for the InstructorTask entry.
+        """
+        return u"instructor_task.report_checkpoint.{}".format(self._parts_dir)
+
+    def _load_checkpoint(self):
+        """
+        Returns the saved checkpoint for the InstructorTask entry, if any.
+        Tasks that are not run for an entry are not checkpointed.
+        """
+        if self.entry_id is None:
+            return {}
+        checkpoint = cache.get(self._checkpoint_cache_key) or {}
+        if checkpoint:
+            TASK_LOG.info(
+                u'InstructorTask ID: %s, Course: %s, Resuming reports after student: %s',
+                self.entry_id,
+                self.course_id,
+                checkpoint.get('last_student_id'),
+            )
+        return checkpoint
+
+    def _save_checkpoint(self):
+        """
+        Saves the checkpoint for the InstructorTask entry.
+        """
+        if self.entry_id is None:
+            return
+        cache.set(
+            self._checkpoint_cache_key,
+            {
+                'timestamp': self.timestamp,
+                'state': self.state,
+                'last_student_id': self._last_student_id,
+                'headers': self._headers,
+                'parts': self._parts,
+                'row_counts': self._row_counts,
+                'progress': {
+                    counter: getattr(self.task_progress, counter)
+                    for counter in ('attempted', 'succeeded', 'skipped', 'failed')
+                },
+            },
+            REPORT_CHECKPOINT_TIMEOUT,
+        )
+
+    def _delete_checkpoint(self):
+        """
+        Deletes the checkpoint for the InstructorTask entry.
+        """
+        if self.entry_id is not None:
+            cache.delete(self._checkpoint_cache_key)
+
+
+def _enrolled_students_in_range(students, student_id_range):
+    """
+    Returns the given queryset of students, limited to the students with ids
+    within the given inclusive range, if any.
+    """
+    if student_id_range is None:
+        return students
+    first_student_id, last_student_id = student_id_range
+    return students.filter(id__gte=first_student_id, id__lte=last_student_id)
+
+
+def _report_shard_name(shard_index):
+    """
+    Returns the name of the shard of a report written by a subtask.
+    """
+    return u"{:05d}".format(shard_index)
+
+
+def delegate_report_subtasks(report_type, upload_fcn, create_subtask_fcn, entry_id, course_id, task_input, action_name):
+    """
+    Generates the report of the given type for a course with `upload_fcn`.
+
+    For courses with more enrolled students than
+    settings.GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK, the students are instead
+    partitioned by ranges of ids, and a subtask is queued for each range, so
+    that the report is generated in parallel.  Each subtask writes a shard of
+    the report, and the last subtask to complete queues a task that merges
+    the shards and completes the InstructorTask entry.
+
+    Arguments:
+        `report_type` : a key of SHARDED_REPORTS.
+        `upload_fcn` : a function of `entry_id`, `course_id`, `task_input` and
+            `action_name` that generates the whole report.
+        `create_subtask_fcn` : a function that constructs a subtask, given
+            the name of its shard, the range of student ids it grades and a
+            SubtaskStatus object reflecting its initial status.
+    """
+    students_per_subtask = settings.GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK
+    enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id).order_by('id')
+    total_num_students = enrolled_students.count()
+    if not students_per_subtask or total_num_students <= students_per_subtask:
+        return upload_fcn(entry_id, course_id, task_input, action_name)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    # As for bulk emails, subtasks that were already queued by an earlier
+    # run of this task are not queued again.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued subtasks for %s", entry.task_id, report_type)
+        return json.loads(entry.task_output)
+
+    shard_indexes = count()
+
+    def _create_report_subtask(student_list, initial_subtask_status):
+        """
+        Creates a subtask to write a shard of the report for the given students.
+        """
+        student_ids = [student['pk'] for student in student_list]
+        return create_subtask_fcn(
+            _report_shard_name(next(shard_indexes)),
+            (min(student_ids), max(student_ids)),
+            initial_subtask_status,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_report_subtask,
+        [enrolled_students],
+        [],
+        students_per_subtask,
+        total_num_students,
     )
-    tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
+
+
+def run_report_subtask(
+        entry_id, report_type, shard, student_id_range, action_name, subtask_status_dict, queue_merge_fcn
+):
+    """
+    Writes a shard of the report of the given type, for the students with
+    ids within the given range, as a subtask of the InstructorTask entry.
+    Progress is recorded in the entry through its subtask status, and once
+    all subtasks are done, `queue_merge_fcn` is called to queue the merge of
+    the shards of the report, see `merge_report_shards`.
+
+    Returns the subtask status, as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info(
+        u"Preparing to write shard %s of %s as subtask %s for instructor task %d, students %s",
+        shard, report_type, current_task_id, entry_id, student_id_range,
+    )
+    # Raises a DuplicateTaskException if the subtask was requeued or is
+    # already being run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    upload_fcn, _ = SHARDED_REPORTS[report_type]
+    try:
+        task_progress = upload_fcn(
+            None,
+            entry_id,
+            entry.course_id,
+            json.loads(entry.task_input),
+            action_name,
+            shard=shard,
+            student_id_range=student_id_range,
+        )
+    except Exception:
+        exc_info = sys.exc_info()
+        TASK_LOG.exception(u"Report subtask %s for instructor task %d: failed unexpectedly!", current_task_id, entry_id)
+        subtask_status.increment(state=FAILURE)
+        try:
+            _complete_report_subtask(entry_id, current_task_id, subtask_status, queue_merge_fcn)
+        except Exception:  # pylint: disable=broad-except
+            TASK_LOG.exception(
+                u"Report subtask %s for instructor task %d: failed to record the failure", current_task_id, entry_id
+            )
+        raise exc_info[0], exc_info[1], exc_info[2]
+
+    subtask_status.increment(
+        succeeded=task_progress['succeeded'],
+        failed=task_progress['failed'],
+        skipped=task_progress['skipped'],
+        state=SUCCESS,
+    )
+    _complete_report_subtask(entry_id, current_task_id, subtask_status, queue_merge_fcn)
+    return subtask_status.to_dict()
+
+
+def _complete_report_subtask(entry_id, current_task_id, subtask_status, queue_merge_fcn):
+    """
+    Records the final status of a report subtask in the InstructorTask entry,
+    and calls `queue_merge_fcn` if it was the last subtask to complete.  The
+    entry is left in progress until the shards are merged.
+    """
+    if update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False):
+        queue_merge_fcn()
+
+
+def merge_report_shards(entry_id, report_type, final_attempt=True):
+    """
+    Uploads the report of the given type, merged from the shards written by
+    the subtasks of the InstructorTask entry, and sets the final state of the
+    entry.  The report fails, and no partial report is uploaded, if any of
+    its subtasks failed.
+
+    A lock in the cache keeps the shards from being merged by several tasks
+    at once.  The lock is released if the merge fails, so that it can be
+    retried, and the entry is marked as failed when the merge fails on its
+    `final_attempt`.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    if entry.task_state in READY_STATES:
+        return
+    lock_key = u"instructor_task.report_merge.{}".format(entry.task_id)
+    # cache.add fails if the key already exists
+    if not cache.add(lock_key, 'true', REPORT_CHECKPOINT_TIMEOUT):
+        return
+
+    subtasks = json.loads(entry.subtasks)
+    if subtasks['failed']:
+        TASK_LOG.warning(
+            u"InstructorTask ID: %s, %s of the %s report subtasks failed", entry_id, subtasks['failed'], subtasks['total']
+        )
+        _fail_report_entry(entry, ReportMergeError(
+            u"{} of the {} subtasks of the report failed".format(subtasks['failed'], subtasks['total'])
+        ))
+        return
+
+    _, always_upload = SHARDED_REPORTS[report_type]
+    try:
+        ChunkedReportWriter.merge_shards(
+            entry_id,
+            entry.course_id,
+            datetime.now(UTC),
+            [_report_shard_name(shard_index) for shard_index in range(subtasks['total'])],
+            always_upload,
+        )
+    except Exception as exc:
+        TASK_LOG.exception(u"InstructorTask ID: %s, Failed to merge the report shards", entry_id)
+        cache.delete(lock_key)
+        if final_attempt:
+            _fail_report_entry(entry, exc, traceback.format_exc())
+        raise
+    entry.task_state = SUCCESS
+    entry.save_now()
+
+
+def _fail_report_entry(entry, exception, traceback_string=None):
+    """
+    Marks the InstructorTask entry of a report as failed with the given exception.
+    """
+    entry.task_output = InstructorTask.create_output_for_failure(exception, traceback_string)
+    entry.task_state = FAILURE
+    entry.save_now()
 
 
 def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at, config_name='FINANCIAL_REPORTS'):
@@ -653,23 +1178,34 @@ def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": report_name})
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):  # pylint: disable=too-many-statements
+def upload_grades_csv(
+        _xmodule_instance_args,
+        _entry_id,
+        course_id,
+        _task_input,
+        action_name,
+        shard=None,
+        student_id_range=None,
+):  # pylint: disable=too-many-statements
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
-
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    written in chunks by a `ChunkedReportWriter`, and the files are only
+    assembled once complete, so we'll never write part of a CSV file to S3 --
+    i.e. any files that are visible in ReportStore will be complete ones.
+
+    If a `shard` name is given, only the students with ids within the
+    inclusive `student_id_range` are graded, and the rows are written as
+    the given shard of the reports, to be merged by `merge_report_shards`.
     """
     start_time = time()
     start_date = datetime.now(UTC)
     status_interval = 100
-    enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
+    enrolled_students = _enrolled_students_in_range(
+        CourseEnrollment.objects.users_enrolled_in(course_id), student_id_range
+    )
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
@@ -691,17 +1227,26 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
 
     certificate_info_header = ['Certificate Eligible', 'Certificate Delivered', 'Certificate Type']
-    certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
-    whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
+    enrichment_kinds = [
+        BulkStudentEnrichment.ENROLLMENT_MODE,
+        BulkStudentEnrichment.VERIFICATION_STATUS,
+        BulkStudentEnrichment.CERTIFICATE,
+    ]
+    if course_is_cohorted:
+        enrichment_kinds.append(BulkStudentEnrichment.COHORT)
+    if teams_enabled:
+        enrichment_kinds.append(BulkStudentEnrichment.TEAM)
+    enrichment = BulkStudentEnrichment(course_id, enrichment_kinds, experiment_partitions)
+
+    # Loop over all our students and write our CSV rows in chunks
+    report_writer = ChunkedReportWriter(_entry_id, course_id, start_date, task_progress, shard=shard)
+    header = report_writer.state.get('header')
+    err_header = ["id", "username", "error_msg"]
     current_step = {'step': 'Calculating Grades'}
 
     total_enrolled_students = enrolled_students.count()
-    student_counter = 0
+    student_counter = task_progress.attempted
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
         task_info_string,
@@ -710,7 +1255,9 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
         total_enrolled_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(
+            course, _prefetch_enrichment(report_writer.remaining_students(enrolled_students), enrichment)
+    ):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -733,11 +1280,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header +
-                    group_configs_header + teams_header +
-                    ['Enrollment Track', 'Verification Status'] + certificate_info_header
-                )
+                report_writer.state['header'] = header
 
             percents = {
                 section['label']: section.get('percent', 0.0)
@@ -747,34 +1290,20 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
             cohorts_group_name = []
             if course_is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
+                cohorts_group_name.append(enrichment.cohort_name(student) or '')
 
             group_configs_group_names = []
             for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
+                group = enrichment.experiment_group(student, partition)
                 group_configs_group_names.append(group.name if group else '')
 
             team_name = []
             if teams_enabled:
-                try:
-                    membership = CourseTeamMembership.objects.get(user=student, team__course_id=course_id)
-                    team_name.append(membership.team.name)
-                except CourseTeamMembership.DoesNotExist:
-                    team_name.append('')
-
-            enrollment_mode = CourseEnrollment.enrollment_mode_for_user(student, course_id)[0]
-            verification_status = SoftwareSecurePhotoVerification.verification_status_for_user(
-                student,
-                course_id,
-                enrollment_mode
-            )
-            certificate_info = certificate_info_for_user(
-                student,
-                course_id,
-                gradeset['grade'],
-                student.id in whitelisted_user_ids
-            )
+                team_name.append(enrichment.team_name(student) or '')
+
+            enrollment_mode = enrichment.enrollment_mode(student)
+            verification_status = enrichment.verification_status(student)
+            certificate_info = enrichment.certificate_info(student, gradeset['grade'])
 
             # Not everybody has the same gradable items. If the item is not
             # found in the user's gradeset, just assume it's a 0. The aggregated
@@ -783,15 +1312,22 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            report_writer.add_row(
+                'grade_report',
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names + team_name +
-                [enrollment_mode] + [verification_status] + certificate_info
+                [enrollment_mode] + [verification_status] + certificate_info,
+                header=(
+                    ["id", "email", "username", "grade"] + header + cohorts_header +
+                    group_configs_header + teams_header +
+                    ['Enrollment Track', 'Verification Status'] + certificate_info_header
+                ),
             )
         else:
             # An empty gradeset means we failed to grade a student.
             task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
+            report_writer.add_row('grade_report_err', [student.id, student.username, err_msg], header=err_header)
+        report_writer.student_done(student)
 
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
@@ -802,23 +1338,37 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         total_enrolled_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
+    # By this point, we've got all the rows of our CSV files.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
-
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+    # Perform the actual upload. The error report is only written if
+    # there are any error rows.
+    if shard is None:
+        report_writer.finish(always_upload=['grade_report'])
+    else:
+        report_writer.finish_shard()
 
     # One last update before we close out...
     TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def _prefetch_enrichment(students, enrichment):
+    """
+    Yields the given students, prefetching the enrichment data of each batch
+    of GRADES_BATCH_SIZE students before the first student of the batch.
+    """
+    students = iter(students)
+    students_batch = list(islice(students, GRADES_BATCH_SIZE))
+    while students_batch:
+        enrichment.prefetch(students_batch)
+        for student in students_batch:
+            yield student
+        students_batch = list(islice(students, GRADES_BATCH_SIZE))
+
+
 def _order_problems(blocks):
     """
     Sort the problems by the assignment type and assignment that it belongs to.
@@ -903,15 +1453,29 @@ def upload_problem_responses_csv(_xmodule_instance_args, _entry_id, course_id, t
     return task_progress.update_task_state(extra_meta=current_step)
 
 
-def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def upload_problem_grade_report(
+        _xmodule_instance_args,
+        _entry_id,
+        course_id,
+        _task_input,
+        action_name,
+        shard=None,
+        student_id_range=None,
+):
     """
     Generate a CSV containing all students' problem grades within a given
     `course_id`.
+
+    If a `shard` name is given, only the students with ids within the
+    inclusive `student_id_range` are graded, and the rows are written as
+    the given shard of the reports, to be merged by `merge_report_shards`.
     """
     start_time = time()
     start_date = datetime.now(UTC)
     status_interval = 100
-    enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
+    enrolled_students = _enrolled_students_in_range(
+        CourseEnrollment.objects.users_enrolled_in(course_id), student_id_range
+    )
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
     # This struct encapsulates both the display names of each static item in the
@@ -929,11 +1493,14 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
         )
 
     # Just generate the static fields for now.
-    rows = [list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))]
-    error_rows = [list(header_row.values()) + ['error_msg']]
+    header = list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))
+    error_header = list(header_row.values()) + ['error_msg']
+    report_writer = ChunkedReportWriter(_entry_id, course_id, start_date, task_progress, shard=shard)
     current_step = {'step': 'Calculating Grades'}
 
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(
+            course_id, report_writer.remaining_students(enrolled_students)
+    ):
         student_fields = [getattr(student, field_name) for field_name in header_row]
         task_progress.attempted += 1
 
@@ -942,8 +1509,9 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
             # Generally there will be a non-empty err_msg, but that is not always the case.
             if not err_msg:
                 err_msg = u"Unknown error"
-            error_rows.append(student_fields + [err_msg])
+            report_writer.add_row('problem_grade_report_err', student_fields + [err_msg], header=error_header)
             task_progress.failed += 1
+            report_writer.student_done(student)
             continue
 
         final_grade = gradeset['percent']
@@ -961,22 +1529,36 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
                 # the case that the student does not have access to it (e.g. A/B
                 # test or cohorted courseware).
                 earned_possible_values.append(['N/A', 'N/A'])
-        rows.append(student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)))
+        report_writer.add_row(
+            'problem_grade_report',
+            student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)),
+            header=header,
+        )
 
         task_progress.succeeded += 1
+        report_writer.student_done(student)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the upload if any students have been successfully graded
-    if len(rows) > 1:
-        upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
-    # If there are any error rows, write them out as well
-    if len(error_rows) > 1:
-        upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
+    # Perform the upload of the reports that have any rows, i.e. if any
+    # students have been successfully graded and if there are any error rows.
+    if shard is None:
+        report_writer.finish()
+    else:
+        report_writer.finish_shard()
 
     return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
 
 
+# Reports that can be written in shards by subtasks, keyed by report type,
+# with the function that writes a shard of the report and the names of the
+# reports that are uploaded even if they have no rows.
+SHARDED_REPORTS = {
+    'grade_report': (upload_grades_csv, ['grade_report']),
+    'problem_grade_report': (upload_problem_grade_report, []),
+}
+
+
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     For a given `course_id`, generate a CSV file containing profile
@@ -1031,13 +1613,14 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    # Loop over all our students and build our CSV lists in memory
-    rows = []
-    header = None
+    # Loop over all our students and write our CSV rows in chunks
+    report_writer = ChunkedReportWriter(
+        _entry_id, course_id, start_date, task_progress, config_name='FINANCIAL_REPORTS',
+    )
     current_step = {'step': 'Gathering Profile Information'}
     enrollment_report_provider = PaidCourseEnrollmentReportProvider()
     total_students = students_in_course.count()
-    student_counter = 0
+    student_counter = task_progress.attempted
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, generating detailed enrollment report for total students: %s',
         task_info_string,
@@ -1046,7 +1629,7 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
         total_students
     )
 
-    for student in students_in_course:
+    for student in report_writer.remaining_students(students_in_course):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -1098,16 +1681,21 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
             'Transaction Reference Number': _('Transaction Reference Number')
         }
 
-        if not header:
+        display_headers = None
+        if not report_writer.has_rows('enrollment_report'):
             header = user_data.keys() + course_enrollment_data.keys() + payment_data.keys()
             display_headers = []
             for header_element in header:
                 # translate header into a localizable display string
                 display_headers.append(enrollment_report_headers.get(header_element, header_element))
-            rows.append(display_headers)
 
-        rows.append(user_data.values() + course_enrollment_data.values() + payment_data.values())
+        report_writer.add_row(
+            'enrollment_report',
+            user_data.values() + course_enrollment_data.values() + payment_data.values(),
+            header=display_headers,
+        )
         task_progress.succeeded += 1
+        report_writer.student_done(student)
 
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Detailed enrollment report generated for students: %s/%s',
@@ -1118,13 +1706,13 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
         total_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
+    # By this point, we've got all the rows of our CSV files.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
     # Perform the actual upload
-    upload_csv_to_report_store(rows, 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS')
+    report_writer.finish(always_upload=['enrollment_report'])
 
     # One last update before we close out...
     TASK_LOG.info(u'%s, Task type: %s, Finalizing detailed enrollment task', task_info_string, action_name)
@@ -8,11 +8,15 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import json
 import os
 import shutil
 from datetime import datetime
+from functools import partial
 import urllib
+from uuid import uuid4
 
+from celery.states import SUCCESS, FAILURE
 import ddt
 from freezegun import freeze_time
 from mock import Mock, patch
@@ -48,8 +52,10 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from lms.djangoapps.verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from lms.djangoapps.instructor_task.models import ReportStore
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from survey.models import SurveyForm, SurveyAnswer
+from lms.djangoapps.grades.course_grades import iterate_grades_for
 from lms.djangoapps.instructor_task.tasks_helper import (
     cohort_students_and_upload,
     upload_problem_responses_csv,
@@ -62,6 +68,10 @@ from lms.djangoapps.instructor_task.tasks_helper import (
     upload_course_survey_report,
     generate_students_certificates,
     upload_ora2_data,
+    delegate_report_subtasks,
+    run_report_subtask,
+    merge_report_shards,
+    ChunkedReportWriter,
     UPDATE_STATUS_FAILED,
     UPDATE_STATUS_SUCCEEDED,
 )
@@ -131,6 +141,178 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
         self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
 
+    @patch('lms.djangoapps.instructor_task.tasks_helper.REPORT_CHUNK_SIZE', 1)
+    @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
+    def test_chunked_upload(self, _mock_current_task):
+        """
+        Test that a report written in several chunks is uploaded as a single file.
+        """
+        students = [self.create_student(u'student{}'.format(index)) for index in range(3)]
+        result = upload_grades_csv(None, None, self.course.id, None, 'graded')
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
+
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.verify_rows_in_csv(
+            [{'id': unicode(student.id), 'username': student.username} for student in students],
+            ignore_other_columns=True,
+        )
+
+    @patch('lms.djangoapps.instructor_task.tasks_helper.REPORT_CHUNK_SIZE', 1)
+    @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
+    def test_resume_after_failure(self, _mock_current_task):
+        """
+        Test that a grade report task that is run again after a failure
+        resumes after the students whose rows were already stored.
+        """
+        students = [self.create_student(u'student{}'.format(index)) for index in range(3)]
+
+        def iterate_grades_then_fail(course_id, students):
+            """
+            Yields the grades of the first two students, then fails.
+            """
+            for index, grade_result in enumerate(iterate_grades_for(course_id, students)):
+                if index == 2:
+                    raise Exception("Worker lost")
+                yield grade_result
+
+        with patch('lms.djangoapps.instructor_task.tasks_helper.iterate_grades_for', iterate_grades_then_fail):
+            with self.assertRaises(Exception):
+                upload_grades_csv(None, 1, self.course.id, None, 'graded')
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+
+        with patch(
+            'lms.djangoapps.instructor_task.tasks_helper.iterate_grades_for', wraps=iterate_grades_for
+        ) as mock_iterate_grades_for:
+            result = upload_grades_csv(None, 1, self.course.id, None, 'graded')
+        self.assertEqual(list(mock_iterate_grades_for.call_args[0][1]), students[2:])
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
+        self.verify_rows_in_csv(
+            [{'id': unicode(student.id), 'username': student.username} for student in students],
+            ignore_other_columns=True,
+        )
+
+    @patch('lms.djangoapps.instructor_task.tasks_helper.REPORT_CHUNK_SIZE', 2)
+    @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
+    def test_resume_after_failed_upload(self, _mock_current_task):
+        """
+        Test that a grade report task that fails after storing its last,
+        partial, chunk resumes after the last student, without writing any
+        row twice.
+        """
+        students = [self.create_student(u'student{}'.format(index)) for index in range(3)]
+
+        with patch.object(ChunkedReportWriter, '_upload_report', side_effect=Exception("Upload failed")):
+            with self.assertRaises(Exception):
+                upload_grades_csv(None, 1, self.course.id, None, 'graded')
+
+        with patch(
+            'lms.djangoapps.instructor_task.tasks_helper.iterate_grades_for', wraps=iterate_grades_for
+        ) as mock_iterate_grades_for:
+            result = upload_grades_csv(None, 1, self.course.id, None, 'graded')
+        self.assertEqual(list(mock_iterate_grades_for.call_args[0][1]), [])
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
+        self.verify_rows_in_csv(
+            [{'id': unicode(student.id), 'username': student.username} for student in students],
+            ignore_other_columns=True,
+        )
+
+    def _run_grade_report_subtasks(self):
+        """
+        Delegates a grade report of the course to subtasks, runs them out of
+        order, then runs the merge that the last one queues.  Returns the
+        InstructorTask entry of the report.
+        """
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_type='grade_course',
+        )
+        queued_subtasks = []
+        queued_merges = []
+
+        def create_subtask(shard, student_id_range, initial_subtask_status):
+            """
+            Returns a subtask whose run is deferred until all subtasks are queued.
+            """
+            subtask = Mock()
+            subtask.apply_async.side_effect = lambda: queued_subtasks.append(partial(
+                run_report_subtask,
+                entry.id,
+                'grade_report',
+                shard,
+                student_id_range,
+                'graded',
+                initial_subtask_status.to_dict(),
+                lambda: queued_merges.append(partial(merge_report_shards, entry.id, 'grade_report')),
+            ))
+            return subtask
+
+        delegate_report_subtasks(
+            'grade_report',
+            partial(upload_grades_csv, None),
+            create_subtask,
+            entry.id,
+            self.course.id,
+            {},
+            'graded',
+        )
+        self.assertEqual(len(queued_subtasks), 3)
+        for run_subtask in reversed(queued_subtasks):
+            try:
+                run_subtask()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            # The report is only complete once its shards are merged.
+            self.assertNotEqual(InstructorTask.objects.get(id=entry.id).task_state, SUCCESS)
+        self.assertEqual(len(queued_merges), 1)
+        queued_merges[0]()
+        return InstructorTask.objects.get(id=entry.id)
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2)
+    @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
+    def test_grade_report_subtasks(self, _mock_current_task):
+        """
+        Test that a grade report of a course with more students than are
+        graded per subtask is written by subtasks and merged in order.
+        """
+        students = [self.create_student(u'student{}'.format(index)) for index in range(5)]
+        entry = self._run_grade_report_subtasks()
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output))
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.verify_rows_in_csv(
+            [{'id': unicode(student.id), 'username': student.username} for student in students],
+            ignore_other_columns=True,
+        )
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2)
+    @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
+    def test_grade_report_failed_subtask(self, _mock_current_task):
+        """
+        Test that a grade report fails, without uploading a partial report,
+        if one of its subtasks fails.
+        """
+        students = [self.create_student(u'student{}'.format(index)) for index in range(5)]
+
+        def iterate_grades_or_fail(course, students_to_grade):
+            """
+            Fails for the shard of the third student.
+            """
+            students_to_grade = list(students_to_grade)
+            if students[2] in students_to_grade:
+                raise Exception("Worker lost")
+            return iterate_grades_for(course, students_to_grade)
+
+        with patch('lms.djangoapps.instructor_task.tasks_helper.iterate_grades_for', iterate_grades_or_fail):
+            entry = self._run_grade_report_subtasks()
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertIn('subtasks of the report failed', json.loads(entry.task_output)['message'])
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+
     def test_cohort_data_in_grading(self):
         """
         Test that cohort data is included in grades csv if cohort configuration is enabled for course.
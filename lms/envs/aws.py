@@ -529,6 +529,31 @@ MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTOR
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
+COURSE_STRUCTURE_LRU_MAX_BYTES = ENV_TOKENS.get('COURSE_STRUCTURE_LRU_MAX_BYTES', COURSE_STRUCTURE_LRU_MAX_BYTES)
+COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES', COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES
+)
+COURSE_DEFINITION_LRU_MAX_BYTES = ENV_TOKENS.get('COURSE_DEFINITION_LRU_MAX_BYTES', COURSE_DEFINITION_LRU_MAX_BYTES)
+COURSE_DEFINITION_LRU_MAX_ITEM_BYTES = ENV_TOKENS.get(
+    'COURSE_DEFINITION_LRU_MAX_ITEM_BYTES', COURSE_DEFINITION_LRU_MAX_ITEM_BYTES
+)
+SPLIT_DEFINITION_FETCH_BATCH_SIZE = ENV_TOKENS.get(
+    'SPLIT_DEFINITION_FETCH_BATCH_SIZE', SPLIT_DEFINITION_FETCH_BATCH_SIZE
+)
+SPLIT_DEFINITION_FETCH_THREADS = ENV_TOKENS.get('SPLIT_DEFINITION_FETCH_THREADS', SPLIT_DEFINITION_FETCH_THREADS)
+CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES', CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES
+)
+CONTENTSERVER_HOT_ASSET_CACHE_MAX_ITEM_BYTES = ENV_TOKENS.get(
+    'CONTENTSERVER_HOT_ASSET_CACHE_MAX_ITEM_BYTES', CONTENTSERVER_HOT_ASSET_CACHE_MAX_ITEM_BYTES
+)
+CONTENTSERVER_HOT_ASSET_CACHE_TIMEOUT = ENV_TOKENS.get(
+    'CONTENTSERVER_HOT_ASSET_CACHE_TIMEOUT', CONTENTSERVER_HOT_ASSET_CACHE_TIMEOUT
+)
+CAPA_PARSED_PROBLEM_CACHE_SIZE = ENV_TOKENS.get('CAPA_PARSED_PROBLEM_CACHE_SIZE', CAPA_PARSED_PROBLEM_CACHE_SIZE)
+CAPA_PARSED_PROBLEM_CACHE_TIMEOUT = ENV_TOKENS.get(
+    'CAPA_PARSED_PROBLEM_CACHE_TIMEOUT', CAPA_PARSED_PROBLEM_CACHE_TIMEOUT
+)
 
 EMAIL_HOST_USER = AUTH_TOKENS.get('EMAIL_HOST_USER', '')  # django default is ''
 EMAIL_HOST_PASSWORD = AUTH_TOKENS.get('EMAIL_HOST_PASSWORD', '')  # django default is ''
@@ -602,6 +627,9 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK = ENV_TOKENS.get(
+    'GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK', GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK
+)
 
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
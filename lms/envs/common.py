@@ -199,6 +199,10 @@ FEATURES = {
     # CSV files to the configured storage backend and give links for downloads.
     'ENABLE_GRADE_DOWNLOADS': False,
 
+    # Grade reports compute the course grades of each batch of students with
+    # NumPy arrays, rather than running the course grader once per student.
+    'ENABLE_GRADE_MATRIX': False,
+
     # whether to use password policy enforcement or not
     'ENFORCE_PASSWORD_POLICY': True,
 
@@ -743,6 +747,38 @@ MODULESTORE = {
     }
 }
 
+# Limits, in bytes of pickled data, of the process-local cache of course
+# structures that is kept in front of the 'course_structure_cache'.  Structures
+# larger than COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES aren't kept in the process.
+# A COURSE_STRUCTURE_LRU_MAX_BYTES of 0 disables the process-local cache.
+COURSE_STRUCTURE_LRU_MAX_BYTES = 64 * 1024 * 1024
+COURSE_STRUCTURE_LRU_MAX_ITEM_BYTES = 16 * 1024 * 1024
+
+# Limits, in bytes of BSON, of the process-local cache of split modulestore
+# definitions.  A COURSE_DEFINITION_LRU_MAX_BYTES of 0 disables the cache.
+COURSE_DEFINITION_LRU_MAX_BYTES = 32 * 1024 * 1024
+COURSE_DEFINITION_LRU_MAX_ITEM_BYTES = 1024 * 1024
+
+# The number of definitions read per query when the split modulestore reads
+# many definitions at once, and the number of those queries run concurrently.
+SPLIT_DEFINITION_FETCH_BATCH_SIZE = 1000
+SPLIT_DEFINITION_FETCH_THREADS = 4
+
+# Limits, in bytes, of the process-local cache of small, frequently served
+# course assets that the contentserver keeps in front of the 'course_assets'
+# cache, and the number of seconds an asset is kept there, since assets can be
+# replaced in Studio.  A CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES of 0 disables it.
+CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES = 32 * 1024 * 1024
+CONTENTSERVER_HOT_ASSET_CACHE_MAX_ITEM_BYTES = 256 * 1024
+CONTENTSERVER_HOT_ASSET_CACHE_TIMEOUT = 60
+
+# The number of capa problems whose parsed XML and script context, which only
+# depend on the problem text and seed, are kept in the process, and the number
+# of seconds they are kept, since the files they include can change.  A
+# CAPA_PARSED_PROBLEM_CACHE_SIZE of 0 disables the cache.
+CAPA_PARSED_PROBLEM_CACHE_SIZE = 512
+CAPA_PARSED_PROBLEM_CACHE_TIMEOUT = 300
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -756,6 +792,18 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Long-lived sandbox workers, which import the modules assumed by capa
+    # problems once and fork a child for each execution, instead of starting
+    # a new sandboxed Python each time.
+    'worker_pool': {
+        # How many workers can each process start?  0 disables the pool.
+        'size': 0,
+        # How many executions does a worker run before it's replaced?
+        'max_jobs': 100,
+        # How many seconds does a worker live before it's replaced?
+        'max_age': 600,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1797,6 +1845,24 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Maximum number of retries per task.
     BLOCK_STRUCTURES_TASK_MAX_RETRIES=5,
+
+    # Whether newly collected block structures are stored in the
+    # array-backed representation, which interns usage keys to integer
+    # indices and keeps block relations and data in flat arrays. This
+    # considerably reduces memory usage and copy time for large courses.
+    BLOCK_STRUCTURES_COMPACT_STORAGE=False,
+
+    # Whether newly collected block structures are also cached in shards,
+    # one per chapter, so that requests for blocks within a chapter (such
+    # as subsection grading) read only that chapter's data from the cache.
+    BLOCK_STRUCTURES_SHARDED_STORAGE=False,
+
+    # Whether a course publish updates the cached block structure in
+    # place, by collecting data only for the blocks that changed since
+    # the cached version (along with their descendants and ancestors),
+    # rather than clearing it and collecting the entire course anew.
+    # The cached block structure is still served until it is updated.
+    BLOCK_STRUCTURES_INCREMENTAL_COLLECT=False,
 )
 
 ################################ Bulk Email ###################################
@@ -2384,6 +2450,11 @@ BADGR_TIMEOUT = 10
 # the ones that contain information other than grades.
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Grade and problem grade reports of courses with more enrolled students than
+# this are generated in parallel by subtasks, each grading this many students.
+# If None, reports are always generated by a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK = None
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
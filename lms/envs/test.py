@@ -230,6 +230,12 @@ CACHES = {
     },
 }
 
+# Don't keep course structures, definitions, assets or problems in the process between tests
+COURSE_STRUCTURE_LRU_MAX_BYTES = 0
+COURSE_DEFINITION_LRU_MAX_BYTES = 0
+CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES = 0
+CAPA_PARSED_PROBLEM_CACHE_SIZE = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
@@ -170,18 +170,16 @@ class Bookmark(TimeStampedModel):
                 log.error(u'No path to block with usage_key: %s.', usage_key)
                 return []
 
-            path_data = []
-            for ancestor_usage_key in path:
-                if ancestor_usage_key != usage_key and ancestor_usage_key.block_type != 'course':  # pylint: disable=no-member
-                    try:
-                        block = modulestore().get_item(ancestor_usage_key)
-                    except ItemNotFoundError:
-                        return []  # No valid path can be found.
-                    path_data.append(
-                        PathItem(usage_key=block.location, display_name=block.display_name_with_default)
-                    )
-
-        return path_data
+            ancestor_usage_keys = [
+                ancestor_usage_key for ancestor_usage_key in path
+                if ancestor_usage_key != usage_key and ancestor_usage_key.block_type != 'course'  # pylint: disable=no-member
+            ]
+            try:
+                blocks = modulestore().get_items_by_keys(ancestor_usage_keys)
+            except ItemNotFoundError:
+                return []  # No valid path can be found.
+
+        return [PathItem(usage_key=block.location, display_name=block.display_name_with_default) for block in blocks]
 
 
 class XBlockCache(TimeStampedModel):
@@ -1,6 +1,7 @@
 """
 Higher order functions built on the BlockStructureManager to interact with a django cache.
 """
+from django.conf import settings
 from django.core.cache import cache
 from openedx.core.lib.block_structure.manager import BlockStructureManager
 from xmodule.modulestore.django import modulestore
@@ -28,6 +29,24 @@ def update_course_in_cache(course_key):
     return get_block_structure_manager(course_key).update_collected()
 
 
+def update_course_in_cache_incrementally(course_key):
+    """
+    A higher order function implemented on top of the
+    block_structure.update_collected_incrementally function that
+    updates the block structure in the cache for the given course_key
+    with the blocks that changed since it was collected.
+    """
+    return get_block_structure_manager(course_key).update_collected_incrementally()
+
+
+def is_incremental_collect_enabled():
+    """
+    Returns whether block structures are updated incrementally when
+    courses are published.
+    """
+    return settings.BLOCK_STRUCTURES_SETTINGS.get('BLOCK_STRUCTURES_INCREMENTAL_COLLECT', False)
+
+
 def clear_course_from_cache(course_key):
     """
     A higher order function implemented on top of the
@@ -48,7 +67,13 @@ def get_block_structure_manager(course_key):
     """
     store = modulestore()
     course_usage_key = store.make_course_usage_key(course_key)
-    return BlockStructureManager(course_usage_key, store, get_cache())
+    return BlockStructureManager(
+        course_usage_key,
+        store,
+        get_cache(),
+        compact=settings.BLOCK_STRUCTURES_SETTINGS.get('BLOCK_STRUCTURES_COMPACT_STORAGE', False),
+        sharded=settings.BLOCK_STRUCTURES_SETTINGS.get('BLOCK_STRUCTURES_SHARDED_STORAGE', False),
+    )
 
 
 def get_cache():
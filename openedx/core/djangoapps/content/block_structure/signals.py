@@ -6,7 +6,7 @@ from django.dispatch.dispatcher import receiver
 
 from xmodule.modulestore.django import SignalHandler
 
-from .api import clear_course_from_cache
+from .api import clear_course_from_cache, is_incremental_collect_enabled
 from .tasks import update_course_in_cache
 
 
@@ -15,13 +15,20 @@ def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable
     """
     Catches the signal that a course has been published in the module
     store and creates/updates the corresponding cache entry.
+
+    When incremental collection is enabled, the cache entry is kept so
+    that the task can determine which blocks changed since it was
+    collected.
     """
-    clear_course_from_cache(course_key)
+    incremental = is_incremental_collect_enabled()
+    if not incremental:
+        clear_course_from_cache(course_key)
 
     # The countdown=0 kwarg ensures the call occurs after the signal emitter
     # has finished all operations.
     update_course_in_cache.apply_async(
         [unicode(course_key)],
+        {'incremental': incremental},
         countdown=settings.BLOCK_STRUCTURES_SETTINGS['BLOCK_STRUCTURES_COURSE_PUBLISH_TASK_DELAY'],
     )
 
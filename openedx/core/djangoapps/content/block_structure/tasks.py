@@ -15,9 +15,15 @@ log = logging.getLogger('edx.celery.task')
     default_retry_delay=settings.BLOCK_STRUCTURES_SETTINGS['BLOCK_STRUCTURES_TASK_DEFAULT_RETRY_DELAY'],
     max_retries=settings.BLOCK_STRUCTURES_SETTINGS['BLOCK_STRUCTURES_TASK_MAX_RETRIES'],
 )
-def update_course_in_cache(course_key):
+def update_course_in_cache(course_key, incremental=False):
     """
     Updates the course blocks (in the database) for the specified course.
+
+    If incremental is True, data is collected only for the blocks that
+    changed since the cached course blocks were collected.
     """
     course_key = CourseKey.from_string(course_key)
-    api.update_course_in_cache(course_key)
+    if incremental:
+        api.update_course_in_cache_incrementally(course_key)
+    else:
+        api.update_course_in_cache(course_key)
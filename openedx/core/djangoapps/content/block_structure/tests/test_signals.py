@@ -1,15 +1,20 @@
 """
 Unit tests for the Course Blocks signals
 """
+import ddt
+from django.conf import settings
+from mock import patch
 
+from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ..api import get_block_structure_manager
 from .helpers import is_course_in_block_structure_cache
 
 
+@ddt.ddt
 class CourseBlocksSignalTest(ModuleStoreTestCase):
     """
     Tests for the Course Blocks signal
@@ -51,3 +56,29 @@ class CourseBlocksSignalTest(ModuleStoreTestCase):
             bs_manager.get_collected()
 
         self.assertFalse(is_course_in_block_structure_cache(self.course.id, self.store))
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_course_update_incremental(self, default_store):
+        with self.store.default_store(default_store):
+            course = CourseFactory.create()
+            chapter = ItemFactory.create(parent=course, category='chapter')
+            course_usage_key = self.store.make_course_usage_key(course.id)
+
+        bs_manager = get_block_structure_manager(course.id)
+        bs_manager.get_collected()
+
+        with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'BLOCK_STRUCTURES_INCREMENTAL_COLLECT': True}):
+            sequential = ItemFactory.create(parent=chapter, category='sequential', display_name='Lightsabers 101')
+            chapter = self.store.get_item(chapter.location)
+            chapter.display_name = 'Unit 1'
+            self.store.update_item(chapter, self.user.id)
+
+        # Cached version of course has been updated
+        updated_block_structure = bs_manager.get_collected()
+        self.assertIn(sequential.location, updated_block_structure)
+        self.assertIn(sequential.location, updated_block_structure.get_children(chapter.location))
+        self.assertEqual(
+            'Unit 1',
+            updated_block_structure.get_xblock_field(chapter.location, 'display_name')
+        )
+        self.assertIn(chapter.location, updated_block_structure.get_children(course_usage_key))
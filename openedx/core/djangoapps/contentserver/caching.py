@@ -1,6 +1,11 @@
 """
 Helper functions for caching course assets.
 """
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
 from opaque_keys import InvalidKeyError
@@ -14,6 +19,124 @@ except InvalidCacheBackendError:
     pass
 
 
+class HotAssetCache(object):
+    """
+    A process-local cache of small in-memory assets, which evicts the least
+    recently used assets once their total length exceeds `max_bytes`, and
+    which drops assets that were cached more than `timeout` seconds ago.
+
+    Assets can be replaced in Studio, and only the cache of the process that
+    replaced an asset is invalidated; the timeout bounds how long the other
+    processes keep serving the old asset.
+    """
+    def __init__(self, max_bytes, max_item_bytes, timeout):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.timeout = timeout
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def limits(self):
+        """
+        The (max_bytes, max_item_bytes, timeout) limits of this cache.
+        """
+        return self.max_bytes, self.max_item_bytes, self.timeout
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return the asset cached for `key`, or None, marking it as the most
+        recently used asset.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            content, cached_at = entry
+            if time.time() - cached_at > self.timeout:
+                self.current_bytes -= content.length
+                return None
+            self._entries[key] = entry
+            return content
+
+    def set(self, key, content):
+        """
+        Cache the in-memory asset `content` for `key`, evicting the least
+        recently used assets as needed.
+        """
+        if content.length is None or content.length > self.max_item_bytes or content.length > self.max_bytes:
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (content, time.time())
+            self.current_bytes += content.length
+            while self.current_bytes > self.max_bytes:
+                _evicted_key, (evicted_content, _cached_at) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_content.length
+
+    def delete(self, key):
+        """
+        Remove the asset cached for `key`, if any.
+        """
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key):
+        """
+        Remove the asset cached for `key`, if any, with the lock held.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[0].length
+
+
+_HOT_ASSET_CACHE = {}
+
+
+def get_hot_asset_cache():
+    """
+    Return the process-local :class:`HotAssetCache`, sized according to the
+    CONTENTSERVER_HOT_ASSET_CACHE_* settings, or None if it is disabled.
+    """
+    max_bytes = getattr(settings, 'CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        return None
+
+    limits = (
+        max_bytes,
+        getattr(settings, 'CONTENTSERVER_HOT_ASSET_CACHE_MAX_ITEM_BYTES', max_bytes),
+        getattr(settings, 'CONTENTSERVER_HOT_ASSET_CACHE_TIMEOUT', 60),
+    )
+    cache = _HOT_ASSET_CACHE.get('cache')
+    if cache is None or cache.limits != limits:
+        cache = _HOT_ASSET_CACHE['cache'] = HotAssetCache(*limits)
+    return cache
+
+
+def get_hot_content(location):
+    """
+    Retrieves the given piece of content by its location if it is cached in the process.
+    """
+    cache = get_hot_asset_cache()
+    if cache is None:
+        return None
+    return cache.get(unicode(location).encode("utf-8"))
+
+
+def set_hot_content(content):
+    """
+    Stores the given piece of in-memory content in the process, if it is small enough.
+    """
+    cache = get_hot_asset_cache()
+    if cache is not None:
+        cache.set(unicode(content.location).encode("utf-8"), content)
+
+
 def set_cached_content(content):
     """
     Stores the given piece of content in the cache, using its location as the key.
@@ -47,3 +170,8 @@ def del_cached_content(location):
         pass
 
     CONTENT_CACHE.delete_many(locations, version=STATIC_CONTENT_VERSION)
+
+    hot_asset_cache = get_hot_asset_cache()
+    if hot_asset_cache is not None:
+        for location in locations:
+            hot_asset_cache.delete(location)
@@ -4,19 +4,22 @@ Middleware to serve assets.
 
 import logging
 import datetime
+from uuid import uuid4
 import newrelic.agent
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect,
+    StreamingHttpResponse)
+from django.utils.http import parse_etags, quote_etag
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
-from .caching import get_cached_content, set_cached_content
+from .caching import get_cached_content, get_hot_content, set_cached_content, set_hot_content
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -28,6 +31,12 @@ from .models import CourseAssetCacheTtlConfig, CdnUserAgentsConfig
 log = logging.getLogger(__name__)
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# Assets smaller than this are read into memory and cached in the 'course_assets' cache, while
+# larger ones are streamed from the contentstore. We cap this at 1MB because it's the default
+# for memcached and also we don't want to do too much buffering in memory when we're serving
+# an actual request.
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
 
 class StaticContentServer(object):
     """
@@ -103,25 +112,33 @@ class StaticContentServer(object):
                 return HttpResponseForbidden('Unauthorized')
 
             # Figure out if the client sent us a conditional request, and let them know
-            # if this asset has changed since then.
-            last_modified_at_str = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            # if this asset has changed since then. An If-None-Match header takes
+            # precedence over an If-Modified-Since header.
+            etag = self.get_etag(content)
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag is not None and self.etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag):
+                    response = HttpResponseNotModified()
+                    response['ETag'] = etag
+                    return response
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+                last_modified_at_str = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
-            # *** File streaming within a byte range ***
+            # *** File streaming within byte ranges ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
+            # Request -> Range attribute structure: "Range: bytes=first-[last][, first-[last]...]"
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
+            # Several ranges are sent back as the parts of a multipart/byteranges response.
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
+            # If an If-Range is provided, the ranges are only sent if the asset is still the one
+            # the client has parts of; otherwise, the whole asset is sent.
+            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
-                if isinstance(content, StaticContent):
-                    content = AssetManager.find(loc, as_stream=True)
-
+            content_type = content.content_type
+            if request.META.get('HTTP_RANGE') and self.if_range_matches(request, content, etag):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -134,19 +151,11 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        ranges = coalesce_ranges(ranges, content.length)
+                        if len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = self.make_response(content, content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
@@ -154,15 +163,30 @@ class StaticContentServer(object):
                             response.status_code = 206  # Partial Content
 
                             newrelic.agent.add_custom_parameter('contentserver.ranged', True)
+                        elif ranges:
+                            # According to Http/1.1 spec content for multiple ranges should be sent as a
+                            # multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            boundary = uuid4().hex
+                            parts = multipart_byteranges(content, ranges, boundary)
+                            response = self.make_response(content, (chunk for part in parts for chunk in part))
+                            response['Content-Length'] = str(multipart_byteranges_length(content, ranges, boundary))
+                            response.status_code = 206  # Partial Content
+                            content_type = 'multipart/byteranges; boundary={}'.format(boundary)
+
+                            newrelic.agent.add_custom_parameter('contentserver.ranged', True)
+                            newrelic.agent.add_custom_parameter('contentserver.multipart_ranges', len(ranges))
                         else:
                             log.warning(
                                 u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
                             )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response = HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Range'] = 'bytes */{length}'.format(length=content.length)
+                            return response
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = self.make_response(content, content.stream_data())
                 response['Content-Length'] = content.length
 
             newrelic.agent.add_custom_parameter('contentserver.content_len', content.length)
@@ -170,7 +194,9 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
+            response['Content-Type'] = content_type
+            if etag is not None:
+                response['ETag'] = etag
 
             # Set any caching headers, and do any response cleanup needed.  Based on how much
             # middleware we have in place, there's no easy way to use the built-in Django
@@ -180,6 +206,52 @@ class StaticContentServer(object):
 
             return response
 
+    @staticmethod
+    def make_response(content, data):
+        """
+        Returns a response with the given iterator over the data of the content. The data of
+        content streamed from the contentstore is streamed to the client as it is read, rather
+        than being read into memory first.
+        """
+        if isinstance(content, StaticContentStream):
+            return StreamingHttpResponse(data)
+        return HttpResponse(data)
+
+    @staticmethod
+    def if_range_matches(request, content, etag):
+        """
+        Returns whether the ranges of the request should be sent, i.e. whether the request has no
+        If-Range header, or whether it matches the ETag or the modification date of the content.
+        Weak entity tags never match.
+        """
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('W/'):
+            return False
+        if if_range.startswith('"'):
+            return etag is not None and if_range == etag
+        return if_range == content.last_modified_at.strftime(HTTP_DATE_FORMAT)
+
+    @staticmethod
+    def get_etag(content):
+        """
+        Returns the quoted ETag of the content, i.e. its digest, or None if it has no digest.
+        """
+        content_digest = getattr(content, "content_digest", None)
+        if not content_digest:
+            return None
+        return quote_etag(content_digest)
+
+    @staticmethod
+    def etag_matches(if_none_match, etag):
+        """
+        Returns whether the If-None-Match header value matches the quoted ETag.
+        """
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in [quote_etag(tag) for tag in etags]
+
     def set_caching_headers(self, content, response):
         """
         Sets caching headers based on whether or not the asset is locked.
@@ -263,6 +335,11 @@ class StaticContentServer(object):
         or loading it directly from the contentstore.
         """
 
+        # See if this item is one of the small assets kept in this process.
+        content = get_hot_content(location)
+        if content is not None:
+            return content
+
         # See if we can load this item from cache.
         content = get_cached_content(location)
         if content is None:
@@ -272,13 +349,15 @@ class StaticContentServer(object):
             except (ItemNotFoundError, NotFoundError):
                 raise
 
-            # Now that we fetched it, let's go ahead and try to cache it. We cap this at 1MB
-            # because it's the default for memcached and also we don't want to do too much
-            # buffering in memory when we're serving an actual request.
-            if content.length is not None and content.length < 1048576:
+            # Now that we fetched it, let's go ahead and try to cache it, if it's small enough.
+            # Larger assets are streamed from the contentstore a chunk at a time.
+            if content.length is not None and content.length < MAX_CACHED_CONTENT_LENGTH:
                 content = content.copy_to_in_mem()
                 set_cached_content(content)
 
+        if not isinstance(content, StaticContentStream):
+            set_hot_content(content)
+
         return content
 
 
@@ -323,3 +402,72 @@ def parse_range_header(header_value, content_length):
         raise ValueError('Invalid syntax')
 
     return unit, ranges
+
+
+# Satisfiable ranges separated by fewer bytes than this are sent as a single range, since the
+# headers of an additional part of a multipart/byteranges response are about as long.
+RANGE_COALESCE_GAP = 80
+
+
+def coalesce_ranges(ranges, content_length):
+    """
+    Returns the satisfiable ranges of the given list of (first, last) tuples, sorted, with the
+    ranges that overlap or that are less than RANGE_COALESCE_GAP bytes apart merged.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35.1
+    """
+    coalesced = []
+    for first, last in sorted(
+            (first, last) for first, last in ranges if 0 <= first <= last < content_length
+    ):
+        if coalesced and first - coalesced[-1][1] <= RANGE_COALESCE_GAP:
+            coalesced[-1] = (coalesced[-1][0], max(coalesced[-1][1], last))
+        else:
+            coalesced.append((first, last))
+    return coalesced
+
+
+def _multipart_byteranges_part_header(content, first, last, boundary):
+    """
+    Returns the boundary and the headers of the part of a multipart/byteranges body for the
+    range of the content from first to last.
+    """
+    return (
+        '--{boundary}\r\n'
+        'Content-Type: {content_type}\r\n'
+        'Content-Range: bytes {first}-{last}/{length}\r\n'
+        '\r\n'
+    ).format(
+        boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+    ).encode('utf-8')
+
+
+def _multipart_byteranges_end(boundary):
+    """
+    Returns the final boundary of a multipart/byteranges body.
+    """
+    return '--{boundary}--\r\n'.format(boundary=boundary)
+
+
+def multipart_byteranges(content, ranges, boundary):
+    """
+    Yields the parts of the multipart/byteranges body of the given ranges of the content, each of
+    which is an iterable of strings. The data of each range is streamed from the content.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    for first, last in ranges:
+        yield [_multipart_byteranges_part_header(content, first, last, boundary)]
+        yield content.stream_data_in_range(first, last)
+        yield ['\r\n']
+    yield [_multipart_byteranges_end(boundary)]
+
+
+def multipart_byteranges_length(content, ranges, boundary):
+    """
+    Returns the length of the multipart/byteranges body of the given ranges of the content.
+    """
+    return sum(
+        len(_multipart_byteranges_part_header(content, first, last, boundary)) + (last - first + 1) + len('\r\n')
+        for first, last in ranges
+    ) + len(_multipart_byteranges_end(boundary))
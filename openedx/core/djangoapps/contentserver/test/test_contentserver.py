@@ -27,7 +27,8 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
-from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
+from ..caching import HotAssetCache, del_cached_content, get_hot_content
+from ..middleware import coalesce_ranges, parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
 
 log = logging.getLogger(__name__)
 
@@ -242,16 +243,53 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges message
+        with a part per range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
         resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
             first=first_byte, last=last_byte))
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        content_type, boundary = resp['Content-Type'].split('; boundary=')
+        self.assertEqual(content_type, 'multipart/byteranges')
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        content = self.contentstore.find(self.unlocked_asset)
+        expected_parts = [
+            '\r\nContent-Type: {}\r\nContent-Range: bytes {}-{}/{}\r\n\r\n{}\r\n'.format(
+                content.content_type, first, last, self.length_unlocked, content.data[first:last + 1]
+            )
+            for first, last in ((first_byte, last_byte), (self.length_unlocked - 100, self.length_unlocked - 1))
+        ]
+        self.assertEqual(resp.content.split('--{}'.format(boundary)), [''] + expected_parts + ['--\r\n'])
+
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that overlapping ranges are sent as a single range.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100-199, 0-99, 150-250')
+
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-250/{}'.format(self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '251')
+
+    def test_range_request_if_range(self):
+        """
+        Test that ranges are only sent if the If-Range matches the asset.
+        """
+        content = self.contentstore.find(self.unlocked_asset)
+        for if_range, expected_status_code in (
+                ('"{}"'.format(content.content_digest), 206),
+                (content.last_modified_at.strftime(HTTP_DATE_FORMAT), 206),
+                ('"{}"'.format(FAKE_MD5_HASH), 200),
+                ('W/"{}"'.format(content.content_digest), 200),
+                ('Thu, 01 Jan 1970 00:00:00 GMT', 200),
+        ):
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=if_range)
+            self.assertEqual(resp.status_code, expected_status_code)
 
     @ddt.data(
         'bytes 0-',
@@ -275,6 +313,7 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
         resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}'.format(
             first=(self.length_unlocked / 2), last=(self.length_unlocked / 4)))
         self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp['Content-Range'], 'bytes */{}'.format(self.length_unlocked))
 
     def test_range_request_malformed_out_of_bounds(self):
         """
@@ -285,6 +324,41 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
             first=(self.length_unlocked), last=(self.length_unlocked)))
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag(self):
+        """
+        Test that assets are sent with an ETag of their digest, and that requests whose
+        If-None-Match matches it are answered with 304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        content_digest = self.contentstore.find(self.unlocked_asset).content_digest
+        self.assertEqual(resp['ETag'], '"{}"'.format(content_digest))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", "{}"'.format(content_digest))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], '"{}"'.format(content_digest))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"{}"'.format(FAKE_MD5_HASH))
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(CONTENTSERVER_HOT_ASSET_CACHE_MAX_BYTES=1024 * 1024)
+    def test_hot_asset_cache(self):
+        """
+        Test that small assets are kept in the process once they are served.
+        """
+        self.addCleanup(del_cached_content, self.unlocked_asset)
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNotNone(get_hot_content(self.unlocked_asset))
+
+        with patch('openedx.core.djangoapps.contentserver.middleware.get_cached_content') as mock_get_cached_content:
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(mock_get_cached_content.called)
+
+        del_cached_content(self.unlocked_asset)
+        self.assertIsNone(get_hot_content(self.unlocked_asset))
+
     def test_vary_header_sent(self):
         """
         Tests that we're properly setting the Vary header to ensure browser requests don't get
@@ -447,3 +521,61 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+@ddt.ddt
+class CoalesceRangesTestCase(unittest.TestCase):
+    """
+    Tests for the coalesce_ranges function.
+    """
+    @ddt.data(
+        ([(0, 9)], [(0, 9)]),
+        ([(500, 599), (0, 9)], [(0, 9), (500, 599)]),
+        ([(0, 9), (5, 20)], [(0, 20)]),
+        ([(0, 9), (10, 20)], [(0, 20)]),
+        ([(0, 99), (10, 20)], [(0, 99)]),
+        ([(0, 9), (80, 99)], [(0, 99)]),
+        ([(0, 9), (100, 199)], [(0, 9), (100, 199)]),
+        ([(20, 10), (0, 9), (1000, 1001)], [(0, 9)]),
+        ([(1000, 1001)], []),
+    )
+    @ddt.unpack
+    def test_coalesce_ranges(self, ranges, expected_ranges):
+        self.assertEqual(coalesce_ranges(ranges, 1000), expected_ranges)
+
+
+class HotAssetCacheTestCase(unittest.TestCase):
+    """
+    Tests for the process-local cache of small assets.
+    """
+    def _content(self, name, length):
+        """
+        Returns in-memory content of the given length.
+        """
+        return StaticContent(name, name, 'text/plain', 'x' * length, length=length)
+
+    def test_eviction(self):
+        cache = HotAssetCache(max_bytes=100, max_item_bytes=60, timeout=60)
+        cache.set('a', self._content('a', 40))
+        cache.set('b', self._content('b', 40))
+        self.assertIsNotNone(cache.get('a'))
+        cache.set('c', self._content('c', 40))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.current_bytes, 80)
+
+        cache.set('big', self._content('big', 61))
+        self.assertIsNone(cache.get('big'))
+
+        cache.delete('a')
+        self.assertEqual((len(cache), cache.current_bytes), (1, 40))
+
+    def test_timeout(self):
+        cache = HotAssetCache(max_bytes=100, max_item_bytes=100, timeout=60)
+        with patch('openedx.core.djangoapps.contentserver.caching.time.time', return_value=1000):
+            cache.set('a', self._content('a', 40))
+        with patch('openedx.core.djangoapps.contentserver.caching.time.time', return_value=1060):
+            self.assertIsNotNone(cache.get('a'))
+        with patch('openedx.core.djangoapps.contentserver.caching.time.time', return_value=1061):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual((len(cache), cache.current_bytes), (0, 0))
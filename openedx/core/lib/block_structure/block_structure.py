@@ -714,6 +714,13 @@ class BlockStructureBlockData(BlockStructure):
     #--- Internal methods ---#
     # To be used within the block_structure framework or by tests.
 
+    def _copy_block_data(self, usage_key):
+        """
+        Returns a deep-copy of the BlockData associated with the given
+        usage_key, or None if the block has no collected data.
+        """
+        return deepcopy(self._block_data_map.get(usage_key))
+
     def _get_transformer_data_version(self, transformer):
         """
         Returns the version number stored for the given transformer.
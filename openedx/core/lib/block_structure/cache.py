@@ -7,7 +7,10 @@ from logging import getLogger
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
 from .block_structure import BlockStructureBlockData
+from .compact import CompactBlockStructureBlockData
+from .exceptions import BlockStructureSerializationError
 from .factory import BlockStructureFactory
+from .serialization import BlockStructureSerializer
 
 
 logger = getLogger(__name__)  # pylint: disable=C0103
@@ -26,33 +29,33 @@ class BlockStructureCache(object):
         """
         self._cache = cache
 
+    # Set the timeout value for the cache to 1 day as a fail-safe
+    # in case the signal to invalidate the cache doesn't come through.
+    TIMEOUT_IN_SECONDS = 60 * 60 * 24
+
     def add(self, block_structure):
         """
-        Store a compressed and pickled serialization of the given
-        block structure into the given cache.
+        Store a serialization of the given block structure into the
+        given cache.
 
         The key in the cache is 'root.key.<root_block_usage_key>'.
         The data stored in the cache includes the structure's
         block relations, transformer data, and block data.
 
+        Compact block structures are stored in the versioned binary
+        format of BlockStructureSerializer, which can be decoded lazily
+        per transformer and per xBlock field.  Other block structures
+        are stored as a compressed pickle.
+
         Arguments:
             block_structure (BlockStructure) - The block structure
                 that is to be serialized to the given cache.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure.transformer_data,
-            block_structure._block_data_map,
-        )
-        zp_data_to_cache = zpickle(data_to_cache)
-
-        # Set the timeout value for the cache to 1 day as a fail-safe
-        # in case the signal to invalidate the cache doesn't come through.
-        timeout_in_seconds = 60 * 60 * 24
+        zp_data_to_cache = self._serialize(block_structure)
         self._cache.set(
             self._encode_root_cache_key(block_structure.root_block_usage_key),
             zp_data_to_cache,
-            timeout=timeout_in_seconds,
+            timeout=self.TIMEOUT_IN_SECONDS,
         )
 
         logger.info(
@@ -97,30 +100,156 @@ class BlockStructureCache(object):
             )
 
         # Deserialize and construct the block structure.
-        block_relations, transformer_data, block_data_map = zunpickle(zp_data_from_cache)
-        return BlockStructureFactory.create_new(
+        return self._deserialize(root_block_usage_key, zp_data_from_cache)
+
+    def add_shards(self, block_structure):
+        """
+        Store a serialization of each subtree (shard) of the given block
+        structure into the given cache, so that the block structure
+        starting at a block within a subtree can later be read without
+        reading the entire block structure.
+
+        A shard is created for each child of the root block.  Each shard
+        contains the blocks in the child's subtree, the root block, and
+        the structure-wide transformer data.  An index of which shard
+        each block is in is stored alongside the shards.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The collected
+                block structure whose shards are to be serialized to
+                the given cache.
+        """
+        root_block_usage_key = block_structure.root_block_usage_key
+        shard_index = {}
+        data_to_cache = {}
+        for shard_number, shard_root_key in enumerate(block_structure.get_children(root_block_usage_key)):
+            shard = BlockStructureFactory.create_subtree(block_structure, shard_root_key)
+            data_to_cache[self._encode_shard_cache_key(root_block_usage_key, shard_number)] = self._serialize(shard)
+            for block_key in shard:
+                shard_index.setdefault(unicode(block_key), shard_number)
+        shard_index.pop(unicode(root_block_usage_key), None)
+
+        data_to_cache[self._encode_shard_index_cache_key(root_block_usage_key)] = zpickle(
+            (len(data_to_cache), shard_index)
+        )
+        self._cache.set_many(data_to_cache, timeout=self.TIMEOUT_IN_SECONDS)
+
+        logger.info(
+            "Wrote %d BlockStructure shards for %s to cache, size: %s",
+            len(data_to_cache) - 1,
             root_block_usage_key,
-            block_relations,
-            transformer_data,
-            block_data_map,
+            sum(len(data) for data in data_to_cache.itervalues()),
+        )
+
+    def get_shard(self, root_block_usage_key, usage_key):
+        """
+        Deserializes and returns the shard of the block structure
+        starting at root_block_usage_key that contains the block for the
+        given usage_key, if it's found in the cache.
+
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage_key for the root
+                of the block structure.
+
+            usage_key (UsageKey) - The usage_key of a block within the
+                requested shard.
+
+        Returns:
+            BlockStructure - The deserialized shard, with
+            root_block_usage_key as its root, if found in the cache.
+
+            NoneType - If no shard for the usage_key is found in the cache.
+        """
+        zp_shard_index = self._cache.get(self._encode_shard_index_cache_key(root_block_usage_key))
+        if not zp_shard_index:
+            return None
+        __, shard_index = zunpickle(zp_shard_index)
+        shard_number = shard_index.get(unicode(usage_key))
+        if shard_number is None:
+            return None
+
+        zp_data_from_cache = self._cache.get(self._encode_shard_cache_key(root_block_usage_key, shard_number))
+        if not zp_data_from_cache:
+            logger.info(
+                "Did not find shard for %r of BlockStructure %r in the cache.",
+                usage_key,
+                root_block_usage_key,
+            )
+            return None
+
+        logger.info(
+            "Read shard for %r of BlockStructure %r from cache, size: %s",
+            usage_key,
+            root_block_usage_key,
+            len(zp_data_from_cache),
         )
+        return self._deserialize(root_block_usage_key, zp_data_from_cache)
 
     def delete(self, root_block_usage_key):
         """
-        Deletes the block structure for the given root_block_usage_key
-        from the given cache.
+        Deletes the block structure, and any of its shards, for the
+        given root_block_usage_key from the given cache.
 
         Arguments:
             root_block_usage_key (UsageKey) - The usage_key for the root
                 of the block structure that is to be removed from
                 the cache.
         """
-        self._cache.delete(self._encode_root_cache_key(root_block_usage_key))
+        keys_to_delete = [self._encode_root_cache_key(root_block_usage_key)]
+        shard_index_key = self._encode_shard_index_cache_key(root_block_usage_key)
+        zp_shard_index = self._cache.get(shard_index_key)
+        if zp_shard_index:
+            num_shards, __ = zunpickle(zp_shard_index)
+            keys_to_delete.append(shard_index_key)
+            keys_to_delete.extend(
+                self._encode_shard_cache_key(root_block_usage_key, shard_number)
+                for shard_number in xrange(num_shards)
+            )
+        self._cache.delete_many(keys_to_delete)
         logger.info(
             "Deleted BlockStructure %r from the cache.",
             root_block_usage_key,
         )
 
+    @classmethod
+    def _serialize(cls, block_structure):
+        """
+        Returns the serialization of the given block structure, in the
+        format described in add.
+        """
+        if isinstance(block_structure, CompactBlockStructureBlockData):
+            return BlockStructureSerializer.serialize(block_structure)
+        return zpickle((
+            block_structure._block_relations,
+            block_structure.transformer_data,
+            block_structure._block_data_map,
+        ))
+
+    @classmethod
+    def _deserialize(cls, root_block_usage_key, zp_data_from_cache):
+        """
+        Returns the block structure for the given serialization, or None
+        if it cannot be deserialized.
+        """
+        if BlockStructureSerializer.is_serialized(zp_data_from_cache):
+            try:
+                return BlockStructureSerializer.deserialize(root_block_usage_key, zp_data_from_cache)
+            except BlockStructureSerializationError as error:
+                logger.warning(
+                    "Could not deserialize BlockStructure %r from cache: %s",
+                    root_block_usage_key,
+                    error,
+                )
+                return None
+
+        block_relations, transformer_data, block_data_map = zunpickle(zp_data_from_cache)
+        return BlockStructureFactory.create_new(
+            root_block_usage_key,
+            block_relations,
+            transformer_data,
+            block_data_map,
+        )
+
     @classmethod
     def _encode_root_cache_key(cls, root_block_usage_key):
         """
@@ -131,3 +260,22 @@ class BlockStructureCache(object):
             version=unicode(BlockStructureBlockData.VERSION),
             root_usage_key=unicode(root_block_usage_key),
         )
+
+    @classmethod
+    def _encode_shard_index_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing the index of the shards
+        of the block structure for the given root_block_usage_key.
+        """
+        return cls._encode_root_cache_key(root_block_usage_key) + ".shards"
+
+    @classmethod
+    def _encode_shard_cache_key(cls, root_block_usage_key, shard_number):
+        """
+        Returns the cache key to use for storing the given shard of the
+        block structure for the given root_block_usage_key.
+        """
+        return "{root_cache_key}.shard.{shard_number}".format(
+            root_cache_key=cls._encode_root_cache_key(root_block_usage_key),
+            shard_number=shard_number,
+        )
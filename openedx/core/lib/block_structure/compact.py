@@ -0,0 +1,926 @@
+"""
+Module with an array-backed storage mode for block structures.
+    CompactBlockStructureBlockData - A BlockStructureBlockData whose
+        relations and collected data are stored by dense integer
+        block indices instead of per-block objects keyed by UsageKey.
+
+The following internal data structures are implemented:
+    _BlockKeyIndex - Interns usage keys to dense integer indices.
+    _CompactBlockRelations - Parent/child adjacency stored in flat
+        (CSR-style) arrays of block indices.
+    _BlockDataColumns - Collected xBlock fields and transformer block
+        fields stored as columns indexed by block index.
+
+For large courses, the per-block _BlockRelations and BlockData objects
+(and their dicts) of BlockStructureBlockData dominate both memory usage
+and the time spent copying, pickling and traversing a block structure.
+The classes in this module keep the same public interface while storing
+only a handful of flat arrays and lists per structure.
+"""
+from array import array
+from copy import deepcopy
+
+from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order
+
+from .block_structure import BlockData, BlockStructureBlockData
+
+
+# Array typecode used for storing block indices.
+_INDEX_TYPECODE = 'i'
+
+
+class _MissingValue(object):
+    """
+    Sentinel type for an unset entry in a data column.  A sentinel is
+    needed (rather than None) since None is a valid collected value.
+    The sentinel keeps its identity across pickling and copying.
+    """
+    def __reduce__(self):
+        return '_MISSING'
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return '<missing>'
+
+
+_MISSING = _MissingValue()
+
+
+class _BlockKeyIndex(object):
+    """
+    Data structure that interns usage keys to dense integer indices,
+    so the rest of the structure can refer to blocks by index.
+    """
+    def __init__(self, keys=None):
+
+        # List of usage keys, in order of their index.
+        # list [UsageKey]
+        self.keys = list(keys or [])
+
+        # Map of a usage key to its index in self.keys.
+        # dict {UsageKey: int}
+        self.indices = {usage_key: index for index, usage_key in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, usage_key):
+        return usage_key in self.indices
+
+    def __getstate__(self):
+        # The indices map is derivable from the keys, so only the keys
+        # are serialized.
+        return self.keys
+
+    def __setstate__(self, keys):
+        self.__init__(keys)
+
+    def intern(self, usage_key):
+        """
+        Returns the index of the given usage_key, assigning it the next
+        available index if it is not yet known.
+        """
+        try:
+            return self.indices[usage_key]
+        except KeyError:
+            index = len(self.keys)
+            self.keys.append(usage_key)
+            self.indices[usage_key] = index
+            return index
+
+    def copy(self):
+        """
+        Returns a copy of this index.  The copied dict reuses the stored
+        hashes of the keys, so no usage key is rehashed.
+        """
+        new_index = _BlockKeyIndex()
+        new_index.keys = list(self.keys)
+        new_index.indices = self.indices.copy()
+        return new_index
+
+
+class _CompactBlockRelations(object):
+    """
+    Data structure to encapsulate the relationships of all blocks in a
+    structure, stored by block index.
+
+    The relations are kept in compressed sparse row (CSR) form: the
+    children of the block with index i are
+    child_targets[child_offsets[i]:child_offsets[i + 1]], and similarly
+    for parents.  Since CSR arrays are expensive to update in place,
+    the relations of a block that is mutated after construction are
+    moved into a per-block list override (copy-on-write).
+    """
+    def __init__(self, key_index=None):
+
+        # Interned usage keys of all blocks, whether present or not.
+        # _BlockKeyIndex
+        self.key_index = key_index if key_index is not None else _BlockKeyIndex()
+
+        # CSR arrays of children and parents indices.
+        # array [int]
+        self.child_offsets = array(_INDEX_TYPECODE, [0])
+        self.child_targets = array(_INDEX_TYPECODE)
+        self.parent_offsets = array(_INDEX_TYPECODE, [0])
+        self.parent_targets = array(_INDEX_TYPECODE)
+
+        # Map of a block's index to its mutated children/parents.
+        # dict {int: [int]}
+        self.children_overrides = {}
+        self.parents_overrides = {}
+
+        # Whether the block at each index is present in the structure.
+        # bytearray
+        self.present = bytearray(len(self.key_index))
+
+        # Number of blocks present in the structure.
+        self.num_present = 0
+
+    @classmethod
+    def from_block_relations(cls, block_relations, key_index=None):
+        """
+        Returns a new _CompactBlockRelations with the same contents as
+        the given dict-based block relations.
+
+        Arguments:
+            block_relations (dict({UsageKey: _BlockRelations})) -
+                Map of a block's usage key to its parents/children
+                relations, as stored by BlockStructure.
+
+            key_index (_BlockKeyIndex) - Optional index to intern the
+                usage keys into.
+        """
+        key_index = key_index if key_index is not None else _BlockKeyIndex()
+        for usage_key in block_relations:
+            key_index.intern(usage_key)
+
+        compact_relations = cls(key_index)
+        indices = key_index.indices
+        for usage_key in key_index.keys:
+            relations = block_relations.get(usage_key)
+            if relations is not None:
+                compact_relations.child_targets.extend(indices[child] for child in relations.children)
+                compact_relations.parent_targets.extend(indices[parent] for parent in relations.parents)
+                compact_relations.present[indices[usage_key]] = 1
+            compact_relations.child_offsets.append(len(compact_relations.child_targets))
+            compact_relations.parent_offsets.append(len(compact_relations.parent_targets))
+        compact_relations.num_present = len(block_relations)
+        return compact_relations
+
+    def __len__(self):
+        return self.num_present
+
+    def __contains__(self, usage_key):
+        index = self.key_index.indices.get(usage_key)
+        return index is not None and index < len(self.present) and self.present[index] == 1
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def iterkeys(self):
+        """
+        Returns an iterator of the usage keys of all present blocks.
+        """
+        keys = self.key_index.keys
+        present = self.present
+        return (keys[index] for index in xrange(len(present)) if present[index])
+
+    def index(self, usage_key):
+        """
+        Returns the index of the given present block.
+
+        Raises KeyError if the block is not present.
+        """
+        index = self.key_index.indices[usage_key]
+        if index >= len(self.present) or not self.present[index]:
+            raise KeyError(usage_key)
+        return index
+
+    def children(self, index):
+        """
+        Returns a sequence of the indices of the given block's children.
+        """
+        return self._get_adjacent(index, self.children_overrides, self.child_offsets, self.child_targets)
+
+    def parents(self, index):
+        """
+        Returns a sequence of the indices of the given block's parents.
+        """
+        return self._get_adjacent(index, self.parents_overrides, self.parent_offsets, self.parent_targets)
+
+    def mutable_children(self, index):
+        """
+        Returns a mutable list of the indices of the given block's
+        children, moving them out of the CSR arrays if needed.
+        """
+        return self._get_mutable_adjacent(index, self.children_overrides, self.child_offsets, self.child_targets)
+
+    def mutable_parents(self, index):
+        """
+        Returns a mutable list of the indices of the given block's
+        parents, moving them out of the CSR arrays if needed.
+        """
+        return self._get_mutable_adjacent(index, self.parents_overrides, self.parent_offsets, self.parent_targets)
+
+    def add_block(self, usage_key):
+        """
+        Adds the given usage_key to the relations, if not already
+        present, and returns its index.
+        """
+        index = self.key_index.intern(usage_key)
+        if index >= len(self.present):
+            self.present.extend(bytearray(index + 1 - len(self.present)))
+        if not self.present[index]:
+            self.present[index] = 1
+            self.num_present += 1
+            # A block that is re-added starts out with no relations.
+            self.children_overrides[index] = []
+            self.parents_overrides[index] = []
+        return index
+
+    def add_relation(self, parent_index, child_index):
+        """
+        Adds a parent to child relationship between the given blocks.
+        """
+        self.mutable_parents(child_index).append(parent_index)
+        self.mutable_children(parent_index).append(child_index)
+
+    def remove_block(self, index):
+        """
+        Marks the given block as no longer present.  The caller is
+        responsible for updating the relations of its neighbors.
+        """
+        if self.present[index]:
+            self.present[index] = 0
+            self.num_present -= 1
+        # Mask any relations left in the CSR arrays.
+        self.children_overrides[index] = []
+        self.parents_overrides[index] = []
+
+    def pruned(self, reachable_indices):
+        """
+        Returns new relations that contain only the given reachable
+        blocks, rebuilt into CSR arrays.  Block indices are unchanged so
+        any data stored by index remains valid.
+
+        Arguments:
+            reachable_indices (list [int]) - Indices of the blocks to
+                keep, in post-order (children before their parents).
+        """
+        reachable = bytearray(len(self.present))
+        children_lists = {}
+        parents_lists = {}
+        for index in reachable_indices:
+            reachable[index] = 1
+            children = [child for child in self.children(index) if reachable[child]]
+            children_lists[index] = children
+            parents_lists[index] = []
+            for child in children:
+                parents_lists[child].append(index)
+
+        pruned_relations = _CompactBlockRelations(self.key_index)
+        pruned_relations.present = reachable
+        pruned_relations.num_present = len(children_lists)
+        for index in xrange(len(reachable)):
+            if reachable[index]:
+                pruned_relations.child_targets.extend(children_lists[index])
+                pruned_relations.parent_targets.extend(parents_lists[index])
+            pruned_relations.child_offsets.append(len(pruned_relations.child_targets))
+            pruned_relations.parent_offsets.append(len(pruned_relations.parent_targets))
+        return pruned_relations
+
+    def consolidated(self):
+        """
+        Returns new relations with the same contents, where the
+        relations of mutated blocks are folded back into the CSR arrays.
+        Block indices are unchanged.
+        """
+        consolidated_relations = _CompactBlockRelations(self.key_index)
+        consolidated_relations.present = bytearray(self.present)
+        consolidated_relations.num_present = self.num_present
+        for index in xrange(len(self.present)):
+            if self.present[index]:
+                consolidated_relations.child_targets.extend(self.children(index))
+                consolidated_relations.parent_targets.extend(self.parents(index))
+            consolidated_relations.child_offsets.append(len(consolidated_relations.child_targets))
+            consolidated_relations.parent_offsets.append(len(consolidated_relations.parent_targets))
+        return consolidated_relations
+
+    def copy(self):
+        """
+        Returns a copy of these relations that can be mutated
+        independently.
+        """
+        new_relations = _CompactBlockRelations(self.key_index.copy())
+        new_relations.child_offsets = self.child_offsets[:]
+        new_relations.child_targets = self.child_targets[:]
+        new_relations.parent_offsets = self.parent_offsets[:]
+        new_relations.parent_targets = self.parent_targets[:]
+        new_relations.children_overrides = {index: list(val) for index, val in self.children_overrides.iteritems()}
+        new_relations.parents_overrides = {index: list(val) for index, val in self.parents_overrides.iteritems()}
+        new_relations.present = bytearray(self.present)
+        new_relations.num_present = self.num_present
+        return new_relations
+
+    @staticmethod
+    def _get_adjacent(index, overrides, offsets, targets):
+        """
+        Returns the adjacent block indices for the given block, from
+        either the overrides or the CSR arrays.
+        """
+        try:
+            return overrides[index]
+        except KeyError:
+            pass
+        if index + 1 < len(offsets):
+            return targets[offsets[index]:offsets[index + 1]]
+        return ()
+
+    @classmethod
+    def _get_mutable_adjacent(cls, index, overrides, offsets, targets):
+        """
+        Returns the adjacent block indices for the given block as a
+        list that is stored in the overrides.
+        """
+        try:
+            return overrides[index]
+        except KeyError:
+            adjacent = list(cls._get_adjacent(index, overrides, offsets, targets))
+            overrides[index] = adjacent
+            return adjacent
+
+
+class _BlockDataColumns(object):
+    """
+    Data structure to encapsulate the collected data of all blocks in a
+    structure, stored in columns indexed by block index.
+
+    Columns are accessed through the find_* and get_* methods so that
+    subclasses can load them on demand.
+    """
+    def __init__(self):
+
+        # Whether each block index has any collected data.
+        # bytearray
+        self.has_data = bytearray()
+
+        # Map of an xBlock field name to its column of values.
+        # dict {string: [any picklable type]}
+        self.xblock_fields = {}
+
+        # Map of a transformer's name to its map of block field name to
+        # its column of values.
+        # dict {string: {string: [any picklable type]}}
+        self.transformer_fields = {}
+
+    @classmethod
+    def from_block_data_map(cls, block_data_map, key_index):
+        """
+        Returns new _BlockDataColumns with the same contents as the given
+        map of usage key to BlockData.
+
+        Arguments:
+            block_data_map (dict({UsageKey: BlockData})) - Map of a
+                block's usage key to its collected data.
+
+            key_index (_BlockKeyIndex) - The index to intern the
+                usage keys into.
+        """
+        columns = cls()
+        for usage_key, block_data in block_data_map.iteritems():
+            index = columns.add_block(key_index.intern(usage_key))
+            for field_name, value in block_data.fields.iteritems():
+                columns.get_xblock_column(field_name)[index] = value
+            for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+                for key, value in transformer_data.fields.iteritems():
+                    columns.get_transformer_column(transformer_name, key)[index] = value
+        return columns
+
+    def __len__(self):
+        return len(self.has_data)
+
+    def add_block(self, index):
+        """
+        Marks the block at the given index as having collected data,
+        growing all columns if needed.  Returns the index.
+        """
+        size = len(self.has_data)
+        if index >= size:
+            padding = index + 1 - size
+            self.has_data.extend(bytearray(padding))
+            for column in self._iter_columns():
+                column.extend([_MISSING] * padding)
+        self.has_data[index] = 1
+        return index
+
+    def remove_block(self, index):
+        """
+        Removes all collected data for the block at the given index.
+        """
+        if index < len(self.has_data):
+            self.has_data[index] = 0
+            for column in self._iter_columns():
+                column[index] = _MISSING
+
+    def find_xblock_column(self, field_name):
+        """
+        Returns the column for the given xBlock field, or None if there
+        is no such column.
+        """
+        return self.xblock_fields.get(field_name)
+
+    def find_transformer_columns(self, transformer_name):
+        """
+        Returns the map of block field name to column for the given
+        transformer, or None if the transformer has no block fields.
+        """
+        return self.transformer_fields.get(transformer_name)
+
+    def get_xblock_column(self, field_name):
+        """
+        Returns the column for the given xBlock field, creating it if
+        needed.
+        """
+        column = self.find_xblock_column(field_name)
+        if column is None:
+            column = self._new_column()
+            self.xblock_fields[field_name] = column
+        return column
+
+    def get_transformer_column(self, transformer_name, key):
+        """
+        Returns the column for the given transformer's block field,
+        creating it if needed.
+        """
+        transformer_columns = self.find_transformer_columns(transformer_name)
+        if transformer_columns is None:
+            transformer_columns = {}
+            self.transformer_fields[transformer_name] = transformer_columns
+        column = transformer_columns.get(key)
+        if column is None:
+            column = self._new_column()
+            transformer_columns[key] = column
+        return column
+
+    def iter_xblock_field_names(self):
+        """
+        Returns an iterator of the names of all xBlock field columns.
+        """
+        return iter(self.xblock_fields)
+
+    def iter_transformer_names(self):
+        """
+        Returns an iterator of the names of all transformers with block
+        field columns.
+        """
+        return iter(self.transformer_fields)
+
+    def _new_column(self):
+        """
+        Returns a new column with no values set.
+        """
+        return [_MISSING] * len(self.has_data)
+
+    def _iter_columns(self):
+        """
+        Returns an iterator of all columns.
+        """
+        for column in self.xblock_fields.itervalues():
+            yield column
+        for transformer_columns in self.transformer_fields.itervalues():
+            for column in transformer_columns.itervalues():
+                yield column
+
+
+class _ColumnView(object):
+    """
+    Base class for attribute-style views onto a set of columns at a
+    given block index.  Subclasses implement _find_columns.
+    """
+    def __init__(self, block_data_columns, index):
+        object.__setattr__(self, '_block_data_columns', block_data_columns)
+        object.__setattr__(self, '_index', index)
+
+    def _find_columns(self):
+        """
+        Returns the map of field name to column for this view, or None.
+        """
+        raise NotImplementedError
+
+    def _find_column(self, field_name):
+        """
+        Returns the column for the given field name, or None.
+        """
+        return (self._find_columns() or {}).get(field_name)
+
+    @property
+    def fields(self):
+        """
+        Returns a dict of the field names and values that are set in this
+        view.
+        """
+        index = self._index
+        return {
+            name: column[index]
+            for name, column in (self._find_columns() or {}).iteritems()
+            if column[index] is not _MISSING
+        }
+
+    def __getattr__(self, field_name):
+        column = self._find_column(field_name)
+        value = column[self._index] if column is not None else _MISSING
+        if value is _MISSING:
+            raise AttributeError("Field {0} does not exist".format(field_name))
+        return value
+
+    def __delattr__(self, field_name):
+        column = self._find_column(field_name)
+        if column is None:
+            raise AttributeError("Field {0} does not exist".format(field_name))
+        column[self._index] = _MISSING
+
+
+class _TransformerDataView(_ColumnView):
+    """
+    View with the interface of TransformerData onto a transformer's
+    block fields for a single block.
+    """
+    def __init__(self, block_data_columns, transformer_name, index):
+        super(_TransformerDataView, self).__init__(block_data_columns, index)
+        object.__setattr__(self, '_transformer_name', transformer_name)
+
+    def _find_columns(self):
+        return self._block_data_columns.find_transformer_columns(self._transformer_name)
+
+    def __setattr__(self, field_name, field_value):
+        column = self._block_data_columns.get_transformer_column(self._transformer_name, field_name)
+        column[self._index] = field_value
+
+
+class _TransformerDataMapView(object):
+    """
+    View with the interface of TransformerDataMap onto all transformers'
+    block fields for a single block.
+    """
+    def __init__(self, block_data_columns, index):
+        self._block_data_columns = block_data_columns
+        self._index = index
+
+    def __getitem__(self, transformer):
+        transformer_name = _transformer_name(transformer)
+        transformer_columns = self._block_data_columns.find_transformer_columns(transformer_name) or {}
+        if not any(column[self._index] is not _MISSING for column in transformer_columns.itervalues()):
+            raise KeyError(transformer_name)
+        return _TransformerDataView(self._block_data_columns, transformer_name, self._index)
+
+    def __contains__(self, transformer):
+        try:
+            self[transformer]  # pylint: disable=pointless-statement
+            return True
+        except KeyError:
+            return False
+
+    def get_or_create(self, transformer):
+        """
+        Returns the view of the given transformer's block fields.
+        """
+        return _TransformerDataView(self._block_data_columns, _transformer_name(transformer), self._index)
+
+
+class _BlockDataView(_ColumnView):
+    """
+    View with the interface of BlockData onto the collected data of a
+    single block.
+    """
+    def __init__(self, block_data_columns, usage_key, index):
+        super(_BlockDataView, self).__init__(block_data_columns, index)
+        object.__setattr__(self, 'location', usage_key)
+        object.__setattr__(self, 'transformer_data', _TransformerDataMapView(block_data_columns, index))
+
+    def _find_columns(self):
+        return {
+            field_name: self._block_data_columns.find_xblock_column(field_name)
+            for field_name in self._block_data_columns.iter_xblock_field_names()
+        }
+
+    def _find_column(self, field_name):
+        return self._block_data_columns.find_xblock_column(field_name)
+
+    def __setattr__(self, field_name, field_value):
+        self._block_data_columns.get_xblock_column(field_name)[self._index] = field_value
+
+
+def _transformer_name(transformer):
+    """
+    Returns the name of the given transformer, which may be given as a
+    transformer class, instance or name.  See
+    TransformerDataMap._translate_key.
+    """
+    try:
+        return transformer.name()
+    except AttributeError:
+        return transformer
+
+
+class CompactBlockStructureBlockData(BlockStructureBlockData):
+    """
+    Subclass of BlockStructureBlockData that stores its relations and
+    block data by dense block indices in flat arrays and columns.
+
+    Structure-wide transformer data is stored as in
+    BlockStructureBlockData, since it is not per-block.
+    """
+    def __init__(self, root_block_usage_key):
+        super(CompactBlockStructureBlockData, self).__init__(root_block_usage_key)
+
+        # Relations of all blocks, stored by block index.
+        # _CompactBlockRelations
+        self._block_relations = _CompactBlockRelations()
+
+        # Collected data of all blocks, stored by block index.
+        # _BlockDataColumns
+        self._block_data_map = _BlockDataColumns()
+
+        self._block_relations.add_block(root_block_usage_key)
+
+    @classmethod
+    def create_from_block_structure(cls, block_structure):
+        """
+        Returns a new CompactBlockStructureBlockData with the
+        same contents as the given BlockStructureBlockData.
+        """
+        # pylint: disable=protected-access
+        block_relations = _CompactBlockRelations.from_block_relations(block_structure._block_relations)
+        block_data_columns = _BlockDataColumns.from_block_data_map(
+            block_structure._block_data_map,
+            block_relations.key_index,
+        )
+        return cls.create_new(
+            block_structure.root_block_usage_key,
+            block_relations,
+            block_structure.transformer_data,
+            block_data_columns,
+        )
+
+    @classmethod
+    def create_new(cls, root_block_usage_key, block_relations, transformer_data, block_data_columns):
+        """
+        Returns a new instance for the given compact relations and
+        block data columns.
+        """
+        block_structure = cls(root_block_usage_key)
+        block_structure._block_relations = block_relations
+        block_structure.transformer_data = transformer_data
+        block_structure._block_data_map = block_data_columns
+        return block_structure
+
+    #--- Block structure relation methods ---#
+
+    def get_parents(self, usage_key):
+        relations = self._block_relations
+        try:
+            index = relations.index(usage_key)
+        except KeyError:
+            return []
+        keys = relations.key_index.keys
+        return [keys[parent] for parent in relations.parents(index)]
+
+    def get_children(self, usage_key):
+        relations = self._block_relations
+        try:
+            index = relations.index(usage_key)
+        except KeyError:
+            return []
+        keys = relations.key_index.keys
+        return [keys[child] for child in relations.children(index)]
+
+    def set_root_block(self, usage_key):
+        index = self._block_relations.index(usage_key)
+        self.root_block_usage_key = usage_key
+        self._block_relations.parents_overrides[index] = []
+
+    def get_block_keys(self):
+        return self._block_relations.iterkeys()
+
+    #--- Block structure traversal methods ---#
+
+    def topological_traversal(
+            self,
+            filter_func=None,
+            yield_descendants_of_unyielded=False,
+            start_node=None,
+    ):
+        """
+        Performs a topological sort of the block structure over block
+        indices and yields the usage_key of each block as it is
+        encountered.
+
+        Arguments:
+            See the description in
+            openedx.core.lib.graph_traversals.traverse_topologically.
+        """
+        relations = self._block_relations
+        keys = relations.key_index.keys
+        return (
+            keys[index] for index in traverse_topologically(
+                start_node=relations.key_index.indices[start_node or self.root_block_usage_key],
+                get_parents=relations.parents,
+                get_children=relations.children,
+                filter_func=self._index_filter(filter_func),
+                yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+            )
+        )
+
+    def post_order_traversal(
+            self,
+            filter_func=None,
+            start_node=None,
+    ):
+        """
+        Performs a post-order sort of the block structure over block
+        indices and yields the usage_key of each block as it is
+        encountered.
+
+        Arguments:
+            See the description in
+            openedx.core.lib.graph_traversals.traverse_post_order.
+        """
+        relations = self._block_relations
+        keys = relations.key_index.keys
+        return (
+            keys[index] for index in traverse_post_order(
+                start_node=relations.key_index.indices[start_node or self.root_block_usage_key],
+                get_children=relations.children,
+                filter_func=self._index_filter(filter_func),
+            )
+        )
+
+    #--- Block data methods ---#
+
+    def copy(self):
+        """
+        Returns a new instance of CompactBlockStructureBlockData with a
+        copy of this instance's contents.
+        """
+        return self.create_new(
+            self.root_block_usage_key,
+            self._block_relations.copy(),
+            deepcopy(self.transformer_data),
+            deepcopy(self._block_data_map),
+        )
+
+    def iteritems(self):
+        keys = self._block_relations.key_index.keys
+        has_data = self._block_data_map.has_data
+        return (
+            (keys[index], _BlockDataView(self._block_data_map, keys[index], index))
+            for index in xrange(len(has_data)) if has_data[index]
+        )
+
+    def itervalues(self):
+        return (block_data for __, block_data in self.iteritems())
+
+    def __getitem__(self, usage_key):
+        index = self._get_data_index(usage_key)
+        if index is None:
+            return None
+        return _BlockDataView(self._block_data_map, usage_key, index)
+
+    def get_xblock_field(self, usage_key, field_name, default=None):
+        index = self._get_data_index(usage_key)
+        if index is None:
+            return default
+        column = self._block_data_map.find_xblock_column(field_name)
+        value = column[index] if column is not None else _MISSING
+        return default if value is _MISSING else value
+
+    def get_transformer_block_data(self, usage_key, transformer):
+        index = self._get_data_index(usage_key)
+        if index is None:
+            raise KeyError(usage_key)
+        return _TransformerDataMapView(self._block_data_map, index)[transformer]
+
+    def get_transformer_block_field(self, usage_key, transformer, key, default=None):
+        index = self._get_data_index(usage_key)
+        if index is None:
+            return default
+        transformer_columns = self._block_data_map.find_transformer_columns(_transformer_name(transformer)) or {}
+        column = transformer_columns.get(key)
+        value = column[index] if column is not None else _MISSING
+        return default if value is _MISSING else value
+
+    def set_transformer_block_field(self, usage_key, transformer, key, value):
+        index = self._get_or_create_block_index(usage_key)
+        self._block_data_map.get_transformer_column(_transformer_name(transformer), key)[index] = value
+
+    def remove_transformer_block_field(self, usage_key, transformer, key):
+        index = self._get_data_index(usage_key)
+        if index is None:
+            return
+        transformer_columns = self._block_data_map.find_transformer_columns(_transformer_name(transformer)) or {}
+        column = transformer_columns.get(key)
+        if column is not None:
+            column[index] = _MISSING
+
+    def remove_block(self, usage_key, keep_descendants):
+        """
+        See the description in BlockStructureBlockData.remove_block.
+        """
+        relations = self._block_relations
+        index = relations.index(usage_key)
+        children = list(relations.children(index))
+        parents = list(relations.parents(index))
+
+        # Remove block from its children.
+        for child in children:
+            relations.mutable_parents(child).remove(index)
+
+        # Remove block from its parents.
+        for parent in parents:
+            relations.mutable_children(parent).remove(index)
+
+        # Remove block.
+        relations.remove_block(index)
+        self._block_data_map.remove_block(index)
+
+        # Recreate the graph connections if descendants are to be kept.
+        if keep_descendants:
+            for child in children:
+                for parent in parents:
+                    relations.add_relation(parent, child)
+
+    #--- Internal methods ---#
+    # To be used within the block_structure framework or by tests.
+
+    def _prune_unreachable(self):
+        """
+        Mutates this block structure by removing any unreachable blocks.
+        """
+        relations = self._block_relations
+        reachable_indices = [
+            index
+            for index in traverse_post_order(
+                start_node=relations.key_index.indices[self.root_block_usage_key],
+                get_children=relations.children,
+            )
+            if relations.present[index]
+        ]
+        self._block_relations = relations.pruned(reachable_indices)
+
+    def _add_relation(self, parent_key, child_key):
+        relations = self._block_relations
+        relations.add_relation(relations.add_block(parent_key), relations.add_block(child_key))
+
+    def _copy_block_data(self, usage_key):
+        index = self._get_data_index(usage_key)
+        if index is None:
+            return None
+        block_data_columns = self._block_data_map
+        block_data = BlockData(usage_key)
+        for field_name in list(block_data_columns.iter_xblock_field_names()):
+            value = block_data_columns.find_xblock_column(field_name)[index]
+            if value is not _MISSING:
+                setattr(block_data, field_name, deepcopy(value))
+        for transformer_name in list(block_data_columns.iter_transformer_names()):
+            for key, column in block_data_columns.find_transformer_columns(transformer_name).iteritems():
+                if column[index] is not _MISSING:
+                    setattr(block_data.transformer_data.get_or_create(transformer_name), key, deepcopy(column[index]))
+        return block_data
+
+    def _get_or_create_block(self, usage_key):
+        return _BlockDataView(self._block_data_map, usage_key, self._get_or_create_block_index(usage_key))
+
+    def _get_or_create_block_index(self, usage_key):
+        """
+        Returns the index of the given block, marking it as having
+        collected data.
+        """
+        return self._block_data_map.add_block(self._block_relations.key_index.intern(usage_key))
+
+    def _get_data_index(self, usage_key):
+        """
+        Returns the index of the given block if it has collected data,
+        else None.
+        """
+        index = self._block_relations.key_index.indices.get(usage_key)
+        if index is None:
+            return None
+        has_data = self._block_data_map.has_data
+        if index >= len(has_data) or not has_data[index]:
+            return None
+        return index
+
+    def _index_filter(self, filter_func):
+        """
+        Returns the given filter function, which takes a usage key,
+        wrapped to take a block index instead.
+        """
+        if filter_func is None:
+            return None
+        keys = self._block_relations.key_index.keys
+        return lambda index: filter_func(keys[index])
@@ -15,3 +15,11 @@ class UsageKeyNotInBlockStructure(Exception):
     Exception for when a usage key is not found within a block structure.
     """
     pass
+
+
+class BlockStructureSerializationError(Exception):
+    """
+    Exception for when serialized block structure data cannot be
+    decoded, such as when it was written in an unsupported format.
+    """
+    pass
@@ -1,7 +1,12 @@
 """
 Module for factory class for BlockStructure objects.
 """
+from copy import deepcopy
+
+from openedx.core.lib.graph_traversals import traverse_pre_order
+
 from .block_structure import BlockStructureModulestoreData, BlockStructureBlockData
+from .compact import CompactBlockStructureBlockData, _CompactBlockRelations
 
 
 class BlockStructureFactory(object):
@@ -57,6 +62,129 @@ class BlockStructureFactory(object):
         build_block_structure(root_xblock)
         return block_structure
 
+    @classmethod
+    def create_partial_from_modulestore(cls, block_structure, changed_block_keys, modulestore):
+        """
+        Creates and returns a block structure from the modulestore with
+        only the blocks affected by changes to the given blocks since the
+        given block structure was created: the changed blocks and all of
+        their current descendants, which are reloaded from the
+        modulestore, along with all of their ancestors and the root.
+
+        Relations of the reloaded blocks are taken from the modulestore.
+        Relations of the other blocks, which did not change, are taken
+        from the given block structure, limited to the affected blocks.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - A previously
+                created block structure for the same root block.
+
+            changed_block_keys (set(UsageKey)) - Usage keys of the blocks
+                that were added or modified in the modulestore since the
+                given block structure was created.
+
+            modulestore (ModuleStoreRead) - The modulestore that
+                contains the current data for the xBlocks.
+
+        Returns:
+            (BlockStructureModulestoreData, set(UsageKey)) - The created
+                block structure and the usage keys of its reloaded blocks.
+        """
+        # pylint: disable=protected-access
+        root_block_usage_key = block_structure.root_block_usage_key
+        partial_block_structure = BlockStructureModulestoreData(root_block_usage_key)
+        reloaded_block_keys = set()
+
+        def reload_block_structure(xblock):
+            """
+            Recursively update the partial block structure with the
+            given xBlock and its descendants.
+            """
+            if xblock.location in reloaded_block_keys:
+                return
+
+            reloaded_block_keys.add(xblock.location)
+            partial_block_structure._add_xblock(xblock.location, xblock)
+            for child in xblock.get_children():
+                partial_block_structure._add_relation(xblock.location, child.location)
+                reload_block_structure(child)
+
+        for block_key in changed_block_keys:
+            if block_key not in reloaded_block_keys:
+                reload_block_structure(modulestore.get_item(block_key, depth=None))
+
+        # Collect the unchanged ancestors of all reloaded blocks, so that
+        # data percolated down from any ancestor is collected anew.
+        ancestor_keys = set() if root_block_usage_key in reloaded_block_keys else {root_block_usage_key}
+        block_keys_to_visit = [block_key for block_key in reloaded_block_keys if block_key in block_structure]
+        while block_keys_to_visit:
+            for parent_key in block_structure.get_parents(block_keys_to_visit.pop()):
+                if parent_key not in reloaded_block_keys and parent_key not in ancestor_keys:
+                    ancestor_keys.add(parent_key)
+                    block_keys_to_visit.append(parent_key)
+
+        for block_key in ancestor_keys:
+            partial_block_structure._add_xblock(block_key, modulestore.get_item(block_key, depth=0))
+            for child_key in block_structure.get_children(block_key):
+                if child_key in ancestor_keys or child_key in reloaded_block_keys:
+                    partial_block_structure._add_relation(block_key, child_key)
+
+        return partial_block_structure, reloaded_block_keys
+
+    @classmethod
+    def create_merged(cls, block_structure, partial_block_structure, reloaded_block_keys):
+        """
+        Returns a new block structure with the blocks of the given block
+        structure, updated with the blocks of the given partial block
+        structure.
+
+        Relations of the reloaded blocks are taken from the partial block
+        structure, and those of all other blocks from the given block
+        structure.  Blocks that are no longer reachable from the root are
+        left out.  Collected block data is taken from the partial block
+        structure for the blocks it contains, and structure-wide
+        transformer data is taken from the partial block structure.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure to update.
+
+            partial_block_structure (BlockStructureBlockData) - A block
+                structure with the same root, as created by
+                create_partial_from_modulestore, whose data is collected.
+
+            reloaded_block_keys (set(UsageKey)) - Usage keys of the
+                blocks whose relations were reloaded in the partial block
+                structure.
+
+        Returns:
+            BlockStructureBlockData - The merged block structure.
+        """
+        # pylint: disable=protected-access
+        merged_block_structure = BlockStructureBlockData(block_structure.root_block_usage_key)
+
+        def get_children(block_key):
+            """
+            Returns the current children of the given block.
+            """
+            if block_key in reloaded_block_keys:
+                return partial_block_structure.get_children(block_key)
+            return block_structure.get_children(block_key)
+
+        for block_key in traverse_pre_order(block_structure.root_block_usage_key, get_children):
+            for child_key in get_children(block_key):
+                merged_block_structure._add_relation(block_key, child_key)
+
+        for block_key in merged_block_structure:
+            if block_key in partial_block_structure:
+                block_data = partial_block_structure._block_data_map.get(block_key)
+            else:
+                block_data = block_structure._copy_block_data(block_key)
+            if block_data is not None:
+                merged_block_structure._block_data_map[block_key] = block_data
+        merged_block_structure.transformer_data = partial_block_structure.transformer_data
+        return merged_block_structure
+
     @classmethod
     def create_from_cache(cls, root_block_usage_key, block_structure_cache):
         """
@@ -87,9 +215,90 @@ class BlockStructureFactory(object):
     def create_new(cls, root_block_usage_key, block_relations, transformer_data, block_data_map):
         """
         Returns a new block structure for given the arguments.
+
+        If the given block_relations are compact (as stored by a
+        CompactBlockStructureBlockData), a compact block structure is
+        returned.
         """
+        if isinstance(block_relations, _CompactBlockRelations):
+            return CompactBlockStructureBlockData.create_new(
+                root_block_usage_key,
+                block_relations,
+                transformer_data,
+                block_data_map,
+            )
+
         block_structure = BlockStructureBlockData(root_block_usage_key)
         block_structure._block_relations = block_relations  # pylint: disable=protected-access
         block_structure.transformer_data = transformer_data
         block_structure._block_data_map = block_data_map  # pylint: disable=protected-access
         return block_structure
+
+    @classmethod
+    def create_compact(cls, block_structure):
+        """
+        Returns a new array-backed block structure with the same
+        relations, transformer data and block data as the given
+        block structure.  Any instantiated xBlocks are not carried over.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure to convert.
+
+        Returns:
+            CompactBlockStructureBlockData - The converted block
+                structure.
+        """
+        if isinstance(block_structure, CompactBlockStructureBlockData):
+            return block_structure
+        return CompactBlockStructureBlockData.create_from_block_structure(block_structure)
+
+    @classmethod
+    def create_subtree(cls, block_structure, subtree_root_key):
+        """
+        Returns a new block structure, with the same root as the given
+        block structure, that contains only the blocks in the subtree
+        starting at subtree_root_key and the ancestor chain from
+        subtree_root_key up to the root.  Structure-wide transformer
+        data is copied as is.
+
+        For blocks with multiple parents, only the first parent is
+        followed in the ancestor chain and only the parents within the
+        subtree are kept.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure to take the subtree from.
+
+            subtree_root_key (UsageKey) - The usage key of the root of
+                the subtree.
+
+        Returns:
+            BlockStructureBlockData - The new block structure, which is
+                compact if the given block structure is compact.
+        """
+        # pylint: disable=protected-access
+        subtree = BlockStructureBlockData(block_structure.root_block_usage_key)
+
+        # Add the ancestor chain.
+        child_key = subtree_root_key
+        parents = block_structure.get_parents(child_key)
+        while parents:
+            subtree._add_relation(parents[0], child_key)
+            child_key = parents[0]
+            parents = block_structure.get_parents(child_key)
+
+        # Add the subtree.
+        for block_key in traverse_pre_order(subtree_root_key, block_structure.get_children):
+            for child_key in block_structure.get_children(block_key):
+                subtree._add_relation(block_key, child_key)
+
+        for block_key in subtree:
+            block_data = block_structure._copy_block_data(block_key)
+            if block_data is not None:
+                subtree._block_data_map[block_key] = block_data
+        subtree.transformer_data = deepcopy(block_structure.transformer_data)
+
+        if isinstance(block_structure, CompactBlockStructureBlockData):
+            subtree = cls.create_compact(subtree)
+        return subtree
@@ -10,12 +10,17 @@ from .exceptions import UsageKeyNotInBlockStructure
 from .transformers import BlockStructureTransformers
 
 
+# Name of the xBlock field in which modulestores that version courses
+# expose the version of the course that an xBlock was loaded from.
+COURSE_VERSION_FIELD = 'course_version'
+
+
 class BlockStructureManager(object):
     """
     Top-level class for managing Block Structures.
     """
 
-    def __init__(self, root_block_usage_key, modulestore, cache):
+    def __init__(self, root_block_usage_key, modulestore, cache, compact=False, sharded=False):
         """
         Arguments:
             root_block_usage_key (UsageKey) - The usage_key for the root
@@ -28,10 +33,23 @@ class BlockStructureManager(object):
             cache (django.core.cache.backends.base.BaseCache) - The
                 cache to use for storing/retrieving the block structure's
                 collected data.
+
+            compact (bool) - Whether newly collected block structures
+                are converted to the array-backed
+                CompactBlockStructureBlockData before being cached.
+                Block structures that are already cached are returned
+                in the storage mode they were cached in.
+
+            sharded (bool) - Whether newly collected block structures
+                are also cached in per-subtree shards, so that requests
+                for a block structure starting below the root block
+                read only the relevant shard from the cache.
         """
         self.root_block_usage_key = root_block_usage_key
         self.modulestore = modulestore
         self.block_structure_cache = BlockStructureCache(cache)
+        self.compact = compact
+        self.sharded = sharded
 
     def get_transformed(self, transformers, starting_block_usage_key=None, collected_block_structure=None):
         """
@@ -59,7 +77,12 @@ class BlockStructureManager(object):
             BlockStructureBlockData - A transformed block structure,
                 starting at starting_block_usage_key.
         """
-        block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        if collected_block_structure:
+            block_structure = collected_block_structure.copy()
+        elif starting_block_usage_key and self.sharded:
+            block_structure = self._get_collected_shard(starting_block_usage_key)
+        else:
+            block_structure = self.get_collected()
 
         if starting_block_usage_key:
             # Override the root_block_usage_key so traversals start at the
@@ -100,8 +123,7 @@ class BlockStructureManager(object):
                     self.root_block_usage_key,
                     self.modulestore
                 )
-                BlockStructureTransformers.collect(block_structure)
-                self.block_structure_cache.add(block_structure)
+                block_structure = self._collect(block_structure)
         return block_structure
 
     def update_collected(self):
@@ -114,6 +136,61 @@ class BlockStructureManager(object):
         self.clear()
         self.get_collected()
 
+    def update_collected_incrementally(self):
+        """
+        Updates the collected Block Structure for the root_block_usage_key
+        by collecting transformers data only for the blocks that were
+        added or modified in the modulestore since the cached Block
+        Structure was collected, along with their descendants and their
+        ancestors.  The collected data of all other blocks is kept.
+
+        Details: The Block Structure is collected in full instead if it
+        is not cached, if its collected data is outdated, if any
+        registered transformer does not support incremental collection
+        or if the modulestore cannot determine which blocks changed.
+        """
+        block_structure = BlockStructureFactory.create_from_cache(
+            self.root_block_usage_key,
+            self.block_structure_cache
+        )
+        if (
+                block_structure is None or
+                BlockStructureTransformers.is_collected_outdated(block_structure) or
+                not BlockStructureTransformers.supports_incremental_collect()
+        ):
+            self.update_collected()
+            return
+
+        collected_version = block_structure.get_xblock_field(self.root_block_usage_key, COURSE_VERSION_FIELD)
+        current_version, changed_block_keys = self.modulestore.get_blocks_changed_since(
+            self._course_key,
+            collected_version,
+        )
+        if changed_block_keys is None:
+            self.update_collected()
+            return
+        if not changed_block_keys:
+            return
+
+        with self._bulk_operations():
+            partial_block_structure, reloaded_block_keys = BlockStructureFactory.create_partial_from_modulestore(
+                block_structure,
+                changed_block_keys,
+                self.modulestore,
+            )
+            root_xblock = partial_block_structure.get_xblock(self.root_block_usage_key)
+            if getattr(root_xblock, COURSE_VERSION_FIELD, None) != current_version:
+                # The course changed again after the changed blocks were
+                # determined.
+                self.update_collected()
+                return
+
+            self._collect(
+                partial_block_structure,
+                merge_into=block_structure,
+                reloaded_block_keys=reloaded_block_keys,
+            )
+
     def clear(self):
         """
         Removes cached data for the block structure associated with the given
@@ -121,14 +198,52 @@ class BlockStructureManager(object):
         """
         self.block_structure_cache.delete(self.root_block_usage_key)
 
+    def _get_collected_shard(self, usage_key):
+        """
+        Returns the collected Block Structure for the shard that contains
+        the given usage_key, falling back to the entire collected Block
+        Structure if the shard is not cached or is outdated.
+        """
+        block_structure = self.block_structure_cache.get_shard(self.root_block_usage_key, usage_key)
+        if block_structure is None or BlockStructureTransformers.is_collected_outdated(block_structure):
+            block_structure = self.get_collected()
+        return block_structure
+
+    def _collect(self, block_structure, merge_into=None, reloaded_block_keys=None):
+        """
+        Collects transformers data for the given block structure, which
+        was created from the modulestore, and caches and returns the
+        result.
+
+        If merge_into is given, the given block structure is a partial
+        block structure whose blocks are merged into the merge_into
+        block structure before caching.
+        """
+        block_structure.request_xblock_fields(COURSE_VERSION_FIELD)
+        BlockStructureTransformers.collect(block_structure)
+        if merge_into is not None:
+            block_structure = BlockStructureFactory.create_merged(merge_into, block_structure, reloaded_block_keys)
+        if self.compact:
+            block_structure = BlockStructureFactory.create_compact(block_structure)
+        self.block_structure_cache.add(block_structure)
+        if self.sharded:
+            self.block_structure_cache.add_shards(block_structure)
+        return block_structure
+
+    @property
+    def _course_key(self):
+        """
+        Returns the course key of the root block, if it has one.
+        """
+        try:
+            return self.root_block_usage_key.course_key
+        except AttributeError:
+            return None
+
     @contextmanager
     def _bulk_operations(self):
         """
         A context manager for notifying the store of bulk operations.
         """
-        try:
-            course_key = self.root_block_usage_key.course_key
-        except AttributeError:
-            course_key = None
-        with self.modulestore.bulk_operations(course_key):
+        with self.modulestore.bulk_operations(self._course_key):
             yield
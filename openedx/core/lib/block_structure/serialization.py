@@ -0,0 +1,336 @@
+"""
+Module for the versioned binary serialization format of block structures.
+
+Unlike a single zpickled tuple of the whole structure, the format is
+split into independently compressed sections so that a reader only
+decodes the data it actually accesses:
+
+    * Structural sections (the interned usage key table, the CSR block
+      relations, structure-wide transformer data and the map of which
+      blocks have data) are decoded eagerly.
+
+    * Each collected xBlock field and each transformer's block data
+      are stored in their own section and decoded lazily, on first
+      access.
+
+Layout (all integers are big-endian):
+
+    header:         magic (4 bytes) | format version (uint16) |
+                    index item size (uint8) | section count (uint32)
+    section table:  for each section:
+                        name length (uint16) | name (utf-8) |
+                        offset (uint32) | length (uint32)
+    sections:       each a zlib-compressed payload, with offsets
+                    relative to the end of the section table.
+
+Deserialized block structures are CompactBlockStructureBlockData.
+"""
+# pylint: disable=protected-access
+import cPickle as pickle
+from array import array
+from copy import deepcopy
+from itertools import chain
+import struct
+import zlib
+
+from .compact import (
+    CompactBlockStructureBlockData,
+    _BlockDataColumns,
+    _BlockKeyIndex,
+    _CompactBlockRelations,
+    _INDEX_TYPECODE,
+    _MISSING,
+)
+from .exceptions import BlockStructureSerializationError
+
+
+# Identifies data in this format.
+FORMAT_MAGIC = 'EXBS'
+
+# The latest version of the format.  Increment this value whenever the
+# layout or the contents of the sections change.
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('>4sHBI')
+_SECTION_NAME_LENGTH = struct.Struct('>H')
+_SECTION_LOCATION = struct.Struct('>II')
+
+_KEYS_SECTION = 'keys'
+_RELATIONS_SECTION = 'relations'
+_TRANSFORMER_DATA_SECTION = 'transformer_data'
+_BLOCK_DATA_SECTION = 'block_data'
+_XBLOCK_FIELD_SECTION_PREFIX = 'xblock_field.'
+_TRANSFORMER_SECTION_PREFIX = 'transformer.'
+
+
+class BlockStructureSerializer(object):
+    """
+    Serializer for the versioned binary format of block structures.
+    """
+    @classmethod
+    def is_serialized(cls, data):
+        """
+        Returns whether the given data is in this serialization format.
+        """
+        return isinstance(data, str) and data.startswith(FORMAT_MAGIC)
+
+    @classmethod
+    def serialize(cls, block_structure):
+        """
+        Returns the binary serialization of the given block structure.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure to serialize.  It is converted to a
+                CompactBlockStructureBlockData if needed.
+        """
+        if not isinstance(block_structure, CompactBlockStructureBlockData):
+            block_structure = CompactBlockStructureBlockData.create_from_block_structure(block_structure)
+
+        block_relations = block_structure._block_relations.consolidated()
+        block_data_columns = block_structure._block_data_map
+
+        sections = [
+            (_KEYS_SECTION, _zpickle(block_relations.key_index.keys)),
+            (_RELATIONS_SECTION, zlib.compress(_pickle((
+                block_relations.child_offsets.tostring(),
+                block_relations.child_targets.tostring(),
+                block_relations.parent_offsets.tostring(),
+                block_relations.parent_targets.tostring(),
+                str(block_relations.present),
+            )))),
+            (_TRANSFORMER_DATA_SECTION, _zpickle(block_structure.transformer_data)),
+            (_BLOCK_DATA_SECTION, zlib.compress(str(block_data_columns.has_data))),
+        ]
+        for field_name in block_data_columns.iter_xblock_field_names():
+            sections.append((
+                _XBLOCK_FIELD_SECTION_PREFIX + field_name,
+                _zpickle(block_data_columns.find_xblock_column(field_name)),
+            ))
+        for transformer_name in block_data_columns.iter_transformer_names():
+            sections.append((
+                _TRANSFORMER_SECTION_PREFIX + transformer_name,
+                _zpickle(block_data_columns.find_transformer_columns(transformer_name)),
+            ))
+        return cls._pack_sections(sections)
+
+    @classmethod
+    def deserialize(cls, root_block_usage_key, data):
+        """
+        Returns the CompactBlockStructureBlockData for the given binary
+        serialization.  The collected block data is decoded lazily.
+
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage key of the root
+                block of the serialized block structure.
+
+            data (str) - The binary serialization.
+
+        Raises:
+            BlockStructureSerializationError - If the data is not in a
+                supported version of this format.
+        """
+        sections = cls._unpack_sections(data)
+        try:
+            key_index = _BlockKeyIndex(_zunpickle(sections.pop(_KEYS_SECTION)))
+            block_relations = _CompactBlockRelations(key_index)
+            (
+                child_offsets, child_targets, parent_offsets, parent_targets, present
+            ) = pickle.loads(zlib.decompress(sections.pop(_RELATIONS_SECTION)))
+            block_relations.child_offsets = _index_array(child_offsets)
+            block_relations.child_targets = _index_array(child_targets)
+            block_relations.parent_offsets = _index_array(parent_offsets)
+            block_relations.parent_targets = _index_array(parent_targets)
+            block_relations.present = bytearray(present)
+            block_relations.num_present = block_relations.present.count('\x01')
+            transformer_data = _zunpickle(sections.pop(_TRANSFORMER_DATA_SECTION))
+            has_data = bytearray(zlib.decompress(sections.pop(_BLOCK_DATA_SECTION)))
+        except KeyError as error:
+            raise BlockStructureSerializationError('Missing section {0}.'.format(error))
+
+        block_data_columns = _LazyBlockDataColumns(
+            has_data,
+            encoded_xblock_fields=_sections_with_prefix(sections, _XBLOCK_FIELD_SECTION_PREFIX),
+            encoded_transformer_fields=_sections_with_prefix(sections, _TRANSFORMER_SECTION_PREFIX),
+        )
+        return CompactBlockStructureBlockData.create_new(
+            root_block_usage_key,
+            block_relations,
+            transformer_data,
+            block_data_columns,
+        )
+
+    @classmethod
+    def _pack_sections(cls, sections):
+        """
+        Returns the header, section table and payloads for the given
+        list of (name, payload) sections, concatenated.
+        """
+        table = []
+        offset = 0
+        for name, payload in sections:
+            encoded_name = name.encode('utf-8')
+            table.append(_SECTION_NAME_LENGTH.pack(len(encoded_name)))
+            table.append(encoded_name)
+            table.append(_SECTION_LOCATION.pack(offset, len(payload)))
+            offset += len(payload)
+
+        header = _HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, array(_INDEX_TYPECODE).itemsize, len(sections))
+        return ''.join(chain([header], table, (payload for __, payload in sections)))
+
+    @classmethod
+    def _unpack_sections(cls, data):
+        """
+        Returns a dict of section name to compressed payload for the
+        given data.
+        """
+        try:
+            magic, version, index_itemsize, num_sections = _HEADER.unpack_from(data)
+        except struct.error:
+            raise BlockStructureSerializationError('Truncated header.')
+        if magic != FORMAT_MAGIC:
+            raise BlockStructureSerializationError('Unrecognized format.')
+        if version != FORMAT_VERSION:
+            raise BlockStructureSerializationError('Unsupported format version {0}.'.format(version))
+        if index_itemsize != array(_INDEX_TYPECODE).itemsize:
+            raise BlockStructureSerializationError('Unsupported index size {0}.'.format(index_itemsize))
+
+        locations = {}
+        position = _HEADER.size
+        try:
+            for __ in xrange(num_sections):
+                name_length, = _SECTION_NAME_LENGTH.unpack_from(data, position)
+                position += _SECTION_NAME_LENGTH.size
+                name = data[position:position + name_length].decode('utf-8')
+                position += name_length
+                locations[name] = _SECTION_LOCATION.unpack_from(data, position)
+                position += _SECTION_LOCATION.size
+        except struct.error:
+            raise BlockStructureSerializationError('Truncated section table.')
+
+        return {
+            name: data[position + offset:position + offset + length]
+            for name, (offset, length) in locations.iteritems()
+        }
+
+
+class _LazyBlockDataColumns(_BlockDataColumns):
+    """
+    Subclass of _BlockDataColumns whose columns are decoded from their
+    serialized sections on first access.
+
+    Blocks that are removed before a column is decoded are recorded, so
+    their stale values can be masked out once the column is decoded.
+    """
+    def __init__(self, has_data, encoded_xblock_fields, encoded_transformer_fields):
+        super(_LazyBlockDataColumns, self).__init__()
+        self.has_data = has_data
+
+        # Maps of a field or transformer name to its compressed section.
+        # dict {string: str}
+        self._encoded_xblock_fields = encoded_xblock_fields
+        self._encoded_transformer_fields = encoded_transformer_fields
+
+        # Indices of blocks removed since the data was deserialized.
+        # set(int)
+        self._removed_indices = set()
+
+    def __deepcopy__(self, memo):
+        # Share the (immutable) compressed sections, rather than
+        # decoding them in order to copy them.
+        new_columns = _LazyBlockDataColumns(
+            bytearray(self.has_data),
+            dict(self._encoded_xblock_fields),
+            dict(self._encoded_transformer_fields),
+        )
+        new_columns.xblock_fields = deepcopy(self.xblock_fields, memo)
+        new_columns.transformer_fields = deepcopy(self.transformer_fields, memo)
+        new_columns._removed_indices = set(self._removed_indices)
+        return new_columns
+
+    def __getstate__(self):
+        # Decode everything so the pickled state is self-contained.
+        for field_name in list(self._encoded_xblock_fields):
+            self.find_xblock_column(field_name)
+        for transformer_name in list(self._encoded_transformer_fields):
+            self.find_transformer_columns(transformer_name)
+        return self.__dict__
+
+    def remove_block(self, index):
+        super(_LazyBlockDataColumns, self).remove_block(index)
+        if index < len(self.has_data):
+            self._removed_indices.add(index)
+
+    def find_xblock_column(self, field_name):
+        encoded_column = self._encoded_xblock_fields.pop(field_name, None)
+        if encoded_column is not None:
+            self.xblock_fields[field_name] = self._restore_column(_zunpickle(encoded_column))
+        return super(_LazyBlockDataColumns, self).find_xblock_column(field_name)
+
+    def find_transformer_columns(self, transformer_name):
+        encoded_columns = self._encoded_transformer_fields.pop(transformer_name, None)
+        if encoded_columns is not None:
+            self.transformer_fields[transformer_name] = {
+                key: self._restore_column(column)
+                for key, column in _zunpickle(encoded_columns).iteritems()
+            }
+        return super(_LazyBlockDataColumns, self).find_transformer_columns(transformer_name)
+
+    def iter_xblock_field_names(self):
+        return chain(list(self.xblock_fields), list(self._encoded_xblock_fields))
+
+    def iter_transformer_names(self):
+        return chain(list(self.transformer_fields), list(self._encoded_transformer_fields))
+
+    def _restore_column(self, column):
+        """
+        Brings a newly decoded column up to date with the changes made
+        since deserialization: it is padded to the current number of
+        blocks and the values of removed blocks are cleared.
+        """
+        column.extend([_MISSING] * (len(self.has_data) - len(column)))
+        for index in self._removed_indices:
+            column[index] = _MISSING
+        return column
+
+
+def _pickle(data):
+    """
+    Returns the pickled serialization of the given data.
+    """
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+
+def _zpickle(data):
+    """
+    Returns the zlib-compressed pickled serialization of the given data.
+    """
+    return zlib.compress(_pickle(data))
+
+
+def _zunpickle(zdata):
+    """
+    Returns the data for the given zlib-compressed pickled serialization.
+    """
+    return pickle.loads(zlib.decompress(zdata))
+
+
+def _index_array(data):
+    """
+    Returns an array of block indices for the given raw bytes.
+    """
+    indices = array(_INDEX_TYPECODE)
+    indices.fromstring(data)
+    return indices
+
+
+def _sections_with_prefix(sections, prefix):
+    """
+    Returns a dict of the given sections whose names have the given
+    prefix, keyed by their names without the prefix.
+    """
+    return {
+        name[len(prefix):]: payload
+        for name, payload in sections.iteritems()
+        if name.startswith(prefix)
+    }
@@ -44,6 +44,11 @@ class MockModulestore(object):
     def __init__(self):
         self.get_items_call_count = 0
         self.blocks = None
+        self.version = 0
+
+        # Map of a version to the keys of the blocks changed since it.
+        # dict {int: set(block key)}
+        self.changed_block_keys = {}
 
     def set_blocks(self, blocks):
         """
@@ -54,6 +59,37 @@ class MockModulestore(object):
             to its mock xBlock.
         """
         self.blocks = blocks
+        self._set_course_version(blocks)
+
+    def update_blocks(self, blocks):
+        """
+        Updates the mock modulestore with the given added or modified
+        blocks, as a new version of its blocks.
+
+        Arguments:
+            blocks ({block key, MockXBlock}) - A map of block_key
+            to its new mock xBlock.
+        """
+        for block_keys in self.changed_block_keys.itervalues():
+            block_keys.update(blocks)
+        self.changed_block_keys[self.version] = set(blocks)
+        self.version += 1
+        self.blocks.update(blocks)
+        self._set_course_version(self.blocks)
+
+    def get_blocks_changed_since(self, course_key, version):  # pylint: disable=unused-argument
+        """
+        Returns the current version of the mock modulestore's blocks and
+        the keys of the blocks changed since the given version.
+        """
+        return self.version, self.changed_block_keys.get(version, set() if version == self.version else None)
+
+    def _set_course_version(self, blocks):
+        """
+        Sets the current version on the given mock xBlocks.
+        """
+        for block in blocks.itervalues():
+            block.field_map['course_version'] = self.version
 
     def get_item(self, block_key, depth=None):  # pylint: disable=unused-argument
         """
@@ -108,6 +144,21 @@ class MockCache(object):
         """
         del self.map[key]
 
+    def set_many(self, data, timeout):
+        """
+        Associates each of the given keys with its value in the cache.
+        """
+        for key, val in data.iteritems():
+            self.set(key, val, timeout)
+
+    def delete_many(self, keys):
+        """
+        Deletes the given keys from the cache, ignoring any that are
+        not found.
+        """
+        for key in keys:
+            self.map.pop(key, None)
+
 
 class MockModulestoreFactory(object):
     """
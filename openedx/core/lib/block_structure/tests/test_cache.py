@@ -54,3 +54,33 @@ class TestBlockStructureCache(ChildrenMapTestMixin, TestCase):
         self.assertIsNone(
             self.block_structure_cache.get(self.block_structure.root_block_usage_key)
         )
+
+    def test_add_and_get_shards(self):
+        self.add_transformers()
+        self.block_structure_cache.add_shards(self.block_structure)
+
+        #     0
+        #    / \
+        #   1  2
+        #  / \
+        # 3   4
+        for block_key in (1, 3, 4):
+            shard = self.block_structure_cache.get_shard(self.block_structure.root_block_usage_key, block_key)
+            self.assert_block_structure(shard, [[1], [3, 4], [], [], []], missing_blocks=[2])
+        shard = self.block_structure_cache.get_shard(self.block_structure.root_block_usage_key, 2)
+        self.assert_block_structure(shard, [[2], [], [], [], []], missing_blocks=[1, 3, 4])
+        self.assertEquals(
+            shard.get_transformer_block_field(0, MockTransformer, 'test'),
+            '{} val'.format(MockTransformer.name()),
+        )
+
+        # The root block is not within any shard.
+        self.assertIsNone(self.block_structure_cache.get_shard(self.block_structure.root_block_usage_key, 0))
+
+    def test_delete_shards(self):
+        self.add_transformers()
+        self.block_structure_cache.add(self.block_structure)
+        self.block_structure_cache.add_shards(self.block_structure)
+        self.block_structure_cache.delete(self.block_structure.root_block_usage_key)
+        self.assertIsNone(self.block_structure_cache.get_shard(self.block_structure.root_block_usage_key, 1))
+        self.assertEquals(self.mock_cache.map, {})
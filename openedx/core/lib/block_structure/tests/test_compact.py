@@ -0,0 +1,194 @@
+"""
+Tests for compact.py
+"""
+# pylint: disable=protected-access
+from copy import deepcopy
+import ddt
+import itertools
+from nose.plugins.attrib import attr
+from unittest import TestCase
+
+from ..block_structure import BlockStructureBlockData
+from ..cache import BlockStructureCache
+from ..compact import CompactBlockStructureBlockData
+from ..factory import BlockStructureFactory
+from .helpers import ChildrenMapTestMixin, MockCache, MockTransformer
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestCompactBlockStructure(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for CompactBlockStructureBlockData
+    """
+    ALL_CHILDREN_MAPS = [
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    ]
+
+    def create_compact_block_structure(self, children_map):
+        """
+        Returns a compact block structure converted from a regular block
+        structure for the given children_map, with transformer and
+        xBlock data set on each block.
+        """
+        block_structure = self.create_block_structure(children_map)
+        for block_key in range(len(children_map)):
+            block_structure.set_transformer_block_field(block_key, MockTransformer, 'key', 'val.' + unicode(block_key))
+            setattr(block_structure._get_or_create_block(block_key), 'field', block_key)
+        return BlockStructureFactory.create_compact(block_structure)
+
+    @ddt.data(*ALL_CHILDREN_MAPS)
+    def test_relations(self, children_map):
+        block_structure = self.create_block_structure(children_map, CompactBlockStructureBlockData)
+        self.assert_block_structure(block_structure, children_map)
+        self.assertEquals(len(block_structure), len(children_map))
+        self.assertNotIn(len(children_map) + 1, block_structure)
+        self.assertEquals(block_structure.get_children(len(children_map) + 1), [])
+
+    @ddt.data(*ALL_CHILDREN_MAPS)
+    def test_create_compact(self, children_map):
+        block_structure = self.create_compact_block_structure(children_map)
+        self.assertIsInstance(block_structure, CompactBlockStructureBlockData)
+        self.assert_block_structure(block_structure, children_map)
+        for block_key in range(len(children_map)):
+            self.assertEquals(block_structure.get_xblock_field(block_key, 'field'), block_key)
+            self.assertEquals(block_structure[block_key].field, block_key)
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block_key, MockTransformer, 'key'),
+                'val.' + unicode(block_key),
+            )
+            self.assertEquals(
+                block_structure.get_transformer_block_data(block_key, MockTransformer).key,
+                'val.' + unicode(block_key),
+            )
+        self.assertEquals(
+            sorted(block_key for block_key, __ in block_structure.iteritems()),
+            range(len(children_map)),
+        )
+
+    @ddt.data(*ALL_CHILDREN_MAPS)
+    def test_traversals(self, children_map):
+        block_structure = self.create_block_structure(children_map)
+        compact_block_structure = BlockStructureFactory.create_compact(block_structure)
+        self.assertEquals(
+            list(block_structure.topological_traversal()),
+            list(compact_block_structure.topological_traversal()),
+        )
+        self.assertEquals(
+            list(block_structure.post_order_traversal()),
+            list(compact_block_structure.post_order_traversal()),
+        )
+        self.assertEquals(
+            list(block_structure.topological_traversal(filter_func=lambda block_key: block_key != 1)),
+            list(compact_block_structure.topological_traversal(filter_func=lambda block_key: block_key != 1)),
+        )
+
+    def test_missing_data(self):
+        block_structure = self.create_block_structure(
+            ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+            CompactBlockStructureBlockData,
+        )
+        block_structure.set_transformer_block_field(1, MockTransformer, 'none_key', None)
+
+        self.assertIsNone(block_structure[0])
+        self.assertEquals(block_structure.get_xblock_field(1, 'field', 'default'), 'default')
+        self.assertIsNone(block_structure.get_transformer_block_field(1, MockTransformer, 'none_key', 'default'))
+        self.assertEquals(block_structure.get_transformer_block_field(1, MockTransformer, 'key', 'default'), 'default')
+        with self.assertRaises(KeyError):
+            block_structure.get_transformer_block_data(0, MockTransformer)
+
+        block_structure.remove_transformer_block_field(1, MockTransformer, 'none_key')
+        self.assertEquals(
+            block_structure.get_transformer_block_field(1, MockTransformer, 'none_key', 'default'),
+            'default',
+        )
+
+    @ddt.data(
+        *itertools.product(
+            [True, False],
+            range(7),
+            ALL_CHILDREN_MAPS,
+        )
+    )
+    @ddt.unpack
+    def test_remove_block(self, keep_descendants, block_to_remove, children_map):
+        if (block_to_remove >= len(children_map)) or (keep_descendants and block_to_remove == 0):
+            return
+
+        block_structure = self.create_block_structure(children_map)
+        compact_block_structure = self.create_compact_block_structure(children_map)
+
+        for structure in (block_structure, compact_block_structure):
+            structure.remove_block(block_to_remove, keep_descendants)
+            structure._prune_unreachable()
+
+        for block_key in range(len(children_map)):
+            self.assertEquals(block_key in block_structure, block_key in compact_block_structure)
+            self.assertEquals(
+                set(block_structure.get_children(block_key)),
+                set(compact_block_structure.get_children(block_key)),
+            )
+            self.assertEquals(
+                set(block_structure.get_parents(block_key)),
+                set(compact_block_structure.get_parents(block_key)),
+            )
+        self.assertEquals(len(block_structure), len(compact_block_structure))
+        self.assertIsNone(compact_block_structure[block_to_remove])
+
+    def test_set_root_block(self):
+        block_structure = self.create_compact_block_structure(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        block_structure.set_root_block(1)
+        block_structure._prune_unreachable()
+        self.assert_block_structure(
+            block_structure,
+            [[], [3, 4], [], [], []],
+            missing_blocks=[0, 2],
+        )
+
+    def test_copy(self):
+        block_structure = self.create_compact_block_structure(ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        new_copy = block_structure.copy()
+        self.assertIsInstance(new_copy, CompactBlockStructureBlockData)
+        self.assert_block_structure(new_copy, ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+
+        # verify edits to the original block structure do not affect the copy
+        block_structure.remove_block(2, keep_descendants=True)
+        block_structure.set_transformer_block_field(1, MockTransformer, 'key', 'edit1')
+        self.assert_block_structure(block_structure, [[1], [3], [], []], missing_blocks=[2])
+        self.assert_block_structure(new_copy, [[1], [2], [3], []])
+        self.assertEquals(new_copy.get_transformer_block_field(1, MockTransformer, 'key'), 'val.1')
+
+        # verify edits to the copy do not affect the original
+        new_copy._add_relation(3, 4)
+        new_copy.set_transformer_block_field(4, MockTransformer, 'key', 'edit2')
+        self.assertNotIn(4, block_structure)
+        self.assertIsNone(block_structure.get_transformer_block_field(4, MockTransformer, 'key'))
+        self.assertEquals(new_copy.get_transformer_block_field(4, MockTransformer, 'key'), 'edit2')
+
+    def test_cache(self):
+        children_map = ChildrenMapTestMixin.DAG_CHILDREN_MAP
+        block_structure = self.create_compact_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        block_structure_cache = BlockStructureCache(MockCache())
+        block_structure_cache.add(block_structure)
+
+        cached_block_structure = block_structure_cache.get(block_structure.root_block_usage_key)
+        self.assertIsInstance(cached_block_structure, CompactBlockStructureBlockData)
+        self.assert_block_structure(cached_block_structure, children_map)
+        self.assertEquals(cached_block_structure._get_transformer_data_version(MockTransformer), MockTransformer.VERSION)
+        self.assertIsNone(cached_block_structure.get_xblock_field(0, 'missing_field'))
+        for block_key in range(len(children_map)):
+            self.assertEquals(cached_block_structure.get_xblock_field(block_key, 'field'), block_key)
+
+    def test_public_api_matches(self):
+        children_map = deepcopy(ChildrenMapTestMixin.DAG_CHILDREN_MAP)
+        block_structure = self.create_block_structure(children_map, BlockStructureBlockData)
+        compact_block_structure = self.create_block_structure(children_map, CompactBlockStructureBlockData)
+        for structure in (block_structure, compact_block_structure):
+            structure.remove_block_traversal(lambda block_key: block_key == 3, keep_descendants=True)
+        self.assertEquals(set(block_structure), set(compact_block_structure))
+        for block_key in block_structure:
+            self.assertEquals(block_structure.get_children(block_key), compact_block_structure.get_children(block_key))
+            self.assertEquals(block_structure.get_parents(block_key), compact_block_structure.get_parents(block_key))
@@ -6,6 +6,7 @@ from unittest import TestCase
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
 from ..cache import BlockStructureCache
+from ..compact import CompactBlockStructureBlockData
 from ..factory import BlockStructureFactory
 from .helpers import (
     MockCache, MockModulestoreFactory, ChildrenMapTestMixin
@@ -66,3 +67,31 @@ class TestBlockStructureFactory(TestCase, ChildrenMapTestMixin):
             block_structure._block_data_map,  # pylint: disable=protected-access
         )
         self.assert_block_structure(new_structure, self.children_map)
+
+    def test_subtree(self):
+        #     0
+        #    / \
+        #   1  2
+        #   \ / \
+        #    3  4
+        #   / \
+        #  5  6
+        block_structure = self.create_block_structure(self.DAG_CHILDREN_MAP)
+        block_structure.set_transformer_block_field(3, 'transformer', 'key', 'val3')
+        block_structure.set_transformer_block_field(4, 'transformer', 'key', 'val4')
+
+        subtree = BlockStructureFactory.create_subtree(block_structure, 2)
+        self.assertEquals(subtree.root_block_usage_key, 0)
+        self.assert_block_structure(subtree, [[2], [], [3, 4], [5, 6], [], [], []], missing_blocks=[1])
+        self.assertEquals(subtree.get_transformer_block_field(3, 'transformer', 'key'), 'val3')
+        self.assertEquals(subtree.get_transformer_block_field(4, 'transformer', 'key'), 'val4')
+
+        # verify the subtree's data is a copy
+        subtree.set_transformer_block_field(3, 'transformer', 'key', 'edit')
+        self.assertEquals(block_structure.get_transformer_block_field(3, 'transformer', 'key'), 'val3')
+
+    def test_compact_subtree(self):
+        block_structure = BlockStructureFactory.create_compact(self.create_block_structure(self.children_map))
+        subtree = BlockStructureFactory.create_subtree(block_structure, 1)
+        self.assertIsInstance(subtree, CompactBlockStructureBlockData)
+        self.assert_block_structure(subtree, [[1], [3, 4], [], [], []], missing_blocks=[2])
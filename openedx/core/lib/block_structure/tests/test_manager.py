@@ -9,7 +9,7 @@ from ..exceptions import UsageKeyNotInBlockStructure
 from ..manager import BlockStructureManager
 from ..transformers import BlockStructureTransformers
 from .helpers import (
-    MockModulestoreFactory, MockCache, MockTransformer, ChildrenMapTestMixin, mock_registered_transformers
+    MockModulestoreFactory, MockCache, MockTransformer, MockXBlock, ChildrenMapTestMixin, mock_registered_transformers
 )
 
 
@@ -85,6 +85,26 @@ class TestTransformer1(MockTransformer):
         return data_key + 't1.val1.' + unicode(block_key)
 
 
+class TestIncrementalTransformer(TestTransformer1):
+    """
+    Test Transformer class that supports incremental collection, and
+    percolates the collected values of blocks down to their descendants.
+    """
+    SUPPORTS_INCREMENTAL_COLLECT = True
+    collected_block_keys = None
+
+    @classmethod
+    def collect(cls, block_structure):
+        super(TestIncrementalTransformer, cls).collect(block_structure)
+        cls.collected_block_keys = set(block_structure)
+        block_structure.request_xblock_fields('value')
+        for block_key in block_structure.topological_traversal():
+            values = {block_structure.get_xblock(block_key).field_map.get('value')}
+            for parent_key in block_structure.get_parents(block_key):
+                values |= block_structure.get_transformer_block_field(parent_key, cls, 'merged_values')
+            block_structure.set_transformer_block_field(block_key, cls, 'merged_values', values)
+
+
 @attr(shard=2)
 class TestBlockStructureManager(TestCase, ChildrenMapTestMixin):
     """
@@ -94,6 +114,7 @@ class TestBlockStructureManager(TestCase, ChildrenMapTestMixin):
         super(TestBlockStructureManager, self).setUp()
 
         TestTransformer1.collect_call_count = 0
+        TestIncrementalTransformer.collect_call_count = 0
         self.registered_transformers = [TestTransformer1()]
         with mock_registered_transformers(self.registered_transformers):
             self.transformers = BlockStructureTransformers(self.registered_transformers)
@@ -179,8 +200,139 @@ class TestBlockStructureManager(TestCase, ChildrenMapTestMixin):
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.assertEquals(TestTransformer1.collect_call_count, 2)
 
+    def test_get_transformed_sharded(self):
+        self.bs_manager.sharded = True
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.get_collected()
+
+        # Remove the entire block structure from the cache, so that only
+        # its shards remain.
+        del self.cache.map[self.bs_manager.block_structure_cache._encode_root_cache_key(0)]  # pylint: disable=protected-access
+
+        self.modulestore.get_items_call_count = 0
+        with mock_registered_transformers(self.registered_transformers):
+            block_structure = self.bs_manager.get_transformed(self.transformers, starting_block_usage_key=1)
+        self.assertEquals(self.modulestore.get_items_call_count, 0)
+        self.assert_block_structure(block_structure, [[], [3, 4], [], [], []], missing_blocks=[0, 2])
+        TestTransformer1.assert_transformed(block_structure)
+
+        # A starting block that is not within a shard uses the entire
+        # block structure.
+        with mock_registered_transformers(self.registered_transformers):
+            block_structure = self.bs_manager.get_transformed(self.transformers, starting_block_usage_key=0)
+        self.assertGreater(self.modulestore.get_items_call_count, 0)
+        self.assert_block_structure(block_structure, self.children_map)
+
     def test_clear(self):
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.bs_manager.clear()
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.assertEquals(TestTransformer1.collect_call_count, 2)
+
+
+    def update_collected_incrementally(self, changed_blocks):
+        """
+        Updates the modulestore with the given changed blocks, given as a
+        map of block key to a tuple of its value and children, and calls
+        the manager's update_collected_incrementally method.
+        """
+        self.modulestore.update_blocks({
+            block_key: MockXBlock(block_key, {'value': value}, children=children, modulestore=self.modulestore)
+            for block_key, (value, children) in changed_blocks.iteritems()
+        })
+        self.modulestore.get_items_call_count = 0
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.update_collected_incrementally()
+
+    def get_collected_and_verify(self):
+        """
+        Returns the collected block structure from the cache, after
+        verifying its relations and collected data.
+        """
+        self.modulestore.get_items_call_count = 0
+        with mock_registered_transformers(self.registered_transformers):
+            block_structure = self.bs_manager.get_collected()
+        self.assertEquals(self.modulestore.get_items_call_count, 0)
+        self.assert_block_structure(block_structure, self.children_map)
+        TestIncrementalTransformer.assert_collected(block_structure)
+        return block_structure
+
+    def test_update_collected_incrementally(self):
+        self.registered_transformers = [TestIncrementalTransformer()]
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.get_collected()
+
+        self.update_collected_incrementally({1: ('new', [3, 4])})
+        # Only the changed block, its descendants and its ancestors are collected.
+        self.assertEquals(TestIncrementalTransformer.collected_block_keys, {0, 1, 3, 4})
+        block_structure = self.get_collected_and_verify()
+        for block_key, values in [(0, {None}), (1, {None, 'new'}), (2, {None}), (3, {None, 'new'})]:
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block_key, TestIncrementalTransformer, 'merged_values'),
+                values,
+            )
+        self.assertEquals(block_structure.get_xblock_field(1, 'value'), 'new')
+        self.assertIsNone(block_structure.get_xblock_field(2, 'value'))
+
+        # Without any further changes, nothing is collected.
+        TestIncrementalTransformer.collected_block_keys = None
+        self.update_collected_incrementally({})
+        self.assertEquals(self.modulestore.get_items_call_count, 0)
+        self.assertIsNone(TestIncrementalTransformer.collected_block_keys)
+
+    def test_update_collected_incrementally_relations(self):
+        self.registered_transformers = [TestIncrementalTransformer()]
+        self.bs_manager.compact = True
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.get_collected()
+
+        # Move block 4 from block 1 to a new block 5 under block 2.
+        self.update_collected_incrementally({
+            1: (None, [3]),
+            2: (None, [5]),
+            5: ('new', [4]),
+        })
+        self.children_map = [[1, 2], [3], [5], [], [], [4]]
+        self.assertEquals(TestIncrementalTransformer.collected_block_keys, {0, 1, 2, 3, 4, 5})
+        block_structure = self.get_collected_and_verify()
+        self.assertEquals(
+            block_structure.get_transformer_block_field(4, TestIncrementalTransformer, 'merged_values'),
+            {None, 'new'},
+        )
+
+        # Remove block 5.
+        self.update_collected_incrementally({2: (None, [])})
+        self.children_map = [[1, 2], [3], [], []]
+        self.assertEquals(TestIncrementalTransformer.collected_block_keys, {0, 2})
+        block_structure = self.get_collected_and_verify()
+        self.assertNotIn(5, block_structure)
+        self.assertNotIn(4, block_structure)
+
+    def test_update_collected_incrementally_unsupported(self):
+        self.registered_transformers = [TestIncrementalTransformer(), TestTransformer1()]
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.get_collected()
+
+        self.update_collected_incrementally({1: ('new', [3, 4])})
+        # The entire block structure is collected again.
+        self.assertEquals(TestIncrementalTransformer.collected_block_keys, {0, 1, 2, 3, 4})
+        self.assertEquals(TestTransformer1.collect_call_count, 2)
+
+    def test_update_collected_incrementally_unknown_changes(self):
+        self.registered_transformers = [TestIncrementalTransformer()]
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.get_collected()
+
+        # Collected data of a version whose changes are not known
+        # anymore is collected again in full.
+        self.modulestore.update_blocks({})
+        self.modulestore.changed_block_keys.clear()
+        self.update_collected_incrementally({1: ('new', [3, 4])})
+        self.assertEquals(TestIncrementalTransformer.collected_block_keys, {0, 1, 2, 3, 4})
+        self.assertEquals(TestIncrementalTransformer.collect_call_count, 2)
+
+    def test_update_collected_incrementally_not_cached(self):
+        self.registered_transformers = [TestIncrementalTransformer()]
+        self.update_collected_incrementally({1: ('new', [3, 4])})
+        self.assertEquals(TestIncrementalTransformer.collected_block_keys, {0, 1, 2, 3, 4})
+        self.assertEquals(TestIncrementalTransformer.collect_call_count, 1)
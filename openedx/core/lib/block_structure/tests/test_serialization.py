@@ -0,0 +1,118 @@
+"""
+Tests for serialization.py
+"""
+# pylint: disable=protected-access
+import ddt
+from nose.plugins.attrib import attr
+from unittest import TestCase
+
+from ..cache import BlockStructureCache
+from ..compact import CompactBlockStructureBlockData
+from ..exceptions import BlockStructureSerializationError
+from ..factory import BlockStructureFactory
+from ..serialization import BlockStructureSerializer, FORMAT_MAGIC
+from .helpers import ChildrenMapTestMixin, MockCache, MockTransformer
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestBlockStructureSerializer(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for BlockStructureSerializer
+    """
+    def create_serialized_block_structure(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        transformer and xBlock data, and its binary serialization.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        for block_key in range(len(children_map)):
+            block_structure.set_transformer_block_field(block_key, MockTransformer, 'key', block_key * 10)
+            block_structure.set_transformer_block_field(block_key, 'other', 'key', None)
+            setattr(block_structure._get_or_create_block(block_key), 'field', unicode(block_key))
+        return block_structure, BlockStructureSerializer.serialize(block_structure)
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_round_trip(self, children_map):
+        block_structure, data = self.create_serialized_block_structure(children_map)
+        self.assertTrue(BlockStructureSerializer.is_serialized(data))
+
+        deserialized = BlockStructureSerializer.deserialize(block_structure.root_block_usage_key, data)
+        self.assertIsInstance(deserialized, CompactBlockStructureBlockData)
+        self.assert_block_structure(deserialized, children_map)
+        self.assertEquals(deserialized._get_transformer_data_version(MockTransformer), MockTransformer.VERSION)
+        for block_key in range(len(children_map)):
+            self.assertEquals(deserialized.get_transformer_block_field(block_key, MockTransformer, 'key'), block_key * 10)
+            self.assertIsNone(deserialized.get_transformer_block_field(block_key, 'other', 'key', 'default'))
+            self.assertEquals(deserialized.get_xblock_field(block_key, 'field'), unicode(block_key))
+
+    def test_lazy_decoding(self):
+        __, data = self.create_serialized_block_structure(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        deserialized = BlockStructureSerializer.deserialize(0, data)
+        block_data_columns = deserialized._block_data_map
+        self.assertEquals(block_data_columns.transformer_fields, {})
+        self.assertEquals(block_data_columns.xblock_fields, {})
+
+        deserialized.get_transformer_block_field(1, MockTransformer, 'key')
+        self.assertEquals(block_data_columns.transformer_fields.keys(), [MockTransformer.name()])
+        self.assertEquals(block_data_columns.xblock_fields, {})
+
+    def test_changes_before_decoding(self):
+        __, data = self.create_serialized_block_structure(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        deserialized = BlockStructureSerializer.deserialize(0, data)
+
+        deserialized.remove_block(1, keep_descendants=False)
+        deserialized.set_transformer_block_field(5, 'new', 'key', 'new value')
+        new_copy = deserialized.copy()
+
+        for block_structure in (deserialized, new_copy):
+            self.assertIsNone(block_structure.get_transformer_block_field(1, MockTransformer, 'key'))
+            self.assertIsNone(block_structure.get_xblock_field(1, 'field'))
+            self.assertIsNone(block_structure.get_transformer_block_field(5, MockTransformer, 'key'))
+            self.assertEquals(block_structure.get_transformer_block_field(2, MockTransformer, 'key'), 20)
+            self.assertEquals(block_structure.get_transformer_block_field(5, 'new', 'key'), 'new value')
+
+    def test_serialize_deserialized(self):
+        block_structure, data = self.create_serialized_block_structure(ChildrenMapTestMixin.DAG_CHILDREN_MAP)
+        deserialized = BlockStructureSerializer.deserialize(0, data)
+        deserialized.remove_block(3, keep_descendants=True)
+
+        reserialized = BlockStructureSerializer.deserialize(0, BlockStructureSerializer.serialize(deserialized))
+        block_structure.remove_block(3, keep_descendants=True)
+        for block_key in range(len(ChildrenMapTestMixin.DAG_CHILDREN_MAP)):
+            self.assertEquals(block_structure.get_children(block_key), reserialized.get_children(block_key))
+            self.assertEquals(block_structure.get_parents(block_key), reserialized.get_parents(block_key))
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block_key, MockTransformer, 'key'),
+                reserialized.get_transformer_block_field(block_key, MockTransformer, 'key'),
+            )
+
+    @ddt.data(
+        '',
+        'not a block structure',
+        FORMAT_MAGIC,
+        FORMAT_MAGIC + '\xff\xff\x04\x00\x00\x00\x00',
+    )
+    def test_invalid_data(self, data):
+        with self.assertRaises(BlockStructureSerializationError):
+            BlockStructureSerializer.deserialize(0, data)
+
+    def test_cache(self):
+        children_map = ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP
+        mock_cache = MockCache()
+        block_structure_cache = BlockStructureCache(mock_cache)
+        block_structure = BlockStructureFactory.create_compact(self.create_block_structure(children_map))
+        block_structure_cache.add(block_structure)
+
+        cached_data = mock_cache.map.values()[0]
+        self.assertTrue(BlockStructureSerializer.is_serialized(cached_data))
+        self.assert_block_structure(block_structure_cache.get(0), children_map)
+
+        # Data in an unsupported version of the format is a cache miss.
+        mock_cache.map[mock_cache.map.keys()[0]] = FORMAT_MAGIC + '\xff\xff' + cached_data[6:]
+        self.assertIsNone(block_structure_cache.get(0))
@@ -28,6 +28,24 @@ class BlockStructureTransformer(object):
     #
     VERSION = 0
 
+    # A transformer may set its SUPPORTS_INCREMENTAL_COLLECT class
+    # attribute to True if its collect method can be run on a partial
+    # block structure, which contains only the blocks affected by a
+    # change to the modulestore: the changed blocks, their descendants
+    # and their ancestors.  Collected data of all other blocks is kept
+    # as is.
+    #
+    # This holds when the data that the transformer collects for a block
+    # depends only on that block and its ancestors (for example, when
+    # data is percolated down to descendants), and its structure-wide
+    # data depends only on the root block.  The collect method must
+    # not access xBlocks of blocks that are not in the block structure.
+    #
+    # Incremental collection is used only when all registered
+    # transformers support it.
+    #
+    SUPPORTS_INCREMENTAL_COLLECT = False
+
     @classmethod
     def name(cls):
         """
@@ -101,6 +101,26 @@ class BlockStructureTransformers(object):
 
         return bool(outdated_transformers)
 
+    @classmethod
+    def supports_incremental_collect(cls):
+        """
+        Returns whether all registered transformers support collecting
+        data for a partial block structure.
+        """
+        unsupported_transformers = [
+            transformer
+            for transformer in TransformerRegistry.get_registered_transformers()
+            if not transformer.SUPPORTS_INCREMENTAL_COLLECT
+        ]
+
+        if unsupported_transformers:
+            logger.info(
+                "The following transformers do not support incremental collection: '%s'.",
+                [transformer.name() for transformer in unsupported_transformers],
+            )
+
+        return not unsupported_transformers
+
     def transform(self, block_structure):
         """
         The given block structure is transformed by each transformer in the